@@ -0,0 +1,105 @@
+# Настройки бенчмарков накладных расходов фреймворка
+# Запуск: pytest benchmarks/ (в одном процессе, без -n, иначе замеры мешают друг другу)
+# Фикстуры из корневого conftest.py (playwright, browser_pool, new_context, context, page ...) работают как обычно,
+# но base_url указывает на локальный стенд-заглушку (tests/utils/stand_in_app.py), а не на стенд Cicada8.
+
+import os
+import pytest
+
+from tests.utils import benchmark  # Замеры, сводка и сравнение с базовой линией
+from tests.utils.session_stats import stats  # Замеры передаются через статистику сессии (в том числе от воркеров xdist)
+from tests.utils.stand_in_app import StandInApp  # Локальный HTTP-сервер с формой входа и дашбордом
+
+# Учётные данные, которые принимает стенд-заглушка
+BENCH_EMAIL = "bench@cicada8.ru"
+BENCH_PASSWORD = "bench-password"
+
+
+# Регистрируем опции бенчмарков
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-rounds", type=int, default=10,
+        help="How many measured rounds each benchmarked path runs (after one warm-up round)",
+    )
+    parser.addoption(
+        "--bench-threshold", type=float, default=0.2,
+        help="Fail when a path's median is slower than the baseline by more than this fraction (0.2 = 20%%)",
+    )
+    parser.addoption(
+        "--bench-baseline", default=os.path.join(os.path.dirname(__file__), "baseline.json"),
+        help="JSON file with baseline benchmark results",
+    )
+    parser.addoption(
+        "--bench-save-baseline", action="store_true",
+        help="Save this run's results as the new baseline instead of comparing against it",
+    )
+
+
+# Фикстура для стенда-заглушки (один на сессию)
+@pytest.fixture(scope="session")
+def stand_in_app():
+    with StandInApp(accounts={BENCH_EMAIL: BENCH_PASSWORD}) as app:
+        yield app
+
+
+# Фикстура для учётных данных, которые принимает стенд-заглушка: (email, пароль)
+@pytest.fixture(scope="session")
+def bench_account():
+    return BENCH_EMAIL, BENCH_PASSWORD
+
+
+# Фикстуры page, logged_in_page и др. открывают стенд-заглушку вместо стенда Cicada8
+@pytest.fixture(scope="session")
+def base_url(stand_in_app):
+    return stand_in_app.base_url
+
+
+# Фикстура для замера пути: bench("имя", функция, cleanup=...) выполняет функцию --bench-rounds раз
+@pytest.fixture
+def bench(pytestconfig):
+    rounds = pytestconfig.getoption("--bench-rounds")
+
+    def run(name, func, cleanup=None, warmup=1):
+        return benchmark.run(name, func, rounds, warmup=warmup, cleanup=cleanup)
+
+    return run
+
+
+# Хук сравнивает результаты с базовой линией (или сохраняет их как новую базовую линию)
+# Выполняется в контроллере xdist или в единственном процессе, когда статистика воркеров уже объединена
+def pytest_sessionfinish(session):
+    config = session.config
+    if hasattr(config, "workeroutput"):
+        return
+    results = benchmark.collect_results(stats.records.get(benchmark.STATS_SECTION, []))
+    if not results:
+        return
+    path = config.getoption("--bench-baseline")
+    config.bench_results = results
+    config.bench_baseline = benchmark.load_baseline(path)
+    if config.getoption("--bench-save-baseline"):
+        benchmark.save_baseline(path, results)
+        config.bench_saved = path
+        return
+    config.bench_regressions = benchmark.find_regressions(
+        results, config.bench_baseline, config.getoption("--bench-threshold")
+    )
+    if config.bench_regressions:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED  # Замедление пути считается падением запуска
+
+
+# Хук выводит таблицу результатов и найденные регрессии
+def pytest_terminal_summary(terminalreporter):
+    config = terminalreporter.config
+    results = getattr(config, "bench_results", None)
+    if not results:
+        return
+    terminalreporter.section("benchmarks (ms)")
+    for line in benchmark.summary_lines(results, config.bench_baseline):
+        terminalreporter.write_line(line)
+    if getattr(config, "bench_saved", None):
+        terminalreporter.write_line(f"baseline saved to {config.bench_saved}")
+    elif not config.bench_baseline:
+        terminalreporter.write_line("no baseline yet: run with --bench-save-baseline to create one")
+    for line in getattr(config, "bench_regressions", []):
+        terminalreporter.write_line(f"REGRESSION {line}", red=True)
@@ -0,0 +1,98 @@
+# Бенчмарки накладных расходов фреймворка на локальном стенде-заглушке
+# Каждый тест замеряет один путь из conftest.py и утилит: запуск Playwright, запуск браузера,
+# создание контекста, открытие страницы, трассировка, вход через форму и из кэша авторизации, подключение к IMAP.
+# Итог (min, медиана, p95 и сравнение с базовой линией) печатается в разделе "benchmarks" в конце запуска.
+
+from concurrent.futures import ThreadPoolExecutor
+
+from playwright.sync_api import sync_playwright
+
+from tests.utils.browser_pool import BrowserPool
+from tests.utils.auth_utils import AuthStateCache, login_via_ui, open_logged_in_page
+from tests.utils.imap_utils import get_mailbox_watermark, wait_for_reset_link
+from tests.utils.trace_ring import TraceRing
+
+
+# Запуск драйвера Playwright (фикстура playwright)
+# Пока в потоке теста работает драйвер из фикстуры playwright, второй sync_playwright в нём запустить нельзя,
+# поэтому драйвер запускается и останавливается в отдельном потоке: замер не зависит от порядка тестов
+def test_playwright_startup(bench):
+    with ThreadPoolExecutor(max_workers=1) as thread:  # Один поток: драйвер останавливается там же, где запущен
+        bench(
+            "playwright start",
+            lambda: thread.submit(lambda: sync_playwright().start()).result(),
+            cleanup=lambda playwright: thread.submit(playwright.stop).result(),
+        )
+
+
+# Запуск Chromium (BrowserPool из фикстуры browser_pool; в тестах это происходит раз на воркер)
+def test_browser_launch(bench, playwright):
+    pool = BrowserPool(playwright, headless=True)
+    bench("browser launch", pool.acquire, cleanup=lambda browser: pool.close())
+
+
+# Создание контекста фабрикой new_context (запись трафика, кэш ресурсов, сборщик артефактов)
+def test_new_context(bench, new_context):
+    bench("new_context", new_context, cleanup=lambda context: context.close())
+
+
+# Новая страница и переход на base_url (фикстура page)
+def test_new_page_goto(bench, context, base_url):
+    def open_page():
+        page = context.new_page()
+        page.goto(base_url)
+        return page
+
+    bench("new_page + goto", open_page, cleanup=lambda page: page.close())
+
+
+# Контекст с трассировкой и без неё (фикстура trace_ring): накладные расходы трассировки на успешный тест
+# Трассировка отбрасывается при закрытии контекста, как у прошедшего теста
+def test_trace_ring_overhead(bench, browser, base_url):
+    def open_page(ring):
+        context = browser.new_context()
+        if ring:
+            ring.attach(context)
+        page = context.new_page()
+        page.goto(base_url)
+        page.locator("input[type=email]").fill("bench@cicada8.ru")
+        return context, ring
+
+    def close(result):
+        context, ring = result
+        if ring:
+            ring.detach(context)
+        context.close()
+
+    bench("context + goto (no trace)", lambda: open_page(None), cleanup=close)
+    bench("context + goto (trace ring)", lambda: open_page(TraceRing()), cleanup=close)
+
+
+# Вход через форму в новом контексте (logged_in_page, когда в кэше авторизации нет состояния)
+def test_form_login(bench, new_context, base_url, bench_account):
+    def login():
+        context = new_context()
+        page = context.new_page()
+        page.goto(base_url)
+        login_via_ui(page, *bench_account)
+        return context
+
+    bench("login (form)", login, cleanup=lambda context: context.close())
+
+
+# Авторизованная страница из кэша состояния (обычный путь logged_in_page); прогревочный запуск заполняет кэш
+def test_cached_login(bench, new_context, base_url, bench_account, tmp_path):
+    cache = AuthStateCache(str(tmp_path), ttl=3600)
+    bench(
+        "login (cached state)",
+        lambda: open_logged_in_page(new_context, base_url, *bench_account, cache),
+        cleanup=lambda result: result[0].close(),
+    )
+
+
+# Подключение к IMAP, выбор папки и поиск/чтение письма сброса (imap_utils на локальном почтовом сервере)
+def test_imap_connect_and_search(bench, fake_mail_server, bench_account):
+    email, _ = bench_account
+    fake_mail_server.inject_reset_email(email, token="bench")
+    bench("imap connect + watermark", lambda: get_mailbox_watermark(email, "secret"))
+    bench("imap find reset link", lambda: wait_for_reset_link(email, "secret", since_uid=0, timeout=5))
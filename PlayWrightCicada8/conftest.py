@@ -1,19 +1,39 @@
 # Импортируем библиотеки
 import os  # Модуль для работы с операционной системой, например, для чтения переменных окружения
+import inspect  # Модуль для проверки, является ли тест асинхронной функцией
+from urllib.parse import urlsplit  # Разбор base_url (путь страницы входа для пула страниц)
 import pytest  # Фреймворк для написания и запуска автоматических тестов
 from playwright.sync_api import sync_playwright, Page, \
     BrowserContext  # Инструменты Playwright для управления браузером в синхронном режиме
+from playwright.async_api import async_playwright  # Асинхронный API Playwright для конкурентной работы со страницами
 import logging  # Модуль для записи логов (информации о действиях программы)
 from dotenv import load_dotenv  # Модуль для загрузки переменных окружения из файла .env
-from datetime import datetime  # Модуль для работы с датой и временем, нужен для создания временных меток
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,  # Устанавливаем уровень логов INFO: записываем только важные сообщения
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    # Формат логов: время, имя логгера, уровень, сообщение
-    filename='test_logs.log'  # Все логи будут сохраняться в файл test_logs.log
-)
+from tests.utils.browser_pool import BrowserPool, savings_line  # Пул "тёплых" браузеров (один браузер на воркер)
+from tests.utils.browser_daemon import BrowserDaemon, chromium_executable  # Браузер, живущий между запусками pytest
+from tests.utils import browser_grid  # Браузеры на удалённых серверах Playwright (сетка узлов)
+from tests.utils.mail_broker import MailBrokerProcess  # Брокер почты: одно подключение IMAP для всех воркеров
+from tests.utils.session_stats import stats  # Статистика сессии (замеры времени, счётчики)
+from tests.utils.auth_utils import AuthStateCache, open_logged_in_page, \
+    open_logged_in_page_async  # Кэш состояния авторизации и вход под аккаунтом
+from tests.utils.account_pool import AccountPool, load_accounts  # Аренда тестовых аккаунтов между воркерами
+from tests.utils.async_runner import AsyncRunner  # Цикл событий asyncio в фоновом потоке воркера
+from tests.utils.fake_mail_server import FakeMailServer  # Локальный SMTP/IMAP сервер для тестов без реальной почты
+from tests.utils.network_replay import NetworkRecorder, NETWORK_MODES  # Запись и воспроизведение трафика (HAR)
+from tests.utils.asset_cache import AssetCache, AssetCacheRouter  # Дисковый кэш статических ресурсов
+from tests.utils import perf  # Замер времени шагов тестов и JSON-отчёт о производительности
+from tests.utils.failure_artifacts import ArtifactCollector  # Скриншоты, DOM, консоль и сеть упавших тестов
+from tests.utils import log_pipeline  # Логирование через очередь в JSON-lines файлы воркеров
+from tests.utils.duration_history import DurationHistory, DurationRecorder  # История длительности тестов для планировщика xdist
+from tests.utils import web_vitals  # Клиентские метрики страниц (LCP, CLS, ...) и бюджеты из pytest.ini
+from tests.utils.trace_ring import TraceRing  # Трассировка Playwright с кольцевым буфером, сохраняется при падении
+from tests.utils.page_pool import PagePool, summary_line as page_pool_line  # Пул "тёплых" страниц входа
+from tests.utils import network_profiles  # Профили сети и CPU (задержка, скорость, потери пакетов) для тестов
+from tests.utils import memory_monitor  # Память браузера воркера после каждого теста и поиск утечек
+from tests.utils.preflight import Preflight, CircuitBreaker, STAND_CHECKS, LOGIN_CHECKS, \
+    MAIL_CHECKS  # Проверка стенда перед тестами и автомат защиты фикстур
+
+# Логирование настраивается в pytest_configure (log_pipeline): каждый воркер пишет свой файл
+# test_logs/<запуск>/<воркер>.jsonl, а в конце сессии файлы объединяются в merged.jsonl
 logger = logging.getLogger(__name__)  # Создаём логгер с именем текущего модуля для записи сообщений
 
 # Загружаем .env
@@ -21,6 +41,309 @@ logger = logging.getLogger(__name__)  # Создаём логгер с имен
 load_dotenv()  # Загружаем переменные из файла .env, чтобы использовать их в коде
 
 
+# Регистрируем настройки проекта в pytest.ini
+def pytest_addoption(parser):
+    parser.addini(
+        "auth_state_ttl",
+        "Seconds a cached logged-in storage state stays valid (0 disables the cache)",
+        default="1800",
+    )
+    parser.addini(
+        "asset_cache_max_mb",
+        "Size limit of the shared on-disk static asset cache in megabytes",
+        default="500",
+    )
+    parser.addini(
+        "artifacts_dir",
+        "Directory for failure artifacts (screenshots, DOM, console and network logs)",
+        default="screenshot",
+    )
+    parser.addini(
+        "artifacts_max_mb",
+        "Size limit of failure artifacts written in one run, in megabytes",
+        default="200",
+    )
+    parser.addini(
+        "log_dir",
+        "Directory for per-run JSON-lines test logs (one file per xdist worker plus merged.jsonl)",
+        default="test_logs",
+    )
+    parser.addini(
+        "log_max_mb",
+        "Size in megabytes after which a worker log file is rotated",
+        default="50",
+    )
+    parser.addini(
+        "log_keep_runs",
+        "How many most recent runs to keep in log_dir",
+        default="10",
+    )
+    parser.addini(
+        "perf_report_dir",
+        "Directory for the per-run JSON step timing report (perf_<timestamp>.json and perf_latest.json)",
+        default="reports",
+    )
+    parser.addini(
+        "duration_history",
+        "SQLite file with smoothed per-test durations from previous runs (used to schedule tests across xdist workers)",
+        default=".test_durations.sqlite",
+    )
+    parser.addini(
+        "default_test_duration",
+        "Expected duration in seconds of a test with no history when nothing else is known",
+        default="5",
+    )
+    parser.addini(
+        "account_pool_dir",
+        "Directory shared by xdist workers with account lease locks and current passwords of test accounts",
+        default=".account_pool",
+    )
+    parser.addini(
+        "account_wait_timeout",
+        "Seconds a test may wait for a free test account before failing",
+        default="900",
+    )
+    parser.addini(
+        "browser_grid",
+        "Playwright browser server endpoints (ws://host:port/), one per line; contexts are balanced across them",
+        type="linelist",
+        default=[],
+    )
+    parser.addini(
+        "browser_daemon_dir",
+        "Directory with the state file, profile and log of the browser kept running by --browser-daemon",
+        default=".browser_daemon",
+    )
+    parser.addini(
+        "web_vitals_history",
+        "JSON-lines file the client-side page metrics of every run are appended to",
+        default="reports/web_vitals.jsonl",
+    )
+    parser.addini(
+        "web_vitals_budgets",
+        "Per-page budgets, one per line: '<url path glob> metric=max ...' (e.g. '/ lcp_ms=2000 js_kb=1500')",
+        type="linelist",
+        default=[],
+    )
+    parser.addini(
+        "trace_ring_chunks",
+        "How many finished Playwright trace chunks each context keeps in memory (besides the current one)",
+        default="2",
+    )
+    parser.addini(
+        "trace_chunk_seconds",
+        "Seconds after which the current trace chunk is finished and moved to the in-memory ring",
+        default="10",
+    )
+    parser.addini(
+        "trace_chunk_actions",
+        "Page actions and waits after which the current trace chunk is finished and moved to the in-memory ring",
+        default="50",
+    )
+    parser.addini(
+        "preflight_timeout",
+        "Timeout in seconds of each stand preflight check (DNS, TLS, HTTP, login API, IMAP)",
+        default="5",
+    )
+    parser.addini(
+        "circuit_breaker_threshold",
+        "Consecutive failures of one kind (page load, login) after which dependent tests fail fast (0 disables)",
+        default="3",
+    )
+    parser.addini(
+        "page_pool_bounce_path",
+        "SPA route the pooled login page briefly navigates to (client-side) so the login form remounts empty",
+        default="/password-recovery",
+    )
+    parser.addini(
+        "network_profiles",
+        "Network/CPU profiles: '<name> latency_ms=.. download_kbps=.. upload_kbps=.. packet_loss=.. cpu=..' per line",
+        type="linelist",
+        default=[],
+    )
+    parser.addini(
+        "memory_leak_rss_mb",
+        "Browser RSS growth over the baseline (MB) after which a test is reported as a leak suspect",
+        default="100",
+    )
+    parser.addini(
+        "browser_restart_rss_mb",
+        "Browser RSS (MB) after a test at which the worker browser is restarted before the next test (0 disables)",
+        default="0",
+    )
+    parser.addoption(
+        "--no-memory-monitor", action="store_true",
+        help="Do not sample browser memory (JS heap, DOM, listeners, RSS) after each test",
+    )
+    parser.addoption(
+        "--network-profile", default=network_profiles.DEFAULT_PROFILE,
+        help="Network/CPU profile from network_profiles in pytest.ini applied to every page (the marker overrides it)",
+    )
+    parser.addoption(
+        "--page-pool", action="store_true",
+        help="Reuse loaded login pages between tests using the page fixture (state is reset and verified)",
+    )
+    parser.addoption(
+        "--no-preflight", action="store_true",
+        help="Do not check the stand (DNS, TLS, HTTP, login API, IMAP) before the first test that needs it",
+    )
+    parser.addoption(
+        "--no-trace-ring", action="store_true",
+        help="Do not trace contexts (by default the last trace chunks are kept in memory and saved for failed tests)",
+    )
+    parser.addoption(
+        "--no-web-vitals", action="store_true",
+        help="Do not collect client-side page metrics and do not check web vitals budgets",
+    )
+    parser.addoption(
+        "--browser-grid", default=None,
+        help="Comma-separated Playwright browser server endpoints to run browsers on (overrides browser_grid)",
+    )
+    parser.addoption(
+        "--local-grid", type=int, default=0, metavar="N",
+        help="Start N local Playwright browser servers and use them as the browser grid",
+    )
+    parser.addoption(
+        "--browser-daemon", action="store_true",
+        help="Connect to a Chromium kept running between pytest runs (started on first use) instead of launching one",
+    )
+    parser.addoption(
+        "--no-duration-scheduling", action="store_true",
+        help="Use the default pytest-xdist load scheduling instead of longest-tests-first by historical duration",
+    )
+    parser.addoption(
+        "--no-asset-cache", action="store_true",
+        help="Download static assets (JS, CSS, fonts, images) from the stand in every context",
+    )
+    parser.addoption(
+        "--fake-mail", action="store_true",
+        help="Use a local in-process SMTP/IMAP server instead of mail.cicada8.ru in test_password_recovery",
+    )
+    parser.addoption(
+        "--mail-broker", action="store_true",
+        help="Wait for reset emails of all workers through one broker process with one IMAP session per mailbox",
+    )
+    parser.addoption(
+        "--fake-mail-host", default="127.0.0.1",
+        help="Interface the local mail server listens on (0.0.0.0 if the stand delivers mail to this machine)",
+    )
+    parser.addoption(
+        "--fake-smtp-port", type=int, default=2525,
+        help="SMTP port of the local mail server (the stand must be configured to send mail there)",
+    )
+    parser.addoption(
+        "--network-mode", choices=NETWORK_MODES, default="live",
+        help="live: talk to the stand; record: save each test's traffic to HAR; replay: serve responses from HAR",
+    )
+    parser.addoption(
+        "--har-dir", default="har",
+        help="Directory with per-test HAR recordings for --network-mode=record/replay",
+    )
+
+
+# Хук вызывается при старте pytest: настраиваем логирование и сборщик артефактов упавших тестов
+# Все воркеры xdist пишут в каталоги одного запуска (имя приходит от контроллера через workerinput)
+def pytest_configure(config):
+    workerinput = getattr(config, "workerinput", None)
+    log_dir = os.path.join(str(config.rootpath), config.getini("log_dir"))
+    if workerinput is None:
+        config.run_name = log_pipeline.new_run_name()
+        log_pipeline.remove_old_runs(log_dir, int(config.getini("log_keep_runs")) - 1)  # Место для нового запуска
+    else:
+        config.run_name = workerinput["run_name"]
+    config.log_pipeline = log_pipeline.LogPipeline(
+        os.path.join(log_dir, config.run_name),  # Каталог логов запуска
+        level=logging.INFO,  # Записываем сообщения уровня INFO и выше
+        max_bytes=int(config.getini("log_max_mb")) * 1024 * 1024,  # Ротация файла воркера по размеру
+    )
+    config.log_pipeline.start()
+    root_dir = os.path.join(str(config.rootpath), config.getini("artifacts_dir"), config.run_name)
+    config.failure_artifacts = ArtifactCollector(root_dir, int(config.getini("artifacts_max_mb")) * 1024 * 1024)
+    config.web_vitals_budgets = web_vitals.parse_budgets(config.getini("web_vitals_budgets"))  # Ошибка в бюджетах — сразу
+    config.network_profiles = network_profiles.parse_profiles(config.getini("network_profiles"))
+    network_profiles.get_profile(config.network_profiles, config.getoption("--network-profile"))  # Неизвестный профиль
+    if workerinput is None:
+        # История длительностей ведёт только контроллер (или единственный процесс без xdist):
+        # отчёты всех воркеров приходят к нему, а в конце сессии длительности сохраняются в SQLite
+        config.duration_history = DurationHistory(
+            os.path.join(str(config.rootpath), config.getini("duration_history")),
+            default_duration=float(config.getini("default_test_duration")),
+        )
+        config.pluginmanager.register(DurationRecorder(config.duration_history), "duration_recorder")
+    if workerinput is not None:
+        config.browser_grid = workerinput["browser_grid"]  # Адреса узлов сетки определил контроллер
+    elif config.getoption("--local-grid"):
+        # Локальные серверы Playwright вместо настоящей сетки: запускает контроллер, воркеры только подключаются
+        config.local_grid = browser_grid.LocalGrid(
+            config.getoption("--local-grid"), os.path.join(config.log_pipeline.run_dir, "grid")
+        )
+        config.browser_grid = config.local_grid.start()
+    elif config.getoption("--browser-grid"):
+        config.browser_grid = [endpoint.strip() for endpoint in config.getoption("--browser-grid").split(",")]
+    else:
+        config.browser_grid = config.getini("browser_grid")
+    if workerinput is not None:
+        config.mail_broker_address = workerinput["mail_broker"]
+    elif config.getoption("--mail-broker"):
+        # Брокер почты запускает контроллер; воркеры получают его адрес и обращаются к нему из imap_utils
+        config.mail_broker = MailBrokerProcess(os.path.join(config.log_pipeline.run_dir, "mail_broker.log"))
+        try:
+            config.mail_broker_address = config.mail_broker.start()
+        except RuntimeError as e:
+            logger.warning("Mail broker is unavailable, tests will connect to IMAP directly: %s", e)
+            config.mail_broker_address = None
+    else:
+        config.mail_broker_address = None
+    if config.mail_broker_address:
+        os.environ["MAIL_BROKER"] = config.mail_broker_address
+    if workerinput is None and config.getoption("--browser-daemon") and not config.browser_grid:
+        # Браузер-демон готовит контроллер до старта воркеров: запускает его, если он не работает,
+        # и закрывает страницы, оставленные упавшими запусками. Воркеры только подключаются
+        try:
+            browser_daemon(config).ensure(chromium_executable, clean=True)
+        except (RuntimeError, TimeoutError) as e:
+            logger.warning("Browser daemon is unavailable, browsers will be launched locally: %s", e)
+
+
+# Хук вызывается при завершении pytest: останавливаем локальные серверы Playwright (--local-grid)
+# и брокер почты (--mail-broker)
+def pytest_unconfigure(config):
+    local_grid = getattr(config, "local_grid", None)
+    if local_grid is not None:
+        local_grid.stop()
+    mail_broker = getattr(config, "mail_broker", None)
+    if mail_broker is not None:
+        mail_broker.stop()
+        os.environ.pop("MAIL_BROKER", None)
+
+
+# Функция возвращает BrowserDaemon для каталога из pytest.ini
+def browser_daemon(config):
+    return BrowserDaemon(os.path.join(str(config.rootpath), config.getini("browser_daemon_dir")), headless=True)
+
+
+# Хук pytest-xdist: вместо стандартной раздачи тестов используем планировщик "сначала самые долгие"
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption("--no-duration-scheduling") or config.getoption("dist") != "load":
+        return None  # Другие режимы --dist (loadfile, loadscope, ...) работают как обычно
+    from tests.utils.duration_scheduler import DurationScheduling, xdist_supported  # Модуль зависит от xdist
+    if not xdist_supported():
+        logger.warning("Duration scheduling is not supported by this pytest-xdist version, using load scheduling")
+        return None
+    scheduler = DurationScheduling(config, log, history=config.duration_history)
+    config.pluginmanager.get_plugin("duration_recorder").scheduler = scheduler  # Для сравнения прогноза и факта
+    return scheduler
+
+
+# Хук pytest-xdist: контроллер передаёт воркеру имя каталога запуска для логов и артефактов
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    node.workerinput["run_name"] = node.config.run_name
+    node.workerinput["browser_grid"] = node.config.browser_grid
+    node.workerinput["mail_broker"] = node.config.mail_broker_address
+
+
 # Фикстура для Playwright
 @pytest.fixture(scope="session")  # scope="session" означает, что фикстура создаётся один раз для всей тестовой сессии
 def playwright():
@@ -28,29 +351,267 @@ def playwright():
         yield p  # Возвращаем объект Playwright для использования в других фикстурах
 
 
+# Фикстура для пула браузеров
+# Браузер Chromium запускается один раз на воркер (при запуске с -n auto у каждого воркера своя сессия),
+# а не на каждый тест: это экономит 1-2 секунды на тест и снижает нагрузку на CPU
+# С опцией --browser-daemon браузер не запускается вовсе: воркеры подключаются к браузеру, который остался
+# работать после прошлого запуска pytest (если его нет — браузер запускается локально, как обычно)
+# С сеткой (--browser-grid, --local-grid или browser_grid в pytest.ini) контексты создаются на удалённых
+# серверах Playwright: на узле с наименьшим числом открытых контекстов всех воркеров
+@pytest.fixture(scope="session")
+def browser_pool(playwright, pytestconfig):  # Зависит от фикстуры playwright
+    grid = None
+    if pytestconfig.browser_grid:
+        state_path = os.path.join(pytestconfig.log_pipeline.run_dir, "browser_grid.json")  # Общий для воркеров
+        grid = browser_grid.BrowserGrid(playwright, pytestconfig.browser_grid, state_path)
+    daemon = browser_daemon(pytestconfig) if pytestconfig.getoption("--browser-daemon") and not grid else None
+    pool = BrowserPool(playwright, daemon=daemon, grid=grid, headless=True)  # Браузер в фоновом режиме (без интерфейса)
+    yield pool  # Возвращаем пул для использования в других фикстурах
+    pool.close()  # Закрываем браузер в конце сессии воркера
+    if grid:
+        grid.close()  # Отключаемся от узлов сетки и записываем нагрузку на них
+
+
+# Фикстура для наблюдения за памятью браузера воркера (отключается опцией --no-memory-monitor)
+# После каждого теста записывает остаток в браузере (контексты, страницы, куча JS, RSS Chromium), помечает
+# тесты, после которых память не вернулась к базовой линии, и перезапускает браузер после browser_restart_rss_mb
+@pytest.fixture(scope="session")
+def browser_memory(pytestconfig, browser_pool):
+    if pytestconfig.getoption("--no-memory-monitor") or pytestconfig.browser_grid:
+        return None  # Процессы браузеров сетки работают на других машинах
+    return memory_monitor.MemoryMonitor(
+        browser_pool,
+        leak_rss_mb=float(pytestconfig.getini("memory_leak_rss_mb")),
+        restart_rss_mb=float(pytestconfig.getini("browser_restart_rss_mb")),
+    )
+
+
 # Фикстура для браузера
-# Эта фикстура запускает браузер Chromium для выполнения тестов
+# Возвращает общий браузер воркера, предварительно проверив, что он жив (упавший браузер перезапускается)
+@pytest.fixture
+def browser(browser_pool, browser_memory, request):  # Зависит от фикстуры browser_pool
+    yield browser_pool.acquire()  # Возвращаем рабочий браузер для использования в тестах
+    browser_pool.release()  # Закрываем контексты, которые тест мог оставить открытыми
+    if browser_memory:
+        browser_memory.sample(request.node.nodeid)  # Что осталось в браузере после теста
+
+
+# Фикстура для кэша статических ресурсов
+# Один дисковый кэш на все воркеры (каталог .asset_cache); отключается опцией --no-asset-cache.
+# При записи и воспроизведении HAR кэш не используется, чтобы в записи был весь трафик теста
+@pytest.fixture(scope="session")
+def asset_cache(pytestconfig):
+    if pytestconfig.getoption("--no-asset-cache") or pytestconfig.getoption("--network-mode") != "live":
+        return None
+    cache_dir = os.path.join(str(pytestconfig.rootpath), ".asset_cache")
+    max_bytes = int(pytestconfig.getini("asset_cache_max_mb")) * 1024 * 1024
+    return AssetCacheRouter(AssetCache(cache_dir, max_bytes))
+
+
+# Фикстура для клиентских метрик страниц теста
+# Собирает метрики каждой страницы, открытой в контекстах теста, после теста проверяет бюджеты
+# (хук pytest_runtest_call), а в конце теста записывает замеры в статистику сессии. Отключается --no-web-vitals
+@pytest.fixture
+def web_vitals_monitor(network_throttler, request):
+    if request.config.getoption("--no-web-vitals"):
+        yield None
+        return
+    if network_throttler.profile.throttles:
+        # Бюджеты описывают стенд на сети без ограничений: на медленном профиле замеры только записываются
+        monitor = web_vitals.WebVitalsMonitor(request.node.nodeid, network_profile=network_throttler.profile.name)
+    else:
+        monitor = web_vitals.WebVitalsMonitor(request.node.nodeid, request.config.web_vitals_budgets)
+    request.node.web_vitals = monitor  # Для проверки бюджетов в хуке pytest_runtest_call
+    yield monitor
+    monitor.finish()
+
+
+# Фикстура для трассировки Playwright контекстов теста
+# Последние куски трассировки (скриншоты и снимки DOM действий) держатся в памяти; при падении теста
+# или для тестов с маркером flaky они записываются в артефакты теста (хук pytest_runtest_makereport)
+@pytest.fixture
+def trace_ring(request):
+    if request.config.getoption("--no-trace-ring"):
+        yield None
+        return
+    ring = TraceRing(
+        keep=int(request.config.getini("trace_ring_chunks")),
+        chunk_seconds=float(request.config.getini("trace_chunk_seconds")),
+        chunk_actions=int(request.config.getini("trace_chunk_actions")),
+    )
+    request.node.trace_ring = ring  # Для записи трассировки в хуке pytest_runtest_makereport
+    perf.recorder.listeners.append(ring.on_step)  # Куски сменяются по числу действий и ожиданий на страницах
+    yield ring
+    perf.recorder.listeners.remove(ring.on_step)
+    ring.finish()
+
+
+# Фикстура для профиля сети и CPU теста (маркер network_profile или опция --network-profile)
+# Профиль применяется к каждой странице контекстов теста через CDP; после теста длительность входа,
+# загрузок страниц и шагов теста записывается в статистику сессии с именем профиля (раздел "network profiles")
 @pytest.fixture
-def browser(playwright):  # Зависит от фикстуры playwright
-    browser = playwright.chromium.launch(headless=True)  # Запускаем браузер Chromium в фоновом режиме (без интерфейса)
-    yield browser  # Возвращаем объект браузера для использования в тестах
-    browser.close()  # Закрываем браузер после завершения тестов, чтобы освободить ресурсы
+def network_throttler(request):
+    marker = request.node.get_closest_marker("network_profile")
+    name = marker.args[0] if marker else request.config.getoption("--network-profile")
+    throttler = network_profiles.NetworkThrottler(
+        network_profiles.get_profile(request.config.network_profiles, name), request.node.nodeid
+    )
+    yield throttler
+    throttler.finish(perf.recorder.steps)  # Шаги теста к этому моменту уже замерены
+
+
+# Фикстура-фабрика контекстов
+# Все контексты теста создаются через неё: так к каждому контексту подключаются общие настройки
+# (например, запись/воспроизведение трафика), а в конце теста все они закрываются
+@pytest.fixture
+def new_context(browser, browser_pool, asset_cache, web_vitals_monitor, trace_ring, network_throttler, browser_memory,
+                request):  # Зависит от фикстур browser и browser_pool
+    network = NetworkRecorder(
+        request.config.getoption("--network-mode"),
+        os.path.join(str(request.config.rootpath), request.config.getoption("--har-dir")),
+        request.node.nodeid,
+    )
+    created = []  # Контексты, созданные в этом тесте
+
+    def factory(**context_options):
+        context = browser_pool.new_context(**context_options)  # Создаём новый контекст браузера
+        created.append(context)
+        context.on("page", perf.instrument_page)  # Замеряем действия и ожидания на всех страницах контекста
+        network_throttler.attach(context)  # Задержка, скорость сети и замедление CPU профиля теста
+        request.config.failure_artifacts.watch(context)  # Запоминаем консоль и сеть на случай падения теста
+        network.attach(context)  # Подключаем запись или воспроизведение трафика
+        if asset_cache:
+            asset_cache.attach(context)  # Статические ресурсы отдаются из общего дискового кэша
+        if web_vitals_monitor:
+            web_vitals_monitor.attach(context)  # Метрики каждой загруженной страницы (LCP, CLS, размер JS, ...)
+        if trace_ring:
+            trace_ring.attach(context)  # Трассировка с кольцевым буфером в памяти
+        return context
+
+    yield factory  # Возвращаем фабрику для использования в других фикстурах
+    for context in created:
+        request.config.failure_artifacts.unwatch(context)
+        if web_vitals_monitor:
+            web_vitals_monitor.collect(context)  # Итоговые метрики открытых страниц, пока контекст не закрыт
+        if browser_memory:
+            browser_memory.collect(context)  # Куча JS, узлы DOM и обработчики страниц теста перед закрытием
+        if trace_ring:
+            trace_ring.detach(context)  # Трассировка нужна только упавшим тестам — отбрасываем без выгрузки
+        context.close()  # Закрываем контексты после завершения теста (в режиме record при этом сохраняется HAR)
+
+
+# Фикстура для пула страниц входа (опция --page-pool, один пул на воркер)
+# Загруженные страницы входа не закрываются после теста, а сбрасываются (cookies, хранилища, форма входа)
+# и выдаются следующим тестам с фикстурой page. При записи и воспроизведении трафика пул не используется
+@pytest.fixture(scope="session")
+def page_pool(pytestconfig, browser_pool, asset_cache, base_url):
+    if not pytestconfig.getoption("--page-pool") or pytestconfig.getoption("--network-mode") != "live":
+        yield None
+        return
+
+    def pooled_context():
+        # Контекст создаётся в браузере напрямую: BrowserPool.release закрывает свои контексты после каждого теста
+        context = browser_pool.acquire().new_context()
+        context.on("page", perf.instrument_page)
+        if asset_cache:
+            asset_cache.attach(context)
+        return context
+
+    pool = PagePool(
+        pooled_context, base_url,
+        login_path=urlsplit(base_url).path or "/",
+        bounce_path=pytestconfig.getini("page_pool_bounce_path"),
+    )
+    yield pool
+    pool.close()
+
+
+# Фикстура выдаёт страницу из пула тесту, который использует фикстуру page (только с опцией --page-pool)
+# После теста страница сбрасывается и возвращается в пул; страница упавшего теста закрывается.
+# Тесты с профилем сети с ограничениями получают новую страницу: страницы пула загружены без ограничений
+@pytest.fixture
+def page_lease(page_pool, circuit_breaker, network_throttler, request):
+    if page_pool is None or "page" not in request.fixturenames or network_throttler.profile.throttles:
+        yield None
+        return
+    lease = guarded(circuit_breaker, "page load", page_pool.checkout)
+    request.config.failure_artifacts.watch(lease.context)  # Консоль и сеть этого теста на случай падения
+    yield lease
+    request.config.failure_artifacts.unwatch(lease.context)
+    page_pool.checkin(lease, reusable=not getattr(request.node, "test_failed", False))
 
 
 # Фикстура для контекста
+# Каждый тест получает новый изолированный контекст (свои cookies, localStorage и кэш)
+@pytest.fixture
+def context(new_context, page_lease):  # Зависит от фикстуры new_context
+    if page_lease:
+        return page_lease.context  # С опцией --page-pool — контекст страницы из пула (состояние уже сброшено)
+    return new_context()  # Создаём новый контекст браузера (аналог новой сессии)
+
+
+# Фикстура для проверок стенда перед тестами (preflight)
+# Каждая проверка выполняется один раз за запуск: результаты хранятся в каталоге логов запуска и общие для воркеров
+@pytest.fixture(scope="session")
+def preflight(pytestconfig, base_url):
+    if pytestconfig.getoption("--no-preflight") or pytestconfig.getoption("--network-mode") == "replay":
+        return None  # При воспроизведении трафика из HAR стенд не нужен
+    path = os.path.join(pytestconfig.log_pipeline.run_dir, "preflight.json")
+    return Preflight(path, base_url, timeout=float(pytestconfig.getini("preflight_timeout")))
+
+
+# Фикстура для автомата защиты (circuit breaker): после нескольких неудач подряд (например, входа)
+# следующие тесты, которым нужна эта операция, сразу падают с причиной первой неудачи
+@pytest.fixture(scope="session")
+def circuit_breaker(pytestconfig):
+    threshold = int(pytestconfig.getini("circuit_breaker_threshold"))
+    if not threshold:
+        return None
+    return CircuitBreaker(os.path.join(pytestconfig.log_pipeline.run_dir, "circuit_breaker.json"), threshold)
+
+
+# Функция сразу завершает тест с причиной, если стенд не прошёл проверки или автомат для операции разомкнут
+def fail_fast(preflight, checks, circuit_breaker, kind):
+    reason = preflight.failure(checks) if preflight else None
+    if reason is None and circuit_breaker:
+        reason = circuit_breaker.check(kind)
+    if reason:
+        pytest.fail(reason, pytrace=False)
+
+
+# Функция выполняет операцию фикстуры и сообщает автомату защиты об успехе или неудаче
+def guarded(circuit_breaker, kind, operation):
+    if circuit_breaker is None:
+        return operation()
+    try:
+        result = operation()
+    except Exception as e:
+        circuit_breaker.failure(kind, e)
+        raise
+    circuit_breaker.success(kind)
+    return result
+
+
+# Фикстуры-предусловия: стоят первыми в списке зависимостей, поэтому тест падает до запуска браузера и аренды аккаунта
+@pytest.fixture
+def stand_available(preflight, circuit_breaker):
+    fail_fast(preflight, STAND_CHECKS, circuit_breaker, "page load")
+
+
 @pytest.fixture
-def context(browser):  # Зависит от фикстуры browser
-    context = browser.new_context()  # Создаём новый контекст браузера (аналог новой сессии)
-    yield context  # Возвращаем контекст для использования в тестах
-    context.close()  # Закрываем контекст после завершения тестов
+def login_available(preflight, circuit_breaker):
+    fail_fast(preflight, LOGIN_CHECKS, circuit_breaker, "login")
 
 
 # Фикстура для страницы
 # Эта фикстура открывает новую страницу в браузере и переходит по указанному URL
 @pytest.fixture
-def page(context, base_url):  # Зависит от фикстур context и base_url
-    page = context.new_page()  # Создаём новую страницу в контексте
-    page.goto(base_url)  # Переходим на указанный базовый URL
+def page(stand_available, context, base_url, circuit_breaker, page_lease):  # Зависит от фикстур context и base_url
+    if page_lease:
+        yield page_lease.page  # Страница из пула уже открыта на странице входа, после теста её сбросит page_lease
+        return
+    page = perf.instrument_page(context.new_page())  # Создаём новую страницу в контексте
+    guarded(circuit_breaker, "page load", lambda: page.goto(base_url))  # Переходим на указанный базовый URL
     yield page  # Возвращаем объект страницы для использования в тестах
     page.close()  # Закрываем страницу после завершения тестов
 
@@ -59,52 +620,334 @@ def page(context, base_url):  # Зависит от фикстур context и ba
 # Определяем базовый URL, который будет использоваться во всех тестах
 @pytest.fixture(scope="session")  # scope="session" — URL общий для всех тестов
 def base_url():
-    return "https://cicada.develop.apt.lan/"  # Возвращаем строку с адресом тестируемого сайта
+    # Возвращаем строку с адресом тестируемого сайта (можно переопределить переменной окружения BASE_URL)
+    return os.getenv("BASE_URL", "https://cicada.develop.apt.lan/")
+
+
+# Фикстура для кэша авторизации
+# Файлы storage_state (cookies и localStorage) хранятся в каталоге .auth_state и общие для всех воркеров
+@pytest.fixture(scope="session")
+def auth_state_cache(pytestconfig):
+    cache_dir = os.path.join(str(pytestconfig.rootpath), ".auth_state")  # Каталог кэша в корне проекта
+    ttl = int(pytestconfig.getini("auth_state_ttl"))  # Время жизни состояния из pytest.ini
+    if pytestconfig.getoption("--network-mode") != "live":
+        ttl = 0  # При записи и воспроизведении трафика каждый тест логинится сам, чтобы HAR были воспроизводимы
+    return AuthStateCache(cache_dir, ttl)
+
+
+# Фикстура для пула тестовых аккаунтов (аккаунты из TEST_ACCOUNTS_FILE или TEST_EMAIL/TEST_PASSWORD)
+@pytest.fixture(scope="session")
+def account_pool(pytestconfig):
+    return AccountPool(
+        os.path.join(str(pytestconfig.rootpath), pytestconfig.getini("account_pool_dir")),
+        load_accounts(),
+        wait_timeout=int(pytestconfig.getini("account_wait_timeout")),
+    )
+
+
+# Фикстура для тестового аккаунта
+# Аккаунт арендуется совместно: тесты, которые только входят под ним (в том числе на других воркерах xdist),
+# работают одновременно. Тест ждёт, только если все аккаунты взяты монопольно (exclusive_account)
+@pytest.fixture
+def account(account_pool):
+    lease = account_pool.lease_shared()
+    yield lease
+    lease.release()
+
+
+# Фикстура для тестового аккаунта в монопольное пользование (для тестов, которые меняют пароль)
+# Аккаунт выдаётся, когда под ним не работает ни один тест, и до конца теста другим не выдаётся.
+# Новый пароль тест сообщает через exclusive_account.set_password(...), и следующие тесты получат уже его.
+@pytest.fixture
+def exclusive_account(account_pool):
+    lease = account_pool.lease()
+    yield lease
+    lease.release()
 
 
 # Фикстура для авторизованной страницы
-# Эта фикстура открывает страницу, выполняет авторизацию и возвращает авторизованную страницу
-@pytest.fixture
-def logged_in_page(context, base_url):  # Зависит от фикстур context и base_url
-    logger.info("Performing login")  # Логируем начало процесса авторизации
-    page = context.new_page()  # Открываем новую страницу в контексте
-    page.goto(base_url)  # Переходим на базовый URL
-    page.wait_for_load_state("load", timeout=10000)  # Ждём полной загрузки страницы (максимум 10 секунд)
-
-    # Получаем email из переменной окружения TEST_EMAIL, если она не задана — используем значение по умолчанию
-    user_email = os.getenv("TEST_EMAIL", "v.nedyukhin@cicada8.ru")
-    # Получаем пароль из переменной окружения TEST_PASSWORD
-    user_password = os.getenv("TEST_PASSWORD")
-    # Проверяем, задан ли пароль, если нет — выбрасываем ошибку
-    if not user_password:
-        raise ValueError("TEST_PASSWORD not set in .env")
-
-    logger.info(f"Filling email: {user_email}")  # Логируем, что заполняем поле email
-    page.fill('input[placeholder="Введите e-mail"]', user_email)  # Вводим email в поле с указанным placeholder
-    logger.info("Filling password")  # Логируем, что заполняем поле пароля
-    page.fill('input[placeholder="Введите пароль"]', user_password)  # Вводим пароль в поле с указанным placeholder
-
-    logger.info("Waiting for submit button")  # Логируем ожидание кнопки отправки формы
-    # Ждём, пока кнопка отправки станет видимой (максимум 10 секунд)
-    page.locator('button[type="submit"]').wait_for(state="visible", timeout=10000)
-    logger.info("Clicking submit button")  # Логируем клик по кнопке
-    page.click('button[type="submit"]')  # Кликаем по кнопке отправки формы
-
-    # Определяем селектор для элемента, который подтверждает успешную авторизацию
-    dashboard_selector = 'text=Моя организация'
-    logger.info(f"Waiting for dashboard element: {dashboard_selector}")  # Логируем ожидание элемента дашборда
-    try:
-        # Ждём, пока элемент "Моя организация" появится на странице (максимум 60 секунд)
-        page.wait_for_selector(dashboard_selector, state="visible", timeout=60000)
-    except Exception as e:
-        # Если элемент не найден (ошибка авторизации), сохраняем скриншот и HTML страницы для отладки
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")  # Создаём метку времени для имени файлов
-        page.screenshot(path=f"screenshot/error_login_{timestamp}.png")  # Сохраняем скриншот страницы
-        with open(f"screenshot/error_login_page_{timestamp}.html", "w", encoding="utf-8") as f:
-            f.write(page.content())  # Сохраняем HTML-код страницы в файл
-        logger.error(f"Failed to find dashboard element: {e}")  # Логируем ошибку
-        raise  # Повторно выбрасываем ошибку, чтобы тест завершился с ошибкой
-
-    logger.info(f"Current URL after login: {page.url}")  # Логируем текущий URL после авторизации
+# Эта фикстура возвращает страницу, на которой пользователь уже авторизован.
+# Вход через форму выполняется один раз на аккаунт: состояние сохраняется в кэш,
+# и следующие тесты стартуют сразу авторизованными. Если сервер отверг сохранённую сессию,
+# фикстура логинится заново и обновляет кэш.
+@pytest.fixture
+def logged_in_page(login_available, new_context, base_url, auth_state_cache, account, circuit_breaker):
+    logger.info("Performing login as %s", account.email)  # Логируем начало процесса авторизации
+    _, page = guarded(circuit_breaker, "login", lambda: open_logged_in_page(
+        new_context, base_url, account.email, account.password, auth_state_cache
+    ))
+    logger.info("Current URL after login: %s", page.url)  # Логируем текущий URL после авторизации
     yield page  # Возвращаем авторизованную страницу для использования в тестах
-    page.close()  # Закрываем страницу после завершения тестов
\ No newline at end of file
+    page.close()  # Закрываем страницу после завершения тестов (контекст закроет фикстура new_context)
+
+
+# Асинхронные фикстуры
+# Параллельное семейство фикстур на playwright.async_api: async_browser, async_context, async_page,
+# async_logged_in_page. Тесты объявляются как async def и могут запускать несколько страниц
+# и ожиданий конкурентно (asyncio.gather) внутри одного воркера. Корутины выполняются в цикле событий
+# фоновым потоком (фикстура async_runner), потому что основной поток занят синхронным Playwright.
+
+# Фикстура для цикла событий (один на воркер)
+@pytest.fixture(scope="session")
+def async_runner():
+    runner = AsyncRunner()
+    yield runner
+    runner.close()
+
+
+# Фикстура для асинхронного Playwright
+@pytest.fixture(scope="session")
+def async_playwright_instance(async_runner):
+    playwright = async_runner.run(async_playwright().start())  # Запускаем драйвер Playwright в цикле событий
+    yield playwright
+    async_runner.run(playwright.stop())
+
+
+# Фикстура для асинхронного браузера (один на воркер)
+@pytest.fixture(scope="session")
+def async_browser(async_runner, async_playwright_instance):
+    browser = async_runner.run(async_playwright_instance.chromium.launch(headless=True))
+    yield browser
+    async_runner.run(browser.close())
+
+
+# Фикстура-фабрика асинхронных контекстов: все созданные контексты закрываются в конце теста
+# К асинхронным контекстам подключаются только профиль сети и клиентские метрики: запись и воспроизведение
+# трафика, кэш ресурсов, артефакты упавших тестов, трассировка и замеры шагов работают с синхронным API.
+# Поэтому при --network-mode record/replay асинхронные тесты пропускаются: иначе при воспроизведении они
+# ходили бы на живой стенд, а при записи в HAR не попал бы их трафик
+@pytest.fixture
+def async_new_context(async_runner, async_browser, web_vitals_monitor, network_throttler, request):
+    network_mode = request.config.getoption("--network-mode")
+    if network_mode != "live":
+        pytest.skip(f"Async browser tests run only with --network-mode live (got {network_mode})")
+    created = []
+
+    async def factory(**context_options):
+        context = await async_browser.new_context(**context_options)
+        created.append(context)
+        network_throttler.attach_async(context)
+        if web_vitals_monitor:
+            await web_vitals_monitor.attach_async(context, async_runner.run)
+        return context
+
+    yield factory
+    for context in created:
+        if web_vitals_monitor:
+            async_runner.run(web_vitals_monitor.collect_async(context))
+        async_runner.run(context.close())
+
+
+# Фикстура для асинхронного контекста
+@pytest.fixture
+def async_context(async_runner, async_new_context):
+    return async_runner.run(async_new_context())
+
+
+# Фикстура для асинхронной страницы, открытой на базовом URL
+@pytest.fixture
+def async_page(stand_available, async_runner, async_context, base_url, circuit_breaker):
+    async def open_page():
+        page = await async_context.new_page()
+        await page.goto(base_url)
+        return page
+
+    return guarded(circuit_breaker, "page load", lambda: async_runner.run(open_page()))
+
+
+# Фикстура для асинхронной авторизованной страницы (использует общий с logged_in_page кэш авторизации)
+@pytest.fixture
+def async_logged_in_page(login_available, async_runner, async_new_context, base_url, auth_state_cache, account,
+                         circuit_breaker):
+    _, page = guarded(circuit_breaker, "login", lambda: async_runner.run(
+        open_logged_in_page_async(async_new_context, base_url, account.email, account.password, auth_state_cache)
+    ))
+    return page
+
+
+# Хук добавляет фикстуру async_runner асинхронным тестам (async def test_...)
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if inspect.iscoroutinefunction(getattr(item, "obj", None)) and "async_runner" not in item.fixturenames:
+            item.fixturenames.append("async_runner")
+
+
+# Хук запускает асинхронные тесты в цикле событий воркера
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None  # Обычные тесты запускает pytest
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    pyfuncitem.funcargs["async_runner"].run(pyfuncitem.obj(**arguments))
+    return True
+
+
+# Фикстура для локального почтового сервера
+# Запускает SMTP-приёмник и IMAP-сервер в фоновых потоках на свободных портах и направляет imap_utils на них.
+# Письма можно положить напрямую (inject_reset_email) и прочитать без опроса (wait_for_message).
+@pytest.fixture
+def fake_mail_server(monkeypatch):
+    with FakeMailServer() as server:
+        for name, value in server.imap_env.items():
+            monkeypatch.setenv(name, value)  # imap_utils подключится к локальному серверу
+        yield server
+
+
+# Фикстура для почты в тестах восстановления пароля
+# С опцией --fake-mail запускает локальный почтовый сервер на фиксированном SMTP-порту (--fake-smtp-port),
+# куда стенд должен отправлять письма; без опции возвращает None и тесты работают с mail.cicada8.ru
+@pytest.fixture(scope="session")
+def mail_server(pytestconfig, preflight):
+    if not pytestconfig.getoption("--fake-mail"):
+        reason = preflight.failure(MAIL_CHECKS) if preflight else None
+        if reason:
+            pytest.fail(reason, pytrace=False)  # Ошибка фикстуры уровня сессии повторяется для каждого теста с почтой
+        yield None
+        return
+    server = FakeMailServer(
+        host=pytestconfig.getoption("--fake-mail-host"), smtp_port=pytestconfig.getoption("--fake-smtp-port")
+    )
+    saved_env = {name: os.environ.get(name) for name in server.imap_env}
+    with server:
+        os.environ.update(server.imap_env)  # imap_utils подключится к локальному серверу
+        yield server
+    for name, value in saved_env.items():  # Восстанавливаем переменные окружения
+        if value is None:
+            os.environ.pop(name, None)
+        else:
+            os.environ[name] = value
+
+
+# Хук оборачивает выполнение одного теста: замеры шагов собираются от setup до teardown
+# Вызывается только там, где тест действительно выполняется (в воркере xdist, а не в контроллере)
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item, nextitem):
+    perf.recorder.start_test(item.nodeid)
+    log_pipeline.current_test = item.nodeid  # Записи лога помечаются идентификатором теста
+    yield
+    log_pipeline.current_test = None
+    perf.recorder.finish_test()  # Запись о тесте попадает в статистику сессии (раздел "perf")
+
+
+# Хук проверяет бюджеты метрик страниц после успешного выполнения теста: превышение — падение теста
+@pytest.hookimpl(wrapper=True)
+def pytest_runtest_call(item):
+    result = yield  # Если тест упал сам, бюджеты не проверяются
+    monitor = getattr(item, "web_vitals", None)
+    if monitor is not None:
+        monitor.check()
+    return result
+
+
+# Хук запоминает длительность и результат каждой фазы теста (setup, call, teardown)
+# и при падении теста собирает артефакты открытых страниц (контексты ещё не закрыты фикстурами)
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    outcome = yield
+    report = outcome.get_result()
+    perf.recorder.add_phase(report.when, report.duration, report.outcome)
+    if report.failed:
+        item.test_failed = True  # Страницу упавшего теста нельзя вернуть в пул (--page-pool)
+    failed = report.failed and report.when in ("setup", "call")
+    if failed:
+        item.config.failure_artifacts.capture(item.nodeid, report.when)
+    ring = getattr(item, "trace_ring", None)
+    if ring and (failed or report.when == "call" and item.get_closest_marker("flaky")):
+        for name, data in ring.flush():  # Трассировка последних действий — в каталог артефактов теста
+            path = item.config.failure_artifacts.add_file(item.nodeid, f"{report.when}-{name}", data)
+            logger.info("Trace of %s saved to %s", item.nodeid, path)
+
+
+# Хук вызывается в конце сессии: воркер pytest-xdist передаёт свою статистику контроллеру,
+# а контроллер (или единственный процесс без xdist) сохраняет отчёт о времени шагов
+def pytest_sessionfinish(session):
+    session.config.failure_artifacts.close()  # Дописываем артефакты из очереди до передачи статистики
+    session.config.log_pipeline.stop()  # Дописываем записи лога из очереди в файл
+    workeroutput = getattr(session.config, "workeroutput", None)  # Атрибут есть только у воркеров xdist
+    if workeroutput is not None:
+        workeroutput["session_stats"] = stats.to_dict()
+        return
+    # Воркеры к этому моменту завершились: объединяем их логи в один файл в порядке времени
+    session.config.merged_log = log_pipeline.merge_logs(session.config.log_pipeline.run_dir)
+    samples = stats.records.get(web_vitals.STATS_SECTION)
+    if samples:  # Замеры страниц дописываются во временной ряд (по тесту и URL)
+        history = os.path.join(str(session.config.rootpath), session.config.getini("web_vitals_history"))
+        web_vitals.append_history(history, samples, session.config.run_name)
+    report_dir = os.path.join(str(session.config.rootpath), session.config.getini("perf_report_dir"))
+    samples = stats.records.get(memory_monitor.STATS_SECTION)
+    if samples:  # Ряд замеров памяти по воркерам и подозрительные тесты
+        session.config.memory_report = memory_monitor.build_report(samples, session.config.run_name)
+        session.config.memory_report_path = memory_monitor.write_report(session.config.memory_report, report_dir)
+    tests = stats.records.get(perf.STATS_SECTION)
+    if not tests:
+        return
+    session.config.perf_report = perf.build_report(tests)  # Сводка для pytest_terminal_summary
+    session.config.perf_report_path = perf.write_report(session.config.perf_report, report_dir)
+
+
+# Хук pytest-xdist: контроллер получает статистику завершившегося воркера и объединяет её со своей
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    worker_stats = getattr(node, "workeroutput", {}).get("session_stats")
+    if worker_stats:
+        stats.merge(worker_stats)
+
+
+# Хук выводит итоговую статистику сессии в терминал
+def pytest_terminal_summary(terminalreporter):
+    if hasattr(terminalreporter.config, "workeroutput"):
+        return  # Воркеры не печатают итог, это делает контроллер
+    recorder = terminalreporter.config.pluginmanager.get_plugin("duration_recorder")
+    scheduling = recorder.summary_lines() if recorder else []
+    if scheduling:
+        terminalreporter.section("scheduling")
+        for line in scheduling:
+            terminalreporter.write_line(line)
+    merged_log = getattr(terminalreporter.config, "merged_log", None)
+    if merged_log:
+        terminalreporter.write_line(f"test log: {merged_log}")
+    report = getattr(terminalreporter.config, "perf_report", None)
+    if report:
+        terminalreporter.section("step timings")
+        for line in perf.summary_lines(report):
+            terminalreporter.write_line(line)
+        terminalreporter.write_line(f"report: {terminalreporter.config.perf_report_path}")
+    samples = stats.records.get(web_vitals.STATS_SECTION)
+    if samples:
+        terminalreporter.section("web vitals")
+        for line in web_vitals.summary_lines(samples):
+            terminalreporter.write_line(line)
+    timings = stats.records.get(network_profiles.STATS_SECTION)
+    if timings:
+        terminalreporter.section("network profiles")
+        for line in network_profiles.summary_lines(timings):
+            terminalreporter.write_line(line)
+    nodes = stats.records.get(browser_grid.STATS_SECTION)
+    if nodes:
+        terminalreporter.section("browser grid")
+        state_path = os.path.join(terminalreporter.config.log_pipeline.run_dir, "browser_grid.json")
+        for line in browser_grid.summary_lines(nodes, browser_grid.read_state(state_path)):
+            terminalreporter.write_line(line)
+    memory = getattr(terminalreporter.config, "memory_report", None)
+    if memory:
+        terminalreporter.section("memory")
+        for line in memory_monitor.summary_lines(memory):
+            terminalreporter.write_line(line)
+        terminalreporter.write_line(f"report: {terminalreporter.config.memory_report_path}")
+    lines = stats.summary_lines()
+    if not lines:
+        return
+    terminalreporter.section("session stats")
+    for line in lines:
+        terminalreporter.write_line(line)
+    saved = savings_line(stats)
+    if saved:
+        terminalreporter.write_line(saved)
+    pooled = page_pool_line(stats)
+    if pooled:
+        terminalreporter.write_line(pooled)
+    for entry in stats.records.get("failure artifacts", [])[:20]:  # Где лежат артефакты упавших тестов
+        terminalreporter.write_line(f"  artifacts: {entry['dir']} ({entry['test']}, {entry['when']})")
+    unmatched = stats.records.get("network replay", [])
+    for entry in unmatched[:20]:  # Запросы, которых не было в HAR при воспроизведении
+        terminalreporter.write_line(f"  unmatched: {entry['method']} {entry['url']} ({entry['test']})")
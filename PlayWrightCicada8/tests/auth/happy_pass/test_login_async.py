@@ -0,0 +1,44 @@
+# Тест проверяет успешную авторизацию и негативный сценарий входа одновременно в одном воркере
+# Использует асинхронные фикстуры async_logged_in_page и async_page из conftest.py:
+# обе страницы работают конкурентно, поэтому ожидания элементов на них перекрываются по времени
+
+import os
+import asyncio
+import logging
+import pytest
+from playwright.async_api import Page
+from tests.utils.batch_expect import expect_all_async, url, visible, disabled  # Несколько проверок за один цикл опроса
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+
+# Проверка авторизованной страницы: кнопка с email пользователя и текст "Моя организация"
+async def check_dashboard(page: Page, user_email):
+    await expect_all_async(page, [
+        visible("button", has_text=user_email),
+        visible(text="Моя организация"),
+    ], timeout=10000)
+    logger.info("Dashboard checks passed")
+
+
+# Проверка входа без пароля: сообщение "Введите пароль" и неактивная кнопка входа
+async def check_login_without_password(page: Page, base_url):
+    await page.fill('input[placeholder="Введите e-mail"]', os.getenv("TEST_EMAIL", "v.nedyukhin@cicada8.ru"))
+    await page.fill('input[placeholder="Введите пароль"]', "")
+    await page.click('button[type="submit"]')
+    await expect_all_async(page, [
+        url(base_url),
+        visible(text="Введите пароль", exact=True),
+        disabled('button[type="submit"]'),
+    ], timeout=10000)
+    logger.info("Negative login checks passed")
+
+
+# Маркировка теста как smoke (быстрый и критически важный тест)
+@pytest.mark.smoke
+async def test_login_flows_concurrently(async_logged_in_page: Page, async_page: Page, base_url, account):
+    await asyncio.gather(
+        check_dashboard(async_logged_in_page, account.email),
+        check_login_without_password(async_page, base_url),
+    )
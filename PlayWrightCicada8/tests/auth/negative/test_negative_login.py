@@ -3,9 +3,10 @@
 # Использует фикстуры page и base_url из conftest.py
 
 import pytest
-from playwright.sync_api import expect, Page
+from playwright.sync_api import Page
 import os
 import logging
+from tests.utils.batch_expect import expect_all, url, visible, disabled  # Несколько проверок за один цикл опроса в странице
 
 # Создаем логгер для этого модуля
 logger = logging.getLogger(__name__)
@@ -15,42 +16,33 @@ logger = logging.getLogger(__name__)
 def test_negative_login(page: Page, base_url):
     # page: Фикстура из conftest.py, возвращает новую страницу, открытую на базовом URL
     # base_url: Фикстура из conftest.py, содержит базовый URL приложения
-    try:
-        # Логируем начало теста
-        logger.info("Navigating to login page")
-        user_email = os.getenv("TEST_EMAIL", "v.nedyukhin@cicada8.ru")
-
-        # Заполняем поле email
-        logger.info(f"Filling email field with: {user_email}")
-        page.fill('input[placeholder="Введите e-mail"]', user_email)
-
-        # Убеждаемся, что поле пароля пустое
-        logger.info("Ensuring password field is empty")
-        page.fill('input[placeholder="Введите пароль"]', "")
-
-        # Нажимаем кнопку входа
-        logger.info("Clicking submit button")
-        page.locator('button[type="submit"]').wait_for(state="visible", timeout=10000)
-        page.click('button[type="submit"]')
-
-        # Проверяем, что редирект не произошел (остались на странице логина)
-        logger.info("Verifying no redirect occurred")
-        expect(page).to_have_url(base_url, timeout=10000)
-
-        # Проверяем появление сообщения об ошибке
-        logger.info("Checking for 'Введите пароль' error message")
-        expect(page.locator('text="Введите пароль"')).to_be_visible(timeout=10000)
-
-        # Проверяем, что кнопка входа неактивна
-        logger.info("Checking if submit button is disabled")
-        expect(page.locator('button[type="submit"]')).to_be_disabled(timeout=10000)
-
-        # Логируем успешное прохождение теста
-        logger.info("Negative login test passed successfully")
-    except Exception as e:
-        # При ошибке сохраняем скриншот и HTML страницы
-        logger.error(f"Negative login test failed: {str(e)}")
-        page.screenshot(path="screenshot/error_screenshot_negative_login.png")
-        with open("screenshot/error_page_negative_login.html", "w", encoding="utf-8") as f:
-            f.write(page.content())
-        pytest.fail(f"Negative login test failed: {str(e)}")
\ No newline at end of file
+    # Логируем начало теста
+    logger.info("Navigating to login page")
+    user_email = os.getenv("TEST_EMAIL", "v.nedyukhin@cicada8.ru")
+
+    # Заполняем поле email
+    logger.info("Filling email field with: %s", user_email)
+    page.fill('input[placeholder="Введите e-mail"]', user_email)
+
+    # Убеждаемся, что поле пароля пустое
+    logger.info("Ensuring password field is empty")
+    page.fill('input[placeholder="Введите пароль"]', "")
+
+    # Нажимаем кнопку входа
+    logger.info("Clicking submit button")
+    page.locator('button[type="submit"]').wait_for(state="visible", timeout=10000)
+    page.click('button[type="submit"]')
+
+    # Проверяем одним циклом опроса в странице:
+    # - редирект не произошел (остались на странице логина);
+    # - появилось сообщение об ошибке "Введите пароль";
+    # - кнопка входа неактивна
+    logger.info("Verifying no redirect, 'Введите пароль' error message and disabled submit button")
+    expect_all(page, [
+        url(base_url),
+        visible(text="Введите пароль", exact=True),
+        disabled('button[type="submit"]'),
+    ], timeout=10000)
+
+    # Логируем успешное прохождение теста
+    logger.info("Negative login test passed successfully")
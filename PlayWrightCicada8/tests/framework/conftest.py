@@ -0,0 +1,64 @@
+# Фикстуры тестов фреймворка, которым нужен настоящий браузер
+# Браузерный код утилит (скрипты в странице, CDP, трассировка) проверяется в Chromium на стенде-заглушке
+# (tests/utils/stand_in_app.py), без сети и без стенда Cicada8. Если Chromium не установлен
+# (не выполнен playwright install), такие тесты пропускаются, остальные тесты фреймворка работают как обычно.
+
+import pytest
+
+from tests.utils.stand_in_app import StandInApp
+
+# Учётные данные, которые принимает стенд-заглушка
+STAND_IN_EMAIL = "tester@cicada8.ru"
+STAND_IN_PASSWORD = "secret"
+
+
+# Фикстура для отдельного Chromium тестов фреймворка (один на воркер; не общий браузер из browser_pool,
+# чтобы тесты утилит не зависели от опций запуска и наблюдения за памятью браузера воркера)
+@pytest.fixture(scope="session")
+def chromium(playwright):
+    try:
+        browser = playwright.chromium.launch(headless=True)
+    except Exception as exc:
+        pytest.skip(f"Chromium is not available: {exc}")
+    yield browser
+    browser.close()
+
+
+# Фикстура для асинхронного Chromium тестов фреймворка (в цикле событий воркера, как async_browser)
+@pytest.fixture(scope="session")
+def async_chromium(async_runner, async_playwright_instance):
+    try:
+        browser = async_runner.run(async_playwright_instance.chromium.launch(headless=True))
+    except Exception as exc:
+        pytest.skip(f"Chromium is not available: {exc}")
+    yield browser
+    async_runner.run(browser.close())
+
+
+# Фикстура для стенда-заглушки с одним тестовым аккаунтом
+@pytest.fixture
+def stand_in_app():
+    with StandInApp(accounts={STAND_IN_EMAIL: STAND_IN_PASSWORD}) as app:
+        yield app
+
+
+# Фикстура для учётных данных, которые принимает стенд-заглушка: (email, пароль)
+@pytest.fixture(scope="session")
+def stand_in_account():
+    return STAND_IN_EMAIL, STAND_IN_PASSWORD
+
+
+# Фикстура для нового контекста Chromium (закрывается после теста)
+@pytest.fixture
+def chromium_context(chromium):
+    context = chromium.new_context()
+    yield context
+    context.close()
+
+
+# Фикстура для страницы, открытой на форме входа стенда-заглушки
+@pytest.fixture
+def stand_in_page(chromium_context, stand_in_app):
+    page = chromium_context.new_page()
+    page.goto(stand_in_app.base_url)
+    return page
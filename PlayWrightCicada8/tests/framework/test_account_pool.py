@@ -0,0 +1,116 @@
+# Тесты пула тестовых аккаунтов (tests/utils/account_pool.py)
+# Проверяют монопольную и общую аренду, ожидание при занятом пуле, смену пароля и освобождение брошенной аренды
+
+import os
+import threading
+
+import pytest
+
+from tests.utils import account_pool
+from tests.utils.account_pool import AccountPool
+from tests.utils.session_stats import SessionStats
+
+
+ACCOUNTS = [
+    {"email": "a@example.com", "password": "pass-a", "email_password": None},
+    {"email": "b@example.com", "password": "pass-b", "email_password": None},
+]
+
+
+# Статистика каждого теста отдельная, чтобы не смешивать её со статистикой сессии
+@pytest.fixture(autouse=True)
+def isolated_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(account_pool, "stats", session_stats)
+    return session_stats
+
+
+# Пока аккаунт арендован, другой арендатор получает следующий, а при занятом пуле — ждёт освобождения
+def test_leases_are_exclusive_and_wait_when_pool_is_busy(tmp_path, isolated_stats):
+    pool = AccountPool(str(tmp_path), ACCOUNTS, wait_timeout=5, poll_interval=0.01)
+    first, second = pool.lease(), pool.lease()
+    assert {first.email, second.email} == {"a@example.com", "b@example.com"}
+
+    timer = threading.Timer(0.2, first.release)
+    timer.start()
+    third = pool.lease()
+    timer.join()
+    assert third.email == first.email
+    waits = isolated_stats.timings["account pool"]["wait"]
+    assert len(waits) == 3 and max(waits) >= 0.2
+
+
+# Если свободных аккаунтов нет дольше wait_timeout, тест падает с понятной ошибкой
+def test_lease_times_out(tmp_path):
+    pool = AccountPool(str(tmp_path), ACCOUNTS[:1], wait_timeout=0.1, poll_interval=0.01)
+    pool.lease()
+    with pytest.raises(TimeoutError):
+        pool.lease()
+
+
+# Новый пароль переживает освобождение аккаунта и сохраняется в файл, доступный только владельцу
+def test_rotated_password_is_handed_to_next_lease(tmp_path):
+    pool = AccountPool(str(tmp_path), ACCOUNTS[:1])
+    lease = pool.lease()
+    lease.set_password("rotated")
+    lease.release()
+    assert pool.lease().password == "rotated"
+    if os.name != "nt":
+        assert os.stat(pool.state_path).st_mode & 0o777 == 0o600
+
+
+# Сменённый пароль действует, только пока настроенный пароль тот же: после ручного сброса аккаунта
+# и обновления настроек выдаётся новый настроенный пароль; возврат исходного пароля удаляет запись
+def test_rotated_password_expires_with_configured_password(tmp_path):
+    pool = AccountPool(str(tmp_path), [dict(ACCOUNTS[0])])
+    lease = pool.lease()
+    lease.set_password("rotated")
+    lease.release()
+    pool.accounts[0]["password"] = "reset-by-hand"  # Пароль сбросили вручную и обновили .env
+    lease = pool.lease()
+    assert lease.password == "reset-by-hand" and pool.load_passwords() == {}
+    lease.set_password("rotated-again")
+    assert pool.load_passwords() == {"a@example.com": {"configured": "reset-by-hand", "current": "rotated-again"}}
+    lease.set_password("reset-by-hand")  # Тест вернул исходный пароль
+    lease.release()
+    assert pool.load_passwords() == {} and pool.lease().password == "reset-by-hand"
+
+
+# Аренда процесса, который уже завершился, освобождается сразу, не дожидаясь LEASE_STALE_AFTER
+def test_lease_of_finished_process_is_broken(tmp_path, monkeypatch):
+    pool = AccountPool(str(tmp_path), ACCOUNTS[:1], wait_timeout=1, poll_interval=0.01)
+    pool.lease()
+    monkeypatch.setattr(account_pool, "_process_alive", lambda pid: False)
+    assert pool.lease().email == "a@example.com"
+
+
+# Общие аренды одного аккаунта выдаются одновременно; монопольная ждёт, пока они закончатся,
+# а пока она держит аккаунт, новые общие аренды ждут; сменить пароль по общей аренде нельзя
+def test_shared_leases_run_together_and_block_exclusive(tmp_path):
+    pool = AccountPool(str(tmp_path), ACCOUNTS[:1], wait_timeout=5, poll_interval=0.01)
+    readers = [pool.lease_shared(), pool.lease_shared()]
+    with pytest.raises(RuntimeError, match="shared"):
+        readers[0].set_password("rotated")
+    timers = [threading.Timer(0.1 * number, reader.release) for number, reader in enumerate(readers, start=1)]
+    for timer in timers:
+        timer.start()
+    exclusive = pool.lease()
+    assert all(not timer.is_alive() for timer in timers)  # Монопольная аренда выдана после обеих общих
+    exclusive.set_password("rotated")
+    timer = threading.Timer(0.2, exclusive.release)
+    timer.start()
+    reader = pool.lease_shared()
+    assert not timer.is_alive() and reader.password == "rotated"
+    timer.join()
+    pool.wait_timeout = 0.1
+    with pytest.raises(TimeoutError):
+        pool.lease()
+    reader.release()
+
+
+# Общая аренда процесса, который уже завершился, не мешает монопольной
+def test_shared_lease_of_finished_process_is_broken(tmp_path, monkeypatch):
+    pool = AccountPool(str(tmp_path), ACCOUNTS[:1], wait_timeout=1, poll_interval=0.01)
+    pool.lease_shared()
+    monkeypatch.setattr(account_pool, "_process_alive", lambda pid: False)
+    assert pool.lease().exclusive
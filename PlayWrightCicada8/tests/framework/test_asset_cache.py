@@ -0,0 +1,46 @@
+# Тесты дискового кэша статических ресурсов (tests/utils/asset_cache.py)
+# Проверяют хранение по хешу содержимого, учёт Cache-Control и вытеснение давно не использованных ресурсов
+
+import os
+import time
+from tests.utils.asset_cache import AssetCache
+
+
+# Одинаковое содержимое по разным URL хранится один раз
+def test_identical_content_is_stored_once(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    headers = {"cache-control": "max-age=60", "content-type": "text/javascript"}
+    cache.store("https://stand/app.js?v=1", 200, headers, b"console.log(1)")
+    cache.store("https://stand/app.js?v=2", 200, headers, b"console.log(1)")
+    assert len(os.listdir(cache.blob_dir)) == 1
+    entry = cache.lookup("https://stand/app.js?v=2")
+    assert cache.is_fresh(entry)
+    assert cache.read(entry) == b"console.log(1)"
+
+
+# no-store не кэшируется, no-cache требует перепроверки на сервере
+def test_cache_control_is_respected(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=10_000)
+    assert cache.store("https://stand/a.css", 200, {"cache-control": "no-store"}, b"a") is None
+    entry = cache.store("https://stand/b.css", 200, {"cache-control": "no-cache", "etag": '"v1"'}, b"b")
+    assert not cache.is_fresh(entry)
+    assert cache.can_revalidate(entry)
+
+
+# При превышении лимита удаляется ресурс, к которому дольше всего не обращались, вместе с записями индекса
+# на него (и по другим URL с тем же содержимым); записи остальных ресурсов остаются
+def test_least_recently_used_blob_is_evicted(tmp_path):
+    cache = AssetCache(str(tmp_path), max_bytes=250)
+    headers = {"cache-control": "max-age=60"}
+    old = cache.store("https://stand/old.png", 200, headers, b"o" * 100)
+    cache.store("https://stand/old.png?v=2", 200, headers, b"o" * 100)
+    new = cache.store("https://stand/new.png", 200, headers, b"n" * 100)
+    past = time.time() - 100
+    os.utime(os.path.join(cache.blob_dir, old["blob"]), (past, past))
+    cache.store("https://stand/third.png", 200, headers, b"t" * 100)
+    cache.evict()
+    assert cache.lookup("https://stand/old.png") is None
+    assert cache.lookup("https://stand/new.png") == new
+    assert sorted(os.listdir(cache.index_dir)) == sorted(
+        os.path.basename(cache._index_path(url)) for url in ("https://stand/new.png", "https://stand/third.png")
+    )
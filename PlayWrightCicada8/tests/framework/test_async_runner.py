@@ -0,0 +1,25 @@
+# Тесты запуска асинхронных тестов (tests/utils/async_runner.py и хук pytest_pyfunc_call в conftest.py)
+# Проверяют, что async def тесты выполняются и что ожидания внутри теста идут конкурентно
+
+import time
+import asyncio
+from tests.utils.imap_utils import wait_for_reset_link_async
+
+
+# Два ожидания по 0.3 секунды внутри одного теста занимают около 0.3 секунды, а не 0.6
+async def test_waits_overlap_inside_one_test():
+    started = time.monotonic()
+    await asyncio.gather(asyncio.sleep(0.3), asyncio.sleep(0.3))
+    assert time.monotonic() - started < 0.5
+
+
+# Ожидания писем в IMAP для двух ящиков выполняются одновременно и не блокируют цикл событий
+async def test_imap_waits_run_concurrently(fake_mail_server):
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.3, fake_mail_server.inject_reset_email, "first@cicada8.ru", "first")
+    loop.call_later(0.3, fake_mail_server.inject_reset_email, "second@cicada8.ru", "second")
+    first, second = await asyncio.gather(
+        wait_for_reset_link_async("first@cicada8.ru", "secret", since_uid=0, timeout=5),
+        wait_for_reset_link_async("second@cicada8.ru", "secret", since_uid=0, timeout=5),
+    )
+    assert first.endswith("/first/") and second.endswith("/second/")
@@ -0,0 +1,93 @@
+# Тесты разбора ответа API авторизации (tests/utils/auth_utils.py)
+# Проверяют, какие ответы считаются ответом на вход и что отказ сервера сразу завершает вход ошибкой,
+# а вход через форму (синхронный и асинхронный) — в Chromium на стенде-заглушке
+
+import time
+from types import SimpleNamespace
+import pytest
+from tests.utils import auth_utils
+from tests.utils.auth_utils import (
+    DASHBOARD_SELECTOR, LOGIN_ERROR_SELECTOR, is_auth_response, check_auth_response, login_via_ui, login_via_ui_async,
+)
+from tests.utils.session_stats import SessionStats
+from tests.utils.stand_in_app import SESSION_COOKIE
+
+
+# Создаёт объект с полями ответа Playwright
+def make_response(method, url):
+    return SimpleNamespace(url=url, request=SimpleNamespace(method=method))
+
+
+# Ответом на вход считается только POST-запрос к API авторизации
+def test_only_auth_post_requests_match():
+    assert is_auth_response(make_response("POST", "https://stand/api/v1/auth/login/"))
+    assert not is_auth_response(make_response("GET", "https://stand/api/v1/auth/login/"))
+    assert not is_auth_response(make_response("POST", "https://stand/api/v1/organizations/"))
+
+
+# Ошибка 4xx/5xx от API авторизации сразу завершает вход исключением
+@pytest.mark.parametrize("status", [400, 401, 403, 500, 502])
+def test_error_status_fails_immediately(status):
+    with pytest.raises(RuntimeError, match=str(status)):
+        check_auth_response(status, "https://stand/api/v1/auth/login/")
+    check_auth_response(200, "https://stand/api/v1/auth/login/")
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(auth_utils, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Вход через форму стенда-заглушки в Chromium завершается дашбордом, фазы входа попадают в статистику
+def test_login_via_ui_reaches_dashboard(stand_in_page, stand_in_account, session_stats):
+    login_via_ui(stand_in_page, *stand_in_account, dashboard_timeout=10000)
+    assert stand_in_page.locator(DASHBOARD_SELECTOR).is_visible()
+    timings = session_stats.timings[auth_utils.STATS_SECTION]
+    assert {"login: fill form", "login: auth response", "login: dashboard", "ui login"} <= set(timings)
+
+
+# Отказ API авторизации завершает вход ошибкой сразу, а не по таймауту дашборда
+def test_login_via_ui_fails_fast_on_rejected_password(stand_in_page, stand_in_account, session_stats):
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="401|Неверный"):
+        login_via_ui(stand_in_page, stand_in_account[0], "wrong", dashboard_timeout=30000)
+    assert time.monotonic() - started < 10
+
+
+# Если AUTH_API_PATTERN не совпал ни с одним запросом стенда, вход не ждёт ответ API, а завершается по дашборду
+def test_login_via_ui_falls_back_to_dashboard(stand_in_page, stand_in_account, session_stats, monkeypatch):
+    monkeypatch.setenv("AUTH_API_PATTERN", r"/api/v9/no-such-login")
+    login_via_ui(stand_in_page, *stand_in_account, dashboard_timeout=10000, response_timeout=100)
+    assert "login: auth response" not in session_stats.timings[auth_utils.STATS_SECTION]
+    assert stand_in_page.locator(DASHBOARD_SELECTOR).is_visible()
+
+
+# Настройки входа читаются из окружения при вызове (.env загружается после импорта утилит):
+# с AUTH_COOKIE_NAME вход завершается, как только появилась cookie сессии
+def test_login_via_ui_reads_settings_at_call_time(stand_in_page, stand_in_account, session_stats, monkeypatch):
+    monkeypatch.setenv("AUTH_COOKIE_NAME", SESSION_COOKIE)
+    login_via_ui(stand_in_page, *stand_in_account, dashboard_timeout=10000)
+    assert "login: session cookie" in session_stats.timings[auth_utils.STATS_SECTION]
+
+
+# Сообщение role="alert" вне формы входа не считается ошибкой входа
+def test_login_error_selector_is_scoped_to_login_form(stand_in_page, stand_in_account):
+    stand_in_page.evaluate("document.body.insertAdjacentHTML('afterbegin', '<div role=alert>Плановые работы</div>')")
+    assert stand_in_page.locator(LOGIN_ERROR_SELECTOR).count() == 1  # Только скрытый #error внутри формы
+    login_via_ui(stand_in_page, *stand_in_account, dashboard_timeout=10000)
+
+
+# Асинхронный вариант использует те же фазы входа
+async def test_login_via_ui_async_shares_phases(async_chromium, stand_in_app, stand_in_account, session_stats):
+    context = await async_chromium.new_context()
+    try:
+        page = await context.new_page()
+        await page.goto(stand_in_app.base_url)
+        with pytest.raises(RuntimeError, match="401|Неверный"):
+            await login_via_ui_async(page, stand_in_account[0], "wrong", dashboard_timeout=10000)
+        await login_via_ui_async(page, *stand_in_account, dashboard_timeout=10000)
+        assert await page.locator(DASHBOARD_SELECTOR).is_visible()
+    finally:
+        await context.close()
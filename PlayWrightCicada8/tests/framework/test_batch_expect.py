@@ -0,0 +1,148 @@
+# Тесты пакетных проверок (tests/utils/batch_expect.py)
+# Сборка ошибки проверяется без браузера (страница заменена объектом с заданным результатом опроса),
+# а совпадение результата с expect() — в Chromium на стенде-заглушке и на отдельных фрагментах HTML
+
+import re
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError, expect
+
+from tests.utils.batch_expect import expect_all, url, visible, hidden, enabled, disabled, has_text
+
+
+# Страница, у которой опрос условий либо проходит, либо заканчивается таймаутом с заданными невыполненными проверками
+class FakePage:
+    def __init__(self, failures):
+        self.failures = failures
+        self.polls = 0
+
+    def wait_for_function(self, expression, arg=None, polling=None, timeout=None):
+        self.polls += 1
+        if self.failures:
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded.")
+
+    def evaluate(self, expression, arg=None):
+        return self.failures
+
+
+# Все проверки выполняются одним опросом страницы
+def test_all_checks_pass_in_one_poll():
+    page = FakePage([])
+    expect_all(page, [url("https://stand/"), visible(text="Введите пароль", exact=True), disabled("button")])
+    assert page.polls == 1
+
+
+# В ошибке перечислены все невыполненные проверки, а не только первая
+def test_failure_lists_every_failed_check():
+    checks = [url("https://stand/"), visible("button", has_text="user@example.com"), disabled("button")]
+    page = FakePage([
+        {"description": checks[1]["description"], "reason": "no matching element"},
+        {"description": checks[2]["description"], "reason": "element is enabled"},
+    ])
+    with pytest.raises(AssertionError) as error:
+        expect_all(page, checks, timeout=500)
+    message = str(error.value)
+    assert message.startswith("2 of 3 checks failed after 500ms")
+    assert "button has_text='user@example.com' is visible: no matching element" in message
+    assert "button is disabled: element is enabled" in message
+
+
+# Проверка адреса принимает регулярное выражение; элемент задаётся либо селектором, либо текстом
+def test_check_builders():
+    check = url(re.compile(r"/dashboard", re.IGNORECASE))
+    assert (check["pattern"], check["flags"], check["expected"]) == ("/dashboard", "i", None)
+    with pytest.raises(ValueError):
+        visible()
+    with pytest.raises(ValueError):
+        visible("button", text="Войти")
+
+
+# Выполняет ту же проверку через expect(); возвращает True, если она прошла
+def expect_passes(page, check, timeout=200):
+    if check["text"] is not None:
+        locator = page.get_by_text(check["text"], exact=check["exact"])
+    else:
+        locator = page.locator(check["selector"], has_text=check["has_text"])
+    assertion = expect(locator)
+    try:
+        if check["condition"] == "has_text":
+            method = assertion.to_have_text if check["exact"] else assertion.to_contain_text
+            method(check["expected"], timeout=timeout)
+        else:
+            getattr(assertion, f"to_be_{check['condition']}")(timeout=timeout)
+    except (AssertionError, PlaywrightError):  # PlaywrightError — нарушение строгого режима
+        return False
+    return True
+
+
+# Выполняет проверку через expect_all; возвращает True, если она прошла
+def batch_passes(page, check, timeout=200):
+    try:
+        expect_all(page, [check], timeout=timeout)
+    except AssertionError:
+        return False
+    return True
+
+
+# Фрагменты HTML, на которых простые правила легко расходятся с expect(): (HTML, проверка, ожидаемый результат)
+HTML_CASES = [
+    ('<p>Раз</p><p style="display:none">Два</p>', visible("p"), False),  # Строгий режим: элементов два
+    ('<p hidden>Раз</p><p hidden>Два</p>', hidden("p"), False),
+    ('<button disabled>Раз</button><button>Два</button>', disabled("button"), False),
+    ('<p style="visibility:collapse">Раз</p>', visible("p"), False),
+    ('<p style="visibility:hidden">Раз</p>', hidden("p"), True),
+    ('<script>const label = "Войти"</script><b>Выход</b>', hidden(text="Войти"), True),
+    ('<p>Войти<script>1</script></p>', visible(text="Войти", exact=True), True),
+    ('<div>Привет <b>Мир</b></div>', visible(text="привет мир"), True),
+    ('<div>Привет <b>Мир</b></div>', visible(text="Привет Мир", exact=True), True),
+    ('<div><span>Мир</span><span>Мир</span></div>', visible(text="Мир"), False),
+    ('<div><p><b>Мир</b></p></div><i>Мир</i>', visible(text="Мир"), False),  # Вложенные совпадения не считаются
+    ('<div>Войти <b>Войти</b></div>', visible(text="Войти", exact=True), True),
+    ('<h1>Моя организация</h1>', has_text("h1", "моя организация"), False),  # to_contain_text учитывает регистр
+    ('<h1>Моя организация</h1>', has_text("h1", "Моя"), True),
+    ('<h1>Моя организация</h1>', has_text("h1", "Моя", exact=True), False),
+    ('<button aria-disabled="true">Раз</button>', disabled("button"), True),
+    ('<span aria-disabled="true">Раз</span>', enabled("span"), True),  # У span нет роли, aria-disabled не действует
+    ('<div aria-disabled="true"><button>Раз</button></div>', enabled("button"), True),
+    ('<div role="group" aria-disabled="true"><span role="button">Раз</span></div>', disabled("span"), True),
+    ('<fieldset disabled><input></fieldset>', disabled("input"), True),
+    ('<select disabled><option>Раз</option></select>', enabled("option"), True),
+    ('<ul><li>Раз</li><li>Два</li></ul>', visible("li", has_text="два"), True),
+]
+
+
+# На фрагментах HTML пакетная проверка проходит и не проходит там же, где expect()
+@pytest.mark.parametrize("html, check, passes", HTML_CASES, ids=[case[1]["description"] for case in HTML_CASES])
+def test_batch_matches_expect_on_html(chromium_context, html, check, passes):
+    page = chromium_context.new_page()
+    page.set_content(html)
+    assert expect_passes(page, check) is passes
+    assert batch_passes(page, check) is passes
+
+
+# На страницах стенда-заглушки проверки тестов входа дают тот же результат, что и expect()
+def test_batch_matches_expect_on_stand_in_pages(stand_in_page, stand_in_account):
+    page = stand_in_page
+    login_form = [
+        (visible(text="Введите пароль", exact=True), False),  # Сообщение об ошибке пока скрыто
+        (visible("input"), False),  # Полей два: нарушение строгого режима
+        (hidden("#error"), True),
+        (enabled('button[type="submit"]'), True),
+    ]
+    for check, passes in login_form:
+        assert (expect_passes(page, check), batch_passes(page, check)) == (passes, passes), check["description"]
+    page.click('button[type="submit"]')  # Пустой пароль: сообщение и неактивная кнопка
+    for check in (visible(text="Введите пароль", exact=True), disabled('button[type="submit"]')):
+        assert (expect_passes(page, check, timeout=2000), batch_passes(page, check, timeout=2000)) == (True, True)
+    page.fill('input[placeholder="Введите e-mail"]', stand_in_account[0])
+    page.fill('input[placeholder="Введите пароль"]', stand_in_account[1])
+    page.click('button[type="submit"]')
+    expect_all(page, [visible("button", has_text=stand_in_account[0]), visible(text="Моя организация")])
+    dashboard = [
+        (visible("button", has_text=stand_in_account[0].upper()), True),
+        (has_text("h1", "моя организация"), False),
+        (visible(text="Моя"), True),
+        (hidden('input[placeholder="Введите пароль"]'), True),
+    ]
+    for check, passes in dashboard:
+        assert (expect_passes(page, check), batch_passes(page, check)) == (passes, passes), check["description"]
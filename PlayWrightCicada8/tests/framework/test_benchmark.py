@@ -0,0 +1,30 @@
+# Тесты замеров и сравнения с базовой линией (tests/utils/benchmark.py)
+
+from tests.utils.benchmark import measure, summarize, find_regressions, save_baseline, load_baseline
+
+
+# Прогревочный запуск не попадает в замеры, cleanup получает результат каждого запуска
+def test_measure_skips_warmup_and_cleans_up():
+    cleaned = []
+    samples = measure(lambda: "result", rounds=3, warmup=2, cleanup=cleaned.append)
+    assert len(samples) == 3
+    assert cleaned == ["result"] * 5
+
+
+# Сводка содержит min, медиану и p95
+def test_summarize():
+    summary = summarize([0.5, 0.1, 0.2, 0.3, 0.4])
+    assert summary == {"rounds": 5, "min": 0.1, "median": 0.3, "p95": 0.5}
+
+
+# Регрессия — рост медианы больше порога и больше шума; новые пути без базовой линии не проверяются
+def test_find_regressions(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    save_baseline(path, {"slow": {"median": 0.100}, "noisy": {"median": 0.001}, "stable": {"median": 0.100}})
+    baseline = load_baseline(path)
+    results = {
+        "slow": {"median": 0.150}, "noisy": {"median": 0.004}, "stable": {"median": 0.110}, "new": {"median": 9.0},
+    }
+    regressions = find_regressions(results, baseline, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("slow: median 150.0ms vs baseline 100.0ms")
+    assert load_baseline(str(tmp_path / "missing.json")) == {}
@@ -0,0 +1,150 @@
+# Тесты браузера-демона (tests/utils/browser_daemon.py)
+# Вместо Chromium запускается маленький скрипт, который, как браузер, пишет порт в DevToolsActivePort
+# и отвечает на /json/version, /json/list и /json/close/<id>; список открытых страниц хранится в файле pages.json
+# в профиле. Закрытие страниц, оставленных пулом браузеров воркера, проверяется и в Chromium
+
+import os
+import sys
+import json
+import textwrap
+import subprocess
+
+import pytest
+
+from tests.utils import browser_daemon, browser_pool
+from tests.utils.browser_daemon import BrowserDaemon
+from tests.utils.browser_pool import BrowserPool
+from tests.utils.session_stats import SessionStats
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="the fake browser is started as a POSIX script")
+
+FAKE_BROWSER = """
+    import os, sys, json
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    profile = next(arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--user-data-dir="))
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            pages_path = os.path.join(profile, "pages.json")
+            pages = json.load(open(pages_path)) if os.path.exists(pages_path) else []
+            if self.path.startswith("/json/close/"):
+                target_id = self.path.rsplit("/", 1)[1]
+                json.dump([page for page in pages if page["id"] != target_id], open(pages_path, "w"))
+                body = b"Target is closing"
+            else:
+                body = json.dumps({"Browser": "Fake/1.0"} if self.path == "/json/version" else pages).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    with open(os.path.join(profile, "DevToolsActivePort"), "w") as f:
+        f.write(f"{server.server_address[1]}\\n/devtools/browser/fake\\n")
+    server.serve_forever()
+"""
+
+
+@pytest.fixture
+def fake_browser(tmp_path):
+    path = tmp_path / "fake-browser"
+    path.write_text(f"#!{sys.executable}\n" + textwrap.dedent(FAKE_BROWSER))
+    path.chmod(0o755)
+    return str(path)
+
+
+@pytest.fixture
+def daemon(tmp_path, monkeypatch):
+    monkeypatch.setattr(browser_daemon, "stats", SessionStats())
+    daemon = BrowserDaemon(str(tmp_path / "daemon"))
+    yield daemon
+    daemon.stop()
+
+
+# Первый вызов запускает браузер, следующие (в том числе из другого экземпляра) переиспользуют его
+def test_started_once_and_reused(daemon, fake_browser):
+    endpoint = daemon.ensure(lambda: fake_browser)
+    assert endpoint.startswith("http://127.0.0.1:")
+    assert BrowserDaemon(daemon.state_dir).ensure(lambda: pytest.fail("must not start a second browser")) == endpoint
+    assert daemon.endpoint() == endpoint
+
+
+# Функция возвращает PID процесса, который уже завершился
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+# Функция записывает файл владельца браузера для другого процесса
+def write_owner(daemon, pid, targets):
+    os.makedirs(daemon.owners_dir, exist_ok=True)
+    with open(os.path.join(daemon.owners_dir, f"{pid}.json"), "w") as f:
+        json.dump(targets, f)
+
+
+# Функция возвращает id страниц, открытых в фальшивом браузере
+def open_page_ids(daemon):
+    with open(os.path.join(daemon.profile_dir, "pages.json")) as f:
+        return {page["id"] for page in json.load(f)}
+
+
+# С clean=True закрываются только страницы завершившихся запусков, браузер не перезапускается:
+# страницы живого владельца остаются, страница без владельца закрывается, когда живых владельцев не осталось
+def test_only_pages_of_dead_owners_are_closed(daemon, fake_browser):
+    daemon.ensure(lambda: fake_browser)
+    first_pid = daemon.read_state()["pid"]
+    pages = [{"id": target_id, "type": "page", "url": "https://stand/"} for target_id in ("dead", "live", "lost")]
+    with open(os.path.join(daemon.profile_dir, "pages.json"), "w") as f:
+        json.dump(pages, f)
+    write_owner(daemon, dead_pid(), ["dead"])
+    daemon.add_target("live")  # Владелец — этот процесс, он жив
+    daemon.ensure(lambda: fake_browser)  # Воркеры (clean=False) ничего не закрывают
+    assert open_page_ids(daemon) == {"dead", "live", "lost"}
+    BrowserDaemon(daemon.state_dir).ensure(lambda: fake_browser, clean=True)
+    assert open_page_ids(daemon) == {"live", "lost"}
+    assert set(daemon.read_owners()) == {os.getpid()}  # Файл завершившегося владельца удалён
+    assert browser_daemon.stats.counters[browser_daemon.STATS_SECTION]["stale pages closed"] == 1
+    daemon.unregister_owner()
+    BrowserDaemon(daemon.state_dir).ensure(lambda: fake_browser, clean=True)
+    assert open_page_ids(daemon) == set()
+    assert daemon.read_state()["pid"] == first_pid
+
+
+# Если процесс браузера завершился, endpoint() сообщает об этом, а ensure запускает браузер заново
+def test_restarted_when_unhealthy(daemon, fake_browser):
+    daemon.ensure(lambda: fake_browser)
+    state = daemon.read_state()
+    os.kill(state["pid"], 9)
+    daemon._process.wait()
+    assert daemon.endpoint() is None
+    daemon.ensure(lambda: fake_browser)
+    assert daemon.read_state()["pid"] != state["pid"]
+    assert browser_daemon.stats.counters[browser_daemon.STATS_SECTION]["restarts (unhealthy)"] == 1
+
+
+# В Chromium пул воркера записывает свои страницы владельцем: очистка другого запуска их не закрывает,
+# а после завершения владельца его страница закрывается по CDP
+def test_pool_pages_are_closed_only_after_owner_exits(tmp_path, chromium, playwright, stand_in_app, monkeypatch):
+    monkeypatch.setattr(browser_daemon, "stats", SessionStats())
+    monkeypatch.setattr(browser_pool, "stats", SessionStats())
+    daemon = BrowserDaemon(str(tmp_path / "daemon"))
+    pool = BrowserPool(playwright, daemon=daemon)
+    try:
+        page = pool.new_context().new_page()
+        page.goto(stand_in_app.base_url)
+        (target_id,) = daemon.read_owners()[os.getpid()]
+        BrowserDaemon(daemon.state_dir).ensure(lambda: pytest.fail("must not restart the browser"), clean=True)
+        assert page.evaluate("1 + 1") == 2
+        daemon.unregister_owner()
+        write_owner(daemon, dead_pid(), [target_id])
+        BrowserDaemon(daemon.state_dir).ensure(lambda: pytest.fail("must not restart the browser"), clean=True)
+        if not page.is_closed():
+            page.wait_for_event("close", timeout=5000)
+    finally:
+        pool.close()
+        daemon.stop()
@@ -0,0 +1,132 @@
+# Тесты сетки удалённых браузеров (tests/utils/browser_grid.py)
+# Узлы сетки — заглушки chromium.connect: браузер узла создаёт контексты, "мёртвый" узел отказывает в подключении.
+# Локальные серверы Playwright (LocalGrid) запускаются по-настоящему: браузер им нужен только при подключении
+
+import socket
+from urllib.parse import urlsplit
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils import browser_grid
+from tests.utils.browser_grid import BrowserGrid, LocalGrid, read_state, summary_lines
+from tests.utils.session_stats import SessionStats
+
+NODES = ["ws://node-1:3000/", "ws://node-2:3000/", "ws://node-3:3000/"]
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.handlers = []
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def close(self):
+        for handler in self.handlers:
+            handler(self)
+
+
+class FakeBrowser:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.connected = True
+        self.handlers = []
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **context_options):
+        return FakeContext(self)
+
+    def close(self):
+        self.connected = False
+        for handler in self.handlers:
+            handler(self)
+
+
+class FakeChromium:
+    def __init__(self, dead=()):
+        self.dead = set(dead)
+
+    def connect(self, endpoint, timeout=None):
+        if endpoint in self.dead:
+            raise PlaywrightError(f"connect ECONNREFUSED {endpoint}")
+        return FakeBrowser(endpoint)
+
+
+class FakePlaywright:
+    def __init__(self, dead=()):
+        self.chromium = FakeChromium(dead)
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(browser_grid, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+def grid_for_worker(monkeypatch, name, playwright, state_path):
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", name)
+    return BrowserGrid(playwright, NODES, state_path)
+
+
+# Контексты двух воркеров распределяются по узлам поровну: выбирается узел с наименьшим числом открытых контекстов
+def test_contexts_are_balanced_across_workers(tmp_path, monkeypatch, session_stats):
+    path = str(tmp_path / "browser_grid.json")
+    playwright = FakePlaywright()
+    gw0 = grid_for_worker(monkeypatch, "gw0", playwright, path)
+    gw1 = grid_for_worker(monkeypatch, "gw1", playwright, path)
+    contexts = [gw0.new_context(), gw1.new_context(), gw0.new_context(), gw1.new_context()]
+    assert [context.browser.endpoint for context in contexts] == NODES + NODES[:1]
+    assert read_state(path)[NODES[0]]["contexts"] == {"gw0": 1, "gw1": 1}
+    contexts[1].close()  # Узел 2 освободился — следующий контекст создаётся на нём
+    assert gw0.new_context().browser.endpoint == NODES[1]
+    assert read_state(path)[NODES[0]]["peak"] == 2
+
+
+# Недоступный узел исключается для всех воркеров, контекст создаётся на следующем; без узлов — RuntimeError
+def test_dead_node_is_skipped_and_retried_elsewhere(tmp_path, monkeypatch, session_stats):
+    path = str(tmp_path / "browser_grid.json")
+    playwright = FakePlaywright(dead=[NODES[0]])
+    gw0 = grid_for_worker(monkeypatch, "gw0", playwright, path)
+    assert gw0.new_context().browser.endpoint == NODES[1]
+    assert read_state(path)[NODES[0]]["cause"] == f"Error: connect ECONNREFUSED {NODES[0]}"
+    gw1 = grid_for_worker(monkeypatch, "gw1", playwright, path)
+    assert gw1.acquire().endpoint == NODES[2]  # Узел 1 исключён, узел 2 занят
+    playwright.chromium.dead.update(NODES)
+    gw1.browsers[NODES[2]].close()  # Соединение с узлом оборвалось
+    with pytest.raises(RuntimeError, match="No browser grid node is available"):
+        gw1.new_context()
+    assert session_stats.counters[browser_grid.STATS_SECTION] == {"node failures": 3}
+
+
+# Нагрузка воркеров на узлы складывается в сводку: контексты, доля, время работы, пик и отказы
+def test_usage_summary(tmp_path, monkeypatch, session_stats):
+    clock = iter([100.0, 100.0, 112.5]).__next__
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw0")
+    grid = BrowserGrid(FakePlaywright(), NODES[:2], str(tmp_path / "browser_grid.json"), clock=clock)
+    grid.new_context().close()
+    grid.close()
+    records = session_stats.records[browser_grid.STATS_SECTION]
+    assert records[0] == {"worker": "gw0", "endpoint": NODES[0], "contexts": 1, "busy": 12.5, "failures": 0}
+    assert summary_lines(records, read_state(grid.state_path)) == [
+        f"  {NODES[0]}: 1 contexts (100%), busy 12.5s, peak 1 concurrent, 0 failures",
+        f"  {NODES[1]}: 0 contexts (0%), busy 0.0s, peak 0 concurrent, 0 failures",
+    ]
+
+
+# Локальные серверы Playwright стартуют на свободных портах и принимают подключения, stop их завершает
+def test_local_grid_starts_browser_servers(tmp_path):
+    with LocalGrid(2, str(tmp_path)) as grid:
+        assert len(set(grid.endpoints)) == 2
+        for endpoint in grid.endpoints:
+            parts = urlsplit(endpoint)
+            socket.create_connection((parts.hostname, parts.port), timeout=5).close()
+        processes = list(grid.processes)
+    assert all(process.poll() is not None for process in processes)
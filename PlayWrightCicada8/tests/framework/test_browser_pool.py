@@ -0,0 +1,112 @@
+# Тесты пула браузера воркера (tests/utils/browser_pool.py)
+# Запуск, перезапуск после потери соединения и закрытие оставленных контекстов проверяются в Chromium;
+# повтор создания контекста после отказа — на заглушках браузера и сетки, которые отказывают один раз
+
+import pytest
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils import browser_pool
+from tests.utils.browser_pool import BrowserPool
+from tests.utils.session_stats import SessionStats
+
+
+class FakeContext:
+    def on(self, event, handler):
+        pass
+
+
+class FakeBrowser:
+    def __init__(self, failures=0):
+        self.failures = failures  # Сколько раз new_context ещё откажет
+        self.contexts = 0
+        self.closed = False
+
+    def is_connected(self):
+        return not self.closed
+
+    def new_context(self, **context_options):
+        if self.failures:
+            self.failures -= 1
+            raise PlaywrightError("Target page, context or browser has been closed")
+        self.contexts += 1
+        return FakeContext()
+
+    def close(self):
+        self.closed = True
+
+
+class FakePlaywright:
+    def __init__(self, *browsers):
+        self.browsers = list(browsers)
+        self.chromium = self
+
+    def launch(self, **launch_options):
+        return self.browsers.pop(0)
+
+
+class FakeGrid(FakeBrowser):
+    def acquire(self):
+        return FakeBrowser()
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(browser_pool, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Фикстура для пула с настоящим Chromium (тест пропускается, если Chromium не установлен)
+@pytest.fixture
+def chromium_pool(playwright, session_stats):
+    pool = BrowserPool(playwright, headless=True)
+    try:
+        pool.acquire()
+    except PlaywrightError as exc:
+        pytest.skip(f"Chromium is not available: {exc}")
+    yield pool
+    pool.close()
+
+
+# Браузер запускается один раз и выдаётся следующим тестам; после потери соединения — перезапускается
+def test_acquire_reuses_browser_and_restarts_after_disconnect(chromium_pool, session_stats):
+    browser = chromium_pool.acquire()
+    assert chromium_pool.acquire() is browser
+    browser.close()  # Соединение с браузером потеряно (как при падении браузера)
+    assert not chromium_pool.is_healthy()
+    restarted = chromium_pool.acquire()
+    assert restarted is not browser and restarted.is_connected()
+    assert chromium_pool.new_context().browser is restarted
+    counters = session_stats.counters[browser_pool.STATS_SECTION]
+    assert counters["launches"] == 2 and counters["restarts (disconnected)"] == 1
+
+
+# release закрывает только контексты пула, оставленные тестом открытыми; контексты, закрытые тестом,
+# и контексты, созданные в браузере не через пул (например, другим воркером браузера-демона), не трогает
+def test_release_closes_only_own_contexts(chromium_pool, session_stats):
+    leaked, closed = chromium_pool.new_context(), chromium_pool.new_context()
+    closed.close()
+    foreign = chromium_pool.browser.new_context()
+    chromium_pool.release()
+    assert chromium_pool.browser.contexts == [foreign] and chromium_pool.contexts == set()
+    assert session_stats.counters[browser_pool.STATS_SECTION]["leaked contexts closed"] == 1
+    with pytest.raises(PlaywrightError):
+        leaked.new_page()
+    foreign.close()
+
+
+# Если браузер отказал в создании контекста, пул перезапускает браузер и повторяет попытку в новом
+def test_new_context_retries_in_restarted_browser(session_stats):
+    broken, fresh = FakeBrowser(failures=1), FakeBrowser()
+    pool = BrowserPool(FakePlaywright(broken, fresh))
+    pool.new_context()
+    assert broken.closed and pool.browser is fresh and fresh.contexts == 1
+    assert session_stats.counters[browser_pool.STATS_SECTION]["restarts (new_context failed)"] == 1
+
+
+# Со сеткой повторная попытка тоже идёт через сетку (выбор узла), а не напрямую в браузер узла
+def test_new_context_retry_goes_through_grid(session_stats):
+    grid = FakeGrid(failures=1)
+    pool = BrowserPool(FakePlaywright(), grid=grid)
+    pool.new_context()
+    assert grid.contexts == 1 and pool.browser.contexts == 0
@@ -0,0 +1,21 @@
+# Тесты истории длительностей и оценки makespan (tests/utils/duration_history.py)
+# Проверяют сглаживание, оценку для новых тестов и выигрыш раздачи "сначала самые долгие"
+
+from tests.utils.duration_history import DurationHistory, simulate_makespan
+
+
+# Длительность сглаживается между запусками, новые тесты получают медиану тестов своего файла
+def test_history_smooths_and_predicts_new_tests(tmp_path):
+    history = DurationHistory(str(tmp_path / "durations.sqlite"), default_duration=7.0)
+    assert history.predict(["tests/a.py::test_new"]) == [7.0]
+    history.update({"tests/a.py::test_one": 10.0, "tests/a.py::test_two": 2.0, "tests/b.py::test_three": 1.0})
+    history.update({"tests/a.py::test_one": 20.0})
+    predicted = history.predict(["tests/a.py::test_one", "tests/a.py::test_new", "tests/c.py::test_other"])
+    assert predicted == [15.0, 8.5, 2.0]
+
+
+# Долгий тест в конце списка растягивает makespan, а при раздаче по убыванию длительности — нет
+def test_longest_first_shortens_makespan():
+    durations = [1.0] * 8 + [60.0]
+    assert simulate_makespan(durations, 2) == 64.0
+    assert simulate_makespan(sorted(durations, reverse=True), 2) == 60.0
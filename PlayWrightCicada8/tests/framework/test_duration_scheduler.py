@@ -0,0 +1,77 @@
+# Тесты планировщика pytest-xdist с учётом длительности (tests/utils/duration_scheduler.py)
+# Вместо воркеров xdist — заглушки узлов: запоминают выданные тесты и команду завершения
+
+from types import SimpleNamespace
+
+from tests.utils.duration_scheduler import DurationScheduling, xdist_supported
+
+COLLECTION = ["test_a.py::test_1", "test_a.py::test_2", "test_b.py::test_3", "test_b.py::test_4", "test_c.py::test_5"]
+
+
+class FakeNode:
+    def __init__(self, name):
+        self.gateway = SimpleNamespace(id=name)
+        self.shutting_down = False
+        self.sent = []
+
+    def send_runtest_some(self, indices):
+        self.sent.extend(indices)
+
+    def shutdown(self):
+        self.shutting_down = True
+
+
+class FakeHistory:
+    def __init__(self, durations):
+        self.durations = durations
+
+    def predict(self, nodeids):
+        return [self.durations[nodeid] for nodeid in nodeids]
+
+
+# Создаёт планировщик на nodes воркеров с ожидаемыми длительностями тестов COLLECTION
+def make_scheduler(nodes, durations):
+    config = SimpleNamespace(getvalue=lambda name: [f"{len(nodes)}*popen"], getoption=lambda name: None)
+    scheduler = DurationScheduling(config, history=FakeHistory(dict(zip(COLLECTION, durations))))
+    for node in nodes:
+        scheduler.add_node(node)
+    return scheduler
+
+
+# Самые долгие тесты уходят первыми, по кругу и не больше двух на воркер; освободившийся воркер получает
+# следующий по длительности тест, а после раздачи всех тестов воркеры завершаются
+def test_longest_tests_are_sent_first():
+    first, second = FakeNode("gw0"), FakeNode("gw1")
+    scheduler = make_scheduler([first, second], [1, 9, 3, 7, 5])
+    for node in (first, second):
+        scheduler.add_node_collection(node, COLLECTION)
+    scheduler.schedule()
+    assert first.sent == [1, 4] and second.sent == [3, 2] and scheduler.pending == [0]
+    assert scheduler.predicted_makespan == 13 and scheduler.collection_order_makespan == 14
+    scheduler.mark_test_complete(second, 3)
+    assert second.sent == [3, 2, 0] and scheduler.pending == []
+    scheduler.mark_test_complete(first, 1)
+    assert first.shutting_down and not second.shutting_down
+    assert not scheduler.tests_finished
+    for node, index in ((first, 4), (second, 2), (second, 0)):
+        scheduler.mark_test_complete(node, index)
+    assert scheduler.tests_finished
+
+
+# Если воркеры собрали разные тесты, раздача не начинается
+def test_different_collections_abort_scheduling():
+    first, second = FakeNode("gw0"), FakeNode("gw1")
+    scheduler = make_scheduler([first, second], [1, 2, 3, 4, 5])
+    scheduler.add_node_collection(first, COLLECTION)
+    scheduler.add_node_collection(second, COLLECTION[:-1])
+    scheduler.config = None  # Без отчёта об ошибке сбора через хуки pytest
+    scheduler.schedule()
+    assert first.sent == [] and second.sent == [] and scheduler.collection is None
+
+
+# Планировщик включается только с проверенной основной версией pytest-xdist
+def test_xdist_version_check():
+    assert xdist_supported()
+    assert xdist_supported("3.0.2")
+    assert not xdist_supported("4.0.0")
+    assert not xdist_supported("2.5.0")
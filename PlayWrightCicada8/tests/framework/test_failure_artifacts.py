@@ -0,0 +1,71 @@
+# Тесты сборщика артефактов упавших тестов (tests/utils/failure_artifacts.py)
+# Вместо контекста и страницы Playwright используются простые объекты с теми же методами и событиями
+
+import os
+import gzip
+import json
+import pytest
+from types import SimpleNamespace
+from tests.utils import failure_artifacts
+from tests.utils.failure_artifacts import ArtifactCollector
+from tests.utils.session_stats import SessionStats
+
+
+# Страница: скриншот и HTML
+class DummyPage:
+    url = "https://stand/"
+
+    def is_closed(self):
+        return False
+
+    def screenshot(self):
+        return b"\x89PNG" + b"0" * 100
+
+    def content(self):
+        return "<html><body>" + "Моя организация " * 50 + "</body></html>"
+
+
+# Контекст: запоминает обработчики событий, чтобы тест мог их вызвать
+class DummyContext:
+    def __init__(self):
+        self.pages = [DummyPage()]
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+
+# Отдельная статистика, чтобы замеры тестов не попадали в итог прогона
+@pytest.fixture(autouse=True)
+def local_stats(monkeypatch):
+    monkeypatch.setattr(failure_artifacts, "stats", SessionStats())
+
+
+# При падении сохраняются скриншот, сжатый DOM, консоль и сеть в каталоге воркера и теста
+def test_capture_writes_compressed_artifacts(tmp_path):
+    collector = ArtifactCollector(str(tmp_path), max_bytes=1024 * 1024)
+    context = DummyContext()
+    collector.watch(context)
+    context.handlers["console"](SimpleNamespace(type="error", text="Uncaught TypeError"))
+    request = SimpleNamespace(method="POST", url="https://stand/api/login", failure=None)
+    context.handlers["response"](SimpleNamespace(request=request, url=request.url, status=401))
+    collector.capture("tests/auth/test_login.py::test_login", "call")
+    collector.close()
+    files = {name: os.path.join(root, name) for root, _, names in os.walk(tmp_path) for name in names}
+    assert set(files) == {"call-0-console.json.gz", "call-0-network.json.gz", "call-0-page0.png", "call-0-page0.html.gz"}
+    assert "tests_auth_test_login__test_login" in files["call-0-page0.png"]
+    with gzip.open(files["call-0-network.json.gz"]) as f:
+        assert json.load(f)[0]["status"] == 401
+    with gzip.open(files["call-0-page0.html.gz"]) as f:
+        assert "Моя организация" in f.read().decode("utf-8")
+
+
+# После достижения лимита размера новые артефакты не записываются
+def test_size_limit_is_enforced(tmp_path):
+    collector = ArtifactCollector(str(tmp_path), max_bytes=300)
+    collector.watch(DummyContext())
+    for number in range(5):
+        collector.capture(f"test_{number}", "call")
+    collector.close()
+    assert collector.written <= 300
+    assert sum(len(names) for _, _, names in os.walk(tmp_path)) < 20
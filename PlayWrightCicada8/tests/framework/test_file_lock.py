@@ -0,0 +1,43 @@
+# Тесты межпроцессной блокировки (tests/utils/file_lock.py)
+# Проверяют, что блокировка снимается только своим владельцем, а разрыв зависшей не задевает новую
+
+import os
+import time
+
+from tests.utils.file_lock import FileLock, read_owner
+
+
+# В lock-файле метка владельца (PID и случайная строка); release удаляет файл
+def test_lock_file_holds_owner_token(tmp_path):
+    path = str(tmp_path / "work.lock")
+    with FileLock(path) as lock:
+        assert read_owner(path) == lock.token and lock.token.split()[0] == str(os.getpid())
+        assert not FileLock(path).try_acquire()
+    assert not os.path.exists(path) and lock.token is None
+
+
+# Владелец, работавший дольше stale_after, при освобождении не удаляет блокировку нового владельца
+def test_late_release_keeps_new_owners_lock(tmp_path):
+    path = str(tmp_path / "work.lock")
+    slow, other = FileLock(path, stale_after=0.1), FileLock(path, timeout=1, stale_after=0.1)
+    assert slow.try_acquire()
+    time.sleep(0.2)
+    other.acquire()  # Зависшая блокировка разорвана и захвачена
+    slow.release()
+    assert read_owner(path) == other.token
+    other.release()
+    assert not os.path.exists(path)
+
+
+# Разрыв по устаревшей метке не трогает блокировку, которую уже успели захватить заново
+def test_break_lock_restores_fresh_lock(tmp_path):
+    path = str(tmp_path / "work.lock")
+    stale = FileLock(path)
+    assert stale.try_acquire()
+    stale_token = stale.token
+    os.remove(path)  # Зависшую блокировку разорвал другой процесс...
+    fresh = FileLock(path)
+    assert fresh.try_acquire()  # ...и её захватили снова
+    assert not FileLock(path).break_lock(stale_token)
+    assert read_owner(path) == fresh.token
+    assert os.listdir(str(tmp_path)) == ["work.lock"]
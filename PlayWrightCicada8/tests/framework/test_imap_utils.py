@@ -0,0 +1,97 @@
+# Тесты утилиты imap_utils на локальном почтовом сервере (фикстура fake_mail_server из conftest.py)
+# Не требуют доступа к mail.cicada8.ru и стенду: проверяют разбор писем и ожидание новых писем офлайн
+
+import time
+import imaplib
+import smtplib
+import threading
+import pytest
+from tests.utils.fake_mail_server import _IMAPHandler
+from tests.utils.imap_utils import (
+    get_reset_link_from_email, get_mailbox_watermark, wait_for_reset_link, connect_to_mailbox, wait_for_new_mail,
+)
+
+USER_EMAIL = "tester@cicada8.ru"
+
+
+# Режим опроса находит ссылку в уже пришедшем письме
+def test_polling_mode_extracts_reset_link(fake_mail_server):
+    link = fake_mail_server.inject_reset_email(USER_EMAIL, token="abc-123")
+    assert get_reset_link_from_email(USER_EMAIL, "secret", max_attempts=2, delay=0.1) == link
+
+
+# Режим IDLE возвращает ссылку сразу после прихода письма и игнорирует письма до водяной отметки
+def test_idle_mode_returns_as_soon_as_mail_arrives(fake_mail_server):
+    fake_mail_server.inject_reset_email(USER_EMAIL, token="old-token")
+    watermark = get_mailbox_watermark(USER_EMAIL, "secret")
+    timer = threading.Timer(0.3, fake_mail_server.inject_reset_email, args=(USER_EMAIL, "new-token"))
+    timer.start()
+    started = time.monotonic()
+    link = get_reset_link_from_email(USER_EMAIL, "secret", since_uid=watermark, timeout=10)
+    timer.join()
+    assert link.endswith("/set-password/new-token/")
+    assert time.monotonic() - started < 3
+
+
+# Режим IDLE читает письма через BODY.PEEK и не помечает их прочитанными
+def test_idle_mode_does_not_mark_message_seen(fake_mail_server):
+    fake_mail_server.inject_reset_email(USER_EMAIL, token="peek")
+    wait_for_reset_link(USER_EMAIL, "secret", since_uid=0, timeout=5)
+    assert all("\\Seen" not in message.flags for message in fake_mail_server.store.messages(USER_EMAIL))
+
+
+# Если письмо не пришло, ожидание завершается по общему дедлайну
+def test_idle_mode_times_out(fake_mail_server):
+    with pytest.raises(TimeoutError):
+        wait_for_reset_link(USER_EMAIL, "secret", since_uid=0, timeout=0.5)
+
+
+# Письмо, отправленное через SMTP-приёмник, сразу доступно через API в памяти и через IMAP
+def test_smtp_delivery_is_visible_immediately(fake_mail_server):
+    link = "https://cicada.develop.apt.lan/set-password/from-smtp/"
+    body = f"From: no-reply-dev@cicada8.ru\r\nTo: {USER_EMAIL}\r\nSubject: Reset\r\n\r\n{link}\r\n"
+    with smtplib.SMTP(fake_mail_server.host, fake_mail_server.smtp_port) as client:
+        client.sendmail("no-reply-dev@cicada8.ru", [USER_EMAIL], body)
+    message = fake_mail_server.wait_for_message(USER_EMAIL, timeout=2)
+    assert link.encode() in message.raw
+    assert wait_for_reset_link(USER_EMAIL, "secret", since_uid=0, timeout=2) == link
+
+
+# Сервер отказал в IDLE (тегированный NO вместо "+"): ожидание переходит на опрос и всё равно находит письмо
+def test_refused_idle_falls_back_to_polling(fake_mail_server, monkeypatch):
+    monkeypatch.setattr(_IMAPHandler, "do_idle", lambda handler, tag, args, use_uid: handler.send(
+        f"{tag} NO IDLE is not allowed\r\n"
+    ))
+    timer = threading.Timer(0.3, fake_mail_server.inject_reset_email, args=(USER_EMAIL, "polled"))
+    timer.start()
+    link = wait_for_reset_link(USER_EMAIL, "secret", since_uid=0, timeout=5)
+    timer.join()
+    assert link.endswith("/set-password/polled/")
+
+
+# Сервер не отвечает на IDLE: ожидание не зависает, а завершается по timeout с ошибкой соединения
+def test_silent_server_does_not_hang_idle(fake_mail_server, monkeypatch):
+    monkeypatch.setattr(_IMAPHandler, "do_idle", lambda handler, tag, args, use_uid: None)
+    mail = connect_to_mailbox(USER_EMAIL, "secret")
+    started = time.monotonic()
+    with pytest.raises(imaplib.IMAP4.abort, match="did not confirm IDLE"):
+        wait_for_new_mail(mail, 0.3)
+    assert time.monotonic() - started < 2
+    mail.shutdown()
+
+
+# Уведомления, пришедшие вместе с ответом на IDLE, остаются в буфере imaplib, а не теряются
+def test_idle_keeps_data_after_its_response(fake_mail_server, monkeypatch):
+    def do_idle(handler, tag, args, use_uid):
+        handler.send("+ idling\r\n* 1 EXISTS\r\n")  # Подтверждение и уведомление одним пакетом
+        handler.rfile.readline()  # DONE
+        handler.send(f"{tag} OK IDLE terminated\r\n* 7 RECENT\r\n")
+
+    monkeypatch.setattr(_IMAPHandler, "do_idle", do_idle)
+    mail = connect_to_mailbox(USER_EMAIL, "secret")
+    started = time.monotonic()
+    wait_for_new_mail(mail, 5)
+    assert time.monotonic() - started < 1  # EXISTS из того же пакета замечен сразу
+    assert mail.noop()[0] == "OK"
+    assert mail.response("RECENT")[1][-1] == b"7"
+    mail.logout()
@@ -0,0 +1,66 @@
+# Тесты нагрузочного режима (tests/utils/load_runner.py) на локальном стенде-заглушке в режимах http и browser
+
+from tests.utils import stand_in_app
+from tests.utils.load_runner import (
+    PHASES, BrowserJourney, StepResult, histogram, run_http_load, run_browser_load, build_report,
+)
+from tests.utils.stand_in_app import StandInApp
+
+ACCOUNTS = [("load@example.com", "secret")]
+
+
+# Замеры попадают в интервал с ближайшей сверху границей, всё дольше 10 с — в последний
+def test_histogram_buckets():
+    buckets = dict(histogram([0.005, 0.010, 0.011, 0.3, 60.0]))
+    assert buckets["<=10ms"] == 2 and buckets["<=25ms"] == 1 and buckets["<=500ms"] == 1 and buckets[">10000ms"] == 1
+
+
+# На каждой ступени все фазы сценария выполняются без ошибок, стенд получает запросы входа и сброса
+def test_ramp_records_every_phase():
+    with StandInApp() as app:
+        results = run_http_load(app.base_url, ACCOUNTS, steps=[1, 3], step_seconds=0.3)
+        assert app.requests["reset requests"] == sum(result.journeys for result in results)
+    assert [result.users for result in results] == [1, 3]
+    for result in results:
+        assert result.journeys > 0 and result.error_rate == 0.0 and result.throughput > 0
+        assert all(result.samples[phase] for phase in PHASES)
+    report = build_report(results, "http", "http://stand-in/", stop_error_rate=0.05)
+    assert report["capacity_users"] == 3
+    assert report["steps"][1]["phases"]["page load"]["count"] == results[1].journeys
+
+
+# Перегруженный стенд отвечает 503: ступень с ошибками останавливает рост нагрузки
+def test_ramp_stops_when_error_rate_exceeds_threshold():
+    with StandInApp(latency=0.05, max_concurrent=1) as app:
+        results = run_http_load(app.base_url, ACCOUNTS, steps=[6, 12], step_seconds=0.3, stop_error_rate=0.05)
+    assert len(results) == 1 and results[0].error_rate > 0.05
+    assert "HTTPError: HTTP Error 503" in next(iter(results[0].messages))
+    assert build_report(results, "http", "http://stand-in/", stop_error_rate=0.05)["capacity_users"] == 0
+
+
+# Режим browser: пользователи — контексты асинхронного Chromium, все фазы сценария проходят на стенде-заглушке
+async def test_browser_ramp_records_every_phase(async_chromium):
+    with StandInApp() as app:
+        results = await run_browser_load(async_chromium, app.base_url, ACCOUNTS, steps=[1, 2], step_seconds=0.5)
+    assert [result.users for result in results] == [1, 2]
+    for result in results:
+        assert result.journeys > 0 and result.error_rate == 0.0
+        assert all(result.samples[phase] for phase in PHASES)
+
+
+# Ошибка при создании контекста или на странице восстановления записывается как ошибка фазы и не прерывает
+# ступень: отчёт строится, рост нагрузки останавливается по доле ошибок
+async def test_browser_journey_errors_are_recorded(async_chromium, monkeypatch):
+    class BrokenBrowser:
+        async def new_context(self):
+            raise RuntimeError("Target page, context or browser has been closed")
+
+    with StandInApp() as app:
+        results = await run_browser_load(BrokenBrowser(), app.base_url, ACCOUNTS, steps=[2, 4], step_seconds=0.1)
+        assert len(results) == 1 and results[0].errors["page load"] > 0 and results[0].journeys == 0
+        assert build_report(results, "browser", app.base_url, stop_error_rate=0.05)["capacity_users"] == 0
+
+        monkeypatch.setattr(stand_in_app, "_RECOVERY_PAGE", "<!doctype html><p>Not found</p>")  # Нет поля e-mail
+        result = StepResult(1)
+        await BrowserJourney(async_chromium, app.base_url, timeout=500).run(result, *ACCOUNTS[0])
+    assert result.errors == {"reset request ack": 1} and result.samples["submit to dashboard"]
@@ -0,0 +1,44 @@
+# Тесты логирования через очередь (tests/utils/log_pipeline.py)
+# Проверяют формат JSON-lines, отложенное вычисление значений и объединение логов воркеров
+
+import json
+import logging
+from tests.utils import log_pipeline
+from tests.utils.log_pipeline import LogPipeline, lazy, merge_logs
+from tests.utils.node_names import worker_id
+
+
+# Записи пишутся в файл воркера в формате JSON с идентификаторами теста и воркера,
+# а lazy-значение не вычисляется, если уровень записи отфильтрован
+def test_records_are_tagged_and_lazy_values_skipped(tmp_path, monkeypatch):
+    pipeline = LogPipeline(str(tmp_path))
+    logger = logging.getLogger("framework.log_pipeline")  # Отдельный логгер, чтобы не трогать корневой
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(pipeline.handler)
+    monkeypatch.setattr(log_pipeline, "current_test", "tests/test_x.py::test_x")
+    calls = []
+    pipeline.listener.start()
+    try:
+        logger.debug("Page content: %s", lazy(lambda: calls.append("debug")))
+        logger.info("Current URL: %s", lazy(lambda: calls.append("info") or "https://stand/"))
+    finally:
+        logger.removeHandler(pipeline.handler)
+        pipeline.stop()
+    assert calls == ["info"]
+    with open(pipeline.path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert len(entries) == 1
+    assert entries[0]["message"] == "Current URL: https://stand/"
+    assert entries[0]["test"] == "tests/test_x.py::test_x"
+    assert entries[0]["worker"] == worker_id()
+
+
+# Логи воркеров объединяются в merged.jsonl в порядке времени
+def test_worker_logs_are_merged_by_time(tmp_path):
+    for worker, times in (("gw0", [1.0, 3.0]), ("gw1", [2.0, 4.0])):
+        with open(tmp_path / f"{worker}.jsonl", "w", encoding="utf-8") as f:
+            for moment in times:
+                f.write(json.dumps({"time": moment, "worker": worker}) + "\n")
+    with open(merge_logs(str(tmp_path)), encoding="utf-8") as f:
+        assert [json.loads(line)["time"] for line in f] == [1.0, 2.0, 3.0, 4.0]
@@ -0,0 +1,120 @@
+# Тесты брокера почты (tests/utils/mail_broker.py) на локальном почтовом сервере (фикстура fake_mail_server)
+# Общий ящик: письма для разных адресов (заголовок To) приходят в один ящик, как при пересылке с алиасов
+
+import time
+import threading
+from email.mime.text import MIMEText
+
+import pytest
+
+from tests.utils import mail_broker
+from tests.utils.fake_mail_server import RESET_LINK_TEMPLATE, RESET_SENDER
+from tests.utils.imap_utils import get_mailbox_watermark, get_reset_link_from_email, wait_for_reset_link
+from tests.utils.mail_broker import MailBroker, MailBrokerProcess, request
+from tests.utils.session_stats import SessionStats
+
+MAILBOX = "qa-inbox@cicada8.ru"
+
+
+# Кладёт в общий ящик письмо сброса для адреса recipient и возвращает ссылку
+def send_reset(server, recipient, token):
+    link = RESET_LINK_TEMPLATE.format(token=token)
+    message = MIMEText(f"Для смены пароля перейдите по ссылке: {link}", "plain", "utf-8")
+    message["From"], message["To"], message["Subject"] = RESET_SENDER, recipient, "Восстановление пароля"
+    server.deliver(message, [MAILBOX])
+    return link
+
+
+def wait_request(recipient, since_uid, timeout=5):
+    return {
+        "op": "wait", "mailbox": MAILBOX, "password": "secret", "recipient": recipient,
+        "since_uid": since_uid, "timeout": timeout,
+    }
+
+
+@pytest.fixture
+def broker(fake_mail_server):
+    broker = MailBroker(idle_interval=1).start()
+    yield broker
+    broker.stop()
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(mail_broker, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Ожидающие разных адресов получают каждый своё письмо, хотя письма пришли в обратном порядке
+# и все ожидания обслуживает одно подключение IMAP
+def test_waiters_get_their_own_links_over_one_connection(fake_mail_server, broker):
+    watermark = request(broker.address, {"op": "watermark", "mailbox": MAILBOX, "password": "secret"})["uid"]
+    results = {}
+
+    def waiter(recipient):
+        results[recipient] = request(broker.address, wait_request(recipient, watermark))["link"]
+
+    threads = [threading.Thread(target=waiter, args=(name,)) for name in ("first@cicada8.ru", "second@cicada8.ru")]
+    for thread in threads:
+        thread.start()
+    second = send_reset(fake_mail_server, "second@cicada8.ru", "token-2")
+    first = send_reset(fake_mail_server, "First@cicada8.ru", "token-1")
+    for thread in threads:
+        thread.join(timeout=10)
+    assert results == {"first@cicada8.ru": first, "second@cicada8.ru": second}
+    status = request(broker.address, {"op": "status"})
+    assert status["mailboxes"] == 1 and status["served"] == {"cached": 0, "arrived": 2}
+    assert request(broker.address, {"op": "lookup", "token": "token-1"})["recipients"] == ["first@cicada8.ru"]
+
+
+# Письмо, пришедшее раньше запроса, выдаётся из кэша; выданная ссылка второй раз не выдаётся;
+# письма до водяной отметки и письма старше cache_seconds не выдаются
+def test_cache_serves_late_waiters_once(fake_mail_server, broker):
+    watermark = request(broker.address, {"op": "watermark", "mailbox": MAILBOX, "password": "secret"})["uid"]
+    link = send_reset(fake_mail_server, "late@cicada8.ru", "late")
+    deadline = time.monotonic() + 5
+    while not request(broker.address, {"op": "status"})["messages"] and time.monotonic() < deadline:
+        time.sleep(0.05)  # Ждём, пока брокер проиндексирует письмо
+    response = request(broker.address, wait_request("late@cicada8.ru", watermark))
+    assert response["link"] == link and response["cached"]
+    with pytest.raises(TimeoutError):
+        request(broker.address, wait_request("late@cicada8.ru", watermark, timeout=0.3))
+    with pytest.raises(ValueError, match="precedes"):
+        request(broker.address, wait_request("late@cicada8.ru", -1))
+    broker.cache_seconds = 0
+    assert request(broker.address, {"op": "status"})["messages"] == 0
+
+
+# С MAIL_BROKER функции imap_utils работают через процесс брокера; без брокера — напрямую через IMAP
+def test_imap_utils_use_broker_process(fake_mail_server, tmp_path, monkeypatch, session_stats):
+    process = MailBrokerProcess(str(tmp_path / "mail_broker.log"))
+    monkeypatch.setenv("MAIL_BROKER", process.start())
+    try:
+        watermark = get_mailbox_watermark(MAILBOX, "secret")
+        link = send_reset(fake_mail_server, MAILBOX, "via-broker")
+        assert get_reset_link_from_email(MAILBOX, "secret", since_uid=watermark, timeout=5) == link
+    finally:
+        process.stop()
+    assert process.process is None
+    link = send_reset(fake_mail_server, MAILBOX, "direct")
+    assert get_reset_link_from_email(MAILBOX, "secret", since_uid=watermark, timeout=5) == link
+    counters = session_stats.counters[mail_broker.STATS_SECTION]
+    assert counters["fallbacks to IMAP"] == 1
+    assert counters.get("links on arrival", 0) + counters.get("links from cache", 0) == 1
+
+
+# Если письмо не пришло, ожидание через процесс брокера завершается TimeoutError за один timeout,
+# без перехода к IMAP и второго полного ожидания
+def test_no_mail_through_broker_process_times_out_once(fake_mail_server, tmp_path, monkeypatch, session_stats):
+    process = MailBrokerProcess(str(tmp_path / "mail_broker.log"))
+    monkeypatch.setenv("MAIL_BROKER", process.start())
+    try:
+        watermark = get_mailbox_watermark(MAILBOX, "secret")
+        started = time.monotonic()
+        with pytest.raises(TimeoutError, match="No email with reset link"):
+            wait_for_reset_link(MAILBOX, "secret", since_uid=watermark, timeout=1)
+        assert time.monotonic() - started < 1.8
+    finally:
+        process.stop()
+    assert "fallbacks to IMAP" not in session_stats.counters.get(mail_broker.STATS_SECTION, {})
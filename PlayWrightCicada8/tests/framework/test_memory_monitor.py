@@ -0,0 +1,170 @@
+# Тесты наблюдения за памятью браузера (tests/utils/memory_monitor.py)
+# Вместо браузера — заглушки: сессии CDP отвечают фиксированными метриками, процесс браузера — сам pytest;
+# запросы CDP к настоящему браузеру (метрики страниц, процессы Chromium) проверяются в Chromium на стенде-заглушке
+
+import os
+
+import pytest
+
+from tests.utils import memory_monitor
+from tests.utils.memory_monitor import MemoryMonitor, build_report, summary_lines
+from tests.utils.session_stats import SessionStats
+
+
+class FakeSession:
+    def __init__(self, heap_mb=0, nodes=0, listeners=0):
+        self.heap_mb, self.nodes, self.listeners = heap_mb, nodes, listeners
+        self.detached = False
+
+    def send(self, method, params=None):
+        if method == "Performance.getMetrics":
+            heap = {"name": "JSHeapUsedSize", "value": self.heap_mb * 1048576}
+            return {"metrics": [heap, {"name": "Nodes", "value": 1}]}
+        if method == "Memory.getDOMCounters":
+            return {"documents": 1, "nodes": self.nodes, "jsEventListeners": self.listeners}
+        if method == "SystemInfo.getProcessInfo":
+            return {"processInfo": [{"type": "browser", "id": os.getpid(), "cpuTime": 0}]}
+        return {}
+
+    def detach(self):
+        self.detached = True
+
+
+class FakePage:
+    def __init__(self, context, **metrics):
+        self.context = context
+        self.url = "https://stand/"
+        self.metrics = metrics
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+
+    def new_page(self, **metrics):
+        self.pages.append(FakePage(self, **metrics))
+        return self.pages[-1]
+
+    def new_cdp_session(self, page):
+        return FakeSession(**page.metrics)
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.contexts = []
+
+    def new_browser_cdp_session(self):
+        return FakeSession()
+
+
+class FakeBrowserPool:
+    def __init__(self, daemon=None):
+        self.browser = FakeBrowser()
+        self.daemon = daemon
+        self.restarts = []
+
+    def is_healthy(self):
+        return True
+
+    def restart(self, reason):
+        self.restarts.append(reason)
+        self.browser = FakeBrowser()
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(memory_monitor, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Метрики страниц теста собираются перед закрытием контекста и попадают в замер после теста
+def test_page_metrics_are_sampled_per_test(session_stats):
+    pool = FakeBrowserPool()
+    monitor = MemoryMonitor(pool, leak_rss_mb=10000)
+    context = FakeContext()
+    context.new_page(heap_mb=12.5, nodes=800, listeners=40)
+    context.new_page(heap_mb=3.0, nodes=200, listeners=10)
+    monitor.collect(context)
+    row = monitor.sample("tests/test_a.py::test_a")
+    assert {name: row[name] for name in memory_monitor.PAGE_METRICS} == {
+        "heap_mb": 15.5, "dom_nodes": 1000, "listeners": 50, "documents": 2,
+    }
+    assert row["contexts"] == 0 and row["left_heap_mb"] == 0 and row["rss_mb"] > 0
+    assert monitor.sample("tests/test_b.py::test_b")["heap_mb"] == 0  # Следующий тест начинает с нуля
+    assert [record["test"] for record in session_stats.records[memory_monitor.STATS_SECTION]] == [
+        "tests/test_a.py::test_a", "tests/test_b.py::test_b",
+    ]
+
+
+# Тест, после которого остался контекст со страницей, помечается один раз; после возврата к базовой линии —
+# следующий рост помечается снова
+def test_leak_is_flagged_on_the_test_that_left_it(session_stats):
+    pool = FakeBrowserPool()
+    monitor = MemoryMonitor(pool, leak_rss_mb=10000, warmup=2)
+    assert monitor.sample("warmup-1")["leak"] == [] and monitor.sample("warmup-2")["leak"] == []
+    leaked = FakeContext()
+    leaked.new_page(listeners=500)
+    pool.browser.contexts.append(leaked)
+    assert monitor.sample("leaky")["leak"] == [
+        "contexts 1 (baseline 0)", "pages 1 (baseline 0)", "left_documents 1 (baseline 0)",
+        "left_listeners 500 (baseline 0)",
+    ]
+    assert monitor.sample("after-leaky")["leak"] == []
+    pool.browser.contexts.clear()
+    assert monitor.sample("clean")["leak"] == []
+    pool.browser.contexts.append(leaked)
+    assert len(monitor.sample("leaky-again")["leak"]) == 4
+    assert session_stats.counters[memory_monitor.STATS_SECTION] == {"leak suspects": 2}
+
+
+# Превышение порога RSS перезапускает браузер воркера (но не общий браузер-демон) и сбрасывает базовую линию
+def test_browser_restarts_over_rss_threshold(session_stats):
+    pool = FakeBrowserPool()
+    monitor = MemoryMonitor(pool, restart_rss_mb=1, warmup=1)
+    monitor.sample("first")
+    assert pool.restarts == ["memory threshold"] and monitor.baseline is None
+    assert session_stats.counters[memory_monitor.STATS_SECTION] == {"browser restarts": 1}
+    daemon_pool = FakeBrowserPool(daemon=object())
+    MemoryMonitor(daemon_pool, restart_rss_mb=1).sample("first")
+    assert daemon_pool.restarts == []
+
+
+# Отчёт: компактный ряд по воркерам и список подозрительных тестов; сводка по RSS
+def test_report_and_summary():
+    def record(worker, test, rss_mb, leak=()):
+        return {"worker": worker, "test": test, "rss_mb": rss_mb, "pages": 0, "leak": list(leak)}
+
+    report = build_report([
+        record("gw0", "t1", 300), record("gw0", "t2", 420, ["rss_mb 420 (baseline 300)"]), record("gw1", "t3", None),
+    ], "20261018_120000")
+    assert report["workers"]["gw0"][1][:4] == ["t2", 420, None, 0]
+    assert report["leaks"] == [{"worker": "gw0", "test": "t2", "reasons": ["rss_mb 420 (baseline 300)"]}]
+    assert summary_lines(report) == [
+        "  gw0: 2 tests, browser RSS first 300 MB, peak 420 MB, last 420 MB",
+        "  gw1: 1 tests (browser RSS unavailable)",
+        "  leak suspect: t2 (gw0): rss_mb 420 (baseline 300)",
+    ]
+
+
+# В Chromium метрики страницы стенда-заглушки приходят из CDP, RSS считается по процессам браузера,
+# а оставленный открытым контекст со страницей помечается как утечка
+def test_chromium_sample_and_leaked_context(chromium, stand_in_app, session_stats):
+    pool = FakeBrowserPool()
+    pool.browser = chromium
+    monitor = MemoryMonitor(pool, leak_rss_mb=10000, warmup=1)
+    context = chromium.new_context()
+    context.new_page().goto(stand_in_app.base_url)
+    monitor.collect(context)
+    context.close()
+    row = monitor.sample("clean")
+    assert row["dom_nodes"] > 0 and row["listeners"] > 0 and row["documents"] >= 1 and row["heap_mb"] > 0
+    assert row["contexts"] == 0 and row["pages"] == 0 and row["rss_mb"] > 0 and row["leak"] == []
+    leaked = chromium.new_context()
+    try:
+        leaked.new_page().goto(stand_in_app.base_url)
+        row = monitor.sample("leaky")
+        assert row["contexts"] == 1 and row["left_dom_nodes"] > 0
+        assert [reason.split()[0] for reason in row["leak"]] == ["contexts", "pages", "left_documents"]
+    finally:
+        leaked.close()
@@ -0,0 +1,161 @@
+# Тесты профилей сети и CPU (tests/utils/network_profiles.py)
+# Вместо браузера — заглушки контекста и страницы: сессия CDP запоминает отправленные команды;
+# действие команд CDP на загрузку страниц проверяется в Chromium на стенде-заглушке
+
+import pytest
+
+from tests.utils import network_profiles
+from tests.utils.network_profiles import NetworkThrottler, parse_profiles, get_profile, summary_lines
+from tests.utils.session_stats import SessionStats
+
+PROFILES = ["vpn-3g latency_ms=300 download_kbps=1600 upload_kbps=800 cpu=4", "lossy latency_ms=150 packet_loss=5"]
+
+
+class FakeSession:
+    def __init__(self):
+        self.commands = []
+
+    def send(self, method, params=None):
+        self.commands.append((method, params))
+
+
+class FakeContext:
+    def __init__(self):
+        self.handlers = {}
+        self.sessions = []
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def new_page(self):
+        page = FakePage(self)
+        for handler in self.handlers.get("page", []):
+            handler(page)
+        return page
+
+    def new_cdp_session(self, page):
+        self.sessions.append(FakeSession())
+        return self.sessions[-1]
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+
+def step(name, duration, kind="step", depth=0, nested=False):
+    return {"name": name, "kind": kind, "target": None, "duration": duration, "depth": depth, "nested": nested}
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(network_profiles, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Профили из pytest.ini: профиль fast есть всегда; неизвестный параметр или профиль — ошибка конфигурации
+def test_parse_profiles():
+    profiles = parse_profiles(PROFILES)
+    assert sorted(profiles) == ["fast", "lossy", "vpn-3g"]
+    assert not profiles["fast"].throttles and profiles["lossy"].throttles
+    assert profiles["vpn-3g"].network_conditions() == {
+        "offline": False, "latency": 300.0, "downloadThroughput": 200000.0, "uploadThroughput": 100000.0,
+    }
+    assert profiles["lossy"].network_conditions()["packetLoss"] == 5.0
+    with pytest.raises(ValueError, match="latency"):
+        parse_profiles(["slow latency=300"])
+    with pytest.raises(ValueError, match="Unknown network profile 'edge'"):
+        get_profile(profiles, "edge")
+
+
+# Профиль применяется к каждой новой странице контекста; профиль fast не подключается вовсе
+def test_throttler_applies_profile_to_every_page(session_stats):
+    profiles = parse_profiles(PROFILES)
+    context = FakeContext()
+    NetworkThrottler(profiles["vpn-3g"]).attach(context)
+    context.new_page()
+    context.new_page()
+    assert [method for method, _ in context.sessions[0].commands] == [
+        "Network.enable", "Network.emulateNetworkConditions", "Emulation.setCPUThrottlingRate",
+    ]
+    assert context.sessions[1].commands[2] == ("Emulation.setCPUThrottlingRate", {"rate": 4.0})
+    assert session_stats.counters[network_profiles.STATS_SECTION] == {"pages throttled (vpn-3g)": 2}
+    unthrottled = FakeContext()
+    NetworkThrottler(profiles["fast"]).attach(unthrottled)
+    unthrottled.new_page()
+    assert unthrottled.sessions == []
+
+
+# По профилю записываются вход, загрузки страниц и шаги теста верхнего уровня; вложенные замеры — нет
+def test_steps_are_recorded_per_profile(session_stats):
+    throttler = NetworkThrottler(parse_profiles(PROFILES)["lossy"], "tests/test_x.py::test_x")
+    throttler.finish([
+        step("page.goto", 1.5, kind="work"),
+        step("auth.login_via_ui", 4.0),
+        step("login.dashboard", 3.0, kind="wait", depth=1),
+        step("locator.wait_for", 3.0, kind="wait", depth=2, nested=True),
+        step("request reset", 2.0),
+        step("page.fill", 0.1, kind="work"),
+    ])
+    records = session_stats.records[network_profiles.STATS_SECTION]
+    steps = [record["step"] for record in records]
+    assert steps == ["page.goto", "auth.login_via_ui", "login.dashboard", "request reset"]
+    assert {record["profile"] for record in records} == {"lossy"}
+
+
+# Сводка: перцентили шага в каждом профиле и таймаут ожидания по самому медленному профилю
+def test_summary_lines():
+    def record(profile, name, kind, duration):
+        return {"profile": profile, "step": name, "kind": kind, "duration": duration}
+
+    records = [
+        record("fast", "login.dashboard", "wait", 0.5), record("fast", "login.dashboard", "wait", 0.7),
+        record("vpn-3g", "login.dashboard", "wait", 4.0), record("vpn-3g", "login.dashboard", "wait", 6.2),
+        record("vpn-3g", "request reset", "step", 2.5),
+    ]
+    assert summary_lines(records) == [
+        "  login.dashboard",
+        "    fast         n=2 p50=0.50s p95=0.70s max=0.70s",
+        "    vpn-3g       n=2 p50=4.00s p95=6.20s max=6.20s",
+        "    suggested timeout: 13s (2x slowest p95)",
+        "  request reset",
+        "    vpn-3g       n=1 p50=2.50s p95=2.50s max=2.50s",
+    ]
+
+
+# Время от отправки запроса документа до конца ответа (Navigation Timing), мс
+RESPONSE_WAIT_JS = """() => {
+  const nav = performance.getEntriesByType("navigation")[0];
+  return nav.responseEnd - nav.requestStart;
+}"""
+
+
+# В Chromium задержка профиля видна в Navigation Timing каждой страницы контекста, а страницы без профиля
+# (и с профилем fast) загружаются без неё
+def test_chromium_pages_get_profile_latency(chromium, stand_in_app, session_stats):
+    profiles = parse_profiles(["slow latency_ms=400 cpu=2"])
+    throttled, unthrottled = chromium.new_context(), chromium.new_context()
+    try:
+        NetworkThrottler(profiles["slow"]).attach(throttled)
+        NetworkThrottler(profiles["fast"]).attach(unthrottled)
+        for context in (throttled, unthrottled):
+            context.new_page().goto(stand_in_app.base_url)
+        assert throttled.pages[0].evaluate(RESPONSE_WAIT_JS) >= 350
+        assert unthrottled.pages[0].evaluate(RESPONSE_WAIT_JS) < 350
+    finally:
+        throttled.close()
+        unthrottled.close()
+    assert session_stats.counters[network_profiles.STATS_SECTION] == {"pages throttled (slow)": 1}
+
+
+# Асинхронный контекст: профиль применяется в new_page до возврата страницы, то есть до первого перехода
+async def test_chromium_async_page_throttled_before_first_goto(async_chromium, stand_in_app, session_stats):
+    context = await async_chromium.new_context()
+    try:
+        NetworkThrottler(parse_profiles(["slow latency_ms=400"])["slow"]).attach_async(context)
+        page = await context.new_page()
+        await page.goto(stand_in_app.base_url)
+        assert await page.evaluate(RESPONSE_WAIT_JS) >= 350
+    finally:
+        await context.close()
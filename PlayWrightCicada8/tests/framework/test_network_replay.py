@@ -0,0 +1,76 @@
+# Тесты записи и воспроизведения трафика (tests/utils/network_replay.py)
+# Трафик входа на стенд-заглушку записывается в HAR в Chromium и воспроизводится без обращений к стенду
+
+import os
+
+import pytest
+
+from tests.utils import network_replay
+from tests.utils.network_replay import NetworkRecorder
+from tests.utils.session_stats import SessionStats
+
+NODEID = "tests/test_login.py::test_login[chromium]"
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(network_replay, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Вход через форму стенда в контексте с записью или воспроизведением; возвращает текст страницы после входа
+def log_in(chromium, mode, har_dir, base_url, email, password):
+    context = chromium.new_context()
+    try:
+        NetworkRecorder(mode, har_dir, NODEID).attach(context)
+        page = context.new_page()
+        page.goto(base_url)
+        page.fill('input[type="email"]', email)
+        page.fill('input[type="password"]', password)
+        page.click('button[type="submit"]')
+        page.wait_for_selector("text=Моя организация")
+        return page.inner_text("body")
+    finally:
+        context.close()  # В режиме record HAR сохраняется при закрытии контекста
+
+
+# Записанный вход воспроизводится из HAR: стенд не получает ни одного запроса, ответы те же, что при записи
+def test_replay_makes_no_live_requests(chromium, stand_in_app, stand_in_account, tmp_path, session_stats):
+    recorded = log_in(chromium, "record", str(tmp_path), stand_in_app.base_url, *stand_in_account)
+    assert os.path.exists(NetworkRecorder("record", str(tmp_path), NODEID).har_path(0))
+    served = dict(stand_in_app.requests)
+    assert served["POST /api/v1/auth/login"] == 1
+    assert log_in(chromium, "replay", str(tmp_path), stand_in_app.base_url, *stand_in_account) == recorded
+    assert stand_in_app.requests == served
+    assert network_replay.STATS_SECTION not in session_stats.counters
+
+
+# Запрос, которого нет в записи (тот же URL, другое тело), прерывается без обращения к стенду и попадает
+# в статистику
+def test_unmatched_request_is_aborted_and_reported(chromium, stand_in_app, stand_in_account, tmp_path, session_stats):
+    log_in(chromium, "record", str(tmp_path), stand_in_app.base_url, *stand_in_account)
+    served, login_url = dict(stand_in_app.requests), f"{stand_in_app.base_url}api/v1/auth/login"
+    context = chromium.new_context()
+    try:
+        NetworkRecorder("replay", str(tmp_path), NODEID).attach(context)
+        page = context.new_page()
+        page.goto(stand_in_app.base_url)
+        page.fill('input[type="email"]', stand_in_account[0])
+        page.fill('input[type="password"]', "other-password")
+        with page.expect_event("requestfailed") as failed:
+            page.click('button[type="submit"]')
+        assert failed.value.url == login_url
+    finally:
+        context.close()
+    assert stand_in_app.requests == served
+    assert session_stats.counters[network_replay.STATS_SECTION] == {"unmatched requests": 1}
+    assert session_stats.records[network_replay.STATS_SECTION] == [
+        {"test": NODEID, "method": "POST", "url": login_url},
+    ]
+
+
+# Воспроизведение теста без записи — ошибка с подсказкой сначала записать трафик
+def test_replay_without_recording_fails(chromium_context, tmp_path):
+    with pytest.raises(FileNotFoundError, match="--network-mode=record"):
+        NetworkRecorder("replay", str(tmp_path), NODEID).attach(chromium_context)
@@ -0,0 +1,160 @@
+# Тесты пула страниц входа (tests/utils/page_pool.py)
+# Логика пула проверяется на заглушках контекста и страницы (сброс формы имитируется флагом form_reset),
+# а скрипты сброса и проверки и поиск оставленных обработчиков и перехватов — в Chromium на стенде-заглушке
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tests.utils import page_pool
+from tests.utils.page_pool import PagePool, summary_line
+from tests.utils.session_stats import SessionStats
+
+
+class FakeImpl:
+    def __init__(self):
+        self.handlers = {}
+        self._routes = []
+
+    def listeners(self, event):
+        return self.handlers.get(event, [])
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self._impl_obj = FakeImpl()
+        self.closed = False
+        self.form_reset = True  # Удастся ли сбросить форму входа навигацией внутри SPA
+        self.urls = []
+
+    def goto(self, url):
+        self.urls.append(url)
+
+    def is_closed(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+    def evaluate(self, script, arg=None):
+        self.urls.append(arg[0])  # Навигация внутри SPA на страницу входа
+
+    def wait_for_function(self, script, arg=None, timeout=None, polling=None):
+        if not self.form_reset:
+            raise PlaywrightTimeoutError("Timeout 3000ms exceeded")
+
+
+class FakeContext:
+    def __init__(self):
+        self._impl_obj = FakeImpl()
+        self.pages = []
+        self.closed = False
+        self.cleared = 0
+
+    def new_page(self):
+        self.pages.append(FakePage(self))
+        return self.pages[-1]
+
+    def clear_cookies(self):
+        self.cleared += 1
+
+    def clear_permissions(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(page_pool, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+@pytest.fixture
+def pool():
+    return PagePool(FakeContext, "https://stand/")
+
+
+# Первый тест получает новую страницу, следующий — ту же страницу после сброса
+def test_page_is_reset_and_reused(pool, session_stats):
+    first = pool.checkout()
+    assert not first.reused and first.page.urls == ["https://stand/"]
+    popup = first.context.new_page()  # Тест открыл ещё одну вкладку
+    pool.checkin(first)
+    assert popup.closed and first.context.cleared == 1
+    second = pool.checkout()
+    assert second.reused and second.page is first.page and second.page.urls[-1] == "/"
+    assert session_stats.counters[page_pool.STATS_SECTION] == {"misses": 1, "hits": 1}
+    assert len(session_stats.timings[page_pool.STATS_SECTION]["reset"]) == 1
+
+
+# Страница не возвращается в пул, если тест упал, оставил обработчик dialog или перехват запросов,
+# или форма входа после сброса не стала пустой
+@pytest.mark.parametrize("spoil", ["failed", "dialog", "route", "form"])
+def test_unverified_page_falls_back_to_fresh(pool, session_stats, spoil):
+    lease = pool.checkout()
+    if spoil == "dialog":
+        lease.page._impl_obj.handlers["dialog"] = [print]
+    elif spoil == "route":
+        lease.page._impl_obj._routes.append("**/api/**")
+    elif spoil == "form":
+        lease.page.form_reset = False
+    pool.checkin(lease, reusable=spoil != "failed")
+    assert lease.context.closed and pool.idle == []
+    assert not pool.checkout().reused
+
+
+# Доля попаданий и оценка сэкономленного времени: загрузка новой страницы минус сброс
+def test_summary_line():
+    session_stats = SessionStats()
+    session_stats.count(page_pool.STATS_SECTION, "misses", 1)
+    session_stats.count(page_pool.STATS_SECTION, "hits", 3)
+    session_stats.timing(page_pool.STATS_SECTION, "fresh page", 1.5)
+    for seconds in (0.2, 0.3, 0.25):
+        session_stats.timing(page_pool.STATS_SECTION, "reset", seconds)
+    assert summary_line(session_stats) == "  page pool hit rate: 75% (3 of 4 tests), ~1.25s saved per pooled test (3.8s total)"
+    assert summary_line(SessionStats()) is None
+
+
+@pytest.fixture
+def chromium_page_pool(chromium, stand_in_app):
+    pool = PagePool(chromium.new_context, stand_in_app.base_url)
+    yield pool
+    pool.close()
+
+
+# В Chromium сброс очищает cookies, хранилища и заполненную форму входа, и страница выдаётся снова
+def test_browser_page_is_reset_and_reused(chromium_page_pool, session_stats):
+    lease = chromium_page_pool.checkout()
+    page = lease.page
+    page.fill('input[placeholder="Введите e-mail"]', "tester@cicada8.ru")
+    page.click('button[type="submit"]')  # Пустой пароль: сообщение об ошибке и неактивная кнопка
+    page.evaluate("localStorage.setItem('draft', '1'); sessionStorage.setItem('step', '2')")
+    lease.context.add_cookies([{"name": "seen", "value": "1", "url": page.url}])
+    lease.context.new_page()  # Вкладка, открытая тестом
+    chromium_page_pool.checkin(lease)
+    reused = chromium_page_pool.checkout()
+    assert reused.reused and reused.page is page and lease.context.pages == [page]
+    assert page.input_value('input[placeholder="Введите e-mail"]') == ""
+    assert page.evaluate("[localStorage.length, sessionStorage.length, location.pathname]") == [0, 0, "/"]
+    assert lease.context.cookies() == []
+    assert page.is_enabled('button[type="submit"]')
+    chromium_page_pool.checkin(reused)
+
+
+# В Chromium обработчик события страницы и перехват запросов, оставленные тестом, находятся,
+# и такая страница не возвращается в пул
+@pytest.mark.parametrize("spoil", ["dialog", "page route", "context route"])
+def test_browser_leftovers_are_detected(chromium_page_pool, session_stats, spoil):
+    lease = chromium_page_pool.checkout()
+    if spoil == "dialog":
+        lease.page.on("dialog", lambda dialog: dialog.dismiss())
+    elif spoil == "page route":
+        lease.page.route("**/api/**", lambda route: route.continue_())
+    else:
+        lease.context.route("**/api/**", lambda route: route.continue_())
+    chromium_page_pool.checkin(lease)
+    assert chromium_page_pool.idle == []
+    assert session_stats.counters[page_pool.STATS_SECTION]["reset rejected (fresh page)"] == 1
@@ -0,0 +1,54 @@
+# Тесты замера времени шагов (tests/utils/perf.py)
+# Вместо страницы Playwright используется простой объект с теми же методами, поэтому браузер не нужен
+
+import time
+from tests.utils import perf
+from tests.utils.session_stats import SessionStats, percentile
+
+
+# Объект с методами страницы: goto "работает" 0.05 секунды, wait_for_selector "ждёт" 0.1 секунды
+class DummyPage:
+    def goto(self, url):
+        time.sleep(0.05)
+
+    def wait_for_selector(self, selector, **kwargs):
+        time.sleep(0.1)
+
+    def locator(self, selector):
+        return DummyPage()
+
+
+# Методы страницы замеряются как шаги, ожидания и действия считаются раздельно, вложенные шаги не удваивают время
+def test_page_calls_are_recorded_as_steps(monkeypatch):
+    recorder, session_stats = perf.StepRecorder(), SessionStats()
+    monkeypatch.setattr(perf, "recorder", recorder)  # Отдельные экземпляры, чтобы не смешивать с замерами прогона
+    monkeypatch.setattr(perf, "stats", session_stats)
+    page = perf.instrument_page(perf.instrument_page(DummyPage()))  # Повторное подключение ничего не меняет
+    recorder.start_test("test_dummy")
+    with perf.step("open and wait"):
+        page.goto("https://stand/")
+        page.locator("#form").wait_for_selector("input")
+    recorder.add_phase("call", 0.2, "passed")
+    recorder.finish_test()
+    test = session_stats.records["perf"][0]
+    assert [item["name"] for item in test["steps"]] == ["page.goto", "locator.wait_for_selector", "open and wait"]
+    assert test["steps"][1]["target"] == "#form"
+    assert 0.09 < test["wait"] < 0.3
+    assert 0.04 < test["work"] < test["wait"]
+
+
+# Отчёт агрегирует шаги всех тестов и считает перцентили
+def test_report_aggregates_steps():
+    tests = [
+        {"nodeid": f"test_{i}", "phases": {"call": 1.0}, "wait": 0.5, "work": 0.5, "outcome": "passed",
+         "steps": [{"name": "page.goto", "kind": "work", "target": "/", "duration": i / 10, "depth": 0,
+                    "nested": False}]}
+        for i in range(1, 11)
+    ]
+    report = perf.build_report(tests)
+    goto = report["steps"]["page.goto"]
+    assert goto["count"] == 10
+    assert goto["p50"] == percentile([i / 10 for i in range(1, 11)], 50) == 0.5
+    assert goto["max"] == 1.0
+    assert report["totals"]["wait"] == 5.0
+    assert any("page.goto" in line for line in perf.summary_lines(report))
@@ -0,0 +1,88 @@
+# Тесты проверки стенда перед тестами и автомата защиты фикстур (tests/utils/preflight.py)
+# Проверки HTTP и API входа выполняются против локального стенда-заглушки, IMAP — против локального почтового сервера
+
+import time
+import socket
+
+import pytest
+
+from tests.utils import preflight
+from tests.utils.preflight import Preflight, CircuitBreaker, CHECKS, LOGIN_CHECKS
+from tests.utils.session_stats import SessionStats
+from tests.utils.stand_in_app import StandInApp
+
+
+@pytest.fixture(autouse=True)
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(preflight, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Проверки стенда и почты проходят на локальных серверах (TLS для http:// пропускается)
+def test_checks_pass_against_local_servers(tmp_path, fake_mail_server, monkeypatch):
+    monkeypatch.setenv("LOGIN_API_PATH", "/api/v1/auth/login")
+    with StandInApp(accounts={"tester@cicada8.ru": "secret"}) as app:
+        checks = Preflight(str(tmp_path / "preflight.json"), app.base_url, timeout=2)
+        assert checks.failure(LOGIN_CHECKS + ("imap",)) is None
+        results = checks.results(LOGIN_CHECKS)
+    assert results["tls"]["detail"] == "skipped (not https)"
+    assert results["login api"]["detail"] == "HTTP 401"  # Заведомо неверные учётные данные отвергнуты
+    assert not results["login api"]["warning"]
+
+
+# Без явного LOGIN_API_PATH API входа не проверяется; ответ не 4xx с JSON — предупреждение, а не ошибка
+def test_login_api_check_only_warns(tmp_path, monkeypatch, session_stats):
+    with StandInApp() as app:
+        monkeypatch.delenv("LOGIN_API_PATH", raising=False)
+        result = Preflight(str(tmp_path / "unset.json"), app.base_url, timeout=2).results(["login api"])["login api"]
+        assert result["ok"] and result["detail"] == "skipped (LOGIN_API_PATH not set)"
+        for path in ("/api/missing", "/"):  # 404 и HTML-страница вместо JSON
+            monkeypatch.setenv("LOGIN_API_PATH", path)
+            checks = Preflight(str(tmp_path / f"{len(path)}.json"), app.base_url, timeout=2)
+            assert checks.failure(["login api"]) is None
+            assert checks.results(["login api"])["login api"]["warning"]
+    assert session_stats.counters[preflight.STATS_SECTION]["login api warnings"] == 2
+
+
+# Недоступный стенд — проверка не проходит с причиной
+def test_failed_checks_report_the_cause(tmp_path):
+    with StandInApp() as app:
+        base_url = app.base_url
+    reason = Preflight(str(tmp_path / "other.json"), base_url, timeout=2).failure(["http"])
+    assert reason.startswith(f"Stand preflight check 'http' failed for {base_url}: URLError")
+
+
+# Зависшее разрешение имени не задерживает проверку DNS дольше её таймаута
+def test_dns_check_respects_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr(socket, "getaddrinfo", lambda *args, **kwargs: time.sleep(2))
+    started = time.monotonic()
+    reason = Preflight(str(tmp_path / "preflight.json"), "https://stand.invalid/", timeout=0.2).failure(["dns"])
+    assert "TimeoutError: DNS lookup of stand.invalid took longer than 0.2s" in reason
+    assert time.monotonic() - started < 1.5
+
+
+# Каждая проверка выполняется один раз за запуск: другие воркеры берут результат из общего файла
+def test_results_are_shared_through_the_run_file(tmp_path):
+    calls = []
+    checks = {name: (lambda base_url, timeout, name=name: calls.append(name) or "ok") for name in CHECKS}
+    path = str(tmp_path / "preflight.json")
+    Preflight(path, "https://stand/", checks=checks).results(["dns", "http"])
+    other_worker = Preflight(path, "https://stand/", checks=checks)
+    assert other_worker.failure(["dns", "http", "imap"]) is None
+    assert calls == ["dns", "http", "imap"]
+
+
+# Автомат размыкается после threshold неудач подряд, успех сбрасывает счётчик; состояние общее для воркеров
+def test_circuit_breaker_opens_after_consecutive_failures(tmp_path, session_stats):
+    path = str(tmp_path / "breaker.json")
+    breaker = CircuitBreaker(path, threshold=2)
+    assert breaker.failure("login", RuntimeError("Login API returned HTTP 502")) is False
+    breaker.success("login")
+    assert breaker.failure("login", TimeoutError("dashboard did not appear")) is False
+    assert breaker.check("login") is None
+    assert breaker.failure("login", RuntimeError("Login API returned HTTP 502")) is True
+    reason = CircuitBreaker(path, threshold=2).check("login")
+    assert "first failure: TimeoutError: dashboard did not appear" in reason
+    assert CircuitBreaker(path, threshold=2).check("page load") is None
+    assert session_stats.counters[preflight.BREAKER_STATS_SECTION] == {"login: opened": 1, "login: failed fast": 1}
@@ -0,0 +1,46 @@
+# Тесты стенда-заглушки (tests/utils/stand_in_app.py): форма входа, API авторизации и дашборд по cookie
+
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from tests.utils.stand_in_app import StandInApp, SESSION_COOKIE
+
+
+@pytest.fixture
+def app():
+    with StandInApp(accounts={"user@example.com": "secret"}) as app:
+        yield app
+
+
+# Отправляет POST-запрос входа и возвращает ответ
+def post_login(app, email, password):
+    request = urllib.request.Request(
+        f"{app.base_url}api/v1/auth/login",
+        data=json.dumps({"email": email, "password": password}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    return urllib.request.urlopen(request, timeout=5)
+
+
+# Без сессии открывается форма входа, после входа та же страница показывает дашборд
+def test_login_sets_session_cookie_and_shows_dashboard(app):
+    page = urllib.request.urlopen(app.base_url, timeout=5).read().decode("utf-8")
+    assert 'placeholder="Введите пароль"' in page
+    response = post_login(app, "user@example.com", "secret")
+    cookie = response.headers["Set-Cookie"].split(";")[0]
+    assert cookie.startswith(f"{SESSION_COOKIE}=")
+    request = urllib.request.Request(app.base_url, headers={"Cookie": cookie})
+    page = urllib.request.urlopen(request, timeout=5).read().decode("utf-8")
+    assert "Моя организация" in page and "user@example.com" in page
+    assert app.requests["POST /api/v1/auth/login"] == 1
+
+
+# Неверный пароль — 401 от API авторизации
+def test_wrong_password_is_rejected(app):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post_login(app, "user@example.com", "wrong")
+    assert error.value.code == 401
@@ -0,0 +1,116 @@
+# Тесты трассировки с кольцевым буфером (tests/utils/trace_ring.py)
+# Вместо контекста браузера — заглушка: stop_chunk(path) записывает в файл номер куска;
+# выгрузка настоящих кусков трассировки (zip для playwright show-trace) проверяется в Chromium на стенде-заглушке
+
+import io
+import json
+import zipfile
+
+import pytest
+
+from tests.utils import trace_ring
+from tests.utils.session_stats import SessionStats
+from tests.utils.trace_ring import TraceRing
+
+
+class FakeTracing:
+    def __init__(self):
+        self.chunk = 0
+        self.discarded = 0
+
+    def start(self, screenshots, snapshots):
+        self.chunk = 1
+
+    def start_chunk(self):
+        self.chunk += 1
+
+    def stop_chunk(self, path=None):
+        with open(path, "wb") as f:
+            f.write(f"chunk-{self.chunk}".encode())
+
+    def stop(self):
+        self.discarded += 1
+
+
+class FakeContext:
+    def __init__(self):
+        self.tracing = FakeTracing()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(trace_ring, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Куски сменяются по числу действий; в буфере остаются только последние keep кусков
+def test_ring_keeps_last_chunks(session_stats):
+    context, ring = FakeContext(), TraceRing(keep=2, chunk_actions=3, chunk_seconds=60, clock=FakeClock())
+    ring.attach(context)
+    for _ in range(10):
+        ring.on_step("work")
+    files = ring.flush()
+    assert [(name, data) for name, data in files] == [
+        ("trace-0-1.zip", b"chunk-2"), ("trace-0-2.zip", b"chunk-3"), ("trace-0-3.zip", b"chunk-4"),
+    ]
+    assert session_stats.counters[trace_ring.STATS_SECTION]["chunks rotated"] == 3
+    ring.on_step("wait")
+    assert [name for name, _ in ring.flush()] == ["trace-0-4.zip"]  # Запись продолжается после сохранения
+
+
+# Кусок заканчивается и по времени, даже если действий было мало
+def test_chunk_rotated_by_time(session_stats):
+    clock = FakeClock()
+    context, ring = FakeContext(), TraceRing(keep=1, chunk_actions=100, chunk_seconds=10, clock=clock)
+    ring.attach(context)
+    ring.on_step("work")
+    clock.now = 11
+    ring.on_step("work")
+    assert [data for _, data in ring.flush()] == [b"chunk-1", b"chunk-2"]
+
+
+# Успешный тест отбрасывает трассировку без выгрузки; накладные расходы попадают в статистику
+def test_passing_test_discards_trace(session_stats):
+    context, ring = FakeContext(), TraceRing(clock=FakeClock())
+    ring.attach(context)
+    ring.on_step("work")
+    ring.detach(context)
+    ring.finish()
+    assert context.tracing.discarded == 1 and ring.traces == []
+    assert len(session_stats.timings[trace_ring.STATS_SECTION]["overhead (trace discarded)"]) == 1
+    assert "traces saved" not in session_stats.counters.get(trace_ring.STATS_SECTION, {})
+
+
+# Возвращает имена методов Playwright, записанных в куске трассировки (zip)
+def traced_methods(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert "trace.trace" in archive.namelist()
+        events = [json.loads(line) for line in archive.read("trace.trace").splitlines() if line.strip()]
+    return [event["method"] for event in events if event.get("type") == "before"]
+
+
+# В Chromium каждый кусок выгружается отдельным архивом трассировки со своими действиями,
+# а вытесненные из буфера куски в сохранённую трассировку не попадают
+def test_chromium_chunks_are_trace_archives(chromium_context, stand_in_app, session_stats):
+    ring = TraceRing(keep=1, chunk_actions=1, chunk_seconds=60, clock=FakeClock())
+    ring.attach(chromium_context)
+    page = chromium_context.new_page()
+    page.goto(stand_in_app.base_url)
+    ring.on_step("work")  # Кусок с переходом на форму входа вытесняется следующим
+    page.fill('input[type="email"]', "first@cicada8.ru")
+    ring.on_step("work")
+    page.click("text=Забыли пароль?")
+    files = ring.flush()
+    assert [name for name, _ in files] == ["trace-0-1.zip", "trace-0-2.zip"]
+    assert [traced_methods(data) for _, data in files] == [["fill"], ["click"]]
+    ring.detach(chromium_context)
+    assert ring.traces == []
@@ -0,0 +1,106 @@
+# Тесты клиентских метрик страниц и бюджетов (tests/utils/web_vitals.py)
+# Разбор бюджетов и учёт замеров проверяются без браузера (метрики передаются в обработчик привязки напрямую),
+# а скрипт сбора, привязка expose_binding и метрики CDP — в Chromium на стенде-заглушке
+
+import json
+
+import pytest
+
+from tests.utils import web_vitals
+from tests.utils.session_stats import SessionStats
+from tests.utils.web_vitals import WebVitalsMonitor, parse_budgets, find_violations, append_history
+
+BUDGETS = ["/ lcp_ms=2000 js_kb=1500", "/dashboard* cls=0.1"]
+
+
+def sample(navigation, path, **metrics):
+    return {"navigation": navigation, "url": f"https://stand{path}", "path": path, **metrics}
+
+
+@pytest.fixture
+def session_stats(monkeypatch):
+    session_stats = SessionStats()
+    monkeypatch.setattr(web_vitals, "stats", session_stats)  # Отдельный экземпляр, чтобы не смешивать с прогоном
+    return session_stats
+
+
+# Бюджеты из pytest.ini: шаблон пути и пределы метрик; неизвестная метрика — ошибка конфигурации
+def test_parse_budgets():
+    assert parse_budgets(BUDGETS) == [("/", {"lcp_ms": 2000.0, "js_kb": 1500.0}), ("/dashboard*", {"cls": 0.1})]
+    with pytest.raises(ValueError, match="lcp"):
+        parse_budgets(["/ lcp=2000"])
+
+
+# Проверяются только метрики страниц, путь которых подходит под шаблон; отсутствующие метрики не проверяются
+def test_find_violations():
+    samples = [
+        sample("a", "/", lcp_ms=2500, js_kb=900, cls=0.5),
+        sample("b", "/dashboard/org", lcp_ms=9000, cls=0.25),
+        sample("c", "/", lcp_ms=None, js_kb=1400),
+    ]
+    assert find_violations(samples, parse_budgets(BUDGETS)) == [
+        "https://stand/: lcp_ms 2500 exceeds budget 2000 (/)",
+        "https://stand/dashboard/org: cls 0.25 exceeds budget 0.1 (/dashboard*)",
+    ]
+
+
+# Повторные отчёты одной загрузки страницы обновляют один замер; превышение бюджета — AssertionError
+def test_monitor_checks_budgets_and_records_samples(session_stats):
+    monitor = WebVitalsMonitor("tests/test_x.py::test_x", parse_budgets(BUDGETS))
+    assert monitor._on_report({}, sample("nav-1", "/", lcp_ms=800)) == "nav-1"
+    monitor._on_report({}, sample("nav-1", "/", lcp_ms=2400, js_kb=700))
+    monitor._on_report({}, sample("nav-2", "/dashboard", lcp_ms=3000, cls=0.0))
+    monitor._add_cdp_metrics("nav-2", [{"name": "JSHeapUsedSize", "value": 3 * 1048576}, {"name": "Nodes", "value": 812.0}])
+    with pytest.raises(AssertionError, match=r"lcp_ms 2400 exceeds budget 2000"):
+        monitor.check()
+    assert session_stats.counters[web_vitals.STATS_SECTION]["budget violations"] == 1
+    monitor.finish()
+    records = session_stats.records[web_vitals.STATS_SECTION]
+    assert [(record["path"], record["lcp_ms"]) for record in records] == [("/", 2400), ("/dashboard", 3000)]
+    assert records[1]["heap_mb"] == 3.0 and records[1]["dom_nodes"] == 812
+    assert records[0]["test"] == "tests/test_x.py::test_x"
+
+
+# Временной ряд дописывается: строки прошлых запусков сохраняются
+def test_append_history(tmp_path):
+    path = str(tmp_path / "reports" / "web_vitals.jsonl")
+    append_history(path, [{"test": "t", "path": "/", "lcp_ms": 900}], "run-1")
+    append_history(path, [{"test": "t", "path": "/", "lcp_ms": 950}], "run-2")
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [(row["run"], row["lcp_ms"]) for row in rows] == [("run-1", 900), ("run-2", 950)]
+    assert web_vitals.summary_lines(rows)[0].split()[:3] == ["/", "n=2", "lcp_ms"]
+
+
+# В Chromium скрипт сбора присылает метрики каждого загруженного документа (страница входа и дашборд после
+# отправки формы), к ним добавляются метрики CDP; бюджеты проверяются по этим замерам
+def test_collector_reports_every_document(chromium_context, stand_in_app, stand_in_account, session_stats):
+    monitor = WebVitalsMonitor("test_collector", parse_budgets(["/ requests=1"]))
+    monitor.attach(chromium_context)
+    page = chromium_context.new_page()
+    page.goto(stand_in_app.base_url)
+    page.fill('input[placeholder="Введите e-mail"]', stand_in_account[0])
+    page.fill('input[placeholder="Введите пароль"]', stand_in_account[1])
+    page.click('button[type="submit"]')
+    page.wait_for_selector("text=Моя организация")
+    with pytest.raises(AssertionError, match="requests 3 exceeds budget 1"):
+        monitor.check()  # Запрашивает итоговые метрики открытой страницы
+    samples = list(monitor.samples.values())
+    assert len(samples) == 2 and {sample["path"] for sample in samples} == {"/"}
+    for sample in samples:
+        assert sample["requests"] == 3 and sample["js_kb"] > 0  # Документ, app.js и app.css
+        assert sample["ttfb_ms"] is not None and sample["load_ms"] is not None
+    assert samples[-1]["dom_nodes"] > 0 and samples[-1]["heap_mb"] > 0  # Метрики CDP открытой страницы
+    monitor.finish()
+    assert len(session_stats.records[web_vitals.STATS_SECTION]) == 2
+
+
+# Бюджеты из pytest.ini разбираются, и страница входа стенда-заглушки в них укладывается
+def test_configured_budgets_pass_on_stand_in(pytestconfig, chromium_context, stand_in_app, session_stats):
+    budgets = parse_budgets(pytestconfig.getini("web_vitals_budgets"))
+    assert "/" in dict(budgets)  # Бюджет страницы входа задан по умолчанию
+    monitor = WebVitalsMonitor("test_configured_budgets", budgets)
+    monitor.attach(chromium_context)
+    chromium_context.new_page().goto(stand_in_app.base_url)
+    monitor.check()
+    assert len(monitor.samples) == 1
@@ -0,0 +1,239 @@
+# Утилита для выдачи тестовых аккаунтов тестам в аренду
+# Тест, меняющий пароль (test_password_recovery), не должен мешать тестам, которые в это же время логинятся
+# под тем же аккаунтом. Поэтому аренда бывает двух видов:
+# - общая (lease_shared): тесты, которые только входят под аккаунтом, работают с ним одновременно;
+# - монопольная (lease): тест, меняющий пароль, ждёт, пока закончатся общие аренды, и до его
+#   освобождения новые общие аренды этого аккаунта не выдаются.
+# - аккаунты читаются из JSON-файла TEST_ACCOUNTS_FILE (или один аккаунт из TEST_EMAIL/TEST_PASSWORD);
+# - монопольная аренда — lock-файл аккаунта в общем для воркеров xdist каталоге (.account_pool),
+#   общая — файл с PID в каталоге <аккаунт>.readers рядом с ним;
+# - если подходящих аккаунтов нет, тест ждёт в очереди, время ожидания попадает в статистику сессии;
+# - текущий пароль аккаунта хранится в файле состояния: если тест сменил пароль (set_password),
+#   следующий арендатор получит уже новый пароль, даже если тест упал, не вернув старый.
+#   Сменённый пароль хранится вместе с настроенным паролем (.env / TEST_ACCOUNTS_FILE), который он заменил,
+#   и действует, только пока настроенный пароль тот же: если аккаунт сбросили вручную и обновили настройки,
+#   запись устаревает и удаляется. Когда тест возвращает исходный пароль, запись тоже удаляется.
+
+import os
+import re
+import json
+import time
+import logging
+import itertools
+
+from tests.utils.auth_utils import get_test_credentials
+from tests.utils.file_lock import FileLock, atomic_write, read_owner
+from tests.utils.perf import step
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики для пула аккаунтов
+STATS_SECTION = "account pool"
+
+# Через сколько секунд аренда без живого владельца считается зависшей (самый долгий тест идёт несколько минут)
+LEASE_STALE_AFTER = 1800
+
+
+# Функция читает список аккаунтов: [{"email": ..., "password": ..., "email_password": ...}, ...]
+# email_password — пароль почтового ящика для тестов восстановления пароля (по умолчанию EMAIL_PASSWORD)
+def load_accounts():
+    path = os.getenv("TEST_ACCOUNTS_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f:
+            accounts = json.load(f)
+    else:
+        email, password = get_test_credentials()
+        accounts = [{"email": email, "password": password}]
+    for account in accounts:
+        if not account.get("email") or not account.get("password"):
+            raise ValueError(f"Account entry without email or password in {path}")
+        account.setdefault("email_password", os.getenv("EMAIL_PASSWORD"))
+    return accounts
+
+
+# Функция проверяет, жив ли процесс (аренды держат воркеры на этой же машине)
+# На Windows os.kill(pid, 0) посылает Ctrl+C, поэтому там полагаемся только на LEASE_STALE_AFTER
+def _process_alive(pid):
+    if os.name == "nt":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Номера общих аренд этого процесса (имя файла аренды: <PID>-<номер>)
+_shared_numbers = itertools.count()
+
+
+# Класс аренды: аккаунт принадлежит тесту до вызова release()
+class AccountLease:
+    def __init__(self, pool, lock, email, password, email_password, exclusive=True, configured_password=None):
+        self.pool = pool
+        self.lock = lock
+        self.email = email  # Email аккаунта
+        self.password = password  # Текущий пароль аккаунта
+        self.configured_password = configured_password or password  # Пароль из настроек (.env, файл аккаунтов)
+        self.email_password = email_password  # Пароль почтового ящика (может быть None)
+        self.exclusive = exclusive  # False — аккаунт одновременно используют и другие тесты
+
+    # Запоминает новый пароль аккаунта сразу после его смены на стенде
+    def set_password(self, new_password):
+        if not self.exclusive:
+            raise RuntimeError(f"Account {self.email} is shared with other tests; lease it exclusively to change it")
+        self.password = new_password
+        self.pool.save_password(self.email, self.configured_password, new_password)
+
+    # Возвращает аккаунт в пул
+    def release(self):
+        self.lock.release()
+        logger.info("Released account %s", self.email)
+
+
+# Класс пула аккаунтов
+class AccountPool:
+    def __init__(self, state_dir, accounts, wait_timeout=900, poll_interval=0.2):
+        self.state_dir = state_dir  # Общий для воркеров каталог с lock-файлами и паролями
+        self.accounts = accounts  # Список аккаунтов из load_accounts()
+        self.wait_timeout = wait_timeout  # Сколько секунд тест может ждать свободный аккаунт
+        self.poll_interval = poll_interval  # Пауза между проверками, когда все аккаунты заняты
+        self.state_path = os.path.join(state_dir, "passwords.json")
+        os.makedirs(state_dir, exist_ok=True)
+
+    def _lock_for(self, email):
+        safe_email = re.sub(r"[^\w.@-]", "_", email)
+        return FileLock(os.path.join(self.state_dir, f"{safe_email}.lease"), stale_after=LEASE_STALE_AFTER)
+
+    # Возвращает каталог общих аренд аккаунта
+    def _readers_dir(self, email):
+        return os.path.join(self.state_dir, re.sub(r"[^\w.@-]", "_", email) + ".readers")
+
+    # Возвращает число общих аренд аккаунта; брошенные аренды завершившихся процессов удаляются
+    def _live_readers(self, email):
+        readers_dir = self._readers_dir(email)
+        try:
+            names = os.listdir(readers_dir)
+        except FileNotFoundError:
+            return 0
+        live = 0
+        for name in names:
+            reader = FileLock(os.path.join(readers_dir, name), stale_after=LEASE_STALE_AFTER)
+            self._break_if_owner_dead(reader)
+            reader._break_if_stale()
+            live += os.path.exists(reader.path)
+        return live
+
+    # Проверяет, держит ли аккаунт монопольную аренду живой процесс
+    def _exclusively_leased(self, lock):
+        self._break_if_owner_dead(lock)
+        lock._break_if_stale()
+        return os.path.exists(lock.path)
+
+    # Возвращает сохранённые пароли {email: {"configured": настроенный пароль, "current": текущий пароль}}
+    def load_passwords(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    # Сохраняет текущий пароль аккаунта вместе с настроенным паролем, который он заменил
+    # (файл доступен только владельцу); возврат настроенного пароля удаляет запись
+    def save_password(self, email, configured, password):
+        with FileLock(f"{self.state_path}.lock", timeout=30):
+            passwords = self.load_passwords()
+            if password == configured:
+                passwords.pop(email, None)
+                stats.count(STATS_SECTION, "passwords restored")
+            else:
+                passwords[email] = {"configured": configured, "current": password}
+                stats.count(STATS_SECTION, "passwords rotated")
+            atomic_write(self.state_path, json.dumps(passwords), mode=0o600)
+
+    # Возвращает текущий пароль аккаунта: сменённый тестом, пока настроенный пароль не изменился,
+    # иначе настроенный (устаревшая запись удаляется)
+    def current_password(self, account):
+        entry = self.load_passwords().get(account["email"])
+        if entry is None:
+            return account["password"]
+        if isinstance(entry, dict) and entry.get("configured") == account["password"]:
+            return entry["current"]
+        logger.warning("Dropping saved password of %s: the configured password has changed", account["email"])
+        with FileLock(f"{self.state_path}.lock", timeout=30):
+            passwords = self.load_passwords()
+            if passwords.get(account["email"]) == entry:  # Другой воркер мог уже записать новый пароль
+                del passwords[account["email"]]
+                atomic_write(self.state_path, json.dumps(passwords), mode=0o600)
+        stats.count(STATS_SECTION, "stale passwords dropped")
+        return account["password"]
+
+    # Освобождает аренду, если процесс, который её взял, уже завершился
+    def _break_if_owner_dead(self, lock):
+        token = read_owner(lock.path)
+        try:
+            pid = int((token or "0").split()[0])
+        except (ValueError, IndexError):
+            return
+        if pid and not _process_alive(pid) and lock.break_lock(token):
+            logger.warning("Broke lease %s of finished process %s", lock.path, pid)
+
+    # Выдаёт аккаунт в монопольное пользование; если все заняты — ждёт, пока какой-нибудь освободится.
+    # Захваченный аккаунт отдаётся тесту, когда закончатся его общие аренды (новые уже не выдаются)
+    def lease(self):
+        started = time.monotonic()
+        with step("account_pool.lease", kind="wait"):
+            held = None  # (аккаунт, lock-файл): монопольная аренда взята, но ещё работают общие
+            while True:
+                if held is None:
+                    # Сначала аккаунты, у которых меньше общих аренд: их дольше не придётся ждать
+                    for account in sorted(self.accounts, key=lambda item: self._live_readers(item["email"])):
+                        lock = self._lock_for(account["email"])
+                        self._break_if_owner_dead(lock)
+                        if lock.try_acquire():
+                            held = (account, lock)
+                            break
+                if held is not None and not self._live_readers(held[0]["email"]):
+                    return self._leased(*held, started, exclusive=True)
+                if time.monotonic() - started > self.wait_timeout:
+                    if held is not None:
+                        held[1].release()
+                    raise TimeoutError(f"No free test account within {self.wait_timeout}s")
+                time.sleep(self.poll_interval)
+
+    # Выдаёт аккаунт, которым одновременно могут пользоваться другие тесты (без смены пароля);
+    # ждёт, только если все аккаунты взяты монопольно
+    def lease_shared(self):
+        started = time.monotonic()
+        with step("account_pool.lease", kind="wait"):
+            while True:
+                for account in self.accounts:
+                    lock = self._lock_for(account["email"])
+                    if self._exclusively_leased(lock):
+                        continue
+                    readers_dir = self._readers_dir(account["email"])
+                    os.makedirs(readers_dir, exist_ok=True)
+                    reader = FileLock(os.path.join(readers_dir, f"{os.getpid()}-{next(_shared_numbers)}"))
+                    reader.try_acquire()
+                    # Монопольная аренда могла появиться между проверкой и записью файла: она ждёт
+                    # общие аренды, поэтому уступаем ей (либо она увидит наш файл, либо мы — её lock-файл)
+                    if os.path.exists(lock.path):
+                        reader.release()
+                        continue
+                    return self._leased(account, reader, started, exclusive=False)
+                if time.monotonic() - started > self.wait_timeout:
+                    raise TimeoutError(f"No test account free of exclusive leases within {self.wait_timeout}s")
+                time.sleep(self.poll_interval)
+
+    def _leased(self, account, lock, started, exclusive):
+        waited = time.monotonic() - started
+        stats.timing(STATS_SECTION, "wait", waited)
+        password = self.current_password(account)
+        logger.info("Leased account %s (%s) after %.2fs", account["email"],
+                    "exclusive" if exclusive else "shared", waited)
+        return AccountLease(self, lock, account["email"], password, account["email_password"], exclusive,
+                            configured_password=account["password"])
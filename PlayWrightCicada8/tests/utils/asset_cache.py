@@ -0,0 +1,240 @@
+# Утилита для кэширования статических ресурсов SPA (JS, CSS, шрифты, картинки) на диске
+# Каждый новый контекст браузера начинается с пустым HTTP-кэшем, поэтому без этого кэша
+# каждый тест заново скачивает бандлы со стенда. Кэш подключается к контексту через context.route
+# и общий для всех воркеров pytest-xdist:
+# - blobs/<sha256> — содержимое ресурса, адресуемое по хешу (одинаковые файлы хранятся один раз);
+# - index/<sha1(url)>.json — метаданные: URL, хеш содержимого, ETag/Last-Modified, заголовки, срок свежести.
+# Запись атомарная (временный файл + os.replace), размер ограничен, при превышении удаляются (вместе с записями индекса)
+# давно не использованные ресурсы (LRU по времени последнего доступа). Заголовки Cache-Control учитываются.
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+
+from tests.utils.file_lock import FileLock, atomic_write
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики кэша
+STATS_SECTION = "asset cache"
+
+# Какие URL перехватываются: только статические ресурсы (API-запросы идут напрямую)
+STATIC_URL_PATTERN = re.compile(
+    r"\.(?:js|mjs|css|woff2?|ttf|otf|eot|png|jpe?g|gif|svg|webp|avif|ico)(?:[?#]|$)", re.IGNORECASE
+)
+
+# Заголовки, которые нельзя отдавать вместе с уже распакованным телом ответа
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie"}
+
+
+# Функция разбирает заголовок Cache-Control в словарь {директива: значение или True}
+def parse_cache_control(value):
+    directives = {}
+    for item in (value or "").split(","):
+        name, _, argument = item.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') if argument else True
+    return directives
+
+
+# Класс дискового кэша ресурсов
+class AssetCache:
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir  # Корневой каталог кэша
+        self.max_bytes = max_bytes  # Максимальный суммарный размер содержимого
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.index_dir = os.path.join(cache_dir, "index")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.index_dir, exist_ok=True)
+
+    def _index_path(self, url):
+        return os.path.join(self.index_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest)
+
+    # Возвращает запись индекса для URL, если и она, и содержимое есть на диске
+    def lookup(self, url):
+        try:
+            with open(self._index_path(url), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get("url") != url or not os.path.exists(self._blob_path(entry["blob"])):
+            return None
+        return entry
+
+    # Читает содержимое ресурса и отмечает его как недавно использованное (для LRU)
+    def read(self, entry):
+        path = self._blob_path(entry["blob"])
+        with open(path, "rb") as f:
+            body = f.read()
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return body
+
+    # Проверяет, можно ли отдать запись без обращения к серверу
+    @staticmethod
+    def is_fresh(entry):
+        if entry.get("no_cache"):
+            return False
+        if entry.get("immutable"):
+            return True
+        return time.time() - entry["stored_at"] < entry.get("max_age", 0)
+
+    # Проверяет, можно ли переспросить сервер условным запросом (ETag / Last-Modified)
+    @staticmethod
+    def can_revalidate(entry):
+        return bool(entry.get("etag") or entry.get("last_modified"))
+
+    # Сохраняет ответ в кэш; возвращает запись индекса или None, если кэшировать нельзя
+    def store(self, url, status, headers, body):
+        directives = parse_cache_control(headers.get("cache-control"))
+        vary = {item.strip().lower() for item in headers.get("vary", "").split(",") if item.strip()}
+        if status != 200 or "no-store" in directives or "private" in directives or vary - {"accept-encoding"}:
+            return None
+        digest = hashlib.sha256(body).hexdigest()
+        if not os.path.exists(self._blob_path(digest)):
+            atomic_write(self._blob_path(digest), body)
+        try:
+            max_age = int(directives.get("s-maxage") or directives.get("max-age") or 0)
+        except ValueError:
+            max_age = 0
+        entry = {
+            "url": url,
+            "blob": digest,
+            "size": len(body),
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "headers": {k: v for k, v in headers.items() if k.lower() not in DROPPED_HEADERS},
+            "stored_at": time.time(),
+            "max_age": max_age,
+            "no_cache": "no-cache" in directives,
+            "immutable": "immutable" in directives,
+        }
+        atomic_write(self._index_path(url), json.dumps(entry))
+        stats.count(STATS_SECTION, "stored")
+        return entry
+
+    # Обновляет срок свежести записи после ответа 304 Not Modified
+    def refresh(self, entry, headers):
+        directives = parse_cache_control(headers.get("cache-control"))
+        try:
+            entry["max_age"] = int(directives.get("s-maxage") or directives.get("max-age") or entry.get("max_age", 0))
+        except ValueError:
+            pass
+        entry["stored_at"] = time.time()
+        atomic_write(self._index_path(entry["url"]), json.dumps(entry))
+
+    # Удаляет давно не использованные ресурсы, если кэш превысил лимит размера
+    # Под блокировкой выполняется только одним воркером; удаляется до 90% лимита, чтобы не чистить на каждом запросе
+    def evict(self):
+        with FileLock(os.path.join(self.cache_dir, "evict.lock"), timeout=30):
+            blobs = []
+            for name in os.listdir(self.blob_dir):
+                path = self._blob_path(name)
+                try:
+                    info = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((info.st_mtime, info.st_size, path))
+            total = sum(size for _, size, _ in blobs)
+            if total <= self.max_bytes:
+                return
+            evicted = set()
+            for _, size, path in sorted(blobs):
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                evicted.add(os.path.basename(path))
+                total -= size
+                stats.count(STATS_SECTION, "evicted")
+            self._drop_index_entries(evicted)
+        logger.info("Asset cache trimmed to %s bytes", total)
+
+    # Удаляет записи индекса, которые указывают на вытесненное содержимое, чтобы индекс не рос без ограничений
+    # Запись остаётся, если другой воркер уже успел сохранить это содержимое заново
+    def _drop_index_entries(self, digests):
+        for name in os.listdir(self.index_dir):
+            if not name.endswith(".json"):
+                continue  # Временные файлы атомарной записи
+            path = os.path.join(self.index_dir, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    digest = json.load(f).get("blob")
+            except (FileNotFoundError, ValueError):
+                continue
+            if digest in digests and not os.path.exists(self._blob_path(digest)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+# Класс-обработчик маршрутов Playwright: отдаёт статические ресурсы из кэша
+class AssetCacheRouter:
+    def __init__(self, cache):
+        self.cache = cache
+        self._bytes_since_evict = 0  # Сколько байт записано с последней проверки размера
+
+    # Подключает кэш к контексту
+    def attach(self, context):
+        context.route(STATIC_URL_PATTERN, self.handle)
+
+    def handle(self, route):
+        request = route.request
+        request_cache = parse_cache_control(request.headers.get("cache-control"))
+        if request.method != "GET" or "no-cache" in request_cache or "no-store" in request_cache:
+            stats.count(STATS_SECTION, "bypassed")
+            route.fallback()
+            return
+
+        entry = self.cache.lookup(request.url)
+        if entry and self.cache.is_fresh(entry) and self._fulfill_from_cache(route, entry):
+            return
+
+        headers = dict(request.headers)
+        if entry and self.cache.can_revalidate(entry):
+            # Условный запрос: если ресурс не изменился, сервер ответит 304 без тела
+            if entry.get("etag"):
+                headers["if-none-match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["if-modified-since"] = entry["last_modified"]
+        response = route.fetch(headers=headers)
+        if response.status == 304 and entry:
+            self.cache.refresh(entry, response.headers)
+            stats.count(STATS_SECTION, "revalidated")
+            if self._fulfill_from_cache(route, entry):
+                return
+            response = route.fetch()  # Содержимое успели вытеснить из кэша — запрашиваем ресурс целиком
+
+        body = response.body()
+        stats.count(STATS_SECTION, "misses")
+        if self.cache.store(request.url, response.status, response.headers, body):
+            self._bytes_since_evict += len(body)
+            if self._bytes_since_evict > self.cache.max_bytes // 20:
+                self._bytes_since_evict = 0
+                self.cache.evict()
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS}
+        route.fulfill(status=response.status, headers=headers, body=body)
+
+    # Отдаёт ресурс из кэша; возвращает False, если содержимое уже вытеснено другим воркером
+    def _fulfill_from_cache(self, route, entry):
+        try:
+            body = self.cache.read(entry)
+        except FileNotFoundError:
+            return False
+        stats.count(STATS_SECTION, "hits")
+        stats.count(STATS_SECTION, "bytes saved", len(body))
+        route.fulfill(status=200, headers=entry["headers"], body=body)
+        return True
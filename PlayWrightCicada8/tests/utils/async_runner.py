@@ -0,0 +1,48 @@
+# Утилита для запуска асинхронного кода (playwright.async_api) внутри pytest
+# Цикл событий asyncio работает в отдельном фоновом потоке воркера:
+# синхронный Playwright (фикстуры page, context и т.д.) использует greenlet и помечает свой цикл
+# как "запущенный" в основном потоке, поэтому второй цикл в том же потоке запустить нельзя.
+# Асинхронные тесты и фикстуры передают корутины в этот поток и ждут результат,
+# а внутри одного теста страницы и ожидания (например, IMAP) выполняются конкурентно через asyncio.gather.
+
+import asyncio
+import logging
+import threading
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+
+# Класс владеет циклом событий в фоновом потоке и выполняет в нём корутины
+class AsyncRunner:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="async-runner", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    # Выполняет корутину в цикле событий и возвращает её результат (исключения пробрасываются)
+    def run(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    # Останавливает цикл событий и фоновый поток
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.run(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=10)
+        self.loop.close()
+
+    # Отменяет незавершённые задачи перед остановкой цикла
+    async def _shutdown(self):
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.loop.shutdown_asyncgens()
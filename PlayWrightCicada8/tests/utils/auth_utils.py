@@ -0,0 +1,346 @@
+# Утилита для авторизации в Cicada8
+# Содержит вход через UI и кэш состояния авторизации (storage_state: cookies и localStorage).
+# Кэш позволяет логиниться через форму один раз на аккаунт, а не в каждом тесте:
+# следующие контексты создаются сразу авторизованными из сохранённого файла.
+# Используется фикстурой logged_in_page (conftest.py)
+
+import os
+import re
+import asyncio
+import json
+import time
+import hashlib
+import logging
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError  # Общий класс для sync и async API
+
+from tests.utils.file_lock import FileLock, atomic_write
+from tests.utils.session_stats import stats
+from tests.utils.perf import timed, step
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Селекторы формы логина и дашборда
+EMAIL_SELECTOR = 'input[placeholder="Введите e-mail"]'
+PASSWORD_SELECTOR = 'input[placeholder="Введите пароль"]'
+SUBMIT_SELECTOR = 'button[type="submit"]'
+DASHBOARD_SELECTOR = 'text=Моя организация'
+# Сообщение об ошибке на форме логина (неверный пароль, заблокированный аккаунт и т.п.):
+# только внутри формы с полем пароля, чтобы не принять за ошибку входа уведомления остальной страницы.
+# Селектор CSS: используется и в document.querySelector (tests/utils/page_pool.py)
+LOGIN_ERROR_SELECTOR = f'form:has({PASSWORD_SELECTOR}) [role="alert"]'
+
+# Настройки входа из переменных окружения читаются при каждом вызове, а не при импорте модуля:
+# conftest.py загружает .env уже после импорта утилит
+# Запрос авторизации, ответ на который отслеживается после отправки формы (регулярное выражение по URL POST-запроса).
+# Ответ ускоряет вход (отказ сервера виден сразу): если шаблон ни с чем не совпал, вход после response_timeout
+# ждёт только дашборд
+DEFAULT_AUTH_API_PATTERN = r"/api/.*(login|auth|token)"
+# Путь API входа для нагрузочного режима без браузера (по умолчанию — путь стенда-заглушки).
+# Проверка стенда перед тестами использует его, только если переменная задана явно (tests/utils/preflight.py)
+DEFAULT_LOGIN_API_PATH = "/api/v1/auth/login"
+
+
+# Функция возвращает шаблон URL запроса авторизации (AUTH_API_PATTERN)
+def auth_api_pattern():
+    return os.getenv("AUTH_API_PATTERN", DEFAULT_AUTH_API_PATTERN)
+
+
+# Функция возвращает путь API входа (LOGIN_API_PATH)
+def login_api_path():
+    return os.getenv("LOGIN_API_PATH", DEFAULT_LOGIN_API_PATH)
+
+
+# Функция возвращает имя cookie сессии (AUTH_COOKIE_NAME): если задано, вход считается завершённым,
+# как только cookie появилась в контексте
+def auth_cookie_name():
+    return os.getenv("AUTH_COOKIE_NAME")
+
+# Раздел статистики для замеров авторизации
+STATS_SECTION = "auth"
+
+
+# Функция возвращает учётные данные тестового пользователя из переменных окружения (.env)
+def get_test_credentials():
+    # Получаем email из переменной окружения TEST_EMAIL, если она не задана — используем значение по умолчанию
+    user_email = os.getenv("TEST_EMAIL", "v.nedyukhin@cicada8.ru")
+    # Получаем пароль из переменной окружения TEST_PASSWORD
+    user_password = os.getenv("TEST_PASSWORD")
+    # Проверяем, задан ли пароль, если нет — выбрасываем ошибку
+    if not user_password:
+        raise ValueError("TEST_PASSWORD not set in .env")
+    return user_email, user_password
+
+
+# Предикат для page.expect_response: ответ на POST-запрос к API авторизации
+def is_auth_response(response):
+    return response.request.method == "POST" and re.search(auth_api_pattern(), response.url) is not None
+
+
+# Функция проверяет ответ API авторизации и сразу завершает вход с ошибкой, если сервер отказал
+def check_auth_response(status, url):
+    if status >= 400:
+        raise RuntimeError(f"Login API {url} returned HTTP {status}")
+
+
+# Функция записывает длительность фазы входа в статистику сессии
+def record_login_phase(name, started):
+    stats.timing(STATS_SECTION, f"login: {name}", time.perf_counter() - started)
+    return time.perf_counter()
+
+
+# Функция проверяет, есть ли среди cookies контекста cookie сессии AUTH_COOKIE_NAME
+def has_session_cookie(cookies, cookie_name):
+    return any(cookie["name"] == cookie_name for cookie in cookies)
+
+
+# Функция возвращает, сколько миллисекунд осталось до таймаута, отсчитанного от момента started
+def remaining_ms(started, timeout):
+    return max(0, timeout - (time.perf_counter() - started) * 1000)
+
+
+# Функция выполняет вход через форму логина на уже открытой странице логина
+# Завершение входа определяется по событиям, а не по длинному ожиданию дашборда:
+# 1) ответ API авторизации (ошибка 4xx/5xx — сразу исключение; если за response_timeout ответа нет —
+#    ждём только дашборд);
+# 2) cookie сессии AUTH_COOKIE_NAME в контексте (если задана и уже есть — на этом вход завершён);
+# 3) дашборд или сообщение об ошибке на форме — что появится раньше.
+# Длительность каждой фазы попадает в статистику сессии и в отчёт о времени шагов.
+# (скриншот и HTML при падении сохранит сборщик артефактов упавших тестов)
+@timed("auth.login_via_ui")
+def login_via_ui(page, user_email, user_password, dashboard_timeout=60000, response_timeout=15000):
+    started = time.perf_counter()
+    logger.info("Filling email: %s", user_email)  # Логируем, что заполняем поле email
+    page.fill(EMAIL_SELECTOR, user_email)
+    logger.info("Filling password")  # Логируем, что заполняем поле пароля
+    page.fill(PASSWORD_SELECTOR, user_password)
+    logger.info("Waiting for submit button")  # Логируем ожидание кнопки отправки формы
+    page.locator(SUBMIT_SELECTOR).wait_for(state="visible", timeout=10000)
+    phase_started = record_login_phase("fill form", started)
+
+    logger.info("Clicking submit button")  # Логируем клик по кнопке
+    clicked = None
+    try:
+        with page.expect_response(is_auth_response, timeout=response_timeout) as response_info:
+            page.click(SUBMIT_SELECTOR)
+            clicked = time.perf_counter()
+        response = response_info.value
+    except PlaywrightTimeoutError:
+        if clicked is None:  # Таймаут самого клика, а не ожидания ответа
+            raise
+        logger.warning("No response matched AUTH_API_PATTERN %s, waiting for dashboard only", auth_api_pattern())
+    else:
+        record_login_phase("auth response", phase_started)
+        logger.info("Login API responded with HTTP %s", response.status)
+        check_auth_response(response.status, response.url)
+        cookie_name = auth_cookie_name()
+        if cookie_name:
+            if has_session_cookie(page.context.cookies(), cookie_name):
+                record_login_phase("session cookie", phase_started)
+                stats.timing(STATS_SECTION, "ui login", time.perf_counter() - started)
+                return
+
+    error = page.locator(LOGIN_ERROR_SELECTOR)
+    logger.info("Waiting for dashboard element: %s", DASHBOARD_SELECTOR)  # Логируем ожидание элемента дашборда
+    with step("login.dashboard", kind="wait"):
+        try:
+            page.locator(DASHBOARD_SELECTOR).or_(error).first.wait_for(
+                state="visible", timeout=remaining_ms(clicked, dashboard_timeout))
+        except PlaywrightTimeoutError:
+            raise TimeoutError(f"Neither dashboard nor login error appeared within {dashboard_timeout} ms") from None
+    record_login_phase("dashboard", phase_started)
+    if error.first.is_visible():
+        raise RuntimeError(f"Login failed: {error.first.inner_text()}")
+    stats.timing(STATS_SECTION, "ui login", time.perf_counter() - started)
+
+
+# Функция проверяет, что на странице виден дашборд (то есть сессия действительна)
+def is_dashboard_visible(page, timeout):
+    try:
+        page.wait_for_selector(DASHBOARD_SELECTOR, state="visible", timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+# Класс хранит файлы storage_state по аккаунтам в общем для всех воркеров каталоге
+class AuthStateCache:
+    def __init__(self, cache_dir, ttl):
+        self.cache_dir = cache_dir  # Каталог с файлами состояния
+        self.ttl = ttl  # Время жизни файла в секундах (0 — кэш не используется)
+
+    # Возвращает путь к файлу состояния для пары (base_url, email)
+    def path_for(self, base_url, user_email):
+        digest = hashlib.sha1(f"{base_url}|{user_email}".encode("utf-8")).hexdigest()[:12]
+        safe_email = re.sub(r"[^\w.@-]", "_", user_email)
+        return os.path.join(self.cache_dir, f"{safe_email}_{digest}.json")
+
+    # Возвращает путь к файлу, если он существует и ещё не устарел, иначе None
+    def get(self, path):
+        if self.ttl <= 0:
+            return None
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except FileNotFoundError:
+            return None
+        return path if age < self.ttl else None
+
+    # Сохраняет состояние контекста в файл (доступ только владельцу: в файле сессионные cookies)
+    def store(self, path, context):
+        state = context.storage_state()
+        atomic_write(path, json.dumps(state), mode=0o600)
+        stats.count(STATS_SECTION, "state saved")
+        logger.info("Saved auth state to %s", path)
+
+    # Удаляет файл состояния, если он не был обновлён другим воркером после того, как мы его прочитали
+    def invalidate(self, path, seen_mtime):
+        try:
+            if os.path.getmtime(path) == seen_mtime:
+                os.remove(path)
+                logger.info("Invalidated auth state %s", path)
+        except FileNotFoundError:
+            pass
+        stats.count(STATS_SECTION, "state invalidated")
+
+    # Блокировка на заполнение кэша конкретного аккаунта: логинится только один воркер, остальные ждут
+    def lock(self, path):
+        return FileLock(f"{path}.lock", timeout=180, stale_after=300)
+
+
+# Функция открывает авторизованную страницу:
+# берёт состояние из кэша, а если его нет или сервер его отверг — логинится через UI и обновляет кэш
+# new_context — функция, создающая контекст (например, BrowserPool.new_context)
+@timed("auth.open_logged_in_page")
+def open_logged_in_page(new_context, base_url, user_email, user_password, cache, check_timeout=10000):
+    path = cache.path_for(base_url, user_email)
+
+    # Пытаемся начать сразу с авторизованного состояния
+    if cache.get(path):
+        seen_mtime = os.path.getmtime(path)
+        context = new_context(storage_state=path)
+        page = context.new_page()
+        page.goto(base_url)
+        if is_dashboard_visible(page, check_timeout):
+            stats.count(STATS_SECTION, "state cache hits")
+            logger.info("Reused cached auth state")
+            return context, page
+        # Сессия истекла или была сброшена на сервере — удаляем файл и логинимся заново
+        logger.info("Cached auth state rejected, logging in again")
+        context.close()
+        cache.invalidate(path, seen_mtime)
+
+    stats.count(STATS_SECTION, "state cache misses")
+    with cache.lock(path):
+        # Пока мы ждали блокировку, другой воркер мог уже обновить кэш
+        if cache.get(path):
+            context = new_context(storage_state=path)
+            page = context.new_page()
+            page.goto(base_url)
+            if is_dashboard_visible(page, check_timeout):
+                logger.info("Auth state refreshed by another worker")
+                return context, page
+            context.close()
+
+        context = new_context()
+        page = context.new_page()
+        page.goto(base_url)
+        page.wait_for_load_state("load", timeout=10000)  # Ждём полной загрузки страницы (максимум 10 секунд)
+        login_via_ui(page, user_email, user_password)
+        cache.store(path, context)
+    return context, page
+
+
+# Асинхронный вариант login_via_ui для страниц playwright.async_api (те же фазы, что и в синхронном)
+async def login_via_ui_async(page, user_email, user_password, dashboard_timeout=60000, response_timeout=15000):
+    started = time.perf_counter()
+    logger.info("Filling email: %s", user_email)
+    await page.fill(EMAIL_SELECTOR, user_email)
+    logger.info("Filling password")
+    await page.fill(PASSWORD_SELECTOR, user_password)
+    await page.locator(SUBMIT_SELECTOR).wait_for(state="visible", timeout=10000)
+    phase_started = record_login_phase("fill form", started)
+
+    logger.info("Clicking submit button")
+    clicked = None
+    try:
+        async with page.expect_response(is_auth_response, timeout=response_timeout) as response_info:
+            await page.click(SUBMIT_SELECTOR)
+            clicked = time.perf_counter()
+        response = await response_info.value
+    except PlaywrightTimeoutError:
+        if clicked is None:
+            raise
+        logger.warning("No response matched AUTH_API_PATTERN %s, waiting for dashboard only", auth_api_pattern())
+    else:
+        record_login_phase("auth response", phase_started)
+        logger.info("Login API responded with HTTP %s", response.status)
+        check_auth_response(response.status, response.url)
+        cookie_name = auth_cookie_name()
+        if cookie_name:
+            if has_session_cookie(await page.context.cookies(), cookie_name):
+                record_login_phase("session cookie", phase_started)
+                stats.timing(STATS_SECTION, "ui login", time.perf_counter() - started)
+                return
+
+    error = page.locator(LOGIN_ERROR_SELECTOR)
+    logger.info("Waiting for dashboard element: %s", DASHBOARD_SELECTOR)
+    try:
+        await page.locator(DASHBOARD_SELECTOR).or_(error).first.wait_for(
+            state="visible", timeout=remaining_ms(clicked, dashboard_timeout))
+    except PlaywrightTimeoutError:
+        raise TimeoutError(f"Neither dashboard nor login error appeared within {dashboard_timeout} ms") from None
+    record_login_phase("dashboard", phase_started)
+    if await error.first.is_visible():
+        raise RuntimeError(f"Login failed: {await error.first.inner_text()}")
+    stats.timing(STATS_SECTION, "ui login", time.perf_counter() - started)
+
+
+# Асинхронный вариант is_dashboard_visible
+async def is_dashboard_visible_async(page, timeout):
+    try:
+        await page.wait_for_selector(DASHBOARD_SELECTOR, state="visible", timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+# Асинхронный вариант open_logged_in_page: использует тот же кэш состояния авторизации
+# new_context — корутина-фабрика контекстов (например, browser.new_context из playwright.async_api)
+async def open_logged_in_page_async(new_context, base_url, user_email, user_password, cache, check_timeout=10000):
+    path = cache.path_for(base_url, user_email)
+
+    async def open_page(**context_options):
+        context = await new_context(**context_options)
+        page = await context.new_page()
+        await page.goto(base_url)
+        return context, page
+
+    if cache.get(path):
+        seen_mtime = os.path.getmtime(path)
+        context, page = await open_page(storage_state=path)
+        if await is_dashboard_visible_async(page, check_timeout):
+            stats.count(STATS_SECTION, "state cache hits")
+            return context, page
+        logger.info("Cached auth state rejected, logging in again")
+        await context.close()
+        cache.invalidate(path, seen_mtime)
+
+    stats.count(STATS_SECTION, "state cache misses")
+    lock = cache.lock(path)
+    await asyncio.to_thread(lock.acquire)  # Ожидание блокировки не должно останавливать цикл событий
+    try:
+        if cache.get(path):
+            context, page = await open_page(storage_state=path)
+            if await is_dashboard_visible_async(page, check_timeout):
+                return context, page
+            await context.close()
+        context, page = await open_page()
+        await page.wait_for_load_state("load", timeout=10000)
+        await login_via_ui_async(page, user_email, user_password)
+        state = await context.storage_state()
+        atomic_write(path, json.dumps(state), mode=0o600)
+        stats.count(STATS_SECTION, "state saved")
+    finally:
+        lock.release()
+    return context, page
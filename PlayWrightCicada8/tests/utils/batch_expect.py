@@ -0,0 +1,243 @@
+# Утилита для пакетных проверок состояния страницы
+# Каждый вызов expect(...) опрашивает браузер отдельно, со своими запросами к драйверу и своим таймаутом.
+# expect_all проверяет сразу набор условий одним циклом опроса внутри страницы (page.wait_for_function):
+#     expect_all(page, [
+#         url(base_url),
+#         visible(text="Введите пароль", exact=True),
+#         disabled('button[type="submit"]'),
+#     ])
+# Если к таймауту выполнены не все условия, выбрасывается одна ошибка со списком всех невыполненных.
+# Элементы ищутся CSS-селектором (с фильтром has_text, как у page.locator) или по тексту (text=..., как
+# page.get_by_text). Проверки строгие, как у expect(): если условию соответствует больше одного элемента,
+# проверка не проходит. Видимость, доступность и сравнение текста повторяют правила expect()
+# (to_be_visible, to_be_hidden, to_be_enabled, to_be_disabled, to_contain_text, to_have_text), совпадение
+# проверяется тестами tests/framework/test_batch_expect.py в Chromium. Проверки выполняются в главном фрейме
+# страницы (без shadow DOM).
+
+import re
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError  # Общий класс для sync и async API
+
+from tests.utils.perf import step
+
+# Как часто (мс) проверять условия внутри страницы
+POLL_INTERVAL = 100
+
+# Функция на JavaScript: проверяет все условия и возвращает список невыполненных с причиной
+_FAILED_CHECKS_JS = """
+(checks) => {
+    const normalize = (value) => (value || "").replace(/\\s+/g, " ").trim();
+    // Без учёта регистра и по подстроке — как get_by_text и has_text; exact — строка целиком с учётом регистра
+    const textMatches = (value, expected, exact) => exact
+        ? normalize(value) === normalize(expected)
+        : normalize(value).toLowerCase().includes(normalize(expected).toLowerCase());
+    // Текст элемента без содержимого script и style (так текст видит get_by_text)
+    const IGNORED = ["SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE"];
+    // Текст считается одним обходом DOM за опрос и общий для всех проверок: texts хранит текст каждого элемента
+    // (в порядке обхода — вложенные раньше родителей)
+    let texts = null;
+    const collect = (element) => {
+        let text = "";
+        for (const node of element.childNodes) {
+            if (node.nodeType === Node.TEXT_NODE) {
+                text += node.nodeValue;
+            } else if (node.nodeType === Node.ELEMENT_NODE) {
+                const child = collect(node);
+                if (!IGNORED.includes(node.nodeName)) text += child;
+            }
+        }
+        texts.set(element, text);
+        return text;
+    };
+    const allTexts = () => {
+        if (texts === null) {
+            texts = new Map();
+            if (document.body) collect(document.body);
+        }
+        return texts;
+    };
+    const textOf = (element) => {
+        const text = allTexts().get(element);
+        return text !== undefined ? text : collect(element);
+    };
+    const isVisible = (element) => {
+        const rect = element.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(element).visibility === "visible";
+    };
+    // Доступность как у expect(): disabled у элементов форм (и disabled fieldset), а aria-disabled — только
+    // у элементов с ролью, которая его поддерживает, и у их предков с такой ролью
+    const ARIA_DISABLED_ROLES = ["application", "button", "composite", "gridcell", "group", "input", "link",
+        "menuitem", "scrollbar", "separator", "tab", "checkbox", "columnheader", "combobox", "grid", "listbox",
+        "menu", "menubar", "menuitemcheckbox", "menuitemradio", "option", "radio", "radiogroup", "row", "rowheader",
+        "searchbox", "select", "slider", "spinbutton", "switch", "tablist", "textbox", "toolbar", "tree",
+        "treegrid", "treeitem"];
+    const INPUT_ROLES = {button: "button", submit: "button", reset: "button", image: "button", checkbox: "checkbox",
+        radio: "radio", range: "slider", number: "spinbutton", search: "searchbox", hidden: null};
+    const roleOf = (element) => {
+        const explicit = (element.getAttribute("role") || "").trim().split(/\\s+/)[0];
+        if (explicit) return explicit;
+        switch (element.nodeName) {
+            case "BUTTON": return "button";
+            case "A": case "AREA": return element.hasAttribute("href") ? "link" : null;
+            case "INPUT": return element.type in INPUT_ROLES ? INPUT_ROLES[element.type] : "textbox";
+            case "SELECT": return element.multiple || element.size > 1 ? "listbox" : "combobox";
+            case "TEXTAREA": return "textbox";
+            case "OPTION": return "option";
+            case "FIELDSET": case "DETAILS": case "OPTGROUP": return "group";
+            case "TR": return "row";
+            default: return null;
+        }
+    };
+    const FORM_CONTROLS = ["BUTTON", "INPUT", "SELECT", "TEXTAREA", "OPTION", "OPTGROUP"];
+    const ariaDisabled = (element) => {
+        for (let node = element; node && ARIA_DISABLED_ROLES.includes(roleOf(node)); node = node.parentElement) {
+            const value = (node.getAttribute("aria-disabled") || "").toLowerCase();
+            if (value === "true") return true;
+            if (value === "false") return false;
+        }
+        return false;
+    };
+    const isDisabled = (element) => (FORM_CONTROLS.includes(element.nodeName) && element.matches(":disabled"))
+        || ariaDisabled(element);
+    const find = (check) => {
+        if (check.text !== null) {
+            // Самые вложенные элементы, текст которых совпадает (дочерние элементы текст целиком не содержат).
+            // Вложенные элементы обходятся раньше родителей, поэтому родитель совпавшего помечается заранее;
+            // несвязанные между собой элементы в этом обходе идут в порядке документа
+            const innermost = [];
+            const containsMatch = new Set();
+            for (const [element, text] of allTexts()) {
+                if (element === document.body) continue;
+                const matches = !IGNORED.includes(element.nodeName) && textMatches(text, check.text, check.exact);
+                if (matches && !containsMatch.has(element)) innermost.push(element);
+                if (matches || containsMatch.has(element)) containsMatch.add(element.parentElement);
+            }
+            return innermost;
+        }
+        const elements = Array.from(document.querySelectorAll(check.selector));
+        return check.has_text === null ? elements
+            : elements.filter((element) => textMatches(textOf(element), check.has_text, false));
+    };
+    // to_contain_text сравнивает с учётом регистра, to_have_text — строку целиком (тоже textContent)
+    const hasText = (element, expected, exact) => exact
+        ? normalize(element.textContent) === normalize(expected)
+        : normalize(element.textContent).includes(normalize(expected));
+    const failures = [];
+    for (const check of checks) {
+        let reason = null;
+        if (check.condition === "url") {
+            const matches = check.pattern !== null
+                ? new RegExp(check.pattern, check.flags).test(location.href)
+                : location.href === check.expected;
+            if (!matches) reason = `url is ${location.href}`;
+        } else {
+            const elements = document.body ? find(check) : [];
+            const element = elements[0];
+            if (elements.length > 1) {
+                reason = `strict mode violation: ${elements.length} matching elements`;
+            } else if (check.condition === "hidden") {
+                if (element && isVisible(element)) reason = "element is visible";
+            } else if (!element) {
+                reason = "no matching element";
+            } else if (check.condition === "visible" && !isVisible(element)) {
+                reason = "element is not visible";
+            } else if (check.condition === "disabled" && !isDisabled(element)) {
+                reason = "element is enabled";
+            } else if (check.condition === "enabled" && isDisabled(element)) {
+                reason = "element is disabled";
+            } else if (check.condition === "has_text" && !hasText(element, check.expected, check.exact)) {
+                reason = `text is "${normalize(element.textContent).slice(0, 100)}"`;
+            }
+        }
+        if (reason !== null) failures.push({description: check.description, reason: reason});
+    }
+    return failures;
+}
+"""
+
+# Условие ожидания для page.wait_for_function: все проверки выполнены
+_ALL_PASSED_JS = f"(checks) => ({_FAILED_CHECKS_JS})(checks).length === 0"
+
+
+# Функция описывает проверку элемента (используется функциями visible, hidden, enabled, disabled, has_text)
+def _element_check(condition, selector, has_text, text, exact, expected=None):
+    if (selector is None) == (text is None):
+        raise ValueError("Pass either a CSS selector or text=")
+    if text is not None:
+        target = f"get_by_text({text!r}, exact=True)" if exact else f"get_by_text({text!r})"
+    else:
+        target = selector if has_text is None else f"{selector} has_text={has_text!r}"
+    description = f"{target} is {condition}" if expected is None else f"{target} has text {expected!r}"
+    return {
+        "condition": condition, "selector": selector, "has_text": has_text, "text": text, "exact": exact,
+        "expected": expected, "pattern": None, "flags": "", "description": description,
+    }
+
+
+# Единственный подходящий элемент видим
+def visible(selector=None, has_text=None, text=None, exact=False):
+    return _element_check("visible", selector, has_text, text, exact)
+
+
+# Подходящий элемент не видим (или его нет)
+def hidden(selector=None, has_text=None, text=None, exact=False):
+    return _element_check("hidden", selector, has_text, text, exact)
+
+
+# Элемент доступен (не disabled и не aria-disabled)
+def enabled(selector=None, has_text=None, text=None, exact=False):
+    return _element_check("enabled", selector, has_text, text, exact)
+
+
+# Элемент недоступен (disabled, внутри disabled fieldset или aria-disabled="true")
+def disabled(selector=None, has_text=None, text=None, exact=False):
+    return _element_check("disabled", selector, has_text, text, exact)
+
+
+# Текст элемента содержит expected с учётом регистра (с exact=True — совпадает целиком)
+def has_text(selector, expected, exact=False):
+    return _element_check("has_text", selector, None, None, exact, expected=expected)
+
+
+# Адрес страницы равен строке или соответствует регулярному выражению (re.compile(...))
+def url(expected):
+    check = {
+        "condition": "url", "selector": None, "has_text": None, "text": None, "exact": True,
+        "expected": expected, "pattern": None, "flags": "", "description": f"url is {expected}",
+    }
+    if isinstance(expected, re.Pattern):
+        check.update(
+            expected=None, pattern=expected.pattern, flags="i" if expected.flags & re.IGNORECASE else "",
+            description=f"url matches {expected.pattern}",
+        )
+    return check
+
+
+# Функция собирает текст ошибки из списка невыполненных проверок
+def failure_message(failures, total, timeout):
+    lines = [f"{len(failures)} of {total} checks failed after {timeout}ms:"]
+    lines += [f"  - {failure['description']}: {failure['reason']}" for failure in failures]
+    return "\n".join(lines)
+
+
+# Функция ждёт, пока все проверки выполнятся; иначе выбрасывает AssertionError со всеми невыполненными
+def expect_all(page, checks, timeout=10000):
+    with step("expect_all", kind="wait"):
+        try:
+            page.wait_for_function(_ALL_PASSED_JS, arg=checks, polling=POLL_INTERVAL, timeout=timeout)
+            return
+        except PlaywrightTimeoutError:
+            failures = page.evaluate(_FAILED_CHECKS_JS, checks)  # Итоговое состояние для сообщения об ошибке
+    if failures:
+        raise AssertionError(failure_message(failures, len(checks), timeout))
+
+
+# Асинхронный вариант expect_all для страниц playwright.async_api
+async def expect_all_async(page, checks, timeout=10000):
+    try:
+        await page.wait_for_function(_ALL_PASSED_JS, arg=checks, polling=POLL_INTERVAL, timeout=timeout)
+        return
+    except PlaywrightTimeoutError:
+        failures = await page.evaluate(_FAILED_CHECKS_JS, checks)
+    if failures:
+        raise AssertionError(failure_message(failures, len(checks), timeout))
@@ -0,0 +1,105 @@
+# Утилита для бенчмарков накладных расходов фреймворка (каталог benchmarks/)
+# Каждый путь (запуск Playwright, запуск браузера, new_context, new_page + goto, вход, IMAP) выполняется
+# несколько раз подряд; по замерам считаются min, медиана и p95. Результаты сравниваются с базовой линией
+# (JSON-файл, сохраняется опцией --bench-save-baseline): если медиана пути выросла больше порога,
+# запуск бенчмарков завершается с ошибкой.
+# Замеры передаются через статистику сессии (раздел "benchmarks"), поэтому работают и с pytest-xdist,
+# но для стабильных чисел бенчмарки лучше запускать в одном процессе.
+
+import json
+import time
+import logging
+import statistics
+
+from tests.utils.file_lock import atomic_write
+from tests.utils.session_stats import stats, percentile
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики для результатов бенчмарков
+STATS_SECTION = "benchmarks"
+
+# Рост медианы меньше этого значения (секунды) не считается регрессией: для быстрых путей это шум
+MIN_REGRESSION_DELTA = 0.005
+
+
+# Функция выполняет func rounds раз (плюс warmup прогревочных запусков без замера) и возвращает замеры в секундах
+# cleanup получает результат func и выполняется вне замера (например, закрывает созданный контекст)
+def measure(func, rounds, warmup=1, cleanup=None):
+    samples = []
+    for index in range(warmup + rounds):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        if cleanup is not None:
+            cleanup(result)
+        if index >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+# Функция считает min, медиану и p95 по замерам
+def summarize(samples):
+    return {
+        "rounds": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "p95": percentile(samples, 95),
+    }
+
+
+# Функция замеряет путь и записывает результат в статистику сессии; возвращает сводку
+def run(name, func, rounds, warmup=1, cleanup=None):
+    summary = summarize(measure(func, rounds, warmup, cleanup))
+    stats.record(STATS_SECTION, {"name": name, **summary})
+    logger.info("Benchmark %s: median %.4fs, p95 %.4fs", name, summary["median"], summary["p95"])
+    return summary
+
+
+# Функция собирает результаты из записей статистики {путь: сводка}
+def collect_results(records):
+    return {record["name"]: {key: value for key, value in record.items() if key != "name"} for record in records}
+
+
+# Функция читает базовую линию (пустой словарь, если файла нет)
+def load_baseline(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["results"]
+    except FileNotFoundError:
+        return {}
+
+
+# Функция сохраняет результаты как новую базовую линию
+def save_baseline(path, results):
+    atomic_write(path, json.dumps({"created": time.time(), "results": results}, indent=2, sort_keys=True))
+
+
+# Функция возвращает описания регрессий: медиана пути выросла больше чем на threshold (доля, 0.2 = 20%)
+def find_regressions(results, baseline, threshold, min_delta=MIN_REGRESSION_DELTA):
+    regressions = []
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        if base is None:
+            continue
+        delta = result["median"] - base["median"]
+        if delta > base["median"] * threshold and delta > min_delta:
+            regressions.append(
+                f"{name}: median {result['median'] * 1000:.1f}ms vs baseline {base['median'] * 1000:.1f}ms "
+                f"(+{delta / base['median'] * 100:.0f}%, threshold {threshold * 100:.0f}%)"
+            )
+    return regressions
+
+
+# Функция возвращает строки таблицы результатов для терминала (в миллисекундах)
+def summary_lines(results, baseline):
+    lines = [f"{'path':<32} {'rounds':>6} {'min':>9} {'median':>9} {'p95':>9} {'baseline':>9}"]
+    for name, result in sorted(results.items()):
+        base = baseline.get(name)
+        base_median = f"{base['median'] * 1000:9.1f}" if base else f"{'-':>9}"
+        lines.append(
+            f"{name:<32} {result['rounds']:>6} {result['min'] * 1000:9.1f} {result['median'] * 1000:9.1f} "
+            f"{result['p95'] * 1000:9.1f} {base_median}"
+        )
+    return lines
@@ -0,0 +1,287 @@
+# Утилита для "тёплого" браузера, который живёт между запусками pytest (опция --browser-daemon)
+# Chromium запускается отдельным процессом с открытым портом CDP (Chrome DevTools Protocol) и не закрывается
+# в конце сессии. Следующий запуск pytest подключается к нему (connect_over_cdp), а не запускает браузер заново.
+# Адрес браузера и PID хранятся в файле состояния .browser_daemon/state.json.
+# - Если браузера нет или он не отвечает, он запускается (перезапускается) заново.
+# - Каждый процесс, подключённый к браузеру, записывает свои страницы (id целей CDP) в файл владельца
+#   .browser_daemon/owners/<pid>.json. Если запуск упал, не закрыв контексты, его страницы закрываются
+#   по CDP при следующем запуске; страницы работающих одновременно запусков не трогаются.
+# - Если подключиться не удалось, BrowserPool запускает браузер локально, как без опции.
+# Остановить браузер: python -m tests.utils.browser_daemon stop
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import subprocess
+import urllib.request
+
+from tests.utils.file_lock import FileLock, atomic_write
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики для браузера-демона
+STATS_SECTION = "browser daemon"
+
+# Сколько секунд ждать, пока запущенный браузер откроет порт CDP
+START_TIMEOUT = 30
+
+# Параметры запуска Chromium: порт CDP выбирает сам браузер и записывает его в файл DevToolsActivePort.
+# Песочница отключена, как у Playwright по умолчанию (chromium_sandbox=False): иначе браузер не запускается от root
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--remote-debugging-port=0",
+    "--remote-debugging-address=127.0.0.1",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-background-networking",
+    "--disable-dev-shm-usage",
+]
+
+
+# Функция проверяет, жив ли процесс
+def _process_alive(pid):
+    if os.name == "nt":
+        return True  # На Windows os.kill(pid, 0) завершает процесс; полагаемся на проверку порта CDP
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Функция выполняет GET-запрос к HTTP-интерфейсу CDP и возвращает JSON (None, если браузер не ответил)
+def _cdp_get(endpoint, path, timeout=1.0):
+    try:
+        with urllib.request.urlopen(f"{endpoint}{path}", timeout=timeout) as response:
+            return json.load(response)
+    except (OSError, ValueError):
+        return None
+
+
+# Функция закрывает цель CDP (страницу) через HTTP-интерфейс; False, если браузер не закрыл её
+def _cdp_close(endpoint, target_id, timeout=1.0):
+    try:
+        with urllib.request.urlopen(f"{endpoint}/json/close/{target_id}", timeout=timeout) as response:
+            return response.status == 200
+    except OSError:
+        return False
+
+
+# Класс управляет процессом браузера, общим для запусков pytest и воркеров xdist на этой машине
+class BrowserDaemon:
+    def __init__(self, state_dir, headless=True):
+        self.state_dir = state_dir  # Каталог с файлом состояния, профилем браузера и его логом
+        self.headless = headless
+        self.state_path = os.path.join(state_dir, "state.json")
+        self.profile_dir = os.path.join(state_dir, "profile")
+        self.owners_dir = os.path.join(state_dir, "owners")  # Файлы владельцев: страницы каждого процесса
+        self._process = None  # Процесс браузера, если он запущен этим процессом pytest
+        self._targets = set()  # Страницы (id целей CDP), открытые в браузере этим процессом
+
+    # Возвращает состояние {"pid", "endpoint", "started"} или None
+    def read_state(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # Проверяет, что процесс браузера жив и отвечает по CDP
+    def is_healthy(self, state):
+        return (
+            state is not None and _process_alive(state["pid"])
+            and _cdp_get(state["endpoint"], "/json/version") is not None
+        )
+
+    # Возвращает число открытых страниц: после нормального завершения запуска их не остаётся
+    def open_pages(self, state):
+        targets = _cdp_get(state["endpoint"], "/json/list") or []
+        return sum(1 for target in targets if target.get("type") == "page" and target.get("url") != "about:blank")
+
+    # Записывает этот процесс владельцем браузера: пока процесс жив, его страницы не считаются оставленными
+    def register_owner(self):
+        os.makedirs(self.owners_dir, exist_ok=True)
+        atomic_write(os.path.join(self.owners_dir, f"{os.getpid()}.json"), json.dumps(sorted(self._targets)))
+
+    # Удаляет файл владельца этого процесса (после отключения от браузера)
+    def unregister_owner(self):
+        self._targets.clear()
+        try:
+            os.remove(os.path.join(self.owners_dir, f"{os.getpid()}.json"))
+        except FileNotFoundError:
+            pass
+
+    # Добавляет страницу в файл владельца этого процесса
+    def add_target(self, target_id):
+        self._targets.add(target_id)
+        self.register_owner()
+
+    # Убирает закрытую страницу из файла владельца этого процесса
+    def remove_target(self, target_id):
+        if target_id in self._targets:
+            self._targets.discard(target_id)
+            self.register_owner()
+
+    # Возвращает владельцев браузера: {pid: множество id их страниц}
+    def read_owners(self):
+        owners = {}
+        try:
+            names = os.listdir(self.owners_dir)
+        except FileNotFoundError:
+            return owners
+        for name in names:
+            pid, ext = os.path.splitext(name)
+            if ext != ".json" or not pid.isdigit():
+                continue  # Временные файлы atomic_write
+            try:
+                with open(os.path.join(self.owners_dir, name), encoding="utf-8") as f:
+                    owners[int(pid)] = set(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return owners
+
+    # Закрывает по CDP страницы, оставленные завершившимися процессами, и возвращает их число.
+    # Страница оставлена, если её владелец не жив; страница без владельца (например, от браузера, открытого
+    # до записи владельцев) закрывается, только если живых владельцев нет: иначе она может принадлежать
+    # работающему запуску, который ещё не успел её записать
+    def close_stale_pages(self, state):
+        owners = self.read_owners()
+        live = {pid for pid in owners if _process_alive(pid)}
+        live_targets = set().union(*(owners[pid] for pid in live))
+        dead_targets = set().union(*(targets for pid, targets in owners.items() if pid not in live))
+        targets = _cdp_get(state["endpoint"], "/json/list") or []
+        closed = 0
+        for target in targets:
+            if target.get("type") != "page" or target.get("url") == "about:blank" or target["id"] in live_targets:
+                continue
+            if (target["id"] in dead_targets or not live) and _cdp_close(state["endpoint"], target["id"]):
+                closed += 1
+        for pid in set(owners) - live:
+            try:
+                os.remove(os.path.join(self.owners_dir, f"{pid}.json"))
+            except FileNotFoundError:
+                pass
+        return closed
+
+    # Возвращает адрес CDP работающего браузера (None, если браузера нет или он не отвечает)
+    def endpoint(self):
+        state = self.read_state()
+        return state["endpoint"] if self.is_healthy(state) else None
+
+    # Готовит браузер к запуску тестов: запускает, если его нет, перезапускает, если он завис,
+    # а с clean=True закрывает страницы упавших запусков. executable_path — путь к Chromium из Playwright
+    # (функция, потому что для его получения нужен драйвер Playwright, а нужен он только при запуске браузера)
+    def ensure(self, executable_path, clean=False):
+        with FileLock(os.path.join(self.state_dir, "daemon.lock"), timeout=START_TIMEOUT * 2):
+            state = self.read_state()
+            if self.is_healthy(state):
+                stale = self.close_stale_pages(state) if clean else 0
+                if stale:
+                    logger.warning("Closed %s stale pages left in browser daemon by finished runs", stale)
+                    stats.count(STATS_SECTION, "stale pages closed", stale)
+                stats.count(STATS_SECTION, "reused")
+                return state["endpoint"]
+            if state is not None:
+                logger.warning("Browser daemon %s is not responding, restarting it", state["pid"])
+                stats.count(STATS_SECTION, "restarts (unhealthy)")
+            self._stop(state)
+            return self._start(executable_path())
+
+    # Запускает браузер отдельным процессом, который переживёт завершение pytest
+    def _start(self, executable):
+        started = time.perf_counter()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        port_file = os.path.join(self.profile_dir, "DevToolsActivePort")
+        if os.path.exists(port_file):
+            os.remove(port_file)
+        args = [executable, *CHROMIUM_ARGS, f"--user-data-dir={self.profile_dir}"]
+        if self.headless:
+            args.append("--headless=new")
+        if os.name == "nt":
+            detach = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            detach = {"start_new_session": True}  # Ctrl+C в терминале pytest не должен закрыть браузер
+        with open(os.path.join(self.state_dir, "browser.log"), "ab") as log:
+            process = subprocess.Popen(
+                args + ["about:blank"], stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **detach
+            )
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            try:
+                with open(port_file, encoding="utf-8") as f:
+                    port = int(f.readline())
+                endpoint = f"http://127.0.0.1:{port}"
+                if _cdp_get(endpoint, "/json/version") is not None:
+                    break
+            except (FileNotFoundError, ValueError):
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError(f"Browser daemon did not open a CDP port within {START_TIMEOUT}s")
+            time.sleep(0.05)
+        self._process = process
+        state = {"pid": process.pid, "endpoint": endpoint, "started": time.time()}
+        atomic_write(self.state_path, json.dumps(state))
+        elapsed = time.perf_counter() - started
+        stats.count(STATS_SECTION, "starts")
+        stats.timing(STATS_SECTION, "start", elapsed)
+        logger.info("Browser daemon started (pid %s, %s) in %.2fs", process.pid, endpoint, elapsed)
+        return endpoint
+
+    # Завершает процесс браузера из состояния и удаляет файл состояния
+    def _stop(self, state):
+        if state is not None and _process_alive(state["pid"]):
+            try:
+                os.kill(state["pid"], signal.SIGTERM)
+            except OSError as e:
+                logger.warning("Failed to stop browser daemon %s: %s", state["pid"], e)
+            if self._process is not None and self._process.pid == state["pid"]:
+                self._process.wait(timeout=5)  # Свой дочерний процесс нужно дождаться, иначе останется зомби
+            deadline = time.monotonic() + 5
+            while os.name != "nt" and _process_alive(state["pid"]) and time.monotonic() < deadline:
+                time.sleep(0.05)
+        try:
+            os.remove(self.state_path)
+        except FileNotFoundError:
+            pass
+
+    # Останавливает браузер (команда stop)
+    def stop(self):
+        with FileLock(os.path.join(self.state_dir, "daemon.lock"), timeout=START_TIMEOUT * 2):
+            self._stop(self.read_state())
+
+
+# Функция возвращает путь к Chromium, который установлен для Playwright (playwright install)
+def chromium_executable():
+    from playwright.sync_api import sync_playwright  # Драйвер запускается только ради пути к браузеру
+    with sync_playwright() as playwright:
+        return playwright.chromium.executable_path
+
+
+# Запуск из командной строки: python -m tests.utils.browser_daemon start|stop|status [каталог]
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "status"
+    daemon = BrowserDaemon(argv[2] if len(argv) > 2 else ".browser_daemon")
+    if command == "start":
+        print(daemon.ensure(chromium_executable))
+    elif command == "stop":
+        daemon.stop()
+    elif command == "status":
+        state = daemon.read_state()
+        if daemon.is_healthy(state):
+            print(f"running: pid {state['pid']}, {state['endpoint']}, {daemon.open_pages(state)} open pages")
+        else:
+            print("not running")
+    else:
+        raise ValueError(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,299 @@
+# Утилита для запуска браузеров на сетке удалённых серверов Playwright (опция --browser-grid)
+# Без сетки все браузеры работают на машине с pytest, и pytest -n auto упирается в её CPU и память.
+# С сеткой BrowserPool не запускает браузер, а подключается (chromium.connect) к серверам Playwright:
+#     python -m playwright run-server --port 3000 --host 0.0.0.0
+# Каждый новый контекст создаётся на узле, где сейчас меньше всего открытых контекстов. Число контекстов
+# узлов общее для воркеров xdist: оно хранится в файле состояния каталога запуска (под блокировкой).
+# Если узел не отвечает (не удалось подключиться или создать контекст, соединение оборвалось), он
+# исключается на down_seconds секунд, а контекст создаётся на следующем узле.
+# В конце прогона раздел "browser grid" показывает по каждому узлу число контекстов, долю нагрузки,
+# суммарное время работы контекстов, пиковое число одновременных контекстов и отказы.
+# Несколько локальных серверов (LocalGrid, опция --local-grid N) заменяют настоящую сетку для проверки.
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import logging
+import subprocess
+
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.file_lock import FileLock, atomic_write
+from tests.utils.node_names import worker_id
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики сетки
+STATS_SECTION = "browser grid"
+
+# Сколько секунд ждать, пока локальный сервер Playwright начнёт принимать подключения
+START_TIMEOUT = 30
+
+
+# Класс распределяет контексты воркера по узлам сетки и ведёт общий для воркеров учёт нагрузки
+class BrowserGrid:
+    def __init__(self, playwright, endpoints, state_path, connect_timeout=30000, down_seconds=60, clock=time.time):
+        if not endpoints:
+            raise ValueError("Browser grid needs at least one endpoint")
+        self.playwright = playwright
+        self.endpoints = list(endpoints)  # Адреса серверов Playwright: ws://host:port/
+        self.state_path = state_path  # Файл состояния в каталоге запуска (общий для воркеров)
+        self.connect_timeout = connect_timeout  # мс
+        self.down_seconds = down_seconds  # На сколько исключать узел после отказа
+        self.clock = clock
+        self.worker = worker_id()
+        self.browsers = {}  # {узел: Browser}
+        self.opened = {}  # {контекст: (узел, время создания)}
+        self.usage = {endpoint: {"contexts": 0, "busy": 0.0, "failures": 0} for endpoint in self.endpoints}
+        self._update(self._forget_worker)  # Счётчики прошлого воркера с тем же именем (если он упал)
+
+    # Изменяет состояние узлов под блокировкой; change может вернуть результат
+    def _update(self, change):
+        with FileLock(f"{self.state_path}.lock", timeout=30):
+            state = read_state(self.state_path)
+            result = change(state)
+            atomic_write(self.state_path, json.dumps(state, ensure_ascii=False, indent=2))
+        return result
+
+    @staticmethod
+    def _entry(state, endpoint):
+        return state.setdefault(endpoint, {"contexts": {}, "peak": 0, "down_until": 0, "cause": None})
+
+    # Убирает из состояния все контексты этого воркера
+    def _forget_worker(self, state):
+        for endpoint in self.endpoints:
+            self._entry(state, endpoint)["contexts"].pop(self.worker, None)
+
+    # Возвращает живые узлы, начиная с наименее загруженного (кроме exclude)
+    def _candidates(self, state, exclude=()):
+        now = self.clock()
+        live = [
+            endpoint for endpoint in self.endpoints
+            if endpoint not in exclude and self._entry(state, endpoint)["down_until"] <= now
+        ]
+        return sorted(live, key=lambda endpoint: sum(self._entry(state, endpoint)["contexts"].values()))
+
+    # Выбирает наименее загруженный живой узел и сразу учитывает на нём новый контекст (None — узлов нет)
+    def _reserve(self, exclude):
+        def change(state):
+            candidates = self._candidates(state, exclude)
+            if not candidates:
+                return None
+            entry = self._entry(state, candidates[0])
+            entry["contexts"][self.worker] = entry["contexts"].get(self.worker, 0) + 1
+            entry["peak"] = max(entry["peak"], sum(entry["contexts"].values()))
+            return candidates[0]
+
+        return self._update(change)
+
+    # Снимает с узла один контекст этого воркера (или все — после потери соединения)
+    def _release(self, endpoint, everything=False):
+        def change(state):
+            contexts = self._entry(state, endpoint)["contexts"]
+            left = 0 if everything else contexts.get(self.worker, 0) - 1
+            if left > 0:
+                contexts[self.worker] = left
+            else:
+                contexts.pop(self.worker, None)
+
+        self._update(change)
+
+    # Исключает узел на down_seconds: другие воркеры тоже перестают его выбирать
+    def _mark_down(self, endpoint, error):
+        cause = f"{type(error).__name__}: {error}".splitlines()[0][:300]
+        logger.warning("Browser grid node %s failed, trying another node: %s", endpoint, cause)
+        self.usage[endpoint]["failures"] += 1
+        stats.count(STATS_SECTION, "node failures")
+        self.browsers.pop(endpoint, None)
+
+        def change(state):
+            entry = self._entry(state, endpoint)
+            entry["down_until"] = self.clock() + self.down_seconds
+            entry["cause"] = cause
+            entry["contexts"].pop(self.worker, None)
+
+        self._update(change)
+
+    # Возвращает подключение к узлу (подключается заново, если соединение потеряно)
+    def _browser(self, endpoint):
+        browser = self.browsers.get(endpoint)
+        if browser is not None and browser.is_connected():
+            return browser
+        started = time.perf_counter()
+        browser = self.playwright.chromium.connect(endpoint, timeout=self.connect_timeout)
+        stats.timing(STATS_SECTION, "connect", time.perf_counter() - started)
+        browser.on("disconnected", lambda _: self._disconnected(endpoint, browser))
+        self.browsers[endpoint] = browser
+        logger.info("Connected to browser grid node %s", endpoint)
+        return browser
+
+    # Соединение с узлом оборвалось: его контексты этого воркера больше не считаются открытыми
+    def _disconnected(self, endpoint, browser):
+        if self.browsers.get(endpoint) is not browser:
+            return  # Подключение закрыли сами (close) или уже заменили новым
+        self.browsers.pop(endpoint, None)
+        for context, (node, _) in list(self.opened.items()):
+            if node == endpoint:
+                self.opened.pop(context)
+        self._release(endpoint, everything=True)
+        logger.warning("Browser grid node %s disconnected", endpoint)
+
+    # Возвращает браузер наименее загруженного живого узла (для фикстуры browser)
+    def acquire(self):
+        tried = []
+        while True:
+            candidates = self._candidates(read_state(self.state_path), tried)
+            if not candidates:
+                raise RuntimeError(f"No browser grid node is available (tried {', '.join(tried) or 'none'})")
+            try:
+                return self._browser(candidates[0])
+            except PlaywrightError as e:
+                self._mark_down(candidates[0], e)
+                tried.append(candidates[0])
+
+    # Создаёт контекст на наименее загруженном узле; при отказе узла повторяет попытку на следующем
+    def new_context(self, **context_options):
+        tried = []
+        while True:
+            endpoint = self._reserve(tried)
+            if endpoint is None:
+                raise RuntimeError(f"No browser grid node is available (tried {', '.join(tried) or 'none'})")
+            try:
+                context = self._browser(endpoint).new_context(**context_options)
+            except PlaywrightError as e:
+                self._mark_down(endpoint, e)
+                tried.append(endpoint)
+                continue
+            self.opened[context] = (endpoint, self.clock())
+            self.usage[endpoint]["contexts"] += 1
+            context.on("close", lambda _: self._closed(context))
+            return context
+
+    def _closed(self, context):
+        endpoint, created = self.opened.pop(context, (None, None))
+        if endpoint is None:
+            return
+        self.usage[endpoint]["busy"] += self.clock() - created
+        self._release(endpoint)
+
+    # Отключается от узлов и записывает нагрузку воркера на узлы в статистику сессии
+    def close(self):
+        browsers, self.browsers = self.browsers, {}
+        for browser in browsers.values():
+            try:
+                browser.close()
+            except PlaywrightError as e:
+                logger.warning("Failed to disconnect from browser grid node: %s", e)
+        self._update(self._forget_worker)
+        for endpoint, usage in self.usage.items():
+            stats.record(STATS_SECTION, {"worker": self.worker, "endpoint": endpoint, **usage})
+
+
+# Функция читает общее состояние узлов: {узел: {"contexts": {воркер: число}, "peak", "down_until", "cause"}}
+def read_state(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+# Функция возвращает строки сводки для терминала: нагрузка и отказы каждого узла
+def summary_lines(records, state=None):
+    nodes = {}
+    for record in records:
+        node = nodes.setdefault(record["endpoint"], {"contexts": 0, "busy": 0.0, "failures": 0})
+        for key in node:
+            node[key] += record[key]
+    total = sum(node["contexts"] for node in nodes.values()) or 1
+    lines = []
+    for endpoint, node in nodes.items():
+        entry = (state or {}).get(endpoint, {})
+        line = (f"  {endpoint}: {node['contexts']} contexts ({node['contexts'] / total:.0%}), "
+                f"busy {node['busy']:.1f}s, peak {entry.get('peak', 0)} concurrent, {node['failures']} failures")
+        if entry.get("cause"):
+            line += f" (last: {entry['cause']})"
+        lines.append(line)
+    return lines
+
+
+# Функция завершает процесс вместе с дочерними (python -m playwright запускает сервер отдельным процессом node)
+def _terminate_tree(process):
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+    except OSError as e:
+        logger.warning("Failed to stop Playwright server %s: %s", process.pid, e)
+        process.terminate()
+
+
+# Класс запускает несколько локальных серверов Playwright вместо настоящей сетки (опция --local-grid)
+class LocalGrid:
+    def __init__(self, size, log_dir, host="127.0.0.1"):
+        self.size = size
+        self.log_dir = log_dir  # Сюда пишутся логи серверов (grid-<номер>.log)
+        self.host = host
+        self.processes = []
+        self.endpoints = []
+
+    # Запускает серверы и ждёт, пока каждый напишет свой адрес ("Listening on ws://...")
+    def start(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        try:
+            for index in range(self.size):
+                self.endpoints.append(self._start_server(os.path.join(self.log_dir, f"grid-{index}.log")))
+        except RuntimeError:
+            self.stop()
+            raise
+        logger.info("Local browser grid started: %s", ", ".join(self.endpoints))
+        return self.endpoints
+
+    def _start_server(self, log_path):
+        args = [sys.executable, "-m", "playwright", "run-server", "--port", "0", "--host", self.host]
+        if os.name == "nt":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}  # Сервер — дочерний процесс node: останавливается вся группа
+        with open(log_path, "w", encoding="utf-8") as log:
+            process = subprocess.Popen(
+                args, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, **group
+            )
+        self.processes.append(process)
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            with open(log_path, encoding="utf-8") as f:
+                match = re.search(r"Listening on (ws://\S+)", f.read())
+            if match:
+                return match.group(1)
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"Playwright server did not start within {START_TIMEOUT}s, see {log_path}")
+            time.sleep(0.05)
+
+    # Останавливает серверы (браузеры, запущенные для подключений, завершаются вместе с ними)
+    def stop(self):
+        for process in self.processes:
+            _terminate_tree(process)
+        for process in self.processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        self.processes = []
+        self.endpoints = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
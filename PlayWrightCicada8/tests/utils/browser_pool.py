@@ -0,0 +1,167 @@
+# Утилита для переиспользования одного браузера Chromium в рамках воркера
+# Браузер запускается один раз на процесс (воркер pytest-xdist или обычный запуск pytest),
+# а каждый тест получает собственный изолированный BrowserContext.
+# Перед выдачей браузер проверяется и при необходимости перезапускается (например, если он упал).
+# Время запуска и закрытия браузера попадает в статистику сессии (tests/utils/session_stats.py)
+# С опцией --browser-daemon пул подключается к браузеру, который живёт между запусками pytest
+# (tests/utils/browser_daemon.py), и запускает браузер локально, только если подключиться не удалось.
+# С опцией --browser-grid браузер не запускается локально: контексты создаются на узлах сетки серверов
+# Playwright (tests/utils/browser_grid.py), на наименее загруженном узле.
+
+import time
+import logging
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики, в который пишутся замеры пула
+STATS_SECTION = "browser_pool"
+
+
+# Класс хранит "тёплый" браузер воркера и выдаёт из него новые контексты
+class BrowserPool:
+    def __init__(self, playwright, daemon=None, grid=None, **launch_options):
+        self.playwright = playwright  # Объект Playwright из фикстуры playwright
+        self.daemon = daemon  # BrowserDaemon, если браузер общий для запусков pytest (иначе None)
+        self.grid = grid  # BrowserGrid, если браузеры работают на удалённых серверах (иначе None)
+        self.launch_options = launch_options  # Параметры запуска, например headless=True
+        self.browser = None  # Текущий экземпляр браузера (запускается лениво)
+        self.daemon_connected = False  # Подключён ли пул к браузеру-демону (а не к локальному браузеру)
+        self.contexts = set()  # Открытые контексты, созданные этим пулом
+
+    # Запускает новый экземпляр браузера и замеряет время запуска
+    def _launch(self):
+        if self.grid is not None:
+            self.browser = self.grid.acquire()  # Подключения к узлам принадлежат сетке
+            return self.browser
+        if self.daemon is not None and self._connect_daemon():
+            return self.browser
+        self.daemon_connected = False
+        started = time.perf_counter()
+        self.browser = self.playwright.chromium.launch(**self.launch_options)
+        elapsed = time.perf_counter() - started
+        stats.count(STATS_SECTION, "launches")
+        stats.timing(STATS_SECTION, "launch", elapsed)
+        logger.info("Browser launched in %.3fs", elapsed)
+        return self.browser
+
+    # Подключается к браузеру-демону (если он не отвечает — перезапускает его); False, если не удалось
+    def _connect_daemon(self):
+        started = time.perf_counter()
+        try:
+            endpoint = self.daemon.endpoint() or self.daemon.ensure(lambda: self.playwright.chromium.executable_path)
+            self.browser = self.playwright.chromium.connect_over_cdp(endpoint)
+        except (PlaywrightError, RuntimeError, TimeoutError) as e:
+            logger.warning("Could not connect to browser daemon, launching a local browser: %s", e)
+            stats.count(STATS_SECTION, "daemon unavailable (local launch)")
+            return False
+        elapsed = time.perf_counter() - started
+        self.daemon_connected = True
+        self.daemon.register_owner()  # Пока воркер жив, его страницы не закроет очистка другого запуска
+        stats.count(STATS_SECTION, "daemon connects")
+        stats.timing(STATS_SECTION, "daemon connect", elapsed)
+        logger.info("Connected to browser daemon %s in %.3fs", endpoint, elapsed)
+        return True
+
+    # Проверяет, что браузер запущен и соединение с ним не потеряно
+    def is_healthy(self):
+        return self.browser is not None and self.browser.is_connected()
+
+    # Перезапускает браузер (закрывает старый экземпляр, если он ещё жив)
+    def restart(self, reason="unhealthy"):
+        logger.warning("Restarting browser: %s", reason)
+        stats.count(STATS_SECTION, f"restarts ({reason})")
+        self.close()
+        return self._launch()
+
+    # Возвращает рабочий браузер, при необходимости запуская или перезапуская его
+    def acquire(self):
+        if self.browser is None:
+            return self._launch()
+        if not self.is_healthy():
+            return self.restart("disconnected")
+        return self.browser
+
+    # Создаёт новый изолированный контекст; если браузер не отвечает, перезапускает его и повторяет попытку
+    def new_context(self, **context_options):
+        browser = self.acquire()
+        started = time.perf_counter()
+        try:
+            # Сетка сама выбирает наименее загруженный узел и повторяет попытку на другом узле при отказе
+            context = (self.grid or browser).new_context(**context_options)
+        except PlaywrightError as e:
+            logger.error("Failed to create browser context: %s", e)
+            browser = self.restart("new_context failed")
+            started = time.perf_counter()
+            context = (self.grid or browser).new_context(**context_options)
+        stats.count(STATS_SECTION, "contexts")
+        stats.timing(STATS_SECTION, "new_context", time.perf_counter() - started)
+        self.contexts.add(context)
+        context.on("close", lambda _: self.contexts.discard(context))
+        if self.daemon_connected:
+            context.on("page", self._track_page)
+        return context
+
+    # Записывает страницу в файл владельца браузера-демона (id цели CDP берётся у самой страницы)
+    def _track_page(self, page):
+        try:
+            session = page.context.new_cdp_session(page)
+            target_id = session.send("Target.getTargetInfo")["targetInfo"]["targetId"]
+            session.detach()
+        except PlaywrightError as e:
+            logger.warning("Failed to get CDP target of a page: %s", e)
+            return
+        self.daemon.add_target(target_id)
+        page.on("close", lambda _: self.daemon.remove_target(target_id))
+
+    # Закрывает контексты, оставшиеся открытыми после теста, чтобы они не копились в общем браузере
+    # Закрываются только свои контексты: к браузеру-демону одновременно подключены и другие воркеры
+    def release(self):
+        if not self.is_healthy():
+            self.contexts.clear()
+            return
+        for context in list(self.contexts):
+            self.contexts.discard(context)
+            stats.count(STATS_SECTION, "leaked contexts closed")
+            try:
+                context.close()
+            except PlaywrightError as e:
+                logger.warning("Failed to close leaked context: %s", e)
+
+    # Закрывает браузер и замеряет время закрытия
+    # Браузер-демон при этом не закрывается: Playwright только закрывает свои контексты и отключается
+    def close(self):
+        if self.browser is None:
+            return
+        if self.grid is not None:
+            self.browser = None  # От узлов отключается сама сетка (BrowserGrid.close) в конце сессии
+            return
+        started = time.perf_counter()
+        try:
+            self.browser.close()
+        except PlaywrightError as e:
+            logger.warning("Failed to close browser: %s", e)
+        stats.timing(STATS_SECTION, "teardown", time.perf_counter() - started)
+        self.browser = None
+        if self.daemon_connected:
+            self.daemon.unregister_owner()
+            self.daemon_connected = False
+
+
+# Возвращает строку с оценкой сэкономленного времени: сколько стоил бы запуск браузера на каждый тест
+def savings_line(session_stats):
+    launches = session_stats.timings.get(STATS_SECTION, {}).get("launch", [])
+    contexts = session_stats.counters.get(STATS_SECTION, {}).get("contexts", 0)
+    if not launches or contexts <= len(launches):
+        return None
+    avg_launch = sum(launches) / len(launches)
+    teardowns = session_stats.timings.get(STATS_SECTION, {}).get("teardown", [])
+    avg_teardown = sum(teardowns) / len(teardowns) if teardowns else 0.0
+    saved = (contexts - len(launches)) * (avg_launch + avg_teardown)
+    return (
+        f"  estimated launch time saved: {saved:.1f}s "
+        f"({contexts} contexts served by {len(launches)} browser launches)"
+    )
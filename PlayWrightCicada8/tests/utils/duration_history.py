@@ -0,0 +1,129 @@
+# Утилита для хранения длительности тестов между запусками (SQLite)
+# Для каждого теста хранится сглаженная длительность (экспоненциальное среднее по прошлым запускам).
+# По ней планировщик pytest-xdist (duration_scheduler.py) раздаёт тесты воркерам: сначала самые долгие.
+# Для тестов без истории длительность оценивается по соседним тестам того же файла или по всем тестам.
+
+import os
+import time
+import heapq
+import sqlite3
+import logging
+import statistics
+from contextlib import contextmanager
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Вес последнего запуска в сглаженной длительности
+SMOOTHING = 0.5
+
+
+# Класс читает и обновляет историю длительностей тестов
+class DurationHistory:
+    def __init__(self, path, default_duration=5.0):
+        self.path = path  # Файл базы SQLite
+        self.default_duration = default_duration  # Оценка, если истории нет совсем
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS durations ("
+                "nodeid TEXT PRIMARY KEY, duration REAL NOT NULL, runs INTEGER NOT NULL, updated REAL NOT NULL)"
+            )
+
+    # Открывает соединение: изменения фиксируются при выходе из блока, соединение закрывается
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    # Возвращает словарь {nodeid: сглаженная длительность} для всех известных тестов
+    def load(self):
+        with self._connect() as db:
+            return dict(db.execute("SELECT nodeid, duration FROM durations"))
+
+    # Сохраняет длительности тестов этого запуска {nodeid: секунды}
+    def update(self, durations):
+        known = self.load()
+        now = time.time()
+        rows = []
+        for nodeid, duration in durations.items():
+            previous = known.get(nodeid)
+            smoothed = duration if previous is None else SMOOTHING * duration + (1 - SMOOTHING) * previous
+            rows.append((nodeid, smoothed, now))
+        with self._connect() as db:
+            db.executemany(
+                "INSERT INTO durations (nodeid, duration, runs, updated) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(nodeid) DO UPDATE SET duration = excluded.duration, runs = runs + 1, "
+                "updated = excluded.updated",
+                rows,
+            )
+        logger.info("Saved durations of %s tests to %s", len(rows), self.path)
+
+    # Возвращает ожидаемую длительность каждого теста из списка (в том же порядке)
+    # Новый тест получает медиану тестов своего файла, иначе медиану всех известных тестов
+    def predict(self, nodeids):
+        known = self.load()
+        by_file = {}
+        for nodeid, duration in known.items():
+            by_file.setdefault(nodeid.split("::")[0], []).append(duration)
+        overall = statistics.median(known.values()) if known else self.default_duration
+        predictions = []
+        for nodeid in nodeids:
+            if nodeid in known:
+                predictions.append(known[nodeid])
+            else:
+                siblings = by_file.get(nodeid.split("::")[0])
+                predictions.append(statistics.median(siblings) if siblings else overall)
+        return predictions
+
+
+# Функция оценивает время до завершения последнего воркера (makespan), если тесты раздаются
+# по порядку списка первому освободившемуся воркеру
+def simulate_makespan(durations, workers):
+    finish_times = [0.0] * max(workers, 1)
+    for duration in durations:
+        earliest = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, earliest + duration)
+    return max(finish_times)
+
+
+# Плагин pytest: собирает длительности тестов этого запуска, сохраняет их в историю
+# и выводит сравнение ожидаемого и фактического времени работы воркеров
+# Регистрируется только в контроллере xdist (или в единственном процессе): отчёты всех воркеров приходят туда
+class DurationRecorder:
+    def __init__(self, history):
+        self.history = history
+        self.durations = {}  # Длительность тестов этого запуска (setup + call + teardown)
+        self.worker_busy = {}  # Суммарное время тестов по воркерам
+        self.scheduler = None  # DurationScheduling, если тесты раздавал он
+        self.finished = None  # Время получения последнего отчёта
+
+    def pytest_runtest_logreport(self, report):
+        self.durations[report.nodeid] = self.durations.get(report.nodeid, 0.0) + report.duration
+        node = getattr(report, "node", None)  # У отчётов от воркеров xdist есть ссылка на воркер
+        worker = node.gateway.id if node is not None else "main"
+        self.worker_busy[worker] = self.worker_busy.get(worker, 0.0) + report.duration
+        self.finished = time.monotonic()
+
+    def pytest_sessionfinish(self):
+        if self.durations:
+            self.history.update(self.durations)
+
+    # Возвращает строки сравнения прогноза и факта (пусто, если тесты раздавал стандартный планировщик)
+    def summary_lines(self):
+        scheduler = self.scheduler
+        if scheduler is None or scheduler.predicted_makespan is None or not self.worker_busy:
+            return []
+        lines = [
+            f"predicted makespan: {scheduler.predicted_makespan:.1f}s longest-first, "
+            f"{scheduler.collection_order_makespan:.1f}s in collection order",
+            f"actual: busiest worker {max(self.worker_busy.values()):.1f}s, "
+            f"wall {self.finished - scheduler.started:.1f}s",
+        ]
+        for worker, busy in sorted(self.worker_busy.items()):
+            lines.append(f"  {worker}: {busy:.1f}s")
+        return lines
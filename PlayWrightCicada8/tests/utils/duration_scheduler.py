@@ -0,0 +1,86 @@
+# Планировщик pytest-xdist с учётом длительности тестов
+# Тесты раздаются в порядке убывания ожидаемой длительности (LPT — longest processing time first):
+# долгие тесты (например, test_password_recovery) стартуют первыми, а короткие заполняют хвост,
+# поэтому воркеры заканчивают примерно одновременно. Воркер получает следующий тест, когда освобождается
+# (xdist держит у воркера два теста: выполняемый и следующий). Ожидаемые длительности берутся
+# из истории прошлых запусков (duration_history.py).
+# Подключается хуком pytest_xdist_make_scheduler в conftest.py.
+# Планировщик опирается на внутренние атрибуты LoadScheduling (_send_tests, node2pending,
+# _check_nodes_have_same_collection), поэтому включается только с проверенной версией pytest-xdist (3.x);
+# с другой версией тесты раздаёт стандартный LoadScheduling.
+
+import time
+from itertools import cycle
+
+import xdist
+from xdist.scheduler import LoadScheduling
+
+from tests.utils.duration_history import simulate_makespan
+
+
+# Сколько тестов одновременно назначено воркеру (минимум для xdist — 2)
+TESTS_PER_NODE = 2
+
+# Основная версия pytest-xdist, с внутренними атрибутами которой проверен планировщик
+SUPPORTED_XDIST_MAJOR = "3"
+
+# Внутренние методы LoadScheduling, которые использует планировщик
+REQUIRED_METHODS = ("_send_tests", "_check_nodes_have_same_collection")
+
+
+# Функция проверяет, что планировщик совместим с установленным pytest-xdist
+def xdist_supported(version=None):
+    version = version or xdist.__version__
+    return version.split(".")[0] == SUPPORTED_XDIST_MAJOR and all(
+        callable(getattr(LoadScheduling, name, None)) for name in REQUIRED_METHODS
+    )
+
+
+# Класс планировщика: наследует LoadScheduling и меняет только порядок и размер выдачи тестов
+class DurationScheduling(LoadScheduling):
+    def __init__(self, config, log=None, history=None):
+        super().__init__(config, log)
+        self.history = history  # История длительностей (DurationHistory)
+        self.predicted = {}  # Ожидаемая длительность по nodeid
+        self.predicted_makespan = None  # Ожидаемый makespan при раздаче в порядке LPT
+        self.collection_order_makespan = None  # Ожидаемый makespan при раздаче в порядке сбора
+        self.started = None  # Время начала раздачи тестов
+
+    def schedule(self):
+        assert self.collection_is_completed
+        if self.collection is not None:
+            for node in self.nodes:
+                self.check_schedule(node)
+            return
+        if not self._check_nodes_have_same_collection():
+            self.log("**Different tests collected, aborting run**")
+            return
+
+        self.collection = next(iter(self.node2collection.values()))
+        if not self.collection:
+            return
+        durations = self.history.predict(self.collection)
+        self.predicted = dict(zip(self.collection, durations))
+        self.pending[:] = sorted(range(len(self.collection)), key=lambda index: durations[index], reverse=True)
+        self.predicted_makespan = simulate_makespan([durations[index] for index in self.pending], len(self.nodes))
+        self.collection_order_makespan = simulate_makespan(durations, len(self.nodes))
+        self.started = time.monotonic()
+
+        # Самые долгие тесты — первыми на каждый воркер, по кругу
+        nodes = cycle(self.nodes)
+        for _ in range(min(len(self.pending), TESTS_PER_NODE * len(self.nodes))):
+            self._send_tests(next(nodes), 1)
+        if not self.pending:
+            for node in self.nodes:
+                node.shutdown()
+
+    # Воркер получает очередной самый долгий тест, как только у него освобождается место
+    def check_schedule(self, node, duration=0):
+        if node.shutting_down:
+            return
+        if self.pending:
+            free = TESTS_PER_NODE - len(self.node2pending[node])
+            if free > 0:
+                self._send_tests(node, free)
+        else:
+            node.shutdown()
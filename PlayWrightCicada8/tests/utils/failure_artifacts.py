@@ -0,0 +1,156 @@
+# Утилита для сбора артефактов упавших тестов
+# Вместо try/except со скриншотом в каждом шаге теста артефакты собираются в одном месте — хуком
+# pytest_runtest_makereport (conftest.py) и только при падении теста:
+# - скриншот каждой открытой страницы (PNG);
+# - DOM страницы (HTML, сжатый gzip);
+# - последние сообщения консоли браузера и последние ответы/ошибки сети (JSON, сжатый gzip).
+# В потоке теста выполняется только то, что требует Playwright (скриншот и page.content()),
+# а сжатие и запись на диск идут в фоновом потоке. Файлы лежат в каталоге
+# <artifacts_dir>/<запуск>/<воркер>/<тест>/, поэтому параллельные воркеры не перезаписывают друг друга.
+# Суммарный размер артефактов за запуск ограничен (делится поровну между воркерами).
+
+import os
+import gzip
+import json
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+from tests.utils.file_lock import atomic_write
+from tests.utils.node_names import worker_id, safe_node_name
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики для артефактов
+STATS_SECTION = "failure artifacts"
+
+# Сколько последних сообщений консоли и сетевых событий хранится для каждого контекста
+LOG_LIMIT = 200
+
+
+# Класс хранит последние сообщения консоли и сетевые события одного контекста
+class ContextLog:
+    def __init__(self, context):
+        self.console = deque(maxlen=LOG_LIMIT)
+        self.network = deque(maxlen=LOG_LIMIT)
+        context.on("console", self._on_console)
+        context.on("response", self._on_response)
+        context.on("requestfailed", self._on_request_failed)
+
+    # Снимает обработчики: контекст из пула страниц (--page-pool) живёт дольше теста
+    def detach(self, context):
+        context.remove_listener("console", self._on_console)
+        context.remove_listener("response", self._on_response)
+        context.remove_listener("requestfailed", self._on_request_failed)
+
+    # В обработчиках используются только свойства событий: они не требуют обращений к браузеру
+    def _on_console(self, message):
+        self.console.append({"time": time.time(), "type": message.type, "text": message.text})
+
+    def _on_response(self, response):
+        self.network.append({
+            "time": time.time(), "method": response.request.method, "url": response.url, "status": response.status,
+        })
+
+    def _on_request_failed(self, request):
+        self.network.append({
+            "time": time.time(), "method": request.method, "url": request.url, "failure": request.failure,
+        })
+
+
+# Класс собирает артефакты при падении теста и записывает их в фоновом потоке
+class ArtifactCollector:
+    def __init__(self, root_dir, max_bytes):
+        self.root_dir = root_dir  # Каталог артефактов этого запуска
+        # Лимит размера делится между воркерами, чтобы не согласовывать его через общий файл
+        workers = int(os.getenv("PYTEST_XDIST_WORKER_COUNT", "1"))
+        self.budget = max_bytes // max(workers, 1)
+        self.written = 0  # Сколько байт уже записано этим воркером
+        self.logs = {}  # Журналы консоли и сети по открытым контекстам
+        self._queue = queue.Queue()
+        self._thread = None
+
+    # Начинает запоминать консоль и сеть контекста
+    def watch(self, context):
+        self.logs[context] = ContextLog(context)
+
+    # Перестаёт следить за контекстом (вызывается перед его закрытием или возвратом в пул страниц)
+    def unwatch(self, context):
+        log = self.logs.pop(context, None)
+        if log is not None:
+            log.detach(context)
+
+    # Снимает артефакты всех открытых страниц упавшего теста и ставит их в очередь на запись
+    # Вызывается в потоке теста; when — фаза, в которой тест упал (setup или call)
+    def capture(self, nodeid, when):
+        started = time.perf_counter()
+        test_dir = os.path.join(self.root_dir, worker_id(), safe_node_name(nodeid))
+        for index, (context, log) in enumerate(list(self.logs.items())):
+            prefix = os.path.join(test_dir, f"{when}-{index}")
+            self._submit(f"{prefix}-console.json.gz", json.dumps(list(log.console), ensure_ascii=False), compress=True)
+            self._submit(f"{prefix}-network.json.gz", json.dumps(list(log.network), ensure_ascii=False), compress=True)
+            for number, page in enumerate(context.pages):
+                if page.is_closed():
+                    continue
+                try:
+                    screenshot = page.screenshot()
+                    html = page.content()
+                except Exception as e:
+                    # Страница могла упасть вместе с тестом — артефакты остальных страниц всё равно сохраняем
+                    logger.warning("Could not capture page %s: %s", page.url, e)
+                    continue
+                self._submit(f"{prefix}-page{number}.png", screenshot)
+                self._submit(f"{prefix}-page{number}.html.gz", html, compress=True)
+        if not self.logs:
+            return  # Тест не открывал браузер — снимать нечего
+        stats.timing(STATS_SECTION, "capture on test thread", time.perf_counter() - started)
+        stats.record(STATS_SECTION, {"test": nodeid, "when": when, "dir": test_dir})
+
+    # Ставит в очередь на запись готовый файл теста (например, трассировку Playwright); возвращает его путь
+    def add_file(self, nodeid, name, data):
+        path = os.path.join(self.root_dir, worker_id(), safe_node_name(nodeid), name)
+        self._submit(path, data)
+        return path
+
+    # Ставит файл в очередь фонового потока (поток запускается при первом падении)
+    def _submit(self, path, data, compress=False):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="failure-artifacts", daemon=True)
+            self._thread.start()
+        self._queue.put((path, data, compress))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+            except Exception as e:
+                logger.error("Failed to write artifact %s: %s", item[0], e)
+
+    def _write(self, path, data, compress):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if compress:
+            data = gzip.compress(data, compresslevel=6)
+        if self.written + len(data) > self.budget:
+            stats.count(STATS_SECTION, "skipped (size limit)")
+            logger.warning("Artifact size limit reached, skipping %s", path)
+            return
+        atomic_write(path, data)
+        self.written += len(data)
+        stats.count(STATS_SECTION, "files written")
+        stats.count(STATS_SECTION, "bytes written", len(data))
+
+    # Дожидается записи всех артефактов из очереди (вызывается в конце сессии)
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
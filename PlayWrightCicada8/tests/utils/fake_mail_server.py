@@ -0,0 +1,502 @@
+# Локальный тестовый почтовый сервер (SMTP + IMAP4) для запуска тестов без mail.cicada8.ru
+# SMTP-приёмник сохраняет письма в память, а IMAP-сервер отдаёт их так, что imap_utils
+# работает с ним без изменений (достаточно переменных окружения IMAP_HOST, IMAP_PORT, IMAP_SSL=0).
+# Поддерживается подмножество IMAP4rev1, которое нужно imap_utils: LOGIN, SELECT, SEARCH,
+# FETCH (RFC822, BODY[...], BODY.PEEK[...], BODYSTRUCTURE), STORE, IDLE, NOOP, LOGOUT и их UID-варианты.
+# Письма доступны сразу после доставки, а также через API в памяти (wait_for_message) без опроса.
+
+import re
+import uuid
+import select
+import logging
+import threading
+import socketserver
+from email import message_from_bytes, policy
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import getaddresses
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Отправитель и формат ссылки писем сброса пароля (совпадают с тем, что ожидает imap_utils)
+RESET_SENDER = "no-reply-dev@cicada8.ru"
+RESET_LINK_TEMPLATE = "https://cicada.develop.apt.lan/set-password/{token}/"
+
+
+# Класс письма в ящике: UID, флаги и исходные байты
+class StoredMessage:
+    def __init__(self, uid, raw):
+        self.uid = uid
+        self.raw = raw
+        self.flags = set()
+        self.message = message_from_bytes(raw, policy=policy.compat32)
+
+
+# Класс почтового ящика одного пользователя
+class Mailbox:
+    def __init__(self):
+        self.messages = []
+        self.uid_next = 1
+
+
+# Класс хранилища писем в памяти; доставка будит всех, кто ждёт новые письма
+class MailStore:
+    def __init__(self):
+        self.mailboxes = {}  # {адрес: Mailbox}
+        self.changed = threading.Condition()
+
+    # Возвращает ящик пользователя, создавая его при первом обращении
+    def mailbox(self, address):
+        return self.mailboxes.setdefault(address.lower(), Mailbox())
+
+    # Доставляет письмо всем получателям и уведомляет ожидающих
+    def deliver(self, raw, recipients):
+        with self.changed:
+            for recipient in recipients:
+                mailbox = self.mailbox(recipient)
+                mailbox.messages.append(StoredMessage(mailbox.uid_next, raw))
+                mailbox.uid_next += 1
+            self.changed.notify_all()
+        logger.info("Delivered message to %s", ', '.join(recipients))
+
+    # Возвращает копию списка писем пользователя
+    def messages(self, address):
+        with self.changed:
+            return list(self.mailbox(address).messages)
+
+    # Ждёт письмо, удовлетворяющее условию predicate(StoredMessage), без опроса (на Condition)
+    def wait_for_message(self, address, predicate=lambda message: True, timeout=10):
+        with self.changed:
+            found = self.changed.wait_for(
+                lambda: next((m for m in self.mailbox(address).messages if predicate(m)), None),
+                timeout=timeout,
+            )
+        if found is None:
+            raise TimeoutError(f"No matching message for {address} within {timeout}s")
+        return found
+
+
+# Обработчик SMTP-сессии: принимает письма и кладёт их в хранилище
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("utf-8") + b"\r\n")
+
+    def handle(self):
+        store = self.server.store
+        self.reply("220 localhost fake SMTP ready")
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", errors="ignore").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, recipients = command.split(":", 1)[1].strip(" <>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command.split(":", 1)[1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b".\n", b""):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                store.deliver(b"".join(lines), recipients)
+                logger.info("SMTP message from %s accepted", sender)
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+# Функция разбирает множество номеров IMAP ("1:*", "3", "1,4:6") в функцию-проверку
+def _parse_sequence_set(text, maximum):
+    ranges = []
+    for chunk in text.split(","):
+        start, _, end = chunk.partition(":")
+        start = maximum if start == "*" else int(start)
+        end = start if not end else (maximum if end == "*" else int(end))
+        ranges.append((min(start, end), max(start, end)))
+    return lambda value: any(low <= value <= high for low, high in ranges)
+
+
+# Функция разбивает аргументы команды на токены с учётом кавычек, скобок и квадратных скобок
+def _tokenize(text):
+    tokens, current, depth, quoted = [], "", 0, False
+    for char in text:
+        if quoted:
+            current += char
+            if char == '"':
+                quoted = False
+            continue
+        if char == '"':
+            quoted = True
+            current += char
+        elif char in "([":
+            depth += 1
+            current += char
+        elif char in ")]":
+            depth -= 1
+            current += char
+        elif char == " " and depth == 0:
+            if current:
+                tokens.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+# Функция превращает строку в IMAP-строку в кавычках (или NIL)
+def _quote(value):
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+# Функция строит BODYSTRUCTURE для письма или его части
+def _bodystructure(part):
+    if part.is_multipart():
+        children = "".join(_bodystructure(child) for child in part.get_payload())
+        return f"({children} {_quote(part.get_content_subtype().upper())})"
+    maintype, subtype = part.get_content_maintype(), part.get_content_subtype()
+    params = " ".join(f"{_quote(key.upper())} {_quote(value)}" for key, value in part.get_params()[1:]) \
+        if part.get_params() and len(part.get_params()) > 1 else ""
+    encoding = (part.get("Content-Transfer-Encoding") or "7bit").upper()
+    payload = part.get_payload()
+    size = len(payload.encode("utf-8")) if isinstance(payload, str) else 0
+    structure = (f"{_quote(maintype.upper())} {_quote(subtype.upper())} "
+                 f"{f'({params})' if params else 'NIL'} NIL NIL {_quote(encoding)} {size}")
+    if maintype == "text":
+        structure += f" {payload.count(chr(10)) + 1 if isinstance(payload, str) else 0}"
+    return f"({structure})"
+
+
+# Функция отделяет заголовки сообщения от тела в исходных байтах
+def _split_raw(raw):
+    for separator in (b"\r\n\r\n", b"\n\n"):
+        position = raw.find(separator)
+        if position >= 0:
+            return raw[:position + len(separator)], raw[position + len(separator):]
+    return raw, b""
+
+
+# Функция возвращает содержимое секции BODY[...] письма
+def _section(stored, section):
+    headers, text = _split_raw(stored.raw)
+    upper = section.upper()
+    if upper == "":
+        return stored.raw
+    if upper == "HEADER":
+        return headers
+    if upper == "TEXT":
+        return text
+    match = re.match(r"HEADER\.FIELDS(\.NOT)?\s*\((.*)\)", upper)
+    if match:
+        names = set(match.group(2).split())
+        keep = (lambda name: name not in names) if match.group(1) else (lambda name: name in names)
+        lines = [f"{name}: {value}" for name, value in stored.message.items() if keep(name.upper())]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8")
+    # Номер части: "1", "1.2", "1.MIME"
+    is_mime = upper.endswith(".MIME")
+    path = upper[:-len(".MIME")] if is_mime else upper
+    part = stored.message
+    for number in path.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(number) - 1]
+        elif number != "1":
+            return b""
+    if is_mime:
+        return ("\r\n".join(f"{name}: {value}" for name, value in part.items()) + "\r\n\r\n").encode("utf-8")
+    payload = part.get_payload()
+    return payload.encode("utf-8") if isinstance(payload, str) else b""
+
+
+# Обработчик IMAP-сессии
+class _IMAPHandler(socketserver.StreamRequestHandler):
+    def send(self, data):
+        self.wfile.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+
+    def handle(self):
+        self.user = None
+        self.mailbox = None
+        self.send("* OK [CAPABILITY IMAP4rev1 IDLE] fake IMAP ready\r\n")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            parts = line.decode("utf-8", errors="ignore").rstrip("\r\n").split(" ", 2)
+            if len(parts) < 2:
+                self.send("* BAD empty command\r\n")
+                continue
+            tag, command = parts[0], parts[1].upper()
+            args = parts[2] if len(parts) > 2 else ""
+            use_uid = False
+            if command == "UID":
+                use_uid = True
+                command, _, args = args.partition(" ")
+                command = command.upper()
+            handler = getattr(self, f"do_{command.lower()}", None)
+            if handler is None:
+                self.send(f"{tag} BAD unknown command {command}\r\n")
+                continue
+            try:
+                if handler(tag, args, use_uid) is False:
+                    return
+            except Exception as e:  # Ошибка в обработке команды не должна ронять сервер
+                logger.error("Fake IMAP failed on %s: %s", command, e)
+                self.send(f"{tag} BAD {e}\r\n")
+
+    def do_capability(self, tag, args, use_uid):
+        self.send(f"* CAPABILITY IMAP4rev1 IDLE\r\n{tag} OK CAPABILITY completed\r\n")
+
+    def do_noop(self, tag, args, use_uid):
+        self.send(f"{tag} OK NOOP completed\r\n")
+
+    def do_login(self, tag, args, use_uid):
+        user, password = [token.strip('"') for token in _tokenize(args)[:2]]
+        expected = self.server.passwords.get(user.lower())
+        if expected is not None and expected != password:
+            self.send(f"{tag} NO [AUTHENTICATIONFAILED] Invalid credentials\r\n")
+            return
+        self.user = user
+        self.send(f"{tag} OK LOGIN completed\r\n")
+
+    def do_logout(self, tag, args, use_uid):
+        self.send(f"* BYE logging out\r\n{tag} OK LOGOUT completed\r\n")
+        return False
+
+    def do_select(self, tag, args, use_uid):
+        if self.user is None:
+            self.send(f"{tag} NO not authenticated\r\n")
+            return
+        self.mailbox = self.server.store.mailbox(self.user)
+        with self.server.store.changed:
+            messages = list(self.mailbox.messages)
+            uid_next = self.mailbox.uid_next
+        unseen = len([m for m in messages if "\\Seen" not in m.flags])
+        self.send(
+            f"* {len(messages)} EXISTS\r\n* 0 RECENT\r\n* OK [UNSEEN {unseen}]\r\n"
+            f"* OK [UIDVALIDITY 1]\r\n* OK [UIDNEXT {uid_next}]\r\n"
+            "* FLAGS (\\Seen \\Deleted)\r\n"
+            f"{tag} OK [READ-WRITE] SELECT completed\r\n"
+        )
+
+    do_examine = do_select
+
+    # Возвращает пары (номер, письмо) для множества номеров или UID
+    def _resolve(self, sequence, use_uid):
+        messages = self.server.store.messages(self.user)
+        if not messages:
+            return []
+        if use_uid:
+            matches = _parse_sequence_set(sequence, messages[-1].uid)
+            return [(index, m) for index, m in enumerate(messages, start=1) if matches(m.uid)]
+        matches = _parse_sequence_set(sequence, len(messages))
+        return [(index, m) for index, m in enumerate(messages, start=1) if matches(index)]
+
+    def do_search(self, tag, args, use_uid):
+        tokens = _tokenize(args)
+        messages = self.server.store.messages(self.user)
+        result = []
+        for index, stored in enumerate(messages, start=1):
+            if self._matches(stored, index, tokens, messages):
+                result.append(str(stored.uid if use_uid else index))
+        self.send(f"* SEARCH {' '.join(result)}\r\n{tag} OK SEARCH completed\r\n".replace("SEARCH \r\n", "SEARCH\r\n"))
+
+    # Проверяет письмо на соответствие критериям SEARCH
+    def _matches(self, stored, index, tokens, messages):
+        position = 0
+        while position < len(tokens):
+            key = tokens[position].upper()
+            if key == "CHARSET":
+                position += 2
+                continue
+            if key == "ALL":
+                pass
+            elif key == "UNSEEN" and "\\Seen" in stored.flags:
+                return False
+            elif key == "SEEN" and "\\Seen" not in stored.flags:
+                return False
+            elif key in ("FROM", "TO", "SUBJECT"):
+                position += 1
+                needle = tokens[position].strip('"').lower()
+                if needle not in (stored.message.get(key) or "").lower():
+                    return False
+            elif key == "UID":
+                position += 1
+                if not _parse_sequence_set(tokens[position], messages[-1].uid)(stored.uid):
+                    return False
+            elif re.match(r"^[\d*:,]+$", key):
+                if not _parse_sequence_set(key, len(messages))(index):
+                    return False
+            position += 1
+        return True
+
+    def do_fetch(self, tag, args, use_uid):
+        sequence, _, items = args.partition(" ")
+        items = items.strip()
+        if items.startswith("(") and items.endswith(")"):
+            items = items[1:-1]
+        names = _tokenize(items)
+        for index, stored in self._resolve(sequence, use_uid):
+            chunks = [f"UID {stored.uid}"] if use_uid else []
+            literals = []
+            for name in names:
+                upper = name.upper()
+                if upper == "UID":
+                    if not use_uid:
+                        chunks.append(f"UID {stored.uid}")
+                elif upper == "FLAGS":
+                    chunks.append(f"FLAGS ({' '.join(sorted(stored.flags))})")
+                elif upper == "BODYSTRUCTURE":
+                    chunks.append(f"BODYSTRUCTURE {_bodystructure(stored.message)}")
+                elif upper in ("RFC822", "RFC822.HEADER", "RFC822.TEXT"):
+                    section = {"RFC822": "", "RFC822.HEADER": "HEADER", "RFC822.TEXT": "TEXT"}[upper]
+                    literals.append((upper, _section(stored, section)))
+                    if upper != "RFC822.HEADER":
+                        stored.flags.add("\\Seen")
+                elif upper.startswith("BODY"):
+                    section = name[name.index("[") + 1:name.rindex("]")]
+                    literals.append((f"BODY[{section}]", _section(stored, section)))
+                    if not upper.startswith("BODY.PEEK"):
+                        stored.flags.add("\\Seen")
+            # Литералы отправляются после атомарных элементов: imaplib умеет читать несколько литералов подряд
+            head = f"* {index} FETCH ({' '.join(chunks)}"
+            if not literals:
+                self.send(head + ")\r\n")
+                continue
+            data = head.encode("utf-8")
+            for number, (name, payload) in enumerate(literals):
+                data += f"{' ' if chunks or number else ''}{name} {{{len(payload)}}}\r\n".encode("utf-8") + payload
+            self.send(data + b")\r\n")
+        self.send(f"{tag} OK FETCH completed\r\n")
+
+    def do_store(self, tag, args, use_uid):
+        sequence, mode, flags = _tokenize(args)[:3]
+        flag_set = set(flags.strip("()").split())
+        for index, stored in self._resolve(sequence, use_uid):
+            if mode.upper().startswith("-"):
+                stored.flags -= flag_set
+            elif mode.upper().startswith("+"):
+                stored.flags |= flag_set
+            else:
+                stored.flags = set(flag_set)
+            if ".SILENT" not in mode.upper():
+                self.send(f"* {index} FETCH (FLAGS ({' '.join(sorted(stored.flags))}))\r\n")
+        self.send(f"{tag} OK STORE completed\r\n")
+
+    # IDLE: сообщаем клиенту о новых письмах (* N EXISTS), пока он не пришлёт DONE
+    def do_idle(self, tag, args, use_uid):
+        store = self.server.store
+        known = len(store.messages(self.user))
+        self.send("+ idling\r\n")
+        while True:
+            with store.changed:
+                store.changed.wait(timeout=0.05)
+                count = len(self.mailbox.messages)
+            if count > known:
+                known = count
+                self.send(f"* {count} EXISTS\r\n")
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            if readable:
+                line = self.rfile.readline()
+                if not line:
+                    return False
+                if line.strip().upper() == b"DONE":
+                    break
+        self.send(f"{tag} OK IDLE terminated\r\n")
+
+
+# Многопоточный TCP-сервер, который можно быстро перезапустить на том же порту
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+# Класс запускает SMTP и IMAP серверы в фоновых потоках текущего процесса
+class FakeMailServer:
+    def __init__(self, host="127.0.0.1", smtp_port=0, imap_port=0, passwords=None):
+        self.host = host
+        self.store = MailStore()
+        self.passwords = {k.lower(): v for k, v in (passwords or {}).items()}  # Пустой словарь — любой пароль подходит
+        self.smtp = _ThreadingServer((host, smtp_port), _SMTPHandler)
+        self.imap = _ThreadingServer((host, imap_port), _IMAPHandler)
+        for server in (self.smtp, self.imap):
+            server.store = self.store
+            server.passwords = self.passwords
+        self._threads = []
+
+    @property
+    def smtp_port(self):
+        return self.smtp.server_address[1]
+
+    @property
+    def imap_port(self):
+        return self.imap.server_address[1]
+
+    # Переменные окружения, с которыми imap_utils подключится к этому серверу
+    @property
+    def imap_env(self):
+        host = "127.0.0.1" if self.host == "0.0.0.0" else self.host  # К 0.0.0.0 подключаемся через localhost
+        return {"IMAP_HOST": host, "IMAP_PORT": str(self.imap_port), "IMAP_SSL": "0"}
+
+    def start(self):
+        for server in (self.smtp, self.imap):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Fake mail server started: SMTP %s:%s, IMAP %s:%s", self.host, self.smtp_port, self.host, self.imap_port)
+        return self
+
+    def stop(self):
+        for server in (self.smtp, self.imap):
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    # Доставляет готовое письмо (объект email.message или байты) напрямую в ящики получателей
+    def deliver(self, message, recipients=None):
+        raw = message if isinstance(message, bytes) else message.as_bytes()
+        if recipients is None:
+            parsed = message_from_bytes(raw)
+            recipients = [address for _, address in getaddresses(parsed.get_all("To", []))]
+        self.store.deliver(raw, recipients)
+
+    # Кладёт в ящик письмо сброса пароля в том же формате, что присылает Cicada8
+    # Возвращает ссылку сброса, которую должен найти imap_utils
+    def inject_reset_email(self, recipient, token=None, sender=RESET_SENDER, subject="Восстановление пароля"):
+        link = RESET_LINK_TEMPLATE.format(token=token or uuid.uuid4().hex)
+        message = MIMEMultipart("alternative")
+        message["From"] = sender
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.attach(MIMEText(f"Для смены пароля перейдите по ссылке: {link}", "plain", "utf-8"))
+        message.attach(MIMEText(f'<p>Для смены пароля перейдите по <a href="{link}">ссылке</a></p>', "html", "utf-8"))
+        self.deliver(message, [recipient])
+        return link
+
+    # Ждёт письмо для адресата в памяти (без опроса IMAP)
+    def wait_for_message(self, recipient, predicate=lambda message: True, timeout=10):
+        return self.store.wait_for_message(recipient, predicate, timeout)
+
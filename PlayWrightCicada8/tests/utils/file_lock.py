@@ -0,0 +1,119 @@
+# Утилита межпроцессной блокировки на основе lock-файла
+# Нужна, чтобы несколько воркеров pytest-xdist не выполняли одну и ту же работу одновременно
+# (например, не логинились все сразу, чтобы заполнить общий кэш).
+# Lock-файл создаётся атомарно (O_CREAT | O_EXCL), поэтому работает на Linux, macOS и Windows.
+# В lock-файл записывается метка владельца "<PID> <случайная строка>": блокировка снимается, только если
+# файл всё ещё принадлежит ей. Иначе владелец, работавший дольше stale_after, удалил бы блокировку, которую
+# после разрыва зависшей уже захватил другой процесс. Зависшая блокировка разрывается переименованием
+# (атомарно), и удаляется, только если это тот же файл, который признан зависшим.
+
+import os
+import time
+import uuid
+import logging
+import threading
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+
+# Класс-контекстный менеджер: with FileLock(path): ... — код внутри выполняется только одним процессом
+class FileLock:
+    def __init__(self, path, timeout=120, stale_after=300, poll_interval=0.05):
+        self.path = path  # Путь к lock-файлу
+        self.timeout = timeout  # Сколько секунд ждать освобождения блокировки
+        self.stale_after = stale_after  # Через сколько секунд блокировка считается "зависшей" (процесс-владелец упал)
+        self.poll_interval = poll_interval  # Пауза между попытками захвата
+        self.token = None  # Метка владельца в lock-файле, пока блокировка захвачена этим объектом
+
+    # Пытается один раз создать lock-файл; возвращает True, если блокировка захвачена
+    def try_acquire(self):
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            self._break_if_stale()
+            return False
+        token = f"{os.getpid()} {uuid.uuid4().hex}"
+        with os.fdopen(fd, "w") as f:
+            f.write(token)
+        self.token = token
+        return True
+
+    # Ждёт освобождения блокировки и захватывает её
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        while not self.try_acquire():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Could not acquire lock {self.path} within {self.timeout}s")
+            time.sleep(self.poll_interval)
+
+    # Освобождает блокировку, если lock-файл всё ещё принадлежит ей
+    def release(self):
+        token, self.token = self.token, None
+        if token is None:
+            return
+        if read_owner(self.path) != token:
+            logger.warning("Lock %s was broken as stale while held, leaving the new owner's lock", self.path)
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    # Удаляет lock-файл, если он старше stale_after (процесс, захвативший его, скорее всего завершился аварийно)
+    def _break_if_stale(self):
+        token = read_owner(self.path)
+        try:
+            age = time.time() - os.path.getmtime(self.path)
+        except FileNotFoundError:
+            return
+        if token is not None and age > self.stale_after and self.break_lock(token):
+            logger.warning("Broke stale lock %s (age %.0fs)", self.path, age)
+
+    # Разрывает чужую блокировку с меткой владельца token; возвращает True, если lock-файл удалён.
+    # Файл сначала атомарно переименовывается: если под этим именем уже лежит новая блокировка другого
+    # процесса (старую успели разорвать и захватить заново), она возвращается на место
+    def break_lock(self, token):
+        broken = f"{self.path}.{uuid.uuid4().hex}.broken"
+        try:
+            os.rename(self.path, broken)
+        except (FileNotFoundError, PermissionError):  # Уже разорвана или (Windows) файл открыт владельцем
+            return False
+        if read_owner(broken) == token:
+            os.remove(broken)
+            return True
+        try:
+            os.link(broken, self.path)  # Без замены: если блокировку уже захватили снова, она не затирается
+        except OSError:
+            pass
+        os.remove(broken)
+        return False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+# Функция возвращает метку владельца из lock-файла ("<PID> <случайная строка>") или None, если файла нет
+def read_owner(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# Атомарно записывает данные в файл: сначала во временный файл рядом, затем os.replace
+# Читатели никогда не увидят наполовину записанный файл
+def atomic_write(path, data, mode=0o644):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    flags = os.O_CREAT | os.O_TRUNC | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    fd = os.open(tmp_path, flags, mode)
+    with os.fdopen(fd, "wb") as f:
+        f.write(data if isinstance(data, bytes) else data.encode("utf-8"))
+    os.replace(tmp_path, path)
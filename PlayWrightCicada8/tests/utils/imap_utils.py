@@ -1,15 +1,32 @@
 # Утилита для работы с IMAP-почтой
-# Содержит функцию для получения ссылки сброса пароля из письма
+# Содержит функции для получения ссылки сброса пароля из письма
 # Используется в тестах восстановления пароля (например, test_password_recovery.py)
+# Есть два режима:
+# - опрос (get_reset_link_from_email без since_uid): SEARCH UNSEEN раз в delay секунд;
+# - ожидание по событию (get_mailbox_watermark + since_uid): запоминаем UID последнего письма
+#   до запроса сброса, затем ждём новые письма через IMAP IDLE и скачиваем только нужные части письма.
+# Если задан адрес брокера почты (переменная окружения MAIL_BROKER, опция --mail-broker), ожидание по событию
+# идёт через брокер (tests/utils/mail_broker.py): одно подключение IMAP на ящик для всех тестов и воркеров.
 
+import os
+import asyncio
 import imaplib
 import email
 from email.header import decode_header
+from email.utils import getaddresses
 import re
 import time
+import base64
+import quopri
+import select
+import socket
+import ssl
+import itertools
 from urllib.parse import unquote
 import logging
 
+from tests.utils.perf import timed
+
 # Создаем логгер для этого модуля
 logger = logging.getLogger(__name__)
 
@@ -21,20 +38,57 @@ def decode_email_subject(subject):
         return decoded.decode('utf-8', errors='ignore')
     return decoded
 
+# Адрес отправителя писем сброса пароля и шаблон ссылки сброса
+RESET_SENDER = "no-reply-dev@cicada8.ru"
+RESET_LINK_PATTERN = r'(https://cicada\.develop\.apt\.lan/set-password/[\w\-]+/)'
+
+# Сколько ждать ответ сервера на DONE после окончания IDLE, с
+IDLE_DONE_TIMEOUT = 5
+# Номера собственных тегов команды IDLE: строчные буквы не совпадают с тегами imaplib (заглавные буквы и цифры)
+_idle_tags = itertools.count(1)
+
+
+# Функция возвращает адрес IMAP-сервера: {"host", "port", "ssl"}
+# Адрес сервера можно переопределить переменными окружения IMAP_HOST, IMAP_PORT и IMAP_SSL
+# (например, чтобы работать с локальным тестовым почтовым сервером)
+def imap_server():
+    return {
+        "host": os.getenv("IMAP_HOST", "mail.cicada8.ru"),
+        "port": int(os.getenv("IMAP_PORT", "993")),
+        "ssl": os.getenv("IMAP_SSL", "1") != "0",
+    }
+
+
+# Функция подключается к IMAP-серверу и выбирает папку "Входящие"
+# server — результат imap_server() (по умолчанию берётся из переменных окружения этого процесса)
+def connect_to_mailbox(email_address, email_password, server=None):
+    server = server or imap_server()
+    host, port = server["host"], server["port"]
+    logger.info("Connecting to IMAP server %s:%s for %s", host, port, email_address)
+    mail = imaplib.IMAP4_SSL(host, port=port) if server["ssl"] else imaplib.IMAP4(host, port=port)
+    mail.login(email_address, email_password)
+    mail.select("inbox")  # Выбираем папку "Входящие"
+    return mail
+
+
 # Функция получает ссылку для сброса пароля из письма
 # Параметры: email_address (адрес почты), email_password (пароль для входа в почту)
 # max_attempts и delay управляют количеством попыток и задержкой между ними
-def get_reset_link_from_email(email_address, email_password, max_attempts=10, delay=5):
+# Если передан since_uid (результат get_mailbox_watermark), используется ожидание через IMAP IDLE
+# с общим дедлайном timeout вместо фиксированного числа попыток
+@timed("imap.get_reset_link", kind="wait")
+def get_reset_link_from_email(email_address, email_password, max_attempts=10, delay=5, since_uid=None, timeout=None):
+    if since_uid is not None:
+        return wait_for_reset_link(
+            email_address, email_password, since_uid, timeout=timeout or max_attempts * delay
+        )
     try:
         # Подключаемся к IMAP-серверу
-        logger.info(f"Connecting to IMAP server for {email_address}")
-        mail = imaplib.IMAP4_SSL("mail.cicada8.ru", port=993)
-        mail.login(email_address, email_password)
-        mail.select("inbox")  # Выбираем папку "Входящие"
+        mail = connect_to_mailbox(email_address, email_password)
 
         # Проверяем новые письма от info-dev@cicada8.ru
         for _ in range(max_attempts):
-            _, data = mail.search(None, 'FROM "no-reply-dev@cicada8.ru" UNSEEN')
+            _, data = mail.search(None, f'FROM "{RESET_SENDER}" UNSEEN')
             if data[0]:
                 # Берем последнее письмо
                 latest_email_id = data[0].split()[-1]
@@ -43,7 +97,7 @@ def get_reset_link_from_email(email_address, email_password, max_attempts=10, de
 
                 # Декодируем тему письма
                 subject = decode_email_subject(msg["subject"])
-                logger.info(f"Found email with subject: {subject}")
+                logger.info("Found email with subject: %s", subject)
 
                 # Извлекаем тело письма
                 body = None
@@ -60,11 +114,10 @@ def get_reset_link_from_email(email_address, email_password, max_attempts=10, de
                     raise Exception("No suitable body found in email")
 
                 # Ищем ссылку для сброса пароля
-                url_pattern = r'(https://cicada\.develop\.apt\.lan/set-password/[\w\-]+/)'
-                match = re.search(url_pattern, body)
+                match = re.search(RESET_LINK_PATTERN, body)
                 if match:
                     reset_link = unquote(match.group(0))
-                    logger.info(f"Extracted reset link: {reset_link}")
+                    logger.info("Extracted reset link: %s", reset_link)
                     mail.logout()  # Закрываем соединение
                     return reset_link
             logger.info("No email found, retrying...")
@@ -73,5 +126,271 @@ def get_reset_link_from_email(email_address, email_password, max_attempts=10, de
         mail.logout()
         raise Exception("No email with reset link found within timeout")
     except Exception as e:
-        logger.error(f"Failed to retrieve email: {str(e)}")
-        raise
\ No newline at end of file
+        logger.error("Failed to retrieve email: %s", e)
+        raise
+
+
+# Функция возвращает UID последнего письма в папке "Входящие"
+# Вызывается до запроса сброса пароля: все письма с большим UID считаются новыми
+@timed("imap.watermark", kind="work")
+def get_mailbox_watermark(email_address, email_password):
+    broker = os.getenv("MAIL_BROKER")
+    if broker:
+        from tests.utils import mail_broker  # Импорт здесь: mail_broker сам использует imap_utils
+        watermark = mail_broker.watermark(broker, email_address, email_password)
+        if watermark is not None:
+            return watermark
+    mail = connect_to_mailbox(email_address, email_password)
+    try:
+        watermark = mailbox_watermark(mail)
+        logger.info("Mailbox watermark for %s: UID %s", email_address, watermark)
+        return watermark
+    finally:
+        mail.logout()
+
+
+# Функция возвращает UID последнего письма в выбранной папке открытого подключения
+def mailbox_watermark(mail):
+    _, uidnext = mail.response("UIDNEXT")  # Сервер сообщает UIDNEXT в ответе на SELECT
+    if uidnext and uidnext[0]:
+        return int(uidnext[0]) - 1
+    _, data = mail.uid("SEARCH", None, "ALL")
+    uids = [int(uid) for uid in data[0].split()]
+    return max(uids) if uids else 0
+
+
+# Функция ждёт новое письмо со ссылкой сброса пароля (UID больше since_uid)
+# Новые письма ожидаются через IMAP IDLE: функция возвращается сразу после прихода письма,
+# а не после очередной паузы. timeout — общий дедлайн ожидания в секундах.
+@timed("imap.wait_for_reset_link", kind="wait")
+def wait_for_reset_link(email_address, email_password, since_uid, timeout=60, sender=RESET_SENDER):
+    broker = os.getenv("MAIL_BROKER")
+    if broker and sender == RESET_SENDER:
+        from tests.utils import mail_broker  # Импорт здесь: mail_broker сам использует imap_utils
+        reset_link = mail_broker.wait_for_link(broker, email_address, email_password, since_uid, timeout)
+        if reset_link is not None:
+            return reset_link
+    deadline = time.monotonic() + timeout
+    mail = connect_to_mailbox(email_address, email_password)
+    try:
+        checked = set()  # UID писем, которые уже проверены и не содержат ссылки
+        while True:
+            reset_link = _find_reset_link(mail, since_uid, sender, checked)
+            if reset_link:
+                return reset_link
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No email with reset link found within {timeout}s")
+            wait_for_new_mail(mail, remaining)
+    except Exception as e:
+        logger.error("Failed to retrieve email: %s", e)
+        raise
+    finally:
+        try:
+            mail.logout()  # Закрываем соединение
+        except Exception:
+            pass
+
+
+# Асинхронный вариант wait_for_reset_link для тестов на playwright.async_api
+# Ожидание выполняется в отдельном потоке, поэтому не блокирует цикл событий и другие страницы теста
+async def wait_for_reset_link_async(email_address, email_password, since_uid, timeout=60, sender=RESET_SENDER):
+    return await asyncio.to_thread(wait_for_reset_link, email_address, email_password, since_uid, timeout, sender)
+
+
+# Функция ищет среди писем с UID > since_uid письмо от sender со ссылкой сброса
+# Скачиваются только заголовки и одна текстовая часть письма (BODY.PEEK не помечает письмо прочитанным)
+def _find_reset_link(mail, since_uid, sender, checked):
+    _, data = mail.uid("SEARCH", None, f"UID {since_uid + 1}:*", f'FROM "{sender}"')
+    # Диапазон "n:*" всегда включает последнее письмо, даже если его UID меньше n, поэтому фильтруем
+    uids = [uid for uid in (int(u) for u in data[0].split()) if uid > since_uid and uid not in checked]
+    for uid in sorted(uids, reverse=True):  # Сначала самые новые письма
+        checked.add(uid)
+        reset_link = read_reset_email(mail, uid)["link"]
+        if reset_link:
+            return reset_link
+    return None
+
+
+# Функция читает письмо по UID: получателей, тему и ссылку сброса (None, если ссылки нет)
+# Скачиваются только заголовки и одна текстовая часть письма; письмо не помечается прочитанным
+def read_reset_email(mail, uid):
+    _, msg_data = mail.uid("FETCH", str(uid), "(BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM TO SUBJECT)])")
+    headers = email.message_from_bytes(_fetch_literal(msg_data))
+    subject = decode_email_subject(headers['subject'] or '')
+    logger.info("Found email with subject: %s", subject)
+    message = {
+        "uid": uid,
+        "recipients": [address.lower() for _, address in getaddresses(headers.get_all("to", []))],
+        "subject": subject,
+        "link": None,
+    }
+    part = _find_text_part(_fetch_bodystructure(msg_data))
+    if part is None:
+        logger.warning("No text part in email UID %s", uid)
+        return message
+    section, encoding, charset = part
+    _, part_data = mail.uid("FETCH", str(uid), f"(BODY.PEEK[{section}])")
+    match = re.search(RESET_LINK_PATTERN, _decode_part(_fetch_literal(part_data), encoding, charset))
+    if match:
+        message["link"] = unquote(match.group(0))
+        logger.info("Extracted reset link: %s", message["link"])
+    return message
+
+
+# Функция ждёт уведомление сервера о новом письме (IMAP IDLE, RFC 2177)
+# Если сервер не поддерживает IDLE или отказал в команде, просто делает короткую паузу перед следующим поиском
+# IDLE перевыпускается не реже раза в idle_interval секунд, чтобы не потерять соединение.
+# Ожидание ограничено timeout (плюс до IDLE_DONE_TIMEOUT на завершение команды); если сервер молчит,
+# выбрасывается imaplib.IMAP4.abort, и соединение нужно открыть заново.
+# Ответы читаются через буфер imaplib (mail.readline), поэтому данные после ответа на IDLE остаются imaplib
+def wait_for_new_mail(mail, timeout, idle_interval=25, poll_delay=1):
+    if "IDLE" not in mail.capabilities:
+        time.sleep(max(0, min(timeout, poll_delay)))
+        return
+    deadline = time.monotonic() + max(0, min(timeout, idle_interval))
+    tag = b"idle%d" % next(_idle_tags)
+    mail.send(tag + b" IDLE\r\n")
+    arrived = False
+    # Ждём подтверждение "+ idling"; вместо него сервер может сразу завершить команду (NO/BAD)
+    while True:
+        line = _read_line(mail, deadline)
+        if line is None:
+            raise imaplib.IMAP4.abort("IMAP server did not confirm IDLE")
+        if line.startswith(b"+"):
+            break
+        if line.startswith(tag + b" "):
+            logger.warning("IMAP server refused IDLE (%s), polling instead", line.decode("utf-8", errors="replace"))
+            time.sleep(max(0, min(poll_delay, deadline - time.monotonic())))
+            return
+        arrived = arrived or _is_exists(line)
+    # Ждём EXISTS или истечения времени; остальные уведомления не нужны (письма ищутся заново через SEARCH)
+    while not arrived:
+        line = _read_line(mail, deadline)
+        if line is None:
+            break
+        arrived = _is_exists(line)
+    if arrived:
+        logger.info("IMAP IDLE: new mail arrived")
+    # Завершаем IDLE и дочитываем ответ сервера до строки с нашим тегом
+    mail.send(b"DONE\r\n")
+    done_deadline = time.monotonic() + IDLE_DONE_TIMEOUT
+    while True:
+        line = _read_line(mail, done_deadline)
+        if line is None:
+            raise imaplib.IMAP4.abort("IMAP server did not finish IDLE")
+        if line.startswith(tag + b" "):
+            return
+
+
+# Функция проверяет, что строка — уведомление о новом письме (* N EXISTS)
+def _is_exists(line):
+    return line.startswith(b"* ") and line.upper().endswith(b" EXISTS")
+
+
+# Функция проверяет без ожидания, есть ли непрочитанные данные в буфере imaplib или в сокете
+def _has_pending_data(mail):
+    sock = mail.socket()
+    previous = sock.gettimeout()
+    sock.settimeout(0)  # peek возвращает буфер, а если он пуст — то, что уже пришло, не дожидаясь новых данных
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        sock.settimeout(previous)
+
+
+# Функция читает строку ответа сервера через imaplib; None — строка не пришла до deadline (time.monotonic)
+def _read_line(mail, deadline):
+    sock = mail.socket()
+    remaining = deadline - time.monotonic()
+    if not _has_pending_data(mail):
+        if remaining <= 0 or not select.select([sock], [], [], remaining)[0]:
+            return None
+    previous = sock.gettimeout()
+    sock.settimeout(max(remaining, 1))  # Начатая строка дочитывается, но не дольше оставшегося времени
+    try:
+        line = mail.readline()  # Конец соединения imaplib сам превращает в IMAP4.abort
+    except socket.timeout:
+        raise imaplib.IMAP4.abort("IMAP server sent an incomplete line")
+    finally:
+        sock.settimeout(previous)
+    return line.rstrip(b"\r\n")
+
+
+# Функция достаёт содержимое литерала (заголовков или части письма) из ответа FETCH
+def _fetch_literal(msg_data):
+    for item in msg_data:
+        if isinstance(item, tuple):
+            return item[1]
+    return b""
+
+
+# Функция достаёт текст BODYSTRUCTURE из ответа FETCH и разбирает его
+def _fetch_bodystructure(msg_data):
+    text = b" ".join(item[0] if isinstance(item, tuple) else item for item in msg_data if item)
+    position = text.find(b"BODYSTRUCTURE ")
+    if position < 0:
+        return None
+    tokens = re.findall(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()]+', text[position + len(b"BODYSTRUCTURE "):])
+    structure, _ = _parse_tokens(tokens, 0)
+    return structure
+
+
+# Функция превращает токены BODYSTRUCTURE во вложенные списки
+def _parse_tokens(tokens, index):
+    token = tokens[index]
+    if token == b"(":
+        items = []
+        index += 1
+        while tokens[index] != b")":
+            item, index = _parse_tokens(tokens, index)
+            items.append(item)
+        return items, index + 1
+    if token.startswith(b'"'):
+        return token[1:-1].replace(b'\\"', b'"').decode("utf-8", errors="ignore"), index + 1
+    if token.upper() == b"NIL":
+        return None, index + 1
+    return token.decode("utf-8", errors="ignore"), index + 1
+
+
+# Функция находит первую текстовую часть письма (text/plain или text/html)
+# Возвращает (номер секции для BODY[...], кодировку передачи, charset) или None
+def _find_text_part(structure, section=""):
+    if not isinstance(structure, list) or not structure:
+        return None
+    if isinstance(structure[0], list):
+        # multipart: вложенные части идут первыми, за ними подтип (mixed, alternative, ...)
+        children = []
+        for item in structure:
+            if not isinstance(item, list):
+                break
+            children.append(item)
+        for number, child in enumerate(children, start=1):
+            found = _find_text_part(child, f"{section}.{number}" if section else str(number))
+            if found:
+                return found
+        return None
+    content_type = f"{structure[0]}/{structure[1]}".lower()
+    if content_type not in ("text/plain", "text/html"):
+        return None
+    params = structure[2] or []
+    charset = "utf-8"
+    for key, value in zip(params[::2], params[1::2]):
+        if key.lower() == "charset":
+            charset = value
+    encoding = (structure[5] or "7bit").lower()
+    return section or "TEXT", encoding, charset
+
+
+# Функция декодирует часть письма с учётом кодировки передачи и charset
+def _decode_part(payload, encoding, charset):
+    if encoding == "base64":
+        payload = base64.b64decode(payload)
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset, errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
@@ -0,0 +1,384 @@
+# Нагрузочный режим: пользовательские сценарии тестов выполняются множеством одновременных виртуальных пользователей
+# Сценарий повторяет шаги logged_in_page и test_password_recovery:
+# - "page load"           — открытие страницы входа (в режиме browser — вместе с созданием контекста);
+# - "submit to dashboard" — отправка формы входа и появление дашборда;
+# - "reset request ack"   — запрос письма сброса пароля и подтверждение от стенда.
+# Режимы:
+# - http    — те же запросы, что отправляет страница (GET страницы и статики, POST API входа и сброса),
+#             каждый пользователь — поток со своими cookies; лёгкий режим для сотен пользователей;
+# - browser — каждый пользователь — отдельный контекст в одном асинхронном браузере (playwright.async_api).
+# Нагрузка растёт ступенями (--steps 1,5,10,20): на каждой ступени заданное число пользователей повторяет
+# сценарий step_seconds секунд. По каждой ступени считаются пропускная способность (сценариев в секунду),
+# доля ошибок и гистограммы времени каждой фазы. Если доля ошибок превысила порог, следующие ступени
+# не запускаются: предыдущая ступень — оценка предела стенда.
+# Запуск против локального стенда-заглушки (tests/utils/stand_in_app.py):
+#     python -m tests.utils.load_runner --stand-in --steps 1,10,50 --step-seconds 10
+# Против стенда Cicada8 (аккаунты из TEST_ACCOUNTS_FILE или TEST_EMAIL/TEST_PASSWORD):
+#     python -m tests.utils.load_runner --mode browser --base-url https://cicada.develop.apt.lan/ --steps 1,5,10
+
+import os
+import re
+import json
+import time
+import asyncio
+import logging
+import argparse
+import threading
+import urllib.request
+import http.cookiejar
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urljoin
+
+from playwright.async_api import async_playwright
+
+from tests.utils.account_pool import load_accounts
+from tests.utils.auth_utils import login_api_path, login_via_ui_async
+from tests.utils.file_lock import atomic_write
+from tests.utils.session_stats import percentile
+from tests.utils.stand_in_app import StandInApp
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Фазы сценария в порядке выполнения
+PHASES = ("page load", "submit to dashboard", "reset request ack")
+
+# Верхние границы интервалов гистограммы, мс (последний интервал — всё, что дольше)
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# API запроса сброса пароля по умолчанию (для режима http; путь API входа — в auth_utils).
+# Переменная RESET_API_PATH читается при запуске сценария: conftest.py загружает .env после импорта утилит
+DEFAULT_RESET_API_PATH = "/api/v1/auth/password-recovery"
+
+# Селекторы страницы восстановления пароля (как в test_password_recovery)
+RESET_EMAIL_SELECTOR = 'input[placeholder="E-mail"]'
+RESET_SUCCESS_SELECTOR = 'text=Инструкция по восстановлению отправлена на указанную почту'
+
+# Ссылки на скрипты и стили в HTML страницы (режим http загружает их, как браузер)
+_ASSET_PATTERN = re.compile(r'(?:src|href)="([^"]+\.(?:js|css))"')
+
+
+# Функция раскладывает замеры по интервалам гистограммы: [["<=10ms", число], ...]
+def histogram(samples):
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for seconds in samples:
+        milliseconds = seconds * 1000
+        index = next((i for i, bound in enumerate(BUCKETS_MS) if milliseconds <= bound), len(BUCKETS_MS))
+        counts[index] += 1
+    labels = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+    return [[label, count] for label, count in zip(labels, counts)]
+
+
+# Класс собирает результаты одной ступени нагрузки (записи идут из потоков пользователей)
+class StepResult:
+    def __init__(self, users):
+        self.users = users  # Число одновременных пользователей
+        self.duration = 0.0  # Фактическая длительность ступени, с
+        self.samples = {phase: [] for phase in PHASES}  # Время успешных фаз, с
+        self.errors = Counter()  # Ошибки по фазам
+        self.messages = Counter()  # Тексты ошибок (для отчёта)
+        self.journeys = 0  # Завершённые сценарии
+        self.failed = 0  # Сценарии, прерванные ошибкой
+        self._lock = threading.Lock()
+
+    def record(self, phase, seconds):
+        with self._lock:
+            self.samples[phase].append(seconds)
+
+    def record_error(self, phase, error):
+        with self._lock:
+            self.errors[phase] += 1
+            self.failed += 1
+            self.messages[f"{phase}: {type(error).__name__}: {str(error)[:200]}"] += 1
+
+    def record_journey(self):
+        with self._lock:
+            self.journeys += 1
+
+    @property
+    def error_rate(self):
+        total = self.journeys + self.failed
+        return self.failed / total if total else 0.0
+
+    @property
+    def throughput(self):
+        return self.journeys / self.duration if self.duration else 0.0
+
+    def to_dict(self):
+        phases = {}
+        for phase, samples in self.samples.items():
+            phases[phase] = {
+                "count": len(samples), "errors": self.errors[phase],
+                "p50": percentile(samples, 50), "p95": percentile(samples, 95), "p99": percentile(samples, 99),
+                "max": max(samples, default=0.0), "histogram": histogram(samples),
+            }
+        return {
+            "users": self.users, "duration": self.duration, "journeys": self.journeys, "failed": self.failed,
+            "throughput": self.throughput, "error_rate": self.error_rate, "phases": phases,
+            "top_errors": self.messages.most_common(5),
+        }
+
+
+# Функция выполняет фазу сценария и записывает её время; при ошибке записывает ошибку и возвращает False
+def _timed_phase(result, phase, func):
+    started = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        result.record_error(phase, e)
+        return False
+    result.record(phase, time.perf_counter() - started)
+    return True
+
+
+# Асинхронный вариант _timed_phase
+async def _timed_phase_async(result, phase, coroutine):
+    started = time.perf_counter()
+    try:
+        await coroutine
+    except Exception as e:
+        result.record_error(phase, e)
+        return False
+    result.record(phase, time.perf_counter() - started)
+    return True
+
+
+# Класс сценария в режиме http: запросы, которые отправляет страница, без браузера
+class HttpJourney:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url
+        self.timeout = timeout  # Таймаут одного запроса, с
+
+    def _open(self, opener, url, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+        with opener.open(request, timeout=self.timeout) as response:  # Ответы 4xx/5xx — исключение HTTPError
+            return response.read().decode("utf-8", errors="replace")
+
+    # Открывает страницу и загружает её скрипты и стили
+    def _load_page(self, opener, url):
+        html = self._open(opener, url)
+        for asset in _ASSET_PATTERN.findall(html):
+            self._open(opener, urljoin(url, asset))
+
+    # Выполняет сценарий одним пользователем с новой сессией (свои cookies)
+    def run(self, result, email, password):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        if not _timed_phase(result, "page load", lambda: self._load_page(opener, self.base_url)):
+            return
+
+        def login():
+            self._open(opener, urljoin(self.base_url, login_api_path()), {"email": email, "password": password})
+            self._open(opener, self.base_url)  # Дашборд открывается с cookie сессии
+
+        if not _timed_phase(result, "submit to dashboard", login):
+            return
+        reset_url = urljoin(self.base_url, os.getenv("RESET_API_PATH", DEFAULT_RESET_API_PATH))
+        reset = lambda: self._open(opener, reset_url, {"email": email})
+        if _timed_phase(result, "reset request ack", reset):
+            result.record_journey()
+
+
+# Класс сценария в режиме browser: отдельный контекст асинхронного браузера на каждое выполнение сценария
+class BrowserJourney:
+    def __init__(self, browser, base_url, timeout=30000):
+        self.browser = browser  # Браузер playwright.async_api
+        self.base_url = base_url
+        self.timeout = timeout  # Таймаут ожиданий, мс
+
+    # Любая ошибка сценария (в том числе при создании контекста) записывается как ошибка фазы, а не выходит
+    # наружу: иначе одно исключение прервало бы asyncio.gather в run_browser_load и всю ступень без отчёта
+    async def run(self, result, email, password):
+        context = page = None
+
+        async def open_page():
+            nonlocal context, page
+            context = await self.browser.new_context()
+            page = await context.new_page()
+            await page.goto(self.base_url, timeout=self.timeout)
+
+        try:
+            if not await _timed_phase_async(result, "page load", open_page()):
+                return
+            login = login_via_ui_async(page, email, password, dashboard_timeout=self.timeout)  # Тот же вход, что у фикстур
+            if not await _timed_phase_async(result, "submit to dashboard", login):
+                return
+
+            try:  # Переход на страницу восстановления не входит во время фазы, но его ошибка — ошибка фазы
+                await page.goto(urljoin(self.base_url, "password-recovery"), timeout=self.timeout)
+                await page.fill(RESET_EMAIL_SELECTOR, email, timeout=self.timeout)
+            except Exception as e:
+                result.record_error("reset request ack", e)
+                return
+
+            async def request_reset():
+                await page.click('button[type="submit"]', timeout=self.timeout)
+                await page.wait_for_selector(RESET_SUCCESS_SELECTOR, state="visible", timeout=self.timeout)
+
+            if await _timed_phase_async(result, "reset request ack", request_reset()):
+                result.record_journey()
+        finally:
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:  # Браузер мог упасть вместе с контекстом: ошибка уже записана в фазе
+                    logger.warning("Failed to close load journey context: %s", e)
+
+
+# Функция запускает ступени нагрузки в режиме http (пользователи — потоки)
+# accounts — список (email, пароль), пользователи берут аккаунты по кругу
+def run_http_load(base_url, accounts, steps, step_seconds, stop_error_rate=0.05):
+    journey = HttpJourney(base_url)
+
+    def run_step(result, deadline):
+        def user(index):
+            email, password = accounts[index % len(accounts)]
+            while time.monotonic() < deadline:
+                journey.run(result, email, password)
+
+        threads = [threading.Thread(target=user, args=(index,), daemon=True) for index in range(result.users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return _ramp(steps, step_seconds, stop_error_rate, run_step)
+
+
+# Функция запускает ступени нагрузки в режиме browser (пользователи — задачи asyncio в одном браузере)
+async def run_browser_load(browser, base_url, accounts, steps, step_seconds, stop_error_rate=0.05):
+    journey = BrowserJourney(browser, base_url)
+    results = []
+    for users in steps:
+        result = StepResult(users)
+        started = time.monotonic()
+        deadline = started + step_seconds
+
+        async def user(index):
+            email, password = accounts[index % len(accounts)]
+            while time.monotonic() < deadline:
+                await journey.run(result, email, password)
+
+        await asyncio.gather(*(user(index) for index in range(users)))
+        result.duration = time.monotonic() - started
+        results.append(result)
+        if _log_step(result, stop_error_rate):
+            break
+    return results
+
+
+# Функция выполняет ступени по очереди и останавливается, когда доля ошибок превысила порог
+def _ramp(steps, step_seconds, stop_error_rate, run_step):
+    results = []
+    for users in steps:
+        result = StepResult(users)
+        started = time.monotonic()
+        run_step(result, started + step_seconds)
+        result.duration = time.monotonic() - started
+        results.append(result)
+        if _log_step(result, stop_error_rate):
+            break
+    return results
+
+
+# Функция пишет итог ступени в лог; возвращает True, если нагрузку пора прекратить
+def _log_step(result, stop_error_rate):
+    logger.info(
+        "Load step %s users: %.1f journeys/s, error rate %.1f%%",
+        result.users, result.throughput, result.error_rate * 100,
+    )
+    if result.error_rate > stop_error_rate:
+        logger.warning("Error rate %.1f%% above %.1f%%, stopping the ramp", result.error_rate * 100, stop_error_rate * 100)
+        return True
+    return False
+
+
+# Функция собирает отчёт: ступени и оценка предела (последняя ступень с долей ошибок не выше порога)
+def build_report(results, mode, base_url, stop_error_rate):
+    passing = [result for result in results if result.error_rate <= stop_error_rate]
+    return {
+        "mode": mode, "base_url": base_url, "stop_error_rate": stop_error_rate,
+        "capacity_users": passing[-1].users if passing else 0,
+        "peak_throughput": max((result.throughput for result in passing), default=0.0),
+        "steps": [result.to_dict() for result in results],
+    }
+
+
+# Функция сохраняет отчёт в report_dir/load_<время>.json и возвращает путь
+def write_report(report, report_dir):
+    path = os.path.join(report_dir, f"load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    atomic_write(path, json.dumps(report, indent=2, ensure_ascii=False))
+    return path
+
+
+# Функция возвращает строки итога для терминала
+def summary_lines(report):
+    lines = []
+    for step in report["steps"]:
+        lines.append(
+            f"{step['users']} users: {step['throughput']:.1f} journeys/s, "
+            f"error rate {step['error_rate'] * 100:.1f}% ({step['journeys']} ok, {step['failed']} failed)"
+        )
+        for phase in PHASES:
+            data = step["phases"][phase]
+            lines.append(
+                f"  {phase:<20} n={data['count']:<6} p50={data['p50'] * 1000:.0f}ms "
+                f"p95={data['p95'] * 1000:.0f}ms p99={data['p99'] * 1000:.0f}ms errors={data['errors']}"
+            )
+        for message, count in step["top_errors"]:
+            lines.append(f"  {count}x {message}")
+    lines.append(
+        f"capacity: {report['capacity_users']} users at error rate <= {report['stop_error_rate'] * 100:.0f}%, "
+        f"peak {report['peak_throughput']:.1f} journeys/s"
+    )
+    return lines
+
+
+# Запуск из командной строки (см. примеры в начале файла)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the login and reset-request journeys under stepped load")
+    parser.add_argument("--mode", choices=("http", "browser"), default="http")
+    parser.add_argument("--base-url", default=os.getenv("BASE_URL", "https://cicada.develop.apt.lan/"))
+    parser.add_argument("--stand-in", action="store_true", help="Start a local stand-in app and load it instead")
+    parser.add_argument("--steps", default="1,5,10,20", help="Comma-separated numbers of concurrent users")
+    parser.add_argument("--step-seconds", type=float, default=10.0)
+    parser.add_argument("--stop-error-rate", type=float, default=0.05)
+    parser.add_argument("--report-dir", default="reports")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    steps = [int(users) for users in args.steps.split(",")]
+
+    stand_in = None
+    if args.stand_in:
+        stand_in = StandInApp().start()
+        base_url, accounts = stand_in.base_url, [("load@cicada8.ru", "load-password")]
+    else:
+        base_url = args.base_url
+        accounts = [(account["email"], account["password"]) for account in load_accounts()]
+    try:
+        if args.mode == "http":
+            results = run_http_load(base_url, accounts, steps, args.step_seconds, args.stop_error_rate)
+        else:
+            results = asyncio.run(_run_browser_mode(base_url, accounts, steps, args))
+    finally:
+        if stand_in is not None:
+            stand_in.stop()
+    report = build_report(results, args.mode, base_url, args.stop_error_rate)
+    for line in summary_lines(report):
+        print(line)
+    print(f"report: {write_report(report, args.report_dir)}")
+
+
+# Запускает асинхронный браузер и ступени нагрузки в режиме browser
+async def _run_browser_mode(base_url, accounts, steps, args):
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            return await run_browser_load(browser, base_url, accounts, steps, args.step_seconds, args.stop_error_rate)
+        finally:
+            await browser.close()
+
+
+if __name__ == "__main__":
+    main()
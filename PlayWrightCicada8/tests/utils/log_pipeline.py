@@ -0,0 +1,128 @@
+# Утилита для логирования тестов через очередь
+# Поток теста только кладёт запись в очередь (QueueHandler), а в файл её пишет фоновый поток (QueueListener).
+# Каждый воркер pytest-xdist пишет свой файл JSON-lines с ротацией по размеру:
+#     test_logs/<запуск>/<воркер>.jsonl
+# Каждая запись помечена идентификатором теста и воркера. В конце сессии контроллер объединяет файлы
+# воркеров в test_logs/<запуск>/merged.jsonl в порядке времени; старые запуски удаляются.
+# Для дорогих значений в сообщениях используется lazy(...): значение вычисляется, только если запись
+# прошла фильтр по уровню. Сообщение форматируется ещё в потоке теста (QueueHandler.prepare), поэтому
+# в lazy можно передавать вызовы Playwright — из фонового потока их вызывать нельзя.
+
+import os
+import json
+import heapq
+import queue
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime
+
+from tests.utils.node_names import worker_id
+
+# Идентификатор текущего теста; обновляется хуками conftest.py
+current_test = None
+
+
+# Обёртка для отложенного вычисления значения в сообщении лога:
+#     logger.debug("Page content: %s", lazy(lambda: page.content()[:500]))
+class lazy:
+    def __init__(self, func):
+        self.func = func
+
+    def __str__(self):
+        return str(self.func())
+
+
+# Фильтр добавляет к записи идентификаторы воркера и теста (выполняется в потоке, создавшем запись)
+class LogContextFilter(logging.Filter):
+    def filter(self, record):
+        record.worker = worker_id()
+        record.test = current_test
+        return True
+
+
+# Форматтер записывает запись одной строкой JSON
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "worker": getattr(record, "worker", None),
+            "test": getattr(record, "test", None),
+            "message": record.getMessage(),  # Текст уже подготовлен в QueueHandler (вместе с traceback)
+        }
+        return json.dumps(entry, ensure_ascii=False)
+
+
+# Класс настраивает логирование воркера: очередь в потоке теста и запись в файл в фоновом потоке
+class LogPipeline:
+    def __init__(self, run_dir, level=logging.INFO, max_bytes=50 * 1024 * 1024, backup_count=3):
+        self.run_dir = run_dir  # Каталог логов этого запуска
+        self.path = os.path.join(run_dir, f"{worker_id()}.jsonl")
+        os.makedirs(run_dir, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        file_handler.setFormatter(JsonFormatter())
+        self._queue = queue.SimpleQueue()
+        self.handler = logging.handlers.QueueHandler(self._queue)
+        self.handler.addFilter(LogContextFilter())
+        self.listener = logging.handlers.QueueListener(self._queue, file_handler)
+        self.level = level
+
+    # Подключает очередь к корневому логгеру и запускает фоновую запись
+    def start(self):
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self.handler)
+        self.listener.start()
+
+    # Отключает очередь и дописывает оставшиеся записи в файл
+    def stop(self):
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
+
+
+# Функция возвращает файлы логов воркеров запуска, включая ротированные (<воркер>.jsonl.1, ...)
+def worker_log_files(run_dir):
+    names = [name for name in os.listdir(run_dir) if ".jsonl" in name and not name.startswith("merged")]
+    return [os.path.join(run_dir, name) for name in sorted(names)]
+
+
+# Функция читает строки файла лога вместе с временем записи (для сортировки при объединении)
+def _read_entries(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)["time"], line
+            except (ValueError, KeyError):
+                continue  # Недописанная строка (например, воркер упал во время записи)
+
+
+# Функция объединяет логи воркеров в merged.jsonl в порядке времени и возвращает путь к файлу
+# Строки каждого файла уже упорядочены по времени, поэтому файлы сливаются без загрузки в память целиком
+def merge_logs(run_dir):
+    files = worker_log_files(run_dir)
+    merged_path = os.path.join(run_dir, "merged.jsonl")
+    streams = [_read_entries(path) for path in files]
+    with open(merged_path, "w", encoding="utf-8") as out:
+        for _, line in heapq.merge(*streams, key=lambda entry: entry[0]):
+            out.write(line if line.endswith("\n") else line + "\n")
+    return merged_path
+
+
+# Функция удаляет каталоги старых запусков, оставляя keep последних (по имени-метке времени)
+def remove_old_runs(log_dir, keep):
+    if not os.path.isdir(log_dir):
+        return
+    runs = sorted(name for name in os.listdir(log_dir) if os.path.isdir(os.path.join(log_dir, name)))
+    for name in runs[:-keep] if keep > 0 else runs:
+        shutil.rmtree(os.path.join(log_dir, name), ignore_errors=True)
+
+
+# Функция возвращает имя каталога нового запуска (метка времени, по ней же сортируются запуски)
+def new_run_name():
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
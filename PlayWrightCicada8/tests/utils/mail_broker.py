@@ -0,0 +1,397 @@
+# Брокер почты: один процесс обслуживает ожидание писем сброса пароля для всех тестов и воркеров (--mail-broker)
+# Без брокера каждый тест подключается к IMAP сам и ищет письма сам: при параллельных тестах восстановления
+# пароля это по подключению на тест, а тест может забрать ссылку, которая пришла для другого теста.
+# Брокер держит одно подключение IMAP на ящик и ждёт новые письма через IMAP IDLE. Каждое письмо сброса
+# при получении раскладывается по получателю (заголовок To) и токену ссылки. Тест просит ссылку для своего
+# адреса, и брокер отдаёт ему письмо, пришедшее после водяной отметки теста; каждая ссылка выдаётся один раз.
+# Письма хранятся cache_seconds секунд, поэтому тест, который пришёл за ссылкой позже письма, получает её
+# сразу, без поиска в ящике.
+# API — JSON-строки по TCP на 127.0.0.1: запрос {"op": ...} в одной строке, ответ в одной строке.
+# - watermark (mailbox, password, imap): UID последнего письма ящика;
+# - wait (+ recipient, since_uid, timeout): ссылка сброса для получателя;
+# - lookup (token): письмо с этим токеном; status; stop.
+# Если брокер недоступен, imap_utils подключается к IMAP напрямую, как без брокера.
+# Запуск отдельно: python -m tests.utils.mail_broker serve [порт]; статус и остановка: status|stop <адрес>
+
+import os
+import re
+import sys
+import json
+import time
+import socket
+import imaplib
+import logging
+import threading
+import subprocess
+import socketserver
+
+from tests.utils.imap_utils import (
+    RESET_SENDER, imap_server, connect_to_mailbox, mailbox_watermark, read_reset_email, wait_for_new_mail,
+)
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики брокера (считается на стороне тестов)
+STATS_SECTION = "mail broker"
+
+# Сколько секунд ждать, пока процесс брокера начнёт принимать подключения
+START_TIMEOUT = 15
+
+# Сколько секунд брокер хранит полученные письма
+CACHE_SECONDS = 300
+
+# Корень проекта: процесс брокера запускается как модуль tests.utils.mail_broker
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Токен — последний сегмент ссылки сброса: https://.../set-password/<токен>/
+TOKEN_PATTERN = r"/set-password/([\w\-]+)/"
+
+# Исключения, которые брокер передаёт клиенту по имени типа (остальные становятся RuntimeError)
+ERRORS = {"TimeoutError": TimeoutError, "ValueError": ValueError, "LookupError": LookupError}
+
+
+# Класс держит одно подключение IMAP к ящику и передаёт брокеру новые письма сброса
+class _MailboxWatcher:
+    def __init__(self, broker, mailbox, password, server):
+        self.broker = broker
+        self.mailbox = mailbox
+        self.password = password
+        self.server = server
+        self.first_uid = None  # Водяная отметка на момент подключения: письма до неё брокер не видел
+        self.last_uid = None  # UID последнего просмотренного письма
+        self.error = None  # Ошибка первого подключения (например, неверный пароль)
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"mail-broker {mailbox}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.broker.stopping.is_set():
+            try:
+                mail = connect_to_mailbox(self.mailbox, self.password, self.server)
+            except (imaplib.IMAP4.error, OSError) as e:
+                if not self.ready.is_set():
+                    self.error = e
+                    self.ready.set()
+                else:
+                    # Следующий запрос к этому ящику подключится заново; проиндексированные письма остаются
+                    logger.warning("Mail broker failed to reconnect to %s, closing its watcher: %s", self.mailbox, e)
+                    self.broker.forget(self)
+                return
+            try:
+                if self.last_uid is None:
+                    self.first_uid = self.last_uid = mailbox_watermark(mail)
+                self.ready.set()
+                while not self.broker.stopping.is_set():
+                    self._sync(mail)
+                    wait_for_new_mail(mail, self.broker.idle_interval, idle_interval=self.broker.idle_interval)
+            except (imaplib.IMAP4.error, OSError) as e:
+                logger.warning("Mail broker lost IMAP connection to %s, reconnecting: %s", self.mailbox, e)
+                self.broker.reconnects += 1
+            finally:
+                try:
+                    mail.logout()
+                except (imaplib.IMAP4.error, OSError):
+                    pass
+
+    # Скачивает письма сброса новее last_uid и передаёт их брокеру
+    def _sync(self, mail):
+        _, data = mail.uid("SEARCH", None, f"UID {self.last_uid + 1}:*", f'FROM "{RESET_SENDER}"')
+        # Диапазон "n:*" всегда включает последнее письмо, даже если его UID меньше n, поэтому фильтруем
+        for uid in sorted(uid for uid in (int(u) for u in data[0].split()) if uid > self.last_uid):
+            self.broker.add(self.mailbox, read_reset_email(mail, uid))
+            self.last_uid = uid
+
+
+# Класс брокера: наблюдатели ящиков, индекс писем и ожидающие тесты
+class MailBroker:
+    def __init__(self, host="127.0.0.1", port=0, cache_seconds=CACHE_SECONDS, idle_interval=25,
+                 clock=time.monotonic):
+        self.cache_seconds = cache_seconds
+        self.idle_interval = idle_interval  # IDLE перевыпускается не реже раза в idle_interval секунд
+        self.clock = clock
+        self.stopping = threading.Event()
+        self.changed = threading.Condition()  # Защищает индекс; будит ожидающих при новом письме
+        self.watchers = {}  # {(сервер, ящик): _MailboxWatcher}
+        self.by_recipient = {}  # {(ящик, получатель): [письмо]}
+        self.by_token = {}  # {токен: письмо}
+        self.waiters = 0
+        self.served = {"cached": 0, "arrived": 0}
+        self.reconnects = 0
+        self.server = _ThreadingServer((host, port), _BrokerHandler)
+        self.server.broker = self
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    # Запускает обработку запросов в фоновом потоке (для тестов и встраивания в процесс pytest)
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info("Mail broker listening on %s", self.address)
+        return self
+
+    # Обрабатывает запросы в текущем потоке до команды stop (процесс брокера)
+    def serve_forever(self):
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+
+    def stop(self):
+        self.stopping.set()
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    # Выполняет запрос клиента и возвращает ответ (словарь для JSON)
+    def handle(self, request):
+        op = request.get("op")
+        if op == "watermark":
+            return {"uid": self._watcher(request).last_uid}
+        if op == "wait":
+            return self.wait(request)
+        if op == "lookup":
+            with self.changed:
+                self._expire()
+                message = self.by_token.get(request["token"])
+                if message is None:
+                    raise LookupError(f"No cached message with token {request['token']}")
+                return {key: value for key, value in message.items() if key != "arrived"}
+        if op == "status":
+            with self.changed:
+                self._expire()
+                return {
+                    "mailboxes": len(self.watchers), "messages": len(self.by_token), "waiters": self.waiters,
+                    "served": dict(self.served), "reconnects": self.reconnects,
+                }
+        if op == "stop":
+            return {}  # Брокер останавливается после отправки ответа (_BrokerHandler)
+        raise ValueError(f"Unknown mail broker request: {op}")
+
+    # Возвращает наблюдателя ящика, подключаясь к ящику при первом запросе
+    def _watcher(self, request):
+        server = request.get("imap") or imap_server()
+        key = (server["host"], server["port"], request["mailbox"].lower())
+        with self.changed:
+            watcher = self.watchers.get(key)
+            if watcher is None:
+                watcher = _MailboxWatcher(self, request["mailbox"].lower(), request["password"], server)
+                self.watchers[key] = watcher
+        if not watcher.ready.wait(timeout=START_TIMEOUT * 2):
+            raise TimeoutError(f"Mail broker could not open mailbox {request['mailbox']}")
+        if watcher.error is not None:
+            with self.changed:
+                self.watchers.pop(key, None)  # Следующий запрос попробует подключиться заново
+            raise RuntimeError(f"Mail broker could not open mailbox {request['mailbox']}: {watcher.error}")
+        return watcher
+
+    # Убирает наблюдателя, который не смог переподключиться к ящику
+    def forget(self, watcher):
+        with self.changed:
+            for key, value in list(self.watchers.items()):
+                if value is watcher:
+                    del self.watchers[key]
+
+    # Добавляет письмо в индекс по получателям и токену и будит ожидающих
+    def add(self, mailbox, message):
+        if not message["link"]:
+            return
+        match = re.search(TOKEN_PATTERN, message["link"])
+        message = dict(message, token=match.group(1) if match else message["link"], arrived=self.clock(),
+                       claimed=False)
+        with self.changed:
+            if message["token"] in self.by_token:
+                return  # Повторное письмо с той же ссылкой (например, копия на второй адрес)
+            self.by_token[message["token"]] = message
+            for recipient in message["recipients"]:
+                self.by_recipient.setdefault((mailbox, recipient), []).append(message)
+            self.changed.notify_all()
+        logger.info("Mail broker indexed reset email UID %s for %s", message["uid"], ", ".join(message["recipients"]))
+
+    # Удаляет из индекса письма старше cache_seconds
+    def _expire(self):
+        oldest = self.clock() - self.cache_seconds
+        for token, message in list(self.by_token.items()):
+            if message["arrived"] < oldest:
+                del self.by_token[token]
+        for key, messages in list(self.by_recipient.items()):
+            messages[:] = [message for message in messages if message["arrived"] >= oldest]
+            if not messages:
+                del self.by_recipient[key]
+
+    # Ждёт письмо для получателя новее since_uid и выдаёт его ссылку (каждая ссылка выдаётся один раз)
+    def wait(self, request):
+        watcher = self._watcher(request)
+        since_uid, timeout = request["since_uid"], request["timeout"]
+        if since_uid < watcher.first_uid:
+            # Письма между отметкой теста и подключением брокера не проиндексированы: ищет сам тест
+            raise ValueError(f"Watermark {since_uid} precedes the mail broker connection (UID {watcher.first_uid})")
+        key = (watcher.mailbox, request["recipient"].lower())
+        started = self.clock()
+        deadline = time.monotonic() + timeout
+        with self.changed:
+            self.waiters += 1
+            try:
+                while True:
+                    self._expire()
+                    candidates = [
+                        message for message in self.by_recipient.get(key, [])
+                        if message["uid"] > since_uid and not message["claimed"]
+                    ]
+                    if candidates:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No email with reset link for {request['recipient']} within {timeout}s")
+                    self.changed.wait(remaining)
+            finally:
+                self.waiters -= 1
+            message = max(candidates, key=lambda item: item["uid"])  # Самое новое письмо, как без брокера
+            message["claimed"] = True
+            cached = message["arrived"] < started
+            self.served["cached" if cached else "arrived"] += 1
+        return {"link": message["link"], "uid": message["uid"], "token": message["token"], "cached": cached}
+
+
+# Обработчик подключения клиента: одна строка запроса, одна строка ответа
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            payload = json.loads(line)
+            response = self.server.broker.handle(payload)
+        except Exception as e:  # Ошибка запроса возвращается клиенту и не должна ронять брокер
+            payload, response = {}, {"error": str(e), "type": type(e).__name__}
+        self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+        if payload.get("op") == "stop":
+            threading.Thread(target=self.server.broker.stop, daemon=True).start()  # shutdown ждёт serve_forever
+
+
+# Многопоточный TCP-сервер: каждый ожидающий тест занимает свой поток
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+# Функция отправляет запрос брокеру и возвращает ответ; ошибку брокера поднимает тем же типом исключения
+# Брокер, не ответивший за timeout, — TimeoutError (socket.timeout в Python 3.9 ещё не TimeoutError)
+def request(address, payload, timeout=10):
+    host, port = address.rsplit(":", 1)
+    with socket.create_connection((host, int(port)), timeout=timeout) as sock:
+        sock.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        try:
+            line = sock.makefile("rb").readline()
+        except socket.timeout:
+            raise TimeoutError(f"Mail broker {address} did not answer within {timeout}s")
+    if not line:
+        raise ConnectionError(f"Mail broker {address} closed the connection")
+    response = json.loads(line)
+    if "error" in response:
+        raise ERRORS.get(response["type"], RuntimeError)(response["error"])
+    return response
+
+
+# Функция возвращает водяную отметку ящика через брокер (None — брокер недоступен, тест подключится к IMAP сам)
+def watermark(address, mailbox, password):
+    try:
+        uid = request(address, {"op": "watermark", "mailbox": mailbox, "password": password, "imap": imap_server()})
+    except (OSError, RuntimeError) as e:
+        logger.warning("Mail broker %s is unavailable, using IMAP directly: %s", address, e)
+        stats.count(STATS_SECTION, "fallbacks to IMAP")
+        return None
+    logger.info("Mailbox watermark for %s from mail broker: UID %s", mailbox, uid["uid"])
+    return uid["uid"]
+
+
+# Функция ждёт ссылку сброса для адреса через брокер (None — брокер не может её выдать, тест ищет сам)
+# К IMAP тест переходит, только если брокер недоступен, не может открыть ящик или не проиндексировал письма
+# до водяной отметки (ValueError). Если письмо не пришло (TimeoutError, LookupError), ошибка передаётся тесту:
+# поиск через IMAP прождал бы ещё один полный timeout. TimeoutError — подкласс OSError, поэтому ловится раньше
+def wait_for_link(address, mailbox, password, since_uid, timeout):
+    payload = {
+        "op": "wait", "mailbox": mailbox, "password": password, "imap": imap_server(),
+        "recipient": mailbox, "since_uid": since_uid, "timeout": timeout,
+    }
+    started = time.perf_counter()
+    try:
+        response = request(address, payload, timeout=timeout + START_TIMEOUT)
+    except (TimeoutError, LookupError):
+        stats.timing(STATS_SECTION, "wait", time.perf_counter() - started)
+        raise
+    except (OSError, RuntimeError, ValueError) as e:
+        logger.warning("Mail broker %s could not serve %s, using IMAP directly: %s", address, mailbox, e)
+        stats.count(STATS_SECTION, "fallbacks to IMAP")
+        return None
+    stats.timing(STATS_SECTION, "wait", time.perf_counter() - started)
+    stats.count(STATS_SECTION, "links from cache" if response["cached"] else "links on arrival")
+    logger.info("Reset link for %s from mail broker (UID %s): %s", mailbox, response["uid"], response["link"])
+    return response["link"]
+
+
+# Класс запускает брокер отдельным процессом на время прогона (контроллер pytest) и останавливает его
+class MailBrokerProcess:
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.process = None
+        self.address = None
+
+    # Запускает процесс и ждёт, пока он напишет свой адрес ("Mail broker listening on host:port")
+    def start(self):
+        args = [sys.executable, "-m", "tests.utils.mail_broker", "serve"]
+        with open(self.log_path, "w", encoding="utf-8") as log:
+            self.process = subprocess.Popen(
+                args, cwd=PROJECT_DIR, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT
+            )
+        deadline = time.monotonic() + START_TIMEOUT
+        while True:
+            with open(self.log_path, encoding="utf-8") as f:
+                match = re.search(r"Mail broker listening on (\S+)", f.read())
+            if match:
+                self.address = match.group(1)
+                logger.info("Mail broker started: %s", self.address)
+                return self.address
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f"Mail broker did not start within {START_TIMEOUT}s, see {self.log_path}")
+            time.sleep(0.05)
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.address is not None and self.process.poll() is None:
+            try:
+                request(self.address, {"op": "stop"})
+            except (OSError, RuntimeError) as e:
+                logger.warning("Failed to stop mail broker %s: %s", self.address, e)
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+
+# Запуск из командной строки: python -m tests.utils.mail_broker serve [порт] | status <адрес> | stop <адрес>
+def main(argv):
+    command = argv[1] if len(argv) > 1 else "serve"
+    if command == "serve":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+        broker = MailBroker(port=int(argv[2]) if len(argv) > 2 else 0)
+        print(f"Mail broker listening on {broker.address}", flush=True)
+        broker.serve_forever()
+    elif command in ("status", "stop"):
+        print(json.dumps(request(argv[2], {"op": command}), ensure_ascii=False))
+    else:
+        raise ValueError(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
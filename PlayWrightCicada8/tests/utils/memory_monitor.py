@@ -0,0 +1,203 @@
+# Утилита для наблюдения за памятью браузера воркера и поиска утечек между тестами
+# Браузер живёт весь сеанс воркера (BrowserPool), поэтому незакрытые контексты и страницы, обработчики
+# событий и растущая куча JS копятся от теста к тесту и делают последние тесты медленными и нестабильными.
+# После каждого теста монитор записывает компактный замер:
+# - метрики страниц теста перед их закрытием (CDP Performance.getMetrics и Memory.getDOMCounters):
+#   куча JS, узлы DOM, обработчики событий, документы;
+# - остаток после закрытия контекстов теста: открытые контексты и страницы, те же метрики оставшихся
+#   страниц (left_*) и RSS процессов Chromium (SystemInfo.getProcessInfo + /proc, только Linux).
+# Базовая линия — минимум остатков первых warmup тестов. Тест помечается как подозрительный, если после него
+# остаток превысил базовую линию больше допуска (LEAK_LIMITS, для RSS — leak_rss_mb) и не вернулся к ней.
+# Если RSS браузера превысил restart_rss_mb, браузер перезапускается до следующего теста.
+# Ряд замеров и отчёт об утечках сохраняются в reports/memory_<запуск>.json, сводка — в разделе "memory".
+
+import os
+import json
+import logging
+
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.node_names import worker_id
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики с замерами памяти
+STATS_SECTION = "memory"
+
+# Метрики страниц: куча JS (МБ), узлы DOM, обработчики событий, документы
+PAGE_METRICS = ("heap_mb", "dom_nodes", "listeners", "documents")
+
+# Столбцы компактного ряда замеров в отчёте (по строке на тест)
+COLUMNS = ("test", "rss_mb", "contexts", "pages") + PAGE_METRICS + tuple(f"left_{name}" for name in PAGE_METRICS)
+
+# Насколько остаток после теста может превышать базовую линию, не считаясь утечкой
+LEAK_LIMITS = {
+    "contexts": 0,
+    "pages": 0,
+    "left_documents": 0,
+    "left_listeners": 100,
+    "left_dom_nodes": 1000,
+    "left_heap_mb": 20,
+}
+
+
+# Функция возвращает RSS процессов в мегабайтах (None — не Linux или процессы уже завершились)
+def process_rss_mb(pids):
+    if not pids or not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/statm", encoding="ascii") as f:
+                total += int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            continue  # Процесс рендерера мог завершиться между запросом списка и чтением
+    return round(total / 1048576, 1)
+
+
+# Функция складывает метрики страниц из ответов CDP в словарь PAGE_METRICS
+def page_metrics(performance, counters):
+    values = {metric["name"]: metric["value"] for metric in performance}
+    return {
+        "heap_mb": round(values.get("JSHeapUsedSize", 0) / 1048576, 1),
+        "dom_nodes": counters.get("nodes", int(values.get("Nodes", 0))),
+        "listeners": counters.get("jsEventListeners", int(values.get("JSEventListeners", 0))),
+        "documents": counters.get("documents", int(values.get("Documents", 0))),
+    }
+
+
+# Класс замеряет память браузера воркера после каждого теста и перезапускает браузер при превышении порога
+class MemoryMonitor:
+    def __init__(self, browser_pool, leak_rss_mb=100.0, restart_rss_mb=0.0, warmup=3):
+        self.browser_pool = browser_pool
+        self.limits = dict(LEAK_LIMITS, rss_mb=leak_rss_mb)
+        self.restart_rss_mb = restart_rss_mb  # 0 — не перезапускать браузер
+        self.warmup = warmup  # Сколько первых тестов задают базовую линию
+        self.baseline = None
+        self._warmup_samples = []
+        self._above = set()  # Метрики, которые уже выше базовой линии (тест, поднявший их, уже помечен)
+        self._test_pages = dict.fromkeys(PAGE_METRICS, 0)  # Метрики страниц текущего теста
+
+    # Запрашивает метрики открытых страниц контекста (вызывается перед закрытием контекста теста)
+    def collect(self, context):
+        for name, value in self._pages_metrics(context.pages).items():
+            self._test_pages[name] += value
+
+    # Суммирует метрики страниц; страницы, которые закрылись во время замера, пропускаются
+    @staticmethod
+    def _pages_metrics(pages):
+        total = dict.fromkeys(PAGE_METRICS, 0)
+        for page in pages:
+            try:
+                session = page.context.new_cdp_session(page)
+                session.send("Performance.enable")
+                performance = session.send("Performance.getMetrics")["metrics"]
+                counters = session.send("Memory.getDOMCounters")
+                session.detach()
+            except PlaywrightError as e:
+                logger.debug("Failed to collect memory metrics of %s: %s", page.url, e)
+                continue
+            for name, value in page_metrics(performance, counters).items():
+                total[name] += value
+        total["heap_mb"] = round(total["heap_mb"], 1)
+        return total
+
+    # Возвращает остаток в браузере после теста: контексты, страницы, их метрики и RSS процессов Chromium
+    def _residual(self, browser):
+        pages = [page for context in browser.contexts for page in context.pages]
+        residual = {"contexts": len(browser.contexts), "pages": len(pages), "rss_mb": None}
+        residual.update({f"left_{name}": value for name, value in self._pages_metrics(pages).items()})
+        try:
+            session = browser.new_browser_cdp_session()
+            processes = session.send("SystemInfo.getProcessInfo")["processInfo"]
+            session.detach()
+            residual["rss_mb"] = process_rss_mb([process["id"] for process in processes])
+        except PlaywrightError as e:
+            logger.debug("Failed to read browser process info: %s", e)
+        return residual
+
+    # Замеряет остаток после теста (контексты теста уже закрыты), записывает замер и проверяет утечки
+    def sample(self, nodeid):
+        if not self.browser_pool.is_healthy():
+            self._test_pages = dict.fromkeys(PAGE_METRICS, 0)
+            return None
+        row = {"test": nodeid, **self._test_pages, **self._residual(self.browser_pool.browser)}
+        self._test_pages = dict.fromkeys(PAGE_METRICS, 0)
+        row["leak"] = self.check(row)
+        stats.record(STATS_SECTION, {"worker": worker_id(), **row})
+        if row["leak"]:
+            stats.count(STATS_SECTION, "leak suspects")
+            logger.warning("Memory did not return to baseline after %s: %s", nodeid, "; ".join(row["leak"]))
+        # Браузер-демон общий для воркеров и переживает переподключение: его память перезапуск пула не освободит
+        over_limit = self.restart_rss_mb and row["rss_mb"] and row["rss_mb"] >= self.restart_rss_mb
+        if over_limit and self.browser_pool.daemon is None:
+            self.restart(f"browser RSS {row['rss_mb']:.0f} MB >= {self.restart_rss_mb:.0f} MB")
+        return row
+
+    # Сравнивает остаток с базовой линией; возвращает причины для метрик, которые только что её превысили
+    def check(self, row):
+        if self.baseline is None:
+            self._warmup_samples.append(row)
+            if len(self._warmup_samples) >= self.warmup:
+                self.baseline = {
+                    name: min((sample[name] for sample in self._warmup_samples if sample[name] is not None),
+                              default=None)
+                    for name in self.limits
+                }
+            return []
+        reasons = []
+        for name, limit in self.limits.items():
+            if row[name] is None or self.baseline[name] is None:
+                continue
+            if row[name] - self.baseline[name] <= limit:
+                self._above.discard(name)  # Вернулась к базовой линии: следующий рост снова будет помечен
+            elif name not in self._above:
+                self._above.add(name)
+                reasons.append(f"{name} {row[name]:g} (baseline {self.baseline[name]:g})")
+        return reasons
+
+    # Перезапускает браузер пула; базовая линия для нового браузера набирается заново
+    def restart(self, reason):
+        stats.count(STATS_SECTION, "browser restarts")
+        self.browser_pool.restart(reason="memory threshold")
+        logger.warning("Browser restarted to free memory: %s", reason)
+        self.baseline = None
+        self._warmup_samples = []
+        self._above = set()
+
+
+# Функция строит компактный отчёт: ряд замеров по воркерам (столбцы COLUMNS) и список подозрительных тестов
+def build_report(records, run_name):
+    workers, leaks = {}, []
+    for record in records:
+        workers.setdefault(record["worker"], []).append([record.get(name) for name in COLUMNS])
+        if record.get("leak"):
+            leaks.append({"worker": record["worker"], "test": record["test"], "reasons": record["leak"]})
+    return {"run": run_name, "columns": list(COLUMNS), "workers": workers, "leaks": leaks}
+
+
+# Функция записывает отчёт в report_dir/memory_<запуск>.json и возвращает путь
+def write_report(report, report_dir):
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"memory_{report['run']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False)
+    return path
+
+
+# Функция возвращает строки сводки для терминала: RSS браузера каждого воркера и подозрительные тесты
+def summary_lines(report, limit=10):
+    lines = []
+    rss = report["columns"].index("rss_mb")
+    for worker, rows in sorted(report["workers"].items()):
+        values = [row[rss] for row in rows if row[rss] is not None]
+        if values:
+            lines.append(f"  {worker}: {len(rows)} tests, browser RSS first {values[0]:g} MB, "
+                         f"peak {max(values):g} MB, last {values[-1]:g} MB")
+        else:
+            lines.append(f"  {worker}: {len(rows)} tests (browser RSS unavailable)")
+    for leak in report["leaks"][:limit]:
+        lines.append(f"  leak suspect: {leak['test']} ({leak['worker']}): {'; '.join(leak['reasons'])}")
+    return lines
@@ -0,0 +1,218 @@
+# Утилита для профилей сети и CPU (медленный VPN, потери пакетов, слабый компьютер пользователя)
+# Пользователи работают с Cicada8 через медленный VPN, а тесты по умолчанию идут по быстрой локальной сети.
+# Профиль задаёт задержку, пропускную способность, потерю пакетов и замедление CPU; фикстуры применяют его
+# к каждой странице контекстов теста через CDP (Network.emulateNetworkConditions и
+# Emulation.setCPUThrottlingRate). Профили описываются в pytest.ini (network_profiles), профиль fast —
+# сеть без ограничений. Профиль выбирается опцией --network-profile или маркером теста:
+#     @pytest.mark.network_profile("vpn-3g")
+# Длительность входа (фазы login_via_ui, ожидание дашборда), загрузки страниц и шагов восстановления пароля
+# записывается по профилям: в конце прогона раздел "network profiles" показывает p50/p95/max каждого шага
+# в каждом профиле и таймаут ожиданий, которого хватит с запасом (вместо подобранного наугад).
+#     network_profiles =
+#         vpn-3g latency_ms=300 download_kbps=1600 upload_kbps=750 cpu=4
+
+import math
+import logging
+
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.session_stats import stats, percentile
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики, в который попадают замеры шагов по профилям
+STATS_SECTION = "network profiles"
+
+# Профиль без ограничений (используется, если профиль не выбран)
+DEFAULT_PROFILE = "fast"
+
+# Параметры профиля: задержка (мс), скорость приёма и отправки (кбит/с), потеря пакетов (%), замедление CPU (раз)
+SETTINGS = ("latency_ms", "download_kbps", "upload_kbps", "packet_loss", "cpu")
+
+# Шаги, длительность которых записывается по профилям (кроме них — именованные шаги тестов верхнего уровня)
+REPORTED_PREFIXES = ("auth.", "login.", "imap.", "page.goto", "page.reload")
+
+# Во сколько раз таймаут ожидания должен превышать p95 шага (запас на выбросы)
+TIMEOUT_MARGIN = 2
+
+
+# Класс описывает один профиль сети и CPU
+class NetworkProfile:
+    def __init__(self, name, latency_ms=0.0, download_kbps=0.0, upload_kbps=0.0, packet_loss=0.0, cpu=1.0):
+        self.name = name
+        self.latency_ms = latency_ms
+        self.download_kbps = download_kbps  # 0 — без ограничения
+        self.upload_kbps = upload_kbps
+        self.packet_loss = packet_loss
+        self.cpu = cpu
+
+    # Ограничивает ли профиль сеть или CPU (профиль fast — нет)
+    @property
+    def throttles(self):
+        return bool(self.latency_ms or self.download_kbps or self.upload_kbps or self.packet_loss or self.cpu > 1)
+
+    # Параметры для Network.emulateNetworkConditions (скорость в CDP — байты в секунду, -1 — без ограничения)
+    def network_conditions(self):
+        conditions = {
+            "offline": False,
+            "latency": self.latency_ms,
+            "downloadThroughput": self.download_kbps * 1000 / 8 if self.download_kbps else -1,
+            "uploadThroughput": self.upload_kbps * 1000 / 8 if self.upload_kbps else -1,
+        }
+        if self.packet_loss:
+            conditions["packetLoss"] = self.packet_loss  # Экспериментальный параметр CDP, проценты
+        return conditions
+
+    def __repr__(self):
+        settings = " ".join(f"{name}={getattr(self, name):g}" for name in SETTINGS)
+        return f"{self.name} ({settings})"
+
+
+# Функция разбирает профили из pytest.ini: "<имя> параметр=значение ..." (профиль fast есть всегда)
+def parse_profiles(lines):
+    profiles = {DEFAULT_PROFILE: NetworkProfile(DEFAULT_PROFILE)}
+    for line in lines:
+        name, *settings = line.split()
+        parsed = {}
+        for setting in settings:
+            key, separator, value = setting.partition("=")
+            if not separator or key not in SETTINGS:
+                raise ValueError(
+                    f"Invalid network profile setting {setting!r} in {line!r}, expected one of {SETTINGS}"
+                )
+            parsed[key] = float(value)
+        profiles[name] = NetworkProfile(name, **parsed)
+    return profiles
+
+
+# Функция возвращает профиль по имени; неизвестное имя — ошибка с перечнем профилей
+def get_profile(profiles, name):
+    if name not in profiles:
+        raise ValueError(
+            f"Unknown network profile {name!r}, expected one of {sorted(profiles)} (network_profiles in pytest.ini)"
+        )
+    return profiles[name]
+
+
+# Класс применяет профиль к страницам контекстов одного теста и записывает длительность шагов теста по профилю
+class NetworkThrottler:
+    def __init__(self, profile, nodeid=None):
+        self.profile = profile
+        self.nodeid = nodeid
+        self.sessions = []  # Сессии CDP страниц: условия эмуляции действуют, пока сессия открыта
+        self.pages = []  # Страницы, к которым профиль уже применён
+        self.opening = False  # Выполняется ли context.new_page (страницу настраивает он сам)
+
+    # Подключает профиль к синхронному контексту: применяется к каждой новой странице, в том числе всплывающей.
+    # Страницы из context.new_page получают профиль до возврата: обработчик события page не задерживает
+    # new_page, и первая загрузка страницы начиналась бы раньше, чем CDP применит ограничения
+    def attach(self, context):
+        if not self.profile.throttles:
+            return
+        context.on("page", self._on_page)  # Всплывающие окна и вкладки, открытые страницей
+        original_new_page = context.new_page
+
+        def new_page():
+            self.opening = True
+            try:
+                page = original_new_page()
+            finally:
+                self.opening = False
+            self.apply(page)
+            return page
+
+        context.new_page = new_page
+
+    def _on_page(self, page):
+        if not self.opening:
+            self.apply(page)
+
+    # Применяет профиль к странице синхронного контекста (один раз, даже если о странице сообщили дважды)
+    def apply(self, page):
+        if page in self.pages:
+            return
+        self.pages.append(page)
+        try:
+            session = page.context.new_cdp_session(page)
+            session.send("Network.enable")
+            session.send("Network.emulateNetworkConditions", self.profile.network_conditions())
+            if self.profile.cpu > 1:
+                session.send("Emulation.setCPUThrottlingRate", {"rate": self.profile.cpu})
+        except PlaywrightError as e:  # Страница уже закрыта или браузер не Chromium
+            logger.warning("Failed to apply network profile %s: %s", self.profile.name, e)
+            return
+        self.sessions.append(session)
+        stats.count(STATS_SECTION, f"pages throttled ({self.profile.name})")
+
+    # Подключает профиль к асинхронному контексту: страницы из context.new_page получают профиль до возврата
+    # (обработчик события page в асинхронном API выполняется позже, когда тест уже мог начать переход)
+    def attach_async(self, context):
+        if not self.profile.throttles:
+            return
+        original_new_page = context.new_page
+
+        async def new_page():
+            page = await original_new_page()
+            await self.apply_async(page)
+            return page
+
+        context.new_page = new_page
+
+    async def apply_async(self, page):
+        try:
+            session = await page.context.new_cdp_session(page)
+            await session.send("Network.enable")
+            await session.send("Network.emulateNetworkConditions", self.profile.network_conditions())
+            if self.profile.cpu > 1:
+                await session.send("Emulation.setCPUThrottlingRate", {"rate": self.profile.cpu})
+        except PlaywrightError as e:
+            logger.warning("Failed to apply network profile %s: %s", self.profile.name, e)
+            return
+        self.sessions.append(session)
+        stats.count(STATS_SECTION, f"pages throttled ({self.profile.name})")
+
+    # Записывает длительность шагов теста (perf.recorder.steps) в статистику сессии с именем профиля
+    def record_steps(self, steps):
+        for item in steps:
+            if item["nested"]:
+                continue  # Замер внутри другого ожидания или действия уже учтён в нём
+            if item["name"].startswith(REPORTED_PREFIXES) or item["kind"] == "step" and item["depth"] == 0:
+                stats.record(STATS_SECTION, {
+                    "profile": self.profile.name,
+                    "test": self.nodeid,
+                    "step": item["name"],
+                    "kind": item["kind"],
+                    "duration": item["duration"],
+                })
+
+    # Завершает тест: сессии CDP закрываются вместе со страницами, ссылки на них больше не нужны
+    def finish(self, steps):
+        self.record_steps(steps)
+        self.sessions = []
+        self.pages = []
+
+
+# Функция возвращает строки сводки для терминала: по каждому шагу — перцентили в каждом профиле
+# и для ожиданий — таймаут с запасом TIMEOUT_MARGIN от p95 в самом медленном профиле
+def summary_lines(records):
+    by_step = {}
+    for record in records:
+        by_step.setdefault(record["step"], {}).setdefault(record["profile"], []).append(record)
+    lines = []
+    for step_name, by_profile in sorted(by_step.items()):
+        lines.append(f"  {step_name}")
+        slowest = 0.0
+        for profile, items in sorted(by_profile.items()):
+            durations = [item["duration"] for item in items]
+            p95 = percentile(durations, 95)
+            lines.append(
+                f"    {profile:<12} n={len(durations)} p50={percentile(durations, 50):.2f}s "
+                f"p95={p95:.2f}s max={max(durations):.2f}s"
+            )
+            if items[0]["kind"] == "wait":
+                slowest = max(slowest, p95)
+        if slowest:
+            timeout = math.ceil(slowest * TIMEOUT_MARGIN)
+            lines.append(f"    suggested timeout: {timeout}s ({TIMEOUT_MARGIN}x slowest p95)")
+    return lines
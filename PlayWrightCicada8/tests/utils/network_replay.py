@@ -0,0 +1,61 @@
+# Утилита для записи и воспроизведения сетевого трафика тестов (HAR)
+# Режимы (опция --network-mode):
+# - live: обычная работа со стендом;
+# - record: трафик каждого контекста записывается в отдельный HAR-файл теста (route_from_har с update=True);
+# - replay: ответы отдаются из HAR-файлов без обращения к стенду; совпадение ищется по методу, URL и телу запроса.
+#   Запросы, которых нет в записи, прерываются и попадают в отчёт.
+
+import os
+import logging
+
+from tests.utils.node_names import safe_node_name
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Допустимые режимы работы с сетью
+NETWORK_MODES = ("live", "record", "replay")
+
+# Раздел статистики для воспроизведения
+STATS_SECTION = "network replay"
+
+
+# Класс подключает запись или воспроизведение HAR к контекстам одного теста
+class NetworkRecorder:
+    def __init__(self, mode, har_dir, nodeid):
+        self.mode = mode  # Режим работы: live, record или replay
+        self.har_dir = har_dir  # Каталог с HAR-файлами
+        self.nodeid = nodeid  # Идентификатор теста
+        self.contexts = 0  # Сколько контекстов уже создано в тесте (у каждого свой HAR-файл)
+
+    # Возвращает путь к HAR-файлу для очередного контекста теста
+    def har_path(self, index):
+        suffix = f"-{index}" if index else ""
+        return os.path.join(self.har_dir, f"{safe_node_name(self.nodeid)}{suffix}.har")
+
+    # Подключает запись или воспроизведение к новому контексту
+    def attach(self, context):
+        path = self.har_path(self.contexts)
+        self.contexts += 1
+        if self.mode == "record":
+            os.makedirs(self.har_dir, exist_ok=True)
+            # HAR сохраняется при закрытии контекста; содержимое ответов встраивается прямо в файл
+            context.route_from_har(path, update=True, update_content="embed", update_mode="full")
+            logger.info("Recording network traffic to %s", path)
+        elif self.mode == "replay":
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No HAR recording {path}; run the test with --network-mode=record first")
+            # Сначала регистрируем обработчик для запросов, которых нет в записи:
+            # маршрут из HAR зарегистрирован позже, поэтому проверяется первым и передаёт сюда только промахи
+            context.route("**/*", self._unmatched)
+            context.route_from_har(path, not_found="fallback")
+            logger.info("Replaying network traffic from %s", path)
+
+    # Обработчик запроса, для которого в HAR не нашлось ответа
+    def _unmatched(self, route):
+        request = route.request
+        stats.count(STATS_SECTION, "unmatched requests")
+        stats.record(STATS_SECTION, {"test": self.nodeid, "method": request.method, "url": request.url})
+        logger.warning("No HAR entry for %s %s", request.method, request.url)
+        route.abort()
@@ -0,0 +1,17 @@
+# Утилита для построения имён файлов по тестам и воркерам
+# Имена уникальны для каждого теста и воркера, поэтому параллельные воркеры (pytest -n auto)
+# не перезаписывают файлы друг друга
+
+import os
+import re
+
+
+# Возвращает идентификатор воркера pytest-xdist ("gw0", "gw1", ...) или "main" при обычном запуске
+def worker_id():
+    return os.getenv("PYTEST_XDIST_WORKER", "main")
+
+
+# Превращает nodeid теста ("tests/auth/test_login.py::test_login[param]") в безопасное имя файла
+def safe_node_name(nodeid, max_length=120):
+    name = re.sub(r"[^\w.-]+", "_", nodeid.replace(".py::", "__")).strip("_")
+    return name[-max_length:]
@@ -0,0 +1,187 @@
+# Утилита для пула "тёплых" страниц входа (опция --page-pool)
+# Обычно фикстура page создаёт контекст и страницу и заново загружает SPA Cicada8 (page.goto(base_url)):
+# для коротких тестов формы (например, test_negative_login) загрузка занимает большую часть времени теста.
+# В режиме пула страница после теста не закрывается, а сбрасывается и выдаётся следующему тесту:
+# - закрываются лишние страницы контекста, удаляются cookies, разрешения, localStorage и sessionStorage;
+# - форма входа сбрасывается навигацией внутри SPA (history.pushState + popstate): переход на bounce_path
+#   и обратно на страницу входа заново монтирует форму (пустые поля, без сообщений об ошибках);
+# - проверяется, что тест не оставил обработчиков событий страницы (dialog, request, ...) и перехватов
+#   запросов (route), а форма входа видна и пуста.
+# Если сброс не удался или его нельзя проверить (тест упал, страница закрыта, остались обработчики),
+# страница закрывается, и следующий тест получает новую. В статистике сессии (раздел "page pool") —
+# число попаданий и промахов, время загрузки новой страницы и сброса, оценка сэкономленного времени.
+
+import time
+import logging
+
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.auth_utils import EMAIL_SELECTOR, PASSWORD_SELECTOR, LOGIN_ERROR_SELECTOR
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики пула страниц
+STATS_SECTION = "page pool"
+
+# События страницы, обработчики которых тест мог оставить (их нельзя снять, не зная функций)
+TEST_EVENTS = ("dialog", "popup", "download", "filechooser", "request", "response", "console", "pageerror")
+
+# Сброс состояния страницы: хранилища очищаются, форма входа монтируется заново навигацией внутри SPA
+_RESET_JS = """
+async ([loginPath, bouncePath]) => {
+  try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}
+  const frame = () => new Promise((resolve) => requestAnimationFrame(() => setTimeout(resolve, 0)));
+  const go = async (path) => {
+    history.pushState(null, "", path);
+    dispatchEvent(new PopStateEvent("popstate", {state: null}));
+    await frame();
+  };
+  await go(bouncePath);
+  await go(loginPath);
+}
+"""
+
+# Проверка сброса: страница входа, поля формы видны и пусты, сообщения об ошибке нет
+_VERIFY_JS = """
+([loginPath, emailSelector, passwordSelector, errorSelector]) => {
+  const visible = (element) => element && element.getClientRects().length > 0;
+  const email = document.querySelector(emailSelector);
+  const password = document.querySelector(passwordSelector);
+  const error = document.querySelector(errorSelector);
+  return location.pathname === loginPath && visible(email) && visible(password)
+    && email.value === "" && password.value === "" && !(visible(error) && error.textContent.trim());
+}
+"""
+
+
+# Функция возвращает число перехватов запросов (route) объекта Playwright (None — узнать нельзя)
+def _route_count(obj):
+    routes = getattr(getattr(obj, "_impl_obj", None), "_routes", None)
+    return None if routes is None else len(routes)
+
+
+# Функция возвращает события, на которые у страницы остались обработчики теста
+def _leftover_listeners(page):
+    impl = getattr(page, "_impl_obj", None)
+    if impl is None or not hasattr(impl, "listeners"):
+        return []
+    return [event for event in TEST_EVENTS if impl.listeners(event)]
+
+
+# Класс описывает страницу из пула, выданную тесту
+class PageLease:
+    def __init__(self, context, page, reused):
+        self.context = context
+        self.page = page
+        self.reused = reused  # True — страница из пула, False — только что загружена
+        self.context_routes = _route_count(context)  # Перехваты, подключённые фикстурами (кэш ресурсов)
+
+
+# Класс хранит загруженные страницы входа воркера и сбрасывает их между тестами
+class PagePool:
+    def __init__(self, new_context, base_url, login_path="/", bounce_path="/password-recovery",
+                 max_idle=2, verify_timeout=3000):
+        self.new_context = new_context  # Функция без аргументов, создающая контекст для пула
+        self.base_url = base_url
+        self.login_path = login_path  # Путь страницы входа внутри SPA
+        self.bounce_path = bounce_path  # Другой маршрут SPA для перемонтирования формы
+        self.max_idle = max_idle  # Сколько сброшенных страниц держать наготове
+        self.verify_timeout = verify_timeout  # Сколько мс ждать, пока форма после сброса станет пустой
+        self.idle = []  # Сброшенные страницы, готовые к выдаче
+
+    # Выдаёт тесту страницу входа: сброшенную из пула или новую
+    def checkout(self):
+        while self.idle:
+            lease = self.idle.pop()
+            if not lease.page.is_closed():
+                stats.count(STATS_SECTION, "hits")
+                lease.reused = True
+                return lease
+            self._discard(lease)
+        started = time.perf_counter()
+        context = self.new_context()
+        try:
+            page = context.new_page()
+            page.goto(self.base_url)
+        except Exception:
+            self._close(context)
+            raise
+        stats.count(STATS_SECTION, "misses")
+        stats.timing(STATS_SECTION, "fresh page", time.perf_counter() - started)
+        return PageLease(context, page, reused=False)
+
+    # Возвращает страницу после теста: сбрасывает её и кладёт в пул; если сброс не удался — закрывает
+    def checkin(self, lease, reusable=True):
+        if not reusable or len(self.idle) >= self.max_idle:
+            self._discard(lease)
+            return
+        started = time.perf_counter()
+        try:
+            problem = self._reset(lease)
+        except PlaywrightError as e:
+            problem = f"reset failed: {e}".splitlines()[0]
+        if problem:
+            logger.info("Pooled page is not reusable (%s), a fresh page will be used", problem)
+            stats.count(STATS_SECTION, "reset rejected (fresh page)")
+            self._discard(lease)
+            return
+        stats.timing(STATS_SECTION, "reset", time.perf_counter() - started)
+        self.idle.append(lease)
+
+    # Сбрасывает состояние страницы; возвращает причину, по которой страницу нельзя переиспользовать (или None)
+    def _reset(self, lease):
+        page, context = lease.page, lease.context
+        if page.is_closed():
+            return "page closed"
+        for other in context.pages:
+            if other is not page:
+                other.close()  # Всплывающие окна и вкладки, открытые тестом
+        listeners = _leftover_listeners(page)
+        if listeners:
+            return f"event listeners left: {', '.join(listeners)}"
+        if _route_count(page) or _route_count(context) != lease.context_routes:
+            return "routes left"
+        context.clear_cookies()
+        context.clear_permissions()
+        page.evaluate(_RESET_JS, [self.login_path, self.bounce_path])
+        try:
+            page.wait_for_function(
+                _VERIFY_JS, arg=[self.login_path, EMAIL_SELECTOR, PASSWORD_SELECTOR, LOGIN_ERROR_SELECTOR],
+                timeout=self.verify_timeout, polling=50,
+            )
+        except PlaywrightError:
+            return "login form was not reset"
+        return None
+
+    def _discard(self, lease):
+        stats.count(STATS_SECTION, "pages closed")
+        self._close(lease.context)
+
+    @staticmethod
+    def _close(context):
+        try:
+            context.close()
+        except PlaywrightError as e:
+            logger.warning("Failed to close pooled context: %s", e)
+
+    # Закрывает страницы пула (конец сессии воркера)
+    def close(self):
+        while self.idle:
+            self._close(self.idle.pop().context)
+
+
+# Возвращает строку с долей попаданий и оценкой сэкономленного времени: загрузка новой страницы минус сброс
+def summary_line(session_stats):
+    counters = session_stats.counters.get(STATS_SECTION, {})
+    timings = session_stats.timings.get(STATS_SECTION, {})
+    hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+    if not hits + misses:
+        return None
+    line = f"  page pool hit rate: {hits / (hits + misses):.0%} ({hits} of {hits + misses} tests)"
+    fresh, resets = timings.get("fresh page"), timings.get("reset")
+    if hits and fresh and resets:
+        saved = sum(fresh) / len(fresh) - sum(resets) / len(resets)
+        line += f", ~{saved:.2f}s saved per pooled test ({saved * hits:.1f}s total)"
+    return line
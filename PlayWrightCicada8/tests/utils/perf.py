@@ -0,0 +1,240 @@
+# Утилита для замера времени шагов тестов
+# Автоматически замеряет каждое действие и ожидание Playwright на страницах из фикстур
+# (goto, fill, click, wait_for_selector, ...), а также функции, помеченные декоратором @timed
+# (например, ожидание письма в imap_utils). Для произвольных участков теста есть именованные шаги:
+#     with step("request reset"):
+#         ...
+# По итогам прогона формируется JSON-отчёт (по тестам и шагам, доля ожиданий и работы, перцентили)
+# и сводка самых медленных шагов в терминале.
+
+import os
+import json
+import time
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from tests.utils.node_names import worker_id
+from tests.utils.session_stats import stats, percentile
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики, в который попадают записи по тестам
+STATS_SECTION = "perf"
+
+# Методы страницы и локатора, которые замеряются автоматически: ожидания и действия
+WAIT_METHODS = (
+    "wait_for_selector", "wait_for_load_state", "wait_for_url", "wait_for_timeout",
+    "wait_for_function", "wait_for_event", "wait_for",
+)
+WORK_METHODS = (
+    "goto", "reload", "go_back", "fill", "click", "dblclick", "type", "press", "check", "uncheck",
+    "select_option", "set_input_files", "hover", "screenshot", "content", "evaluate", "inner_text",
+    "text_content", "is_visible", "is_enabled", "is_disabled", "close",
+)
+
+
+# Класс собирает шаги текущего теста (один тест выполняется в воркере в каждый момент времени)
+class StepRecorder:
+    def __init__(self):
+        self.nodeid = None  # Идентификатор текущего теста
+        self.steps = []  # Шаги текущего теста
+        self.phases = {}  # Длительность фаз setup/call/teardown
+        self.outcome = "passed"
+        self._local = threading.local()  # Вложенность шагов в каждом потоке
+        self.listeners = []  # Функции listener(kind), вызываемые после каждого ожидания или действия верхнего уровня
+
+    # Начинает сбор шагов для теста
+    def start_test(self, nodeid):
+        self.nodeid = nodeid
+        self.steps = []
+        self.phases = {}
+        self.outcome = "passed"
+
+    # Запоминает длительность и результат фазы теста
+    def add_phase(self, when, duration, outcome):
+        self.phases[when] = duration
+        if outcome != "passed" and self.outcome == "passed":
+            self.outcome = outcome if when == "call" else "error"
+
+    # Завершает тест и кладёт его запись в статистику сессии
+    def finish_test(self):
+        if self.nodeid is None:
+            return
+        # Для доли ожиданий и работы берутся только замеры, не вложенные в другие замеры ожиданий/работы,
+        # чтобы время не считалось дважды
+        measured = [item for item in self.steps if not item["nested"]]
+        stats.record(STATS_SECTION, {
+            "nodeid": self.nodeid,
+            "worker": worker_id(),
+            "outcome": self.outcome,
+            "phases": self.phases,
+            "wait": sum(item["duration"] for item in measured if item["kind"] == "wait"),
+            "work": sum(item["duration"] for item in measured if item["kind"] == "work"),
+            "steps": self.steps,
+        })
+        self.nodeid = None
+        self.steps = []
+
+    # Контекстный менеджер, замеряющий один шаг
+    # kind: "wait" (ожидание), "work" (действие) или "step" (именованная группа шагов)
+    @contextmanager
+    def span(self, name, kind="step", target=None):
+        depth = getattr(self._local, "depth", 0)  # Вложенность любых шагов
+        measured = getattr(self._local, "measured", 0)  # Вложенность замеров ожиданий и действий
+        self._local.depth = depth + 1
+        if kind != "step":
+            self._local.measured = measured + 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            self._local.measured = measured
+            if self.nodeid is not None:
+                self.steps.append({
+                    "name": name,
+                    "kind": kind,
+                    "target": target,
+                    "duration": time.perf_counter() - started,
+                    "depth": depth,
+                    "nested": measured > 0,
+                })
+            if kind != "step" and measured == 0:
+                for listener in self.listeners:
+                    listener(kind)
+
+
+# Общий экземпляр для текущего процесса
+recorder = StepRecorder()
+
+
+# Именованный шаг теста: with step("login"): ...
+def step(name, kind="step"):
+    return recorder.span(name, kind)
+
+
+# Декоратор: замеряет каждый вызов функции как шаг с указанным именем
+def timed(name, kind="step"):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with recorder.span(name, kind):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Оборачивает метод объекта Playwright так, чтобы каждый вызов замерялся
+def _wrap_method(obj, method_name, kind, prefix, target=None):
+    original = getattr(obj, method_name, None)
+    if original is None:
+        return
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        argument = target or (str(args[0])[:80] if args else None)
+        with recorder.span(f"{prefix}.{method_name}", kind, argument):
+            return original(*args, **kwargs)
+
+    setattr(obj, method_name, wrapper)
+
+
+# Подключает замеры к локатору (ожидания wait_for и действия click, fill, ...)
+def instrument_locator(locator, selector=None):
+    for name in WAIT_METHODS:
+        _wrap_method(locator, name, "wait", "locator", selector)
+    for name in WORK_METHODS:
+        _wrap_method(locator, name, "work", "locator", selector)
+    return locator
+
+
+# Подключает замеры к странице; повторный вызов для той же страницы ничего не делает
+def instrument_page(page):
+    if getattr(page, "_perf_instrumented", False):
+        return page
+    page._perf_instrumented = True
+    for name in WAIT_METHODS:
+        _wrap_method(page, name, "wait", "page")
+    for name in WORK_METHODS:
+        _wrap_method(page, name, "work", "page")
+    original_locator = page.locator
+
+    @functools.wraps(original_locator)
+    def locator(selector, *args, **kwargs):
+        return instrument_locator(original_locator(selector, *args, **kwargs), selector)
+
+    page.locator = locator
+    return page
+
+
+# Считает агрегаты по шагам всех тестов: число, сумма, минимум, перцентили, максимум
+def aggregate_steps(tests):
+    durations = {}
+    for test in tests:
+        for item in test["steps"]:
+            durations.setdefault((item["name"], item["kind"]), []).append(item["duration"])
+    result = {}
+    for (name, kind), values in durations.items():
+        result[name] = {
+            "kind": kind,
+            "count": len(values),
+            "total": sum(values),
+            "min": min(values),
+            "p50": percentile(values, 50),
+            "p90": percentile(values, 90),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+            "max": max(values),
+        }
+    return result
+
+
+# Собирает итоговый отчёт прогона
+def build_report(tests):
+    test_durations = [sum(t["phases"].values()) for t in tests]
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "tests": tests,
+        "steps": aggregate_steps(tests),
+        "totals": {
+            "tests": len(tests),
+            "wait": sum(t["wait"] for t in tests),
+            "work": sum(t["work"] for t in tests),
+            "test_p50": percentile(test_durations, 50),
+            "test_p95": percentile(test_durations, 95),
+        },
+    }
+
+
+# Записывает отчёт в report_dir/perf_<время>.json и копию в perf_latest.json; возвращает путь
+def write_report(report, report_dir):
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"perf_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    data = json.dumps(report, ensure_ascii=False, indent=2)
+    for target in (path, os.path.join(report_dir, "perf_latest.json")):
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(data)
+    return path
+
+
+# Возвращает строки сводки для терминала: самые медленные шаги по сумме времени и самые долгие вызовы
+def summary_lines(report, limit=10):
+    lines = []
+    totals = report["totals"]
+    busy = totals["wait"] + totals["work"]
+    if busy:
+        lines.append(f"wait {totals['wait']:.1f}s / work {totals['work']:.1f}s "
+                     f"({totals['wait'] / busy:.0%} of step time spent waiting)")
+    slowest = sorted(report["steps"].items(), key=lambda item: item[1]["total"], reverse=True)[:limit]
+    for name, data in slowest:
+        lines.append(f"  {name:<28} {data['kind']:<4} n={data['count']:<4} total={data['total']:.2f}s "
+                     f"p50={data['p50']:.3f}s p95={data['p95']:.3f}s max={data['max']:.3f}s")
+    calls = [(item["duration"], item["name"], item["target"], test["nodeid"])
+             for test in report["tests"] for item in test["steps"]]
+    for duration, name, target, nodeid in sorted(calls, reverse=True, key=lambda call: call[0])[:5]:
+        lines.append(f"  slowest call: {duration:.2f}s {name}({target or ''}) in {nodeid}")
+    return lines
@@ -0,0 +1,251 @@
+# Утилита для проверки окружения перед тестами (preflight) и "автомата защиты" фикстур (circuit breaker)
+# Если стенд недоступен или вход сломан, без проверок каждый тест доходит до своих таймаутов
+# (60 с на вход в logged_in_page, по 10 с на селектор), и двухминутный прогон длится полчаса.
+# Preflight: перед первым тестом, которому нужен стенд, проверяются DNS, TLS, HTTP-статус base_url,
+# API входа и доступность IMAP-сервера (imap_utils). Каждая проверка выполняется один раз за запуск:
+# результат сохраняется в файл каталога запуска и общий для всех воркеров xdist. Тест, которому нужна
+# не прошедшая проверка, сразу падает с её причиной. Проверка может закончиться предупреждением (UserWarning):
+# оно попадает в лог и статистику, но тесты не останавливает.
+# Circuit breaker: после threshold подряд неудачных попыток одного вида (например, входа) следующие
+# тесты, которым нужна эта операция, сразу падают с причиной первой ошибки, а не ждут свои таймауты.
+
+import os
+import ssl
+import json
+import time
+import socket
+import imaplib
+import threading
+import logging
+import urllib.error
+import urllib.request
+from urllib.parse import urljoin, urlsplit
+
+from tests.utils.file_lock import FileLock, atomic_write
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Разделы статистики
+STATS_SECTION = "preflight"
+BREAKER_STATS_SECTION = "circuit breaker"
+
+# Проверки, которые нужны фикстурам
+STAND_CHECKS = ("dns", "tls", "http")  # Открыть страницу стенда (page, context)
+LOGIN_CHECKS = STAND_CHECKS + ("login api",)  # Войти (logged_in_page)
+MAIL_CHECKS = ("imap",)  # Читать письма (mail_server без --fake-mail)
+
+
+# Функция проверяет, что имя хоста стенда разрешается в адрес
+# У getaddrinfo нет таймаута, поэтому разрешение имени идёт в фоновом потоке, который не ждём дольше timeout
+def check_dns(base_url, timeout):
+    parts = urlsplit(base_url)
+    result = {}
+
+    def resolve():
+        try:
+            result["addresses"] = socket.getaddrinfo(parts.hostname, parts.port or 443, proto=socket.IPPROTO_TCP)
+        except Exception as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=resolve, name="preflight-dns", daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise TimeoutError(f"DNS lookup of {parts.hostname} took longer than {timeout}s")
+    if "error" in result:
+        raise result["error"]
+    return f"{parts.hostname} -> {result['addresses'][0][4][0]}"
+
+
+# Функция проверяет TLS-рукопожатие и сертификат стенда (для http:// проверка не нужна)
+def check_tls(base_url, timeout):
+    parts = urlsplit(base_url)
+    if parts.scheme != "https":
+        return "skipped (not https)"
+    context = ssl.create_default_context()
+    with socket.create_connection((parts.hostname, parts.port or 443), timeout=timeout) as sock:
+        with context.wrap_socket(sock, server_hostname=parts.hostname) as tls:
+            expires = tls.getpeercert().get("notAfter")
+            return f"{tls.version()}, certificate valid until {expires}"
+
+
+# Функция проверяет, что base_url отвечает без ошибки
+def check_http(base_url, timeout):
+    with urllib.request.urlopen(base_url, timeout=timeout) as response:  # 4xx/5xx — исключение HTTPError
+        return f"HTTP {response.status}"
+
+
+# Функция проверяет, что API входа отвечает: запрос с заведомо неверными учётными данными должен получить
+# отказ 4xx с JSON (аккаунты тестов не используются, чтобы не влиять на них). Выполняется, только если
+# LOGIN_API_PATH задан явно. Любой другой ответ — предупреждение, а не ошибка: вход через форму от пути API
+# не зависит, и тесты входа сами покажут, работает ли он. Значение по умолчанию в auth_utils — путь
+# стенда-заглушки: на стенде Cicada8 проверка по угаданному пути только зашумила бы лог.
+# Переменная читается при проверке, а не при импорте: conftest.py загружает .env после импорта утилит
+def check_login_api(base_url, timeout):
+    login_api_path = os.getenv("LOGIN_API_PATH")
+    if not login_api_path:
+        return "skipped (LOGIN_API_PATH not set)"
+    url = urljoin(base_url, login_api_path)
+    payload = json.dumps({"email": "preflight@invalid.example", "password": "preflight"}).encode("utf-8")
+    request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, body = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, body = e.code, e.read()
+    except OSError as e:
+        raise UserWarning(f"{url} did not respond: {e}")
+    if not 400 <= status < 500 or status in (404, 405):
+        raise UserWarning(f"{url} returned HTTP {status} to invalid credentials (check LOGIN_API_PATH)")
+    try:
+        json.loads(body.decode("utf-8"))
+    except ValueError:
+        raise UserWarning(f"{url} returned HTTP {status} without JSON (check LOGIN_API_PATH)")
+    return f"HTTP {status}"
+
+
+# Функция проверяет, что IMAP-сервер из настроек imap_utils принимает соединения (без входа в ящик)
+def check_imap(base_url, timeout):
+    host = os.getenv("IMAP_HOST", "mail.cicada8.ru")
+    port = int(os.getenv("IMAP_PORT", "993"))
+    use_ssl = os.getenv("IMAP_SSL", "1") != "0"
+    client = imaplib.IMAP4_SSL if use_ssl else imaplib.IMAP4
+    mail = client(host, port=port, timeout=timeout)  # Подключение и приветствие сервера
+    mail.logout()
+    return f"{host}:{port} ready"
+
+
+# Проверки по именам
+CHECKS = {
+    "dns": check_dns,
+    "tls": check_tls,
+    "http": check_http,
+    "login api": check_login_api,
+    "imap": check_imap,
+}
+
+
+# Класс выполняет проверки окружения один раз за запуск и хранит результаты в общем файле
+class Preflight:
+    def __init__(self, path, base_url, timeout=5.0, checks=None):
+        self.path = path  # Файл результатов в каталоге запуска (общий для воркеров)
+        self.base_url = base_url
+        self.timeout = timeout  # Таймаут каждой проверки, с
+        self.checks = checks or CHECKS
+        self._results = {}  # {проверка: {"ok", "warning", "detail", "duration"}}
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    # Выполняет одну проверку; исключение означает, что проверка не прошла, UserWarning — предупреждение
+    def _run(self, name):
+        started = time.perf_counter()
+        warning = False
+        try:
+            detail, ok = self.checks[name](self.base_url, self.timeout), True
+        except Warning as e:
+            detail, ok, warning = str(e), True, True
+        except Exception as e:
+            detail, ok = f"{type(e).__name__}: {e}", False
+        duration = time.perf_counter() - started
+        stats.timing(STATS_SECTION, name, duration)
+        if warning:
+            stats.count(STATS_SECTION, f"{name} warnings")
+            logger.warning("Preflight %s passed with a warning in %.2fs: %s", name, duration, detail)
+        elif ok:
+            logger.info("Preflight %s passed in %.2fs: %s", name, duration, detail)
+        else:
+            stats.count(STATS_SECTION, f"{name} failed")
+            logger.error("Preflight %s failed in %.2fs: %s", name, duration, detail)
+        return {"ok": ok, "warning": warning, "detail": detail, "duration": duration}
+
+    # Возвращает результаты проверок names; недостающие выполняет один процесс, остальные берут их из файла
+    def results(self, names):
+        missing = [name for name in names if name not in self._results]
+        if missing:
+            self._results.update(self._read())
+            missing = [name for name in names if name not in self._results]
+        if missing:
+            with FileLock(f"{self.path}.lock", timeout=self.timeout * len(CHECKS) * 2):
+                self._results.update(self._read())  # Пока ждали блокировку, проверки мог выполнить другой воркер
+                for name in names:
+                    if name not in self._results:
+                        self._results[name] = self._run(name)
+                atomic_write(self.path, json.dumps(self._results, ensure_ascii=False, indent=2))
+        return {name: self._results[name] for name in names}
+
+    # Возвращает описание первой не прошедшей проверки из names (None — все прошли)
+    # Проверки идут по порядку: после первой неудачи следующие не выполняются (без DNS не будет и HTTP)
+    def failure(self, names):
+        for name in names:
+            result = self.results([name])[name]
+            if not result["ok"]:
+                return f"Stand preflight check '{name}' failed for {self.base_url}: {result['detail']}"
+        return None
+
+
+# Класс считает подряд идущие неудачи операций одного вида (общий для воркеров файл состояния)
+# После threshold неудач подряд "автомат" размыкается до конца запуска: check() сообщает причину первой неудачи
+class CircuitBreaker:
+    def __init__(self, path, threshold=3):
+        self.path = path  # Файл состояния в каталоге запуска
+        self.threshold = threshold
+        self._open = {}  # Разомкнутые виды операций, известные этому процессу: {вид: причина}
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    # Изменяет состояние вида операции под блокировкой
+    def _update(self, kind, change):
+        with FileLock(f"{self.path}.lock", timeout=30):
+            state = self._read()
+            entry = change(state.get(kind, {"failures": 0, "cause": None, "open": False}))
+            state[kind] = entry
+            atomic_write(self.path, json.dumps(state, ensure_ascii=False, indent=2))
+        return entry
+
+    # Возвращает причину, если автомат для вида операции разомкнут (None — операцию можно выполнять)
+    def check(self, kind):
+        if kind not in self._open:
+            entry = self._read().get(kind)
+            if not entry or not entry["open"]:
+                return None
+            self._open[kind] = entry["cause"]
+        stats.count(BREAKER_STATS_SECTION, f"{kind}: failed fast")
+        return (f"Circuit breaker for '{kind}' is open after {self.threshold} consecutive failures, "
+                f"first failure: {self._open[kind]}")
+
+    # Запоминает неудачу; возвращает True, если после неё автомат разомкнулся
+    def failure(self, kind, error):
+        cause = f"{type(error).__name__}: {error}".splitlines()[0][:500]
+
+        def change(entry):
+            failures = entry["failures"] + 1
+            return {
+                "failures": failures,
+                "cause": entry["cause"] or cause,  # Причина — первая неудача серии
+                "open": entry["open"] or failures >= self.threshold,
+            }
+
+        entry = self._update(kind, change)
+        if entry["open"] and kind not in self._open:
+            self._open[kind] = entry["cause"]
+            stats.count(BREAKER_STATS_SECTION, f"{kind}: opened")
+            logger.error("Circuit breaker for %s opened: %s", kind, entry["cause"])
+        return entry["open"]
+
+    # Запоминает успех: счётчик неудач подряд сбрасывается (разомкнутый автомат остаётся разомкнутым)
+    def success(self, kind):
+        entry = self._read().get(kind)
+        if entry and entry["failures"] and not entry["open"]:
+            self._update(kind, lambda entry: entry if entry["open"] else {"failures": 0, "cause": None, "open": False})
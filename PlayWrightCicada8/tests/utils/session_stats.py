@@ -0,0 +1,72 @@
+# Утилита для сбора статистики тестовой сессии
+# Хранит счётчики, замеры времени и произвольные записи (словари) по разделам.
+# При запуске через pytest-xdist каждый воркер отдаёт свои данные контроллеру
+# через config.workeroutput, контроллер объединяет их и печатает итог в терминал
+# (см. хуки pytest_sessionfinish, pytest_testnodedown и pytest_terminal_summary в conftest.py)
+
+import math
+import statistics
+
+
+# Считает перцентиль по списку значений (метод ближайшего ранга)
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+# Класс накапливает статистику одного процесса (воркера или контроллера)
+class SessionStats:
+    def __init__(self):
+        self.counters = {}  # {раздел: {ключ: число}}
+        self.timings = {}  # {раздел: {ключ: [секунды, ...]}}
+        self.records = {}  # {раздел: [словарь, ...]}
+
+    # Увеличивает счётчик в разделе
+    def count(self, section, key, value=1):
+        bucket = self.counters.setdefault(section, {})
+        bucket[key] = bucket.get(key, 0) + value
+
+    # Добавляет замер времени (в секундах) в раздел
+    def timing(self, section, key, seconds):
+        self.timings.setdefault(section, {}).setdefault(key, []).append(seconds)
+
+    # Добавляет произвольную запись (должна сериализоваться в JSON)
+    def record(self, section, data):
+        self.records.setdefault(section, []).append(data)
+
+    # Превращает статистику в словарь, который можно передать через execnet
+    def to_dict(self):
+        return {"counters": self.counters, "timings": self.timings, "records": self.records}
+
+    # Объединяет статистику другого процесса (результат to_dict) с текущей
+    def merge(self, data):
+        for section, values in data.get("counters", {}).items():
+            for key, value in values.items():
+                self.count(section, key, value)
+        for section, values in data.get("timings", {}).items():
+            for key, samples in values.items():
+                self.timings.setdefault(section, {}).setdefault(key, []).extend(samples)
+        for section, items in data.get("records", {}).items():
+            self.records.setdefault(section, []).extend(items)
+
+    # Возвращает строки итогового отчёта для терминала
+    def summary_lines(self):
+        lines = []
+        sections = sorted(set(self.counters) | set(self.timings))
+        for section in sections:
+            lines.append(f"[{section}]")
+            for key, value in sorted(self.counters.get(section, {}).items()):
+                lines.append(f"  {key}: {value}")
+            for key, samples in sorted(self.timings.get(section, {}).items()):
+                lines.append(
+                    f"  {key}: n={len(samples)} total={sum(samples):.2f}s "
+                    f"avg={statistics.mean(samples):.3f}s max={max(samples):.3f}s"
+                )
+        return lines
+
+
+# Общий экземпляр статистики для текущего процесса
+stats = SessionStats()
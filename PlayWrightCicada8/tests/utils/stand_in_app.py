@@ -0,0 +1,272 @@
+# Локальный HTTP-сервер, имитирующий страницы Cicada8, которые используют тесты и фикстуры
+# Нужен, чтобы измерять накладные расходы самого фреймворка (запуск браузера, контексты, вход через форму)
+# без сети и без нагрузки на стенд: ответы сервера мгновенные и одинаковые от запуска к запуску.
+# Страницы повторяют селекторы тестов:
+# - GET /              — форма входа (поля "Введите e-mail" и "Введите пароль", кнопка submit, ссылка
+#                        /password-recovery), а при действующей cookie сессии — дашборд ("Моя организация");
+# - POST /api/v1/auth/login — проверка пароля (JSON), при успехе выставляет cookie сессии;
+# - GET /password-recovery и POST /api/v1/auth/password-recovery — запрос письма для сброса пароля;
+# - GET /static/app.js, /static/app.css — статические ресурсы с Cache-Control (для кэша ресурсов).
+# Форма входа, как в SPA, сбрасывается при навигации внутри страницы (popstate на "/"): на этом
+# основан сброс страниц пула (tests/utils/page_pool.py).
+# Сервер работает в фоновом потоке текущего процесса, как локальный почтовый сервер (fake_mail_server.py).
+# Для нагрузочного режима (load_runner.py) можно задать задержку ответа (latency) и предел одновременно
+# обрабатываемых запросов (max_concurrent): сверх него сервер отвечает 503, как перегруженный стенд.
+
+import json
+import time
+import uuid
+import logging
+import threading
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Имя cookie сессии стенда-заглушки
+SESSION_COOKIE = "stand_in_session"
+
+_LOGIN_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Cicada8</title>
+<link rel="stylesheet" href="/static/app.css"><script src="/static/app.js" defer></script></head>
+<body>
+<form id="login">
+  <input type="email" placeholder="Введите e-mail">
+  <input type="password" placeholder="Введите пароль">
+  <div id="password-error" hidden>Введите пароль</div>
+  <div id="error" role="alert" hidden></div>
+  <button type="submit">Войти</button>
+  <a href="/password-recovery">Забыли пароль?</a>
+</form>
+</body></html>
+"""
+
+_DASHBOARD_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Cicada8</title>
+<link rel="stylesheet" href="/static/app.css"><script src="/static/app.js" defer></script></head>
+<body>
+<header><button type="button">{email}</button></header>
+<main><h1>Моя организация</h1></main>
+</body></html>
+"""
+
+_RECOVERY_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Cicada8</title>
+<link rel="stylesheet" href="/static/app.css"><script src="/static/app.js" defer></script></head>
+<body>
+<form id="recovery">
+  <p>Если вы забыли пароль, введите e-mail</p>
+  <input type="email" placeholder="E-mail">
+  <button type="submit">Отправить</button>
+  <div id="sent" hidden>Инструкция по восстановлению отправлена на указанную почту</div>
+</form>
+</body></html>
+"""
+
+_APP_JS = """
+const form = document.getElementById("login");
+if (form) {
+  const [email, password] = form.querySelectorAll("input");
+  const submit = form.querySelector("button[type=submit]");
+  form.addEventListener("submit", async (event) => {
+    event.preventDefault();
+    if (!password.value) {
+      document.getElementById("password-error").hidden = false;
+      submit.disabled = true;
+      return;
+    }
+    const response = await fetch("/api/v1/auth/login", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({email: email.value, password: password.value}),
+    });
+    if (response.ok) {
+      location.assign("/");
+    } else {
+      const error = document.getElementById("error");
+      error.textContent = "Неверный e-mail или пароль";
+      error.hidden = false;
+    }
+  });
+  password.addEventListener("input", () => { submit.disabled = false; });
+  // Как в SPA: при возврате на страницу входа через историю форма монтируется заново (пул страниц)
+  addEventListener("popstate", () => {
+    if (location.pathname !== "/") return;
+    form.reset();
+    document.getElementById("password-error").hidden = true;
+    document.getElementById("error").hidden = true;
+    submit.disabled = false;
+  });
+}
+const recovery = document.getElementById("recovery");
+if (recovery) {
+  recovery.addEventListener("submit", async (event) => {
+    event.preventDefault();
+    const response = await fetch("/api/v1/auth/password-recovery", {
+      method: "POST",
+      headers: {"Content-Type": "application/json"},
+      body: JSON.stringify({email: recovery.querySelector("input").value}),
+    });
+    if (response.ok) document.getElementById("sent").hidden = false;
+  });
+}
+"""
+
+_APP_CSS = "body { font-family: sans-serif; } [hidden] { display: none; }\n"
+
+# Статические ресурсы: путь -> (Content-Type, тело)
+_STATIC = {
+    "/static/app.js": ("application/javascript; charset=utf-8", _APP_JS),
+    "/static/app.css": ("text/css; charset=utf-8", _APP_CSS),
+}
+
+
+# Обработчик запросов стенда-заглушки
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, как у настоящего стенда
+
+    def log_message(self, format, *args):
+        pass  # Журнал запросов ведёт сам сервер (счётчики), вывод в stderr не нужен
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _session_email(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return self.server.app.sessions.get(morsel.value) if morsel else None
+
+    def do_GET(self):
+        self.server.app.count(f"GET {self.path}")
+        with self.server.app.slot() as admitted:
+            if not admitted:
+                self._send(HTTPStatus.SERVICE_UNAVAILABLE, "Overloaded", "text/plain; charset=utf-8")
+                return
+            self._get()
+
+    def _get(self):
+        path = self.path.split("?")[0]
+        if path in _STATIC:
+            content_type, body = _STATIC[path]
+            self._send(HTTPStatus.OK, body, content_type, {"Cache-Control": "public, max-age=3600"})
+        elif path in ("/", "/login"):
+            email = self._session_email()
+            page = _DASHBOARD_PAGE.format(email=email) if email else _LOGIN_PAGE
+            self._send(HTTPStatus.OK, page, headers={"Cache-Control": "no-store"})
+        elif path == "/password-recovery":
+            self._send(HTTPStatus.OK, _RECOVERY_PAGE, headers={"Cache-Control": "no-store"})
+        else:
+            self._send(HTTPStatus.NOT_FOUND, "Not found", "text/plain; charset=utf-8")
+
+    def do_POST(self):
+        self.server.app.count(f"POST {self.path}")
+        length = int(self.headers.get("Content-Length", "0"))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = {}
+        with self.server.app.slot() as admitted:
+            if not admitted:
+                self._send(HTTPStatus.SERVICE_UNAVAILABLE, "Overloaded", "text/plain; charset=utf-8")
+                return
+            self._post(payload)
+
+    def _post(self, payload):
+        if self.path == "/api/v1/auth/password-recovery":
+            self.server.app.count("reset requests")
+            self._send(HTTPStatus.OK, json.dumps({"detail": "sent"}), "application/json")
+            return
+        if self.path != "/api/v1/auth/login":
+            self._send(HTTPStatus.NOT_FOUND, "Not found", "text/plain; charset=utf-8")
+            return
+        token = self.server.app.login(payload.get("email", ""), payload.get("password", ""))
+        if token is None:
+            self._send(HTTPStatus.UNAUTHORIZED, json.dumps({"detail": "Invalid credentials"}), "application/json")
+            return
+        self._send(
+            HTTPStatus.OK, json.dumps({"token": token}), "application/json",
+            {"Set-Cookie": f"{SESSION_COOKIE}={token}; Path=/; HttpOnly; SameSite=Lax"},
+        )
+
+
+# HTTP-сервер с потоком на соединение и длинной очередью подключений (при нагрузке не сбрасывает соединения)
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+# Класс запускает стенд-заглушку в фоновом потоке текущего процесса
+class StandInApp:
+    def __init__(self, host="127.0.0.1", port=0, accounts=None, latency=0.0, max_concurrent=None):
+        self.accounts = accounts or {}  # {email: пароль}; пустой словарь — подходит любой непустой пароль
+        self.latency = latency  # Искусственная задержка каждого ответа в секундах
+        # Сколько запросов сервер обрабатывает одновременно (None — без ограничения); остальные получают 503
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.sessions = {}  # {токен сессии: email}
+        self.requests = {}  # Счётчики запросов {"GET /": число}
+        self._lock = threading.Lock()
+        self.server = _Server((host, port), _Handler)
+        self.server.app = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count(self, key):
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+    # Занимает место для обработки запроса на время блока (с задержкой latency); False — сервер перегружен
+    @contextmanager
+    def slot(self):
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            self.count("rejected (overloaded)")
+            yield False
+            return
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            yield True
+        finally:
+            if self._slots is not None:
+                self._slots.release()
+
+    # Проверяет пароль и возвращает токен новой сессии (None — неверные учётные данные)
+    def login(self, email, password):
+        expected = self.accounts.get(email)
+        if not password or (self.accounts and password != expected):
+            return None
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[token] = email
+        return token
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stand-in-app", daemon=True)
+        self._thread.start()
+        logger.info("Stand-in app started at %s", self.base_url)
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
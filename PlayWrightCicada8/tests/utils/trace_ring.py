@@ -0,0 +1,136 @@
+# Утилита для постоянной трассировки Playwright с кольцевым буфером в памяти
+# Трассировка (скриншоты и снимки DOM каждого действия) включена в каждом контексте из фикстур, но полная
+# трассировка каждого теста — это медленно и занимает много места. Поэтому запись делится на куски
+# (tracing.start_chunk / stop_chunk): кусок заканчивается, когда в нём набралось chunk_actions действий
+# или прошло chunk_seconds секунд. Законченный кусок выгружается (zip) и хранится в памяти, в буфере
+# остаются только последние keep кусков. Успешный тест просто отбрасывает текущий кусок (это дёшево),
+# а при падении теста или для тестов с маркером flaky буфер и текущий кусок записываются в артефакты теста:
+# trace-<контекст>-<номер>.zip, открываются командой playwright show-trace.
+# Время, потраченное на трассировку, учитывается в статистике сессии (раздел "trace ring").
+
+import os
+import time
+import logging
+import tempfile
+from collections import deque
+
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.session_stats import stats
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики для трассировки
+STATS_SECTION = "trace ring"
+
+
+# Класс хранит трассировку одного контекста: буфер законченных кусков и счётчики текущего куска
+class _ContextTrace:
+    def __init__(self, context, keep, started):
+        self.context = context
+        self.buffer = deque(maxlen=keep)  # Законченные куски (zip) от старых к новым
+        self.started = started  # Когда начался текущий кусок
+        self.actions = 0  # Сколько действий и ожиданий в текущем куске
+        self.dropped = 0  # Сколько кусков вытеснено из буфера (номера кусков в файлах идут подряд)
+
+
+# Класс ведёт трассировку контекстов одного теста
+class TraceRing:
+    def __init__(self, keep=2, chunk_seconds=10.0, chunk_actions=50, screenshots=True, snapshots=True,
+                 clock=time.monotonic):
+        self.keep = keep
+        self.chunk_seconds = chunk_seconds
+        self.chunk_actions = chunk_actions
+        self.screenshots = screenshots
+        self.snapshots = snapshots
+        self.clock = clock
+        self.traces = []  # Трассировки открытых контекстов теста
+        self.overhead = 0.0  # Сколько секунд тест потратил на трассировку
+        self.saved = False  # Записывалась ли трассировка в артефакты
+
+    # Включает трассировку контекста (до открытия в нём страниц)
+    def attach(self, context):
+        started = time.perf_counter()
+        context.tracing.start(screenshots=self.screenshots, snapshots=self.snapshots)  # Начинает и первый кусок
+        self.traces.append(_ContextTrace(context, self.keep, self.clock()))
+        self.overhead += time.perf_counter() - started
+
+    # Вызывается после каждого действия или ожидания на странице (слушатель perf.recorder)
+    def on_step(self, kind):
+        now = self.clock()
+        for trace in self.traces:
+            trace.actions += 1
+            if trace.actions >= self.chunk_actions or now - trace.started >= self.chunk_seconds:
+                self._rotate(trace)
+
+    # Заканчивает текущий кусок, кладёт его в буфер и начинает следующий
+    def _rotate(self, trace):
+        started = time.perf_counter()
+        try:
+            data = self._export(trace.context)
+            trace.context.tracing.start_chunk()
+        except PlaywrightError as e:  # Контекст закрывается — трассировать больше нечего
+            logger.debug("Trace chunk rotation failed: %s", e)
+            self.traces.remove(trace)
+            return
+        if len(trace.buffer) == trace.buffer.maxlen:
+            trace.dropped += 1
+        trace.buffer.append(data)
+        trace.started, trace.actions = self.clock(), 0
+        stats.count(STATS_SECTION, "chunks rotated")
+        self.overhead += time.perf_counter() - started
+
+    # Выгружает текущий кусок трассировки и возвращает его содержимое (zip)
+    @staticmethod
+    def _export(context):
+        fd, path = tempfile.mkstemp(prefix="trace-chunk-", suffix=".zip")
+        os.close(fd)
+        try:
+            context.tracing.stop_chunk(path=path)
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    # Возвращает файлы трассировки всех контекстов [(имя, zip)]: буфер и текущий кусок; запись продолжается
+    def flush(self):
+        started = time.perf_counter()
+        files = []
+        for index, trace in enumerate(list(self.traces)):
+            try:
+                current = self._export(trace.context)
+                trace.context.tracing.start_chunk()
+            except PlaywrightError as e:
+                logger.warning("Could not export the trace of context %s: %s", index, e)
+                current = None
+            chunks = list(trace.buffer) + ([current] if current is not None else [])
+            for number, data in enumerate(chunks, start=trace.dropped):
+                files.append((f"trace-{index}-{number}.zip", data))
+            trace.buffer.clear()
+            trace.dropped += len(chunks)
+            trace.started, trace.actions = self.clock(), 0
+        if files:
+            self.saved = True
+            stats.count(STATS_SECTION, "traces saved")
+            stats.count(STATS_SECTION, "bytes saved", sum(len(data) for _, data in files))
+        self.overhead += time.perf_counter() - started
+        return files
+
+    # Отбрасывает трассировку контекста перед его закрытием
+    def detach(self, context):
+        for trace in list(self.traces):
+            if trace.context is not context:
+                continue
+            started = time.perf_counter()
+            try:
+                context.tracing.stop()  # Без пути текущий кусок отбрасывается без выгрузки
+            except PlaywrightError as e:
+                logger.debug("Failed to stop tracing: %s", e)
+            self.traces.remove(trace)
+            self.overhead += time.perf_counter() - started
+
+    # Учитывает накладные расходы теста в статистике сессии (отдельно для тестов без записи трассировки)
+    def finish(self):
+        key = "overhead (trace saved)" if self.saved else "overhead (trace discarded)"
+        stats.timing(STATS_SECTION, key, self.overhead)
@@ -0,0 +1,247 @@
+# Утилита для клиентских метрик производительности страниц (web vitals)
+# В каждый контекст из фикстур добавляется скрипт, который на каждой загруженной странице (в том числе после
+# переходов по ссылкам и отправки форм) собирает Navigation Timing, first paint и FCP, LCP и CLS
+# (PerformanceObserver), размер кучи JS, число запросов и объём переданных данных (Resource Timing).
+# Скрипт сам отправляет метрики в Python через привязку (expose_binding), поэтому для сбора не нужны
+# обращения к странице из теста. В конце теста у открытых страниц дополнительно запрашиваются метрики CDP
+# (Performance.getMetrics): размер кучи JS и число узлов DOM.
+# Замеры записываются по тесту и URL в файл временного ряда (JSON lines, web_vitals_history в pytest.ini),
+# а бюджеты страниц из pytest.ini (web_vitals_budgets) проверяются после теста: превышение — падение теста.
+#     web_vitals_budgets =
+#         /           lcp_ms=2000 js_kb=1500
+#         /dashboard* lcp_ms=3000 cls=0.1
+
+import os
+import json
+import time
+import logging
+from fnmatch import fnmatch
+
+from playwright.sync_api import Error as PlaywrightError
+
+from tests.utils.session_stats import stats, percentile
+
+# Создаем логгер для этого модуля
+logger = logging.getLogger(__name__)
+
+# Раздел статистики, в который попадают замеры страниц
+STATS_SECTION = "web vitals"
+
+# Имя привязки, через которую скрипт страницы передаёт метрики
+BINDING = "__cicadaWebVitals"
+
+# Метрики замера; для каждой из них можно задать бюджет (максимальное значение)
+METRICS = (
+    "ttfb_ms", "dom_content_loaded_ms", "load_ms", "fp_ms", "fcp_ms", "lcp_ms", "cls",
+    "heap_mb", "dom_nodes", "requests", "transfer_kb", "js_kb",
+)
+
+# Скрипт выполняется в каждом документе до скриптов страницы (кроме about:blank новой вкладки и других
+# не-HTTP документов, у которых нет пути для бюджетов). Метрики отправляются после события load,
+# через 250 мс после новых записей LCP/CLS и при уходе со страницы; report() возвращает ключ замера
+_COLLECTOR_JS = """
+(() => {
+  if (window.top !== window || window.__cicadaWebVitalsReport || !/^https?:$/.test(location.protocol)) return;
+  const navigation = performance.timeOrigin + ":" + Math.random().toString(36).slice(2);
+  const vitals = {fp: null, fcp: null, lcp: null, cls: 0};
+  let timer = null;
+  const round = (value) => value == null ? null : Math.round(value);
+  const kb = (bytes) => Math.round(bytes / 102.4) / 10;
+  const size = (entry) => entry.transferSize || entry.encodedBodySize || 0;
+  const snapshot = () => {
+    const nav = performance.getEntriesByType("navigation")[0];
+    const resources = performance.getEntriesByType("resource");
+    const scripts = resources.filter((entry) => entry.initiatorType === "script");
+    return {
+      navigation,
+      url: location.href,
+      path: location.pathname,
+      ttfb_ms: nav ? round(nav.responseStart) : null,
+      dom_content_loaded_ms: nav && nav.domContentLoadedEventEnd ? round(nav.domContentLoadedEventEnd) : null,
+      load_ms: nav && nav.loadEventEnd ? round(nav.loadEventEnd) : null,
+      fp_ms: round(vitals.fp),
+      fcp_ms: round(vitals.fcp),
+      lcp_ms: round(vitals.lcp),
+      cls: Math.round(vitals.cls * 1000) / 1000,
+      heap_mb: performance.memory ? Math.round(performance.memory.usedJSHeapSize / 104857.6) / 10 : null,
+      requests: resources.length + 1,
+      transfer_kb: kb(resources.reduce((sum, entry) => sum + size(entry), nav ? size(nav) : 0)),
+      js_kb: kb(scripts.reduce((sum, entry) => sum + size(entry), 0)),
+    };
+  };
+  const report = () => {
+    clearTimeout(timer);
+    timer = null;
+    return typeof window.__cicadaWebVitals === "function" ? window.__cicadaWebVitals(snapshot()) : null;
+  };
+  const schedule = () => { if (timer === null) timer = setTimeout(report, 250); };
+  const observe = (type, handle) => {
+    try {
+      new PerformanceObserver((list) => { list.getEntries().forEach(handle); schedule(); })
+        .observe({type, buffered: true});
+    } catch (e) {}  // Тип записей не поддерживается браузером
+  };
+  observe("paint", (entry) => {
+    if (entry.name === "first-paint") vitals.fp = entry.startTime;
+    if (entry.name === "first-contentful-paint") vitals.fcp = entry.startTime;
+  });
+  observe("largest-contentful-paint", (entry) => { vitals.lcp = entry.startTime; });
+  observe("layout-shift", (entry) => { if (!entry.hadRecentInput) vitals.cls += entry.value; });
+  window.__cicadaWebVitalsReport = report;
+  window.addEventListener("load", () => setTimeout(report, 0));
+  window.addEventListener("pagehide", report);
+})();
+"""
+
+# Выражение для page.evaluate: отправить текущие метрики страницы и вернуть ключ замера
+_REPORT_JS = "() => window.__cicadaWebVitalsReport ? window.__cicadaWebVitalsReport() : null"
+
+
+# Функция разбирает бюджеты из pytest.ini: строки "<шаблон пути> метрика=предел ..." -> [(шаблон, {метрика: предел})]
+def parse_budgets(lines):
+    budgets = []
+    for line in lines:
+        pattern, *limits = line.split()
+        parsed = {}
+        for limit in limits:
+            name, separator, value = limit.partition("=")
+            if not separator or name not in METRICS:
+                raise ValueError(f"Invalid web vitals budget {limit!r} in {line!r}, expected one of {METRICS}")
+            parsed[name] = float(value)
+        budgets.append((pattern, parsed))
+    return budgets
+
+
+# Функция возвращает описания превышений бюджетов для замеров страниц
+def find_violations(samples, budgets):
+    violations = []
+    for sample in samples:
+        for pattern, limits in budgets:
+            if not fnmatch(sample["path"], pattern):
+                continue
+            for name, limit in limits.items():
+                value = sample.get(name)
+                if value is not None and value > limit:
+                    violations.append(f"{sample['url']}: {name} {value:g} exceeds budget {limit:g} ({pattern})")
+    return violations
+
+
+# Класс собирает метрики страниц одного теста
+class WebVitalsMonitor:
+    def __init__(self, nodeid, budgets=(), network_profile=None):
+        self.nodeid = nodeid
+        self.budgets = budgets
+        self.network_profile = network_profile  # Профиль сети с ограничениями (None — сеть без ограничений)
+        self.samples = {}  # {ключ замера: метрики}, по одному замеру на загруженный документ
+        self._flushers = []  # Функции, запрашивающие метрики у открытых страниц контекстов теста
+
+    # Подключает сбор метрик к синхронному контексту (до открытия в нём страниц)
+    def attach(self, context):
+        context.expose_binding(BINDING, self._on_report)
+        context.add_init_script(script=_COLLECTOR_JS)
+        self._flushers.append(lambda: self.collect(context))
+
+    # Подключает сбор метрик к асинхронному контексту; run выполняет корутину в цикле событий воркера
+    async def attach_async(self, context, run):
+        await context.expose_binding(BINDING, self._on_report)
+        await context.add_init_script(script=_COLLECTOR_JS)
+        self._flushers.append(lambda: run(self.collect_async(context)))
+
+    # Обработчик привязки: страница прислала метрики (вызывается Playwright в потоке теста)
+    def _on_report(self, source, data):
+        sample = self.samples.setdefault(data["navigation"], {"time": time.time()})
+        sample.update({key: value for key, value in data.items() if key != "navigation"})
+        return data["navigation"]
+
+    # Запрашивает итоговые метрики открытых страниц синхронного контекста и добавляет к ним метрики CDP
+    def collect(self, context):
+        for page in context.pages:
+            try:
+                key = page.evaluate(_REPORT_JS)
+                session = context.new_cdp_session(page)
+                session.send("Performance.enable")
+                metrics = session.send("Performance.getMetrics")["metrics"]
+                session.detach()
+            except PlaywrightError as e:  # Страница закрывается или браузер не Chromium
+                logger.debug("Failed to collect web vitals of %s: %s", page.url, e)
+                continue
+            self._add_cdp_metrics(key, metrics)
+
+    # То же для асинхронного контекста
+    async def collect_async(self, context):
+        for page in context.pages:
+            try:
+                key = await page.evaluate(_REPORT_JS)
+                session = await context.new_cdp_session(page)
+                await session.send("Performance.enable")
+                metrics = (await session.send("Performance.getMetrics"))["metrics"]
+                await session.detach()
+            except PlaywrightError as e:
+                logger.debug("Failed to collect web vitals of %s: %s", page.url, e)
+                continue
+            self._add_cdp_metrics(key, metrics)
+
+    def _add_cdp_metrics(self, key, metrics):
+        sample = self.samples.get(key)
+        if sample is None:
+            return
+        values = {metric["name"]: metric["value"] for metric in metrics}
+        if "JSHeapUsedSize" in values:
+            sample["heap_mb"] = round(values["JSHeapUsedSize"] / 1048576, 1)
+        if "Nodes" in values:
+            sample["dom_nodes"] = int(values["Nodes"])
+
+    # Запрашивает метрики у всех открытых страниц теста
+    def flush(self):
+        for flusher in self._flushers:
+            flusher()
+
+    # Проверяет бюджеты: AssertionError со списком превышений
+    def check(self):
+        self.flush()
+        violations = find_violations(self.samples.values(), self.budgets)
+        if violations:
+            stats.count(STATS_SECTION, "budget violations", len(violations))
+            raise AssertionError("Web vitals budgets exceeded:\n" + "\n".join(violations))
+
+    # Записывает замеры теста в статистику сессии (раздел "web vitals")
+    def finish(self):
+        for sample in self.samples.values():
+            record = {"test": self.nodeid, **sample}
+            if self.network_profile:
+                record["network_profile"] = self.network_profile  # Замеры медленной сети — отдельный ряд
+            stats.record(STATS_SECTION, record)
+        self.samples = {}
+        self._flushers = []
+
+
+# Функция дописывает замеры запуска в файл временного ряда (одна строка JSON на замер)
+def append_history(path, samples, run_name):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for sample in samples:
+            f.write(json.dumps({"run": run_name, **sample}, ensure_ascii=False) + "\n")
+
+
+# Функция возвращает строки сводки для терминала: по каждому пути число замеров и перцентили основных метрик
+# (замеры под профилем сети с ограничениями — отдельной строкой "<путь> [<профиль>]")
+def summary_lines(samples):
+    by_path = {}
+    for sample in samples:
+        key = sample["path"]
+        if sample.get("network_profile"):
+            key = f"{key} [{sample['network_profile']}]"
+        by_path.setdefault(key, []).append(sample)
+    lines = []
+    for path, items in sorted(by_path.items()):
+        parts = [f"n={len(items)}"]
+        for name in ("ttfb_ms", "fcp_ms", "lcp_ms"):
+            values = [item[name] for item in items if item.get(name) is not None]
+            if values:
+                parts.append(f"{name} p50={percentile(values, 50):g} p95={percentile(values, 95):g}")
+        for name in ("cls", "js_kb", "transfer_kb", "requests"):
+            values = [item[name] for item in items if item.get(name) is not None]
+            if values:
+                parts.append(f"{name} max={max(values):g}")
+        lines.append(f"  {path:<28} " + " ".join(parts))
+    return lines